@@ -0,0 +1,38 @@
+"""
+Reading settings from the environment.
+
+Settings and feature switches are read through these helpers, so a malformed
+value is logged and replaced by its default instead of raising wherever the
+setting happens to be read first.
+"""
+
+import os
+
+from backend.logger import logger
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+
+
+def env_number(name: str, default, cast=float):
+    """Read a number from the environment variable ``name``, or ``default`` when it is unset or invalid."""
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        logger.warning("Ignoring invalid value for %s: %r", name, value)
+        return default
+
+
+def env_flag(name: str, default: bool) -> bool:
+    """Read an on/off switch from the environment variable ``name``, or ``default`` when it is unset or invalid."""
+    value = os.getenv(name, "").strip().lower()
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    if value:
+        logger.warning("Ignoring invalid value for %s: %r", name, value)
+    return default
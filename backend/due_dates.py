@@ -0,0 +1,249 @@
+"""
+Due date phrases: finding them in text and resolving them to timestamps.
+
+``TaskMetadata.due_date`` is the phrase the user or the LLM wrote ("next
+Friday", "2026-11-01", "EOM"), which cannot be sorted or range-queried.
+``parse_due_date`` resolves a phrase, relative to the time of the request, to
+the end (23:59:59 UTC) of the day it names. It is local and deterministic:
+
+- today, tonight, EOD, this morning/afternoon/evening: today
+- tomorrow: tomorrow
+- Friday, this Friday: the next Friday, today included. Next Friday: the
+  Friday of the following week (weeks start on Monday)
+- this week, end of the week, EOW: the next Friday, today included. Next
+  week: the Friday of the following week
+- this weekend: the next Sunday, today included. Next weekend: the Sunday
+  of the following week
+- this month, end of the month, EOM: the month's last day. Next month: the
+  last day of the following month
+- this year, end of the year, EOY: December 31st. Next year: December 31st
+  of the following year
+- in 3 days, in 2 weeks, in 1 month
+- 2026-11-01, 11/1, 11/1/26 (month first), Nov 1, November 1st, 2026,
+  1st of November: a date without a year is the next such date, today
+  included
+
+Anything else resolves to None. Resolved days are kept in an LRU cache keyed
+on the normalized phrase and the request's date, since the same few phrases
+come up over and over.
+
+``find_due_date`` finds such a phrase in free text, and ``find_open_ended``
+finds "no deadline" phrasing. Slash dates, month and day without a year, and
+weekdays only count after a lead-in such as "by", "due" or "on", so "1/2
+gallon" and "I may 2 things" are not due dates. ``detect_due_date`` combines them into the
+pre-pass the task agent runs before its extraction LLM call (disable it with
+``DUE_DATE_PREPASS=false``).
+"""
+
+import calendar
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from backend.config import env_flag
+
+# Distinct (phrase, request date) pairs whose resolved day is cached
+DUE_DATE_CACHE_SIZE = 1024
+# Time of day a due date resolves to
+END_OF_DAY = time(23, 59, 59, tzinfo=timezone.utc)
+
+_WEEKDAY = r"(?:mon|tues|wednes|thurs|fri|satur|sun)day"
+_MONTH = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+          r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)")
+_ORDINAL = r"\d{1,2}(?:st|nd|rd|th)?"
+# Phrases that name a day wherever they appear
+_EXPLICIT_DATE = (
+    r"today|tonight|tomorrow"
+    r"|(?:this|next) (?:morning|afternoon|evening|weekend|week|month|year|" + _WEEKDAY + r")"
+    r"|end of (?:the )?(?:day|week|month|year)|eod|eow|eom|eoy"
+    r"|in \d+ (?:days?|weeks?|months?)"
+    r"|\d{4}-\d{1,2}-\d{1,2}"
+)
+# Phrases that only name a day after a lead-in: "1/2" may be a fraction and "may 2" a verb
+_BARE_DATE = (
+    r"\d{1,2}/\d{1,2}(?:/\d{2,4})?"
+    r"|" + _MONTH + r"\.? " + _ORDINAL + r"(?:,? \d{4})?"
+    r"|" + _ORDINAL + r" (?:of )?" + _MONTH + r"(?:,? \d{4})?"
+    r"|" + _WEEKDAY
+)
+_DUE_LEAD_IN = r"\b(?:(?:due\s+)?(?:by|before|on|until|till)|due|no later than)\s+"
+_DUE_DATE = re.compile(
+    r"(?:" + _DUE_LEAD_IN + r")?\b(" + _EXPLICIT_DATE + r")\b|" + _DUE_LEAD_IN + r"(" + _BARE_DATE + r")\b",
+    re.IGNORECASE)
+# "No deadline" phrasing. Words such as "whenever" or "ongoing" only count
+# where they are about the task's timing: ending a clause, or in a set phrase.
+_OPEN_ENDED = re.compile(
+    r"\b(?:no (?:due )?date|no deadline|no rush|not urgent"
+    r"|whenever (?:i|you|we) (?:can|get (?:a chance|around to it|to it)|have (?:the )?time)"
+    r"|(?:anytime|whenever) (?:is fine|works)|on an ongoing basis)\b"
+    r"|\b(?:whenever|someday|anytime|ongoing|open[- ]ended)(?=\s*(?:[.,;!?)]|$))",
+    re.IGNORECASE)
+
+_LEAD_IN = re.compile(r"^(?:(?:due )?(?:by|before|on|until|till|for)|due|no later than)\s+")
+_ISO_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_SLASH_DATE = re.compile(r"(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?")
+_MONTH_DAY = re.compile(r"(" + _MONTH + r")\.? (\d{1,2})(?:st|nd|rd|th)?(?:,? (\d{4}))?")
+_DAY_MONTH = re.compile(r"(\d{1,2})(?:st|nd|rd|th)? (?:of )?(" + _MONTH + r")(?:,? (\d{4}))?")
+_IN_PERIOD = re.compile(r"in (\d+) (day|week|month)s?")
+_WEEKDAY_NAME = re.compile(r"(?:(this|next) )?(" + _WEEKDAY + r")")
+
+_WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+_MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+_FRIDAY = 4
+_SUNDAY = 6
+_TODAY = frozenset({"today", "tonight", "eod", "end of day", "end of the day",
+                    "this morning", "this afternoon", "this evening"})
+_END_OF_WEEK = frozenset({"this week", "eow", "end of week", "end of the week"})
+_END_OF_MONTH = frozenset({"this month", "eom", "end of month", "end of the month"})
+_END_OF_YEAR = frozenset({"this year", "eoy", "end of year", "end of the year"})
+
+
+def find_due_date(text: str) -> Tuple[Optional[str], str]:
+    """Find a due date phrase in ``text``. Returns the phrase (or None) and the text without it."""
+    match = _DUE_DATE.search(text)
+    if match is None:
+        return None, text
+    remainder = (text[:match.start()] + text[match.end():]).strip()
+    return match.group(1) or match.group(2), re.sub(r"\s{2,}", " ", remainder)
+
+
+def find_open_ended(text: str) -> Tuple[bool, str]:
+    """Find "no deadline" phrasing in ``text``. Returns whether it is there and the text without it."""
+    if not _OPEN_ENDED.search(text):
+        return False, text
+    return True, re.sub(r"\s{2,}", " ", _OPEN_ENDED.sub("", text)).strip()
+
+
+def _normalize(phrase: str) -> str:
+    phrase = " ".join(phrase.lower().split()).strip(" .!?;:")
+    return _LEAD_IN.sub("", phrase)
+
+
+def _coming(today: date, weekday: int) -> date:
+    """The next ``weekday``, today included."""
+    return today + timedelta(days=(weekday - today.weekday()) % 7)
+
+
+def _next_week(today: date, weekday: int) -> date:
+    """``weekday`` of the week after this one."""
+    return today + timedelta(days=7 - today.weekday() + weekday)
+
+
+def _last_day(year: int, month: int) -> date:
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _add_months(day: date, months: int) -> date:
+    year, month = divmod(day.month - 1 + months, 12)
+    year += day.year
+    return date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def _calendar_date(today: date, year: Optional[str], month: int, day: int) -> Optional[date]:
+    """A calendar date; without a year, the next such date, today included. None if it does not exist."""
+    try:
+        if year is not None:
+            return date(int(year) + (2000 if len(year) == 2 else 0), month, day)
+        resolved = date(today.year, month, day)
+        return resolved if resolved >= today else date(today.year + 1, month, day)
+    except ValueError:
+        return None
+
+
+def _month_number(name: str) -> int:
+    return _MONTHS.index(name[:3]) + 1
+
+
+@lru_cache(maxsize=DUE_DATE_CACHE_SIZE)
+def _resolve_day(phrase: str, today: date) -> Optional[date]:
+    """Resolve a normalized phrase to the day it names, relative to ``today``."""
+    if phrase in _TODAY:
+        return today
+    if phrase == "tomorrow":
+        return today + timedelta(days=1)
+    if phrase in _END_OF_WEEK:
+        return _coming(today, _FRIDAY)
+    if phrase == "next week":
+        return _next_week(today, _FRIDAY)
+    if phrase == "this weekend":
+        return _coming(today, _SUNDAY)
+    if phrase == "next weekend":
+        return _next_week(today, _SUNDAY)
+    if phrase in _END_OF_MONTH:
+        return _last_day(today.year, today.month)
+    if phrase == "next month":
+        following = _add_months(today.replace(day=1), 1)
+        return _last_day(following.year, following.month)
+    if phrase in _END_OF_YEAR:
+        return date(today.year, 12, 31)
+    if phrase == "next year":
+        return date(today.year + 1, 12, 31)
+    if match := _WEEKDAY_NAME.fullmatch(phrase):
+        weekday = _WEEKDAYS.index(match.group(2))
+        return _next_week(today, weekday) if match.group(1) == "next" else _coming(today, weekday)
+    if match := _IN_PERIOD.fullmatch(phrase):
+        count, unit = int(match.group(1)), match.group(2)
+        if unit == "month":
+            return _add_months(today, count)
+        return today + timedelta(days=count * (7 if unit == "week" else 1))
+    if match := _ISO_DATE.fullmatch(phrase):
+        return _calendar_date(today, match.group(1), int(match.group(2)), int(match.group(3)))
+    if match := _SLASH_DATE.fullmatch(phrase):
+        return _calendar_date(today, match.group(3), int(match.group(1)), int(match.group(2)))
+    if match := _MONTH_DAY.fullmatch(phrase):
+        return _calendar_date(today, match.group(3), _month_number(match.group(1)), int(match.group(2)))
+    if match := _DAY_MONTH.fullmatch(phrase):
+        return _calendar_date(today, match.group(3), _month_number(match.group(2)), int(match.group(1)))
+    return None
+
+
+def parse_due_date(phrase: Optional[str], now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Resolve a due date phrase to the end of the day it names, in UTC.
+
+    Args:
+        phrase: Due date as written, e.g. "next Friday", "2026-11-01" or "EOM"
+        now: Time of the request the phrase is relative to (default: now)
+
+    Returns:
+        23:59:59 UTC on the due day, or None if the phrase names no day
+    """
+    if not phrase:
+        return None
+    now = now.astimezone(timezone.utc) if now is not None else datetime.now(timezone.utc)
+    day = _resolve_day(_normalize(phrase), now.date())
+    return datetime.combine(day, END_OF_DAY) if day is not None else None
+
+
+def due_date_cache_info():
+    """Hits, misses and size of the resolved-day cache, as ``functools.lru_cache`` reports them."""
+    return _resolve_day.cache_info()
+
+
+class LocalDueDate(NamedTuple):
+    """A due date found without the LLM: an explicit phrase, or open-ended phrasing."""
+    due_date: Optional[str]
+    is_open_ended: bool
+
+
+def prepass_enabled() -> bool:
+    """Return whether DUE_DATE_PREPASS allows the local due date pre-pass (default true)."""
+    return env_flag("DUE_DATE_PREPASS", True)
+
+
+def detect_due_date(text: Optional[str], now: Optional[datetime] = None) -> Optional[LocalDueDate]:
+    """
+    Find an explicit due date or open-ended phrasing in ``text``, or return None.
+
+    A due date phrase only counts when ``parse_due_date`` resolves it, so a
+    match such as "Feb 30" is left to the LLM.
+    """
+    if not text:
+        return None
+    phrase, _ = find_due_date(text)
+    if phrase is not None and parse_due_date(phrase, now) is not None:
+        return LocalDueDate(phrase, False)
+    if find_open_ended(text)[0]:
+        return LocalDueDate(None, True)
+    return None
@@ -1,3 +1,4 @@
+import asyncio
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from langchain_core.runnables import RunnableLambda
@@ -5,19 +6,46 @@ from typing import Optional, List
 from langgraph.types import interrupt, Command
 from langgraph.checkpoint.memory import InMemorySaver
 
-from backend.types import TaskMetadata, TaskJudgment, JudgmentType, TaskAgentState, UserFeedbackRetry, SubtaskJudgment
+from backend.types import TaskMetadata, TaskJudgment, JudgmentType, TaskAgentState, UserFeedbackRetry, SubtaskJudgment, SubtaskMetadata
 from backend.tools import (
     extract_task,
     judge_task,
+    extract_and_judge_task,
     generate_subtasks,
     judge_subtasks,
     create_task,
+    find_duplicate_tasks,
     retry_task_with_feedback,
-    retry_subtasks_with_feedback
+    retry_subtasks_with_feedback,
+    aextract_task,
+    ajudge_task,
+    aextract_and_judge_task,
+    agenerate_subtasks,
+    ajudge_subtasks,
+    aretry_task_with_feedback,
+    aretry_subtasks_with_feedback
+)
+from backend.tools.interaction_messages import (
+    generate_task_clarification_prompt,
+    agenerate_task_clarification_prompt,
+    clarification_mode,
+    CLARIFICATION_MODE_RICH,
+    CLARIFICATION_MODE_TEMPLATE
 )
-from backend.tools.interaction_messages import generate_task_clarification_prompt
 #from backend.tools.task_tools import generate_task_clarification_prompt
 from backend.logger import logger
+from backend.tools.prejudge import prejudge_task, prejudge_subtasks, judge_task_by_rules, is_due_date_question
+from backend.due_dates import LocalDueDate, detect_due_date, prepass_enabled
+from backend.tools.degraded import (
+    degrade,
+    extract_task_locally,
+    refine_task_locally,
+    judge_task_locally,
+    skipped_subtasks,
+    judge_subtasks_locally
+)
+from backend.tools.speculation import speculation_enabled, get_speculator, speculation_key, DEFAULT_TENANT
+from backend.metrics import instrument_node, record_retry, record_due_date_prepass
 
 def strtobool(val: str) -> bool:
     """Convert a string representation of truth to true (1) or false (0).
@@ -35,26 +63,141 @@ def strtobool(val: str) -> bool:
         raise ValueError(f"invalid truth value {val}")
 
 # Node definitions
+def _reset_for_new_task(state: TaskAgentState) -> None:
+    state.user_wants_subtasks = None
+    state.user_accepted_subtasks = None
+    state.user_feedback = None
+    state.last_user_message = None
+
+def _local_due_date(state: TaskAgentState, text: Optional[str]) -> Optional[LocalDueDate]:
+    """
+    Due date pre-pass, run before the LLM: find an explicit due date or open-ended
+    phrasing in ``text``, confirming the due date right away when there is one.
+    """
+    if not prepass_enabled():
+        return None
+    local = detect_due_date(text)
+    if local is not None:
+        state.due_date_confirmed = True
+    return local
+
+def _apply_local_due_date(metadata: TaskMetadata, local: Optional[LocalDueDate]) -> bool:
+    """
+    Fill in the due date the LLM missed from the pre-pass, dropping the questions
+    it added to ask for one. Returns whether the metadata changed.
+    """
+    if not prepass_enabled():
+        return False
+    llm_found = bool(metadata.due_date) or metadata.is_open_ended
+    if local is None or llm_found:
+        record_due_date_prepass(("agreed" if local else "llm") if llm_found else "none")
+        return False
+    metadata.due_date, metadata.is_open_ended = local
+    metadata.questions = [question for question in metadata.questions if not is_due_date_question(question)]
+    record_due_date_prepass("filled")
+    return True
+
+def _fused_judgment(state: TaskAgentState, local: Optional[LocalDueDate], result: TaskJudgment) -> TaskJudgment:
+    """
+    Apply the pre-pass to a fused extraction. A failure judged without the due date the
+    pre-pass found is replaced by the rules' pass when they now pass the task.
+    """
+    if _apply_local_due_date(state.task_metadata, local) and result.judgment == JudgmentType.FAIL:
+        rejudged = judge_task_by_rules(state.task_metadata)
+        if rejudged is not None and rejudged.judgment == JudgmentType.PASS:
+            return rejudged
+    return result
+
+def _extract_locally(state: TaskAgentState) -> TaskMetadata:
+    result = extract_task_locally(state.input)
+    if result.due_date is not None or result.is_open_ended:
+        state.due_date_confirmed = True
+    return result
+
+@instrument_node("extract_task")
 def extract_task_node(state: TaskAgentState) -> TaskAgentState:
     """
     Extract the main task from user input and reset state for a new task.
     """
     # Reset state for a new task
-    state.user_wants_subtasks = None
-    state.user_accepted_subtasks = None
-    state.user_feedback = None
-    state.last_user_message = None
+    _reset_for_new_task(state)
     
+    if degrade(state, "extract_task"):
+        state.task_metadata = _extract_locally(state)
+        return state
+    local = _local_due_date(state, state.input)
     result = extract_task(state)
+    _apply_local_due_date(result, local)
     state.task_metadata = result
     return state
 
+@instrument_node("extract_task")
+async def aextract_task_node(state: TaskAgentState) -> TaskAgentState:
+    """Async version of extract_task_node."""
+    _reset_for_new_task(state)
+    if degrade(state, "extract_task"):
+        state.task_metadata = _extract_locally(state)
+        return state
+    local = _local_due_date(state, state.input)
+    state.task_metadata = await aextract_task(state)
+    _apply_local_due_date(state.task_metadata, local)
+    return state
+
+@instrument_node("judge_task")
 def judge_task_node(state: TaskAgentState) -> TaskAgentState:
     """Judge the task and track retry attempts."""
     if state.task_judgment_retry is None:
         state.task_judgment_retry = UserFeedbackRetry()
     
-    result = judge_task(state.task_metadata)
+    if degrade(state, "judge_task"):
+        return _apply_task_judgment(state, judge_task_locally(state.task_metadata))
+    result = prejudge_task(state.task_metadata) or judge_task(state.task_metadata)
+    return _apply_task_judgment(state, result)
+
+@instrument_node("judge_task")
+async def ajudge_task_node(state: TaskAgentState) -> TaskAgentState:
+    """Async version of judge_task_node."""
+    if state.task_judgment_retry is None:
+        state.task_judgment_retry = UserFeedbackRetry()
+
+    if degrade(state, "judge_task"):
+        return _apply_task_judgment(state, judge_task_locally(state.task_metadata))
+    result = prejudge_task(state.task_metadata) or await ajudge_task(state.task_metadata)
+    return _apply_task_judgment(state, result)
+
+@instrument_node("extract_and_judge_task")
+def extract_and_judge_task_node(state: TaskAgentState) -> TaskAgentState:
+    """
+    Fused pipeline entry: extract and judge a new task with one LLM call.
+    Updates the state exactly as extract_task_node followed by judge_task_node would.
+    """
+    _reset_for_new_task(state)
+    if state.task_judgment_retry is None:
+        state.task_judgment_retry = UserFeedbackRetry()
+
+    if degrade(state, "extract_and_judge_task"):
+        state.task_metadata = _extract_locally(state)
+        return _apply_task_judgment(state, judge_task_locally(state.task_metadata))
+    local = _local_due_date(state, state.input)
+    state.task_metadata, result = extract_and_judge_task(state)
+    return _apply_task_judgment(state, _fused_judgment(state, local, result))
+
+@instrument_node("extract_and_judge_task")
+async def aextract_and_judge_task_node(state: TaskAgentState) -> TaskAgentState:
+    """Async version of extract_and_judge_task_node."""
+    _reset_for_new_task(state)
+    if state.task_judgment_retry is None:
+        state.task_judgment_retry = UserFeedbackRetry()
+
+    if degrade(state, "extract_and_judge_task"):
+        state.task_metadata = _extract_locally(state)
+        return _apply_task_judgment(state, judge_task_locally(state.task_metadata))
+    local = _local_due_date(state, state.input)
+    state.task_metadata, result = await aextract_and_judge_task(state)
+    return _apply_task_judgment(state, _fused_judgment(state, local, result))
+
+def _apply_task_judgment(state: TaskAgentState, result: TaskJudgment) -> TaskAgentState:
+    """Record a task judgment and update the retry counter, forcing a pass at max retries."""
     state.task_judgment = result
     
     # Reset retry counter on pass
@@ -62,6 +205,7 @@ def judge_task_node(state: TaskAgentState) -> TaskAgentState:
         state.task_judgment_retry.retries = 0
     else:
         state.task_judgment_retry.retries += 1
+        record_retry("task")
         
         # If we've hit max retries, force a pass
         if state.task_judgment_retry.retries >= state.task_judgment_retry.max_retries:
@@ -72,15 +216,17 @@ def judge_task_node(state: TaskAgentState) -> TaskAgentState:
     
     return state
 
-def ask_to_subtask_node(state: TaskAgentState) -> TaskAgentState:
-    """
-    Pause execution and ask the user if they want help breaking the task into subtasks.
-    Retries up to 2 times before defaulting to "no".
-    """
-    if state.task_metadata.is_subtaskable is False:
+def _ask_to_subtask(state: TaskAgentState) -> TaskAgentState:
+    if state.task_metadata.is_subtaskable is False or degrade(state, "ask_to_subtask"):
         state.user_wants_subtasks = False
         return state
 
+    # Generate subtasks while the user decides; used on "yes", dropped on "no"
+    speculating = speculation_enabled() and state.user_wants_subtasks is None
+    if speculating:
+        get_speculator().start(speculation_key(state.task_metadata), state.tenant_id or DEFAULT_TENANT,
+                               state.task_metadata)
+
     main_prompt = "Would you like help breaking this task into subtasks? (yes/no)"
     retries = 0
     max_retries = 2
@@ -105,20 +251,68 @@ def ask_to_subtask_node(state: TaskAgentState) -> TaskAgentState:
                 state.user_wants_subtasks = False
             continue
         break
+
+    if speculating and not state.user_wants_subtasks:
+        get_speculator().discard(speculation_key(state.task_metadata))
     return state
 
+@instrument_node("ask_to_subtask")
+def ask_to_subtask_node(state: TaskAgentState) -> TaskAgentState:
+    """
+    Pause execution and ask the user if they want help breaking the task into subtasks.
+    Retries up to 2 times before defaulting to "no". Subtasks are not offered while the LLM is unavailable.
+    """
+    return _ask_to_subtask(state)
+
+@instrument_node("ask_to_subtask")
+async def aask_to_subtask_node(state: TaskAgentState) -> TaskAgentState:
+    """Async version of ask_to_subtask_node, run on the event loop since it only waits for the user."""
+    return _ask_to_subtask(state)
+
 
+@instrument_node("generate_subtasks")
 def generate_subtasks_node(state: TaskAgentState) -> TaskAgentState:
-    result = generate_subtasks(state.task_metadata)
-    state.subtask_metadata = result
+    if degrade(state, "generate_subtasks"):
+        state.subtask_metadata = skipped_subtasks()
+        return state
+    result = get_speculator().take(speculation_key(state.task_metadata)) if speculation_enabled() else None
+    state.subtask_metadata = result or generate_subtasks(state.task_metadata, state.tenant_id or DEFAULT_TENANT)
     return state
 
+@instrument_node("generate_subtasks")
+async def agenerate_subtasks_node(state: TaskAgentState) -> TaskAgentState:
+    """Async version of generate_subtasks_node."""
+    if degrade(state, "generate_subtasks"):
+        state.subtask_metadata = skipped_subtasks()
+        return state
+    result = await get_speculator().atake(speculation_key(state.task_metadata)) if speculation_enabled() else None
+    state.subtask_metadata = result or await agenerate_subtasks(state.task_metadata, state.tenant_id or DEFAULT_TENANT)
+    return state
+
+@instrument_node("judge_subtasks")
 def judge_subtasks_node(state: TaskAgentState) -> TaskAgentState:
     """Judge the subtasks and track retry attempts."""
     if state.subtask_judgment_retry is None:
         state.subtask_judgment_retry = UserFeedbackRetry()
     
-    result = judge_subtasks(state.task_metadata, state.subtask_metadata)
+    if degrade(state, "judge_subtasks"):
+        return _apply_subtask_judgment(state, judge_subtasks_locally())
+    result = prejudge_subtasks(state.subtask_metadata) or judge_subtasks(state.task_metadata, state.subtask_metadata)
+    return _apply_subtask_judgment(state, result)
+
+@instrument_node("judge_subtasks")
+async def ajudge_subtasks_node(state: TaskAgentState) -> TaskAgentState:
+    """Async version of judge_subtasks_node."""
+    if state.subtask_judgment_retry is None:
+        state.subtask_judgment_retry = UserFeedbackRetry()
+
+    if degrade(state, "judge_subtasks"):
+        return _apply_subtask_judgment(state, judge_subtasks_locally())
+    result = prejudge_subtasks(state.subtask_metadata) or await ajudge_subtasks(state.task_metadata, state.subtask_metadata)
+    return _apply_subtask_judgment(state, result)
+
+def _apply_subtask_judgment(state: TaskAgentState, result: SubtaskJudgment) -> TaskAgentState:
+    """Record a subtask judgment and update the retry counter, forcing a pass at max retries."""
     state.subtask_judgment = result
     
     # Reset retry counter on pass
@@ -126,6 +320,7 @@ def judge_subtasks_node(state: TaskAgentState) -> TaskAgentState:
         state.subtask_judgment_retry.retries = 0
     else:
         state.subtask_judgment_retry.retries += 1
+        record_retry("subtasks")
         
         # If we've hit max retries, force a pass
         if state.subtask_judgment_retry.retries >= state.subtask_judgment_retry.max_retries:
@@ -136,12 +331,40 @@ def judge_subtasks_node(state: TaskAgentState) -> TaskAgentState:
     
     return state
 
-def create_task_node(state: TaskAgentState) -> TaskAgentState:
+def _save_task(state: TaskAgentState) -> TaskAgentState:
     subtasks = state.subtask_metadata.subtasks if state.subtask_metadata else []
-    create_task(state.task_metadata.task, subtasks)
+    # Checked before saving, so the new task cannot match itself
+    state.duplicates = find_duplicate_tasks(state.task_metadata.task, state.tenant_id)
+    if state.duplicates:
+        logger.warning("Task %r almost duplicates open task(s) %s", state.task_metadata.task,
+                       [duplicate.task_id for duplicate in state.duplicates])
+    result = create_task(
+        state.task_metadata.task,
+        subtasks,
+        due_date=state.task_metadata.due_date,
+        is_open_ended=state.task_metadata.is_open_ended,
+        tenant_id=state.tenant_id
+    )
+    state.task_id = result["id"]
     state.task_creation_confirmed = True
     return state
 
+@instrument_node("create_task")
+def create_task_node(state: TaskAgentState) -> TaskAgentState:
+    return _save_task(state)
+
+@instrument_node("create_task")
+async def acreate_task_node(state: TaskAgentState) -> TaskAgentState:
+    """Async version of create_task_node that saves the task on a worker thread instead of the event loop."""
+    return await asyncio.to_thread(_save_task, state)
+
+def _clarification_mode(state: TaskAgentState, node: str) -> Optional[str]:
+    # Rich messages fall back to the template, which needs no LLM
+    if clarification_mode() == CLARIFICATION_MODE_RICH and degrade(state, node):
+        return CLARIFICATION_MODE_TEMPLATE
+    return None
+
+@instrument_node("ask_about_task")
 def ask_about_task_node(state: TaskAgentState) -> TaskAgentState:
     """
     Pause to ask the user for clarification after failed judgment.
@@ -149,7 +372,8 @@ def ask_about_task_node(state: TaskAgentState) -> TaskAgentState:
     """
     logger.debug("Entering ask_about_task_node ...")
     if state.user_feedback is None:
-        user_message = generate_task_clarification_prompt(state.task_metadata, state.task_judgment, "task")
+        user_message = generate_task_clarification_prompt(state.task_metadata, state.task_judgment, "task",
+                                                          mode=_clarification_mode(state, "ask_about_task"))
         state.last_user_message = user_message
         user_input = interrupt({"prompt": user_message})
         logger.debug("ask_about_task_node: user_input = %s", user_input)
@@ -160,28 +384,84 @@ def ask_about_task_node(state: TaskAgentState) -> TaskAgentState:
     logger.debug("Exiting ask_about_task_node ...")
     return state
 
+@instrument_node("ask_about_task")
+async def aask_about_task_node(state: TaskAgentState) -> TaskAgentState:
+    """Async version of ask_about_task_node."""
+    logger.debug("Entering ask_about_task_node ...")
+    if state.user_feedback is None:
+        user_message = await agenerate_task_clarification_prompt(state.task_metadata, state.task_judgment, "task",
+                                                                 mode=_clarification_mode(state, "ask_about_task"))
+        state.last_user_message = user_message
+        user_input = interrupt({"prompt": user_message})
+        logger.debug("ask_about_task_node: user_input = %s", user_input)
+        state.user_feedback = user_input
+
+    state.task_judgment = None
+    logger.debug("ask_about_task_node: user_feedback = %s", state.user_feedback)
+    logger.debug("Exiting ask_about_task_node ...")
+    return state
+
+def _refine_locally(state: TaskAgentState) -> TaskMetadata:
+    result = refine_task_locally(state.task_metadata, state.user_feedback)
+    if result.due_date is not None or result.is_open_ended:
+        state.due_date_confirmed = True
+    return result
+
+@instrument_node("retry_task")
 def retry_task_node(state: TaskAgentState) -> TaskAgentState:
     """
     Process user feedback to refine the task.
     Clears user_feedback after processing.
     """
-    result = retry_task_with_feedback(state)
+    if degrade(state, "retry_task"):
+        result = _refine_locally(state)
+    else:
+        local = _local_due_date(state, state.user_feedback) or _local_due_date(state, state.input)
+        result = retry_task_with_feedback(state)
+        _apply_local_due_date(result, local)
     state.task_metadata = result
     state.user_feedback = None
     return state
 
+@instrument_node("retry_task")
+async def aretry_task_node(state: TaskAgentState) -> TaskAgentState:
+    """Async version of retry_task_node."""
+    if degrade(state, "retry_task"):
+        state.task_metadata = _refine_locally(state)
+    else:
+        local = _local_due_date(state, state.user_feedback) or _local_due_date(state, state.input)
+        state.task_metadata = await aretry_task_with_feedback(state)
+        _apply_local_due_date(state.task_metadata, local)
+    state.user_feedback = None
+    return state
+
+def _apply_refined_subtasks(state: TaskAgentState, result: SubtaskMetadata) -> TaskAgentState:
+    # Preserve the user_accepted_subtasks field from the result
+    state.user_accepted_subtasks = result.user_accepted_subtasks
+    state.subtask_metadata = result
+    state.user_feedback = None
+    return state
+
+@instrument_node("retry_subtasks")
 def retry_subtasks_node(state: TaskAgentState) -> TaskAgentState:
     """
     Process user feedback to refine the subtasks.
     Clears user_feedback after processing.
     """
+    if degrade(state, "retry_subtasks"):
+        return _apply_refined_subtasks(state, skipped_subtasks(state.subtask_metadata))
     result = retry_subtasks_with_feedback(state)
-    # Preserve the user_accepted_subtasks field from the result
-    state.user_accepted_subtasks = result.user_accepted_subtasks
-    state.subtask_metadata = result
-    state.user_feedback = None
-    return state
+    return _apply_refined_subtasks(state, result)
+
+@instrument_node("retry_subtasks")
+async def aretry_subtasks_node(state: TaskAgentState) -> TaskAgentState:
+    """Async version of retry_subtasks_node."""
+    if degrade(state, "retry_subtasks"):
+        return _apply_refined_subtasks(state, skipped_subtasks(state.subtask_metadata))
+    result = await aretry_subtasks_with_feedback(state)
+    return _apply_refined_subtasks(state, result)
 
+@instrument_node("ask_about_subtasks")
 def ask_about_subtasks_node(state: TaskAgentState) -> TaskAgentState:
     """
     Pause to ask the user for clarification about subtasks after failed judgment.
@@ -189,7 +469,23 @@ def ask_about_subtasks_node(state: TaskAgentState) -> TaskAgentState:
     """
     logger.debug("Entering ask_about_subtask_node ...")
     if state.user_feedback is None:
-        user_message = generate_task_clarification_prompt(state.subtask_metadata, state.subtask_judgment, "subtasks")
+        user_message = generate_task_clarification_prompt(state.subtask_metadata, state.subtask_judgment, "subtasks",
+                                                          mode=_clarification_mode(state, "ask_about_subtasks"))
+        state.last_user_message = user_message
+        user_input = interrupt({"prompt": user_message})
+        logger.debug("ask_about_subtask_node: user_input = %s", user_input)
+        state.user_feedback = user_input
+
+    state.subtask_judgment = None
+    return state
+
+@instrument_node("ask_about_subtasks")
+async def aask_about_subtasks_node(state: TaskAgentState) -> TaskAgentState:
+    """Async version of ask_about_subtasks_node."""
+    logger.debug("Entering ask_about_subtask_node ...")
+    if state.user_feedback is None:
+        user_message = await agenerate_task_clarification_prompt(state.subtask_metadata, state.subtask_judgment, "subtasks",
+                                                                 mode=_clarification_mode(state, "ask_about_subtasks"))
         state.last_user_message = user_message
         user_input = interrupt({"prompt": user_message})
         logger.debug("ask_about_subtask_node: user_input = %s", user_input)
@@ -199,47 +495,71 @@ def ask_about_subtasks_node(state: TaskAgentState) -> TaskAgentState:
     return state
 
 # Build the graph
-builder = StateGraph(TaskAgentState)
-
-builder.add_node("extract_task", RunnableLambda(extract_task_node))
-builder.add_node("judge_task", RunnableLambda(judge_task_node))
-builder.add_node("ask_to_subtask", RunnableLambda(ask_to_subtask_node))
-builder.add_node("ask_about_task", RunnableLambda(ask_about_task_node))
-builder.add_node("retry_task", RunnableLambda(retry_task_node))
-builder.add_node("generate_subtasks", RunnableLambda(generate_subtasks_node))
-builder.add_node("judge_subtasks", RunnableLambda(judge_subtasks_node))
-builder.add_node("ask_about_subtasks", RunnableLambda(ask_about_subtasks_node))
-builder.add_node("retry_subtasks", RunnableLambda(retry_subtasks_node))
-builder.add_node("create_task", RunnableLambda(create_task_node))
-
-builder.set_entry_point("extract_task")
-
-# Graph edges
-builder.add_edge("extract_task", "judge_task")
-builder.add_conditional_edges("judge_task", lambda s: s.task_judgment.judgment.value, {
-    JudgmentType.PASS.value: "ask_to_subtask",
-    JudgmentType.FAIL.value: "ask_about_task"
-})
-builder.add_edge("ask_about_task", "retry_task")
-builder.add_edge("retry_task", "judge_task")
-
-builder.add_conditional_edges(
-    "ask_to_subtask",
-    lambda s: "ask_to_subtask" if s.user_wants_subtasks is None else ("yes" if s.user_wants_subtasks else "no"),
-    {
-        "yes": "generate_subtasks",
-        "no": "create_task",
-        "ask_to_subtask": "ask_to_subtask"
+def _route_task_judgment(state: TaskAgentState) -> str:
+    return state.task_judgment.judgment.value
+
+def build_graph(fused: bool = False) -> StateGraph:
+    """
+    Build the task agent graph.
+
+    Args:
+        fused: Start with a single extract-and-judge LLM call instead of separate
+            extract_task and judge_task calls. Retries still go through judge_task.
+    """
+    builder = StateGraph(TaskAgentState)
+
+    # Nodes that call the LLM register an async variant, used by graph.ainvoke/astream
+    if fused:
+        builder.add_node("extract_and_judge_task", RunnableLambda(extract_and_judge_task_node, afunc=aextract_and_judge_task_node))
+    else:
+        builder.add_node("extract_task", RunnableLambda(extract_task_node, afunc=aextract_task_node))
+    builder.add_node("judge_task", RunnableLambda(judge_task_node, afunc=ajudge_task_node))
+    builder.add_node("ask_to_subtask", RunnableLambda(ask_to_subtask_node, afunc=aask_to_subtask_node))
+    builder.add_node("ask_about_task", RunnableLambda(ask_about_task_node, afunc=aask_about_task_node))
+    builder.add_node("retry_task", RunnableLambda(retry_task_node, afunc=aretry_task_node))
+    builder.add_node("generate_subtasks", RunnableLambda(generate_subtasks_node, afunc=agenerate_subtasks_node))
+    builder.add_node("judge_subtasks", RunnableLambda(judge_subtasks_node, afunc=ajudge_subtasks_node))
+    builder.add_node("ask_about_subtasks", RunnableLambda(ask_about_subtasks_node, afunc=aask_about_subtasks_node))
+    builder.add_node("retry_subtasks", RunnableLambda(retry_subtasks_node, afunc=aretry_subtasks_node))
+    builder.add_node("create_task", RunnableLambda(create_task_node, afunc=acreate_task_node))
+
+    # Graph edges
+    task_judgment_routes = {
+        JudgmentType.PASS.value: "ask_to_subtask",
+        JudgmentType.FAIL.value: "ask_about_task"
     }
-)
-builder.add_edge("generate_subtasks", "judge_subtasks")
-builder.add_conditional_edges("judge_subtasks", lambda s: s.subtask_judgment.judgment.value, {
-    JudgmentType.PASS.value: "create_task",
-    JudgmentType.FAIL.value: "ask_about_subtasks"
-})
-builder.add_edge("ask_about_subtasks", "retry_subtasks")
-builder.add_edge("retry_subtasks", "judge_subtasks")
-builder.add_edge("create_task", END)
-
-# Compile the graph
-graph = builder.compile()
\ No newline at end of file
+    if fused:
+        builder.set_entry_point("extract_and_judge_task")
+        builder.add_conditional_edges("extract_and_judge_task", _route_task_judgment, task_judgment_routes)
+    else:
+        builder.set_entry_point("extract_task")
+        builder.add_edge("extract_task", "judge_task")
+    builder.add_conditional_edges("judge_task", _route_task_judgment, task_judgment_routes)
+    builder.add_edge("ask_about_task", "retry_task")
+    builder.add_edge("retry_task", "judge_task")
+
+    builder.add_conditional_edges(
+        "ask_to_subtask",
+        lambda s: "ask_to_subtask" if s.user_wants_subtasks is None else ("yes" if s.user_wants_subtasks else "no"),
+        {
+            "yes": "generate_subtasks",
+            "no": "create_task",
+            "ask_to_subtask": "ask_to_subtask"
+        }
+    )
+    builder.add_edge("generate_subtasks", "judge_subtasks")
+    builder.add_conditional_edges("judge_subtasks", lambda s: s.subtask_judgment.judgment.value, {
+        JudgmentType.PASS.value: "create_task",
+        JudgmentType.FAIL.value: "ask_about_subtasks"
+    })
+    builder.add_edge("ask_about_subtasks", "retry_subtasks")
+    builder.add_edge("retry_subtasks", "judge_subtasks")
+    builder.add_edge("create_task", END)
+    return builder
+
+builder = build_graph()
+fused_builder = build_graph(fused=True)
+
+# Compile the graphs
+graph = builder.compile()
+fused_graph = fused_builder.compile()
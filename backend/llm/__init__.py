@@ -0,0 +1,114 @@
+"""
+LLM client infrastructure package.
+This package contains the shared plumbing used by the task tools to talk to LLM providers.
+"""
+
+from .clients import (
+    ClientSettings,
+    ClientRegistry,
+    get_client_registry,
+    configure_client_registry
+)
+from .cache import (
+    CacheBackend,
+    MemoryCache,
+    SQLiteCache,
+    get_llm_cache,
+    configure_llm_cache,
+    bypass_llm_cache
+)
+from .semantic_cache import (
+    SemanticCache,
+    SemanticCacheSettings,
+    HashingVectorizer,
+    VectorIndex,
+    get_semantic_cache,
+    configure_semantic_cache
+)
+from .streaming import (
+    stream_llm_tokens,
+    token_sink
+)
+from .json_stream import JsonArrayStream
+from .limiter import (
+    OutboundLimiter,
+    LimiterSettings,
+    llm_priority,
+    get_llm_limiter,
+    configure_llm_limiter
+)
+from .breaker import (
+    CircuitBreaker,
+    BreakerSettings,
+    CircuitOpenError,
+    get_circuit_breaker,
+    configure_circuit_breaker
+)
+from .retry import (
+    RetryPolicy,
+    RetrySettings,
+    LLMDeadlineExceeded,
+    classify_error,
+    llm_deadline,
+    get_retry_policy,
+    configure_retry_policy
+)
+from .router import (
+    ModelRouter,
+    Route,
+    parse_chain,
+    get_model_router,
+    configure_model_router
+)
+from .singleflight import (
+    SingleFlight,
+    AsyncSingleFlight,
+    coalescing_stats
+)
+
+__all__ = [
+    "ClientSettings",
+    "ClientRegistry",
+    "get_client_registry",
+    "configure_client_registry",
+    "CacheBackend",
+    "MemoryCache",
+    "SQLiteCache",
+    "get_llm_cache",
+    "configure_llm_cache",
+    "bypass_llm_cache",
+    "SemanticCache",
+    "SemanticCacheSettings",
+    "HashingVectorizer",
+    "VectorIndex",
+    "get_semantic_cache",
+    "configure_semantic_cache",
+    "stream_llm_tokens",
+    "JsonArrayStream",
+    "token_sink",
+    "OutboundLimiter",
+    "LimiterSettings",
+    "llm_priority",
+    "get_llm_limiter",
+    "configure_llm_limiter",
+    "CircuitBreaker",
+    "BreakerSettings",
+    "CircuitOpenError",
+    "get_circuit_breaker",
+    "configure_circuit_breaker",
+    "RetryPolicy",
+    "RetrySettings",
+    "LLMDeadlineExceeded",
+    "classify_error",
+    "llm_deadline",
+    "get_retry_policy",
+    "configure_retry_policy",
+    "ModelRouter",
+    "Route",
+    "parse_chain",
+    "get_model_router",
+    "configure_model_router",
+    "SingleFlight",
+    "AsyncSingleFlight",
+    "coalescing_stats"
+]
@@ -0,0 +1,239 @@
+"""
+Circuit breaker for the LLM provider.
+
+When the provider is down, every call still waits out its timeouts and
+retries, and a graph run strings several calls together. The breaker watches
+the outcome of recent provider attempts:
+
+- closed: calls go through. Once at least ``min_calls`` attempts finished in
+  the last ``window_seconds`` and ``failure_rate`` of them failed with a
+  provider error (timeout, connection error or 5xx), the breaker opens
+- open: calls fail immediately with ``CircuitOpenError``. After
+  ``open_seconds`` the breaker lets ``half_open_probes`` calls through
+- half-open: a successful probe closes the breaker; a failed one opens it
+  again for another ``open_seconds``
+
+Rate limiting (429) is left to the outbound limiter, and client errors say
+nothing about the provider's health, so neither counts as a failure.
+
+Each provider has its own breaker, so a tool whose route chain falls back to
+another provider keeps working while one provider is down. When every
+provider in a tool's chain is open, the graph takes the local degraded path
+in ``backend.tools.degraded``.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from backend.config import env_flag, env_number
+from backend.logger import logger
+from backend.llm.retry import classify_error
+from backend.llm.router import OPENAI
+from backend.metrics import record_breaker_rejected, record_breaker_state
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Error kinds that count against the provider's health
+FAILURE_KINDS = ("timeout", "connection", "server")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit breaker is open."""
+
+
+class BreakerSettings(BaseModel):
+    """
+    Circuit breaker settings.
+
+    Attributes:
+        enabled: Set to False to let every call through
+        window_seconds: Length of the sliding window the failure rate is computed over
+        min_calls: Calls the window must hold before the breaker may open
+        failure_rate: Fraction of failed calls in the window that opens the breaker
+        open_seconds: How long the breaker stays open before probing
+        half_open_probes: Calls let through at once while half-open
+    """
+    enabled: bool = True
+    window_seconds: float = 30.0
+    min_calls: int = 10
+    failure_rate: float = 0.5
+    open_seconds: float = 15.0
+    half_open_probes: int = 1
+
+    @classmethod
+    def from_env(cls) -> "BreakerSettings":
+        """Build settings from ``LLM_BREAKER*`` environment variables, falling back to defaults."""
+        defaults = cls()
+        return cls(
+            enabled=env_flag("LLM_BREAKER", True),
+            window_seconds=env_number("LLM_BREAKER_WINDOW", defaults.window_seconds),
+            min_calls=env_number("LLM_BREAKER_MIN_CALLS", defaults.min_calls, int),
+            failure_rate=env_number("LLM_BREAKER_FAILURE_RATE", defaults.failure_rate),
+            open_seconds=env_number("LLM_BREAKER_OPEN_SECONDS", defaults.open_seconds),
+        )
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker with half-open probing.
+
+    Callers bracket every provider attempt with ``before_call`` and
+    ``after_call`` (or ``abandon`` when the attempt never reached the
+    provider).
+
+    Args:
+        settings: Breaker settings; read from the environment when omitted
+        provider: Provider the breaker guards, used in logs and metric labels
+        clock: Time source, replaceable in tests
+    """
+
+    def __init__(self, settings: Optional[BreakerSettings] = None, provider: str = OPENAI,
+                 clock: Callable[[], float] = time.monotonic):
+        self.settings = settings or BreakerSettings.from_env()
+        self.provider = provider
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+        record_breaker_state(provider, CLOSED)
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        logger.warning("LLM circuit breaker for %s: %s -> %s", self.provider, self._state, state)
+        self._state = state
+        self._probes = 0
+        if state == OPEN:
+            self._opened_at = self._clock()
+            self.times_opened += 1
+        else:
+            self._outcomes.clear()
+            self._failures = 0
+        record_breaker_state(self.provider, state)
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.settings.open_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.settings.window_seconds
+        while self._outcomes and self._outcomes[0][0] <= cutoff:
+            if self._outcomes.popleft()[1]:
+                self._failures -= 1
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def available(self) -> bool:
+        """Return whether a call would be let through right now, without claiming a probe."""
+        if not self.settings.enabled:
+            return True
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and self._probes < self.settings.half_open_probes)
+
+    def before_call(self) -> bool:
+        """
+        Admit one provider attempt, or raise CircuitOpenError.
+
+        Returns True if the attempt is a half-open probe; pass it back to
+        ``after_call`` or ``abandon``.
+        """
+        if not self.settings.enabled:
+            return False
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and self._probes < self.settings.half_open_probes:
+                self._probes += 1
+                return True
+            self.rejected += 1
+        record_breaker_rejected(self.provider)
+        raise CircuitOpenError(f"LLM provider {self.provider} is unavailable (circuit breaker open)")
+
+    def after_call(self, probe: bool, error: Optional[BaseException] = None) -> None:
+        """Record how an admitted attempt ended. Errors that say nothing about the provider are ignored."""
+        if not self.settings.enabled:
+            return
+        failed = error is not None and classify_error(error) in FAILURE_KINDS
+        if error is not None and not failed:
+            self.abandon(probe)
+            return
+        with self._lock:
+            if probe:
+                if self._state == HALF_OPEN:
+                    self._transition(OPEN if failed else CLOSED)
+                return
+            if self._state != CLOSED:
+                # A call admitted before the breaker opened
+                return
+            now = self._clock()
+            self._prune(now)
+            self._outcomes.append((now, failed))
+            self._failures += failed
+            calls = len(self._outcomes)
+            if failed and calls >= self.settings.min_calls and self._failures / calls >= self.settings.failure_rate:
+                self._transition(OPEN)
+
+    def abandon(self, probe: bool) -> None:
+        """Release an admitted attempt without a verdict (cancelled, or failed for reasons of its own)."""
+        if probe:
+            with self._lock:
+                if self._state == HALF_OPEN and self._probes > 0:
+                    self._probes -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            self._prune(self._clock())
+            calls = len(self._outcomes)
+            retry_in = max(0.0, self._opened_at + self.settings.open_seconds - self._clock()) if state == OPEN else 0.0
+            return {
+                "enabled": self.settings.enabled,
+                "state": state,
+                "window_calls": calls,
+                "window_failures": self._failures,
+                "failure_rate": round(self._failures / calls, 3) if calls else 0.0,
+                "retry_in_seconds": round(retry_in, 2),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str = OPENAI) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for ``provider``, configured from the environment on first use."""
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        with _breaker_lock:
+            breaker = _breakers.get(provider)
+            if breaker is None:
+                breaker = _breakers[provider] = CircuitBreaker(provider=provider)
+    return breaker
+
+
+def configure_circuit_breaker(breaker: Optional[CircuitBreaker], provider: str = OPENAI) -> None:
+    """Install ``breaker`` for ``provider``. Pass None to rebuild every provider's breaker from the environment."""
+    with _breaker_lock:
+        if breaker is None:
+            _breakers.clear()
+        else:
+            _breakers[provider] = breaker
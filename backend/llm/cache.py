@@ -0,0 +1,276 @@
+"""
+Content-addressed cache for LLM responses.
+
+A completion is treated as a pure function of (model, system prompt, user
+prompt, response_format), so the parsed JSON response is stored under a hash
+of those inputs. Two backends are provided: an in-memory LRU with TTL and an
+on-disk SQLite store. The cache is disabled unless ``LLM_CACHE_BACKEND`` is set.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from backend.config import env_number
+from backend.logger import logger
+
+DEFAULT_TTL_SECONDS = 3600.0
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_SQLITE_PATH = "llm_cache.db"
+
+_bypass_cache: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+def make_cache_key(model: str, system_msg: str, user_prompt: str, response_format: Optional[dict]) -> str:
+    """Hash the inputs that fully determine a completion into a stable cache key."""
+    payload = json.dumps([model, system_msg, user_prompt, response_format], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheStats:
+    """Thread-safe hit/miss/eviction counters for a cache backend."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def record(self, hits: int = 0, misses: int = 0, evictions: int = 0, expirations: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+            self.expirations += expirations
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CacheBackend(ABC):
+    """
+    Interface for LLM response cache backends.
+
+    Values are the parsed JSON dicts returned by the LLM. Backends store them
+    serialized so every ``get`` returns a fresh copy the caller may mutate.
+    """
+    name = "base"
+
+    def __init__(self, ttl: Optional[float] = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.stats = CacheStats()
+
+    def _expires_at(self) -> Optional[float]:
+        return self.clock() + self.ttl if self.ttl else None
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached value for ``key`` or None on a miss."""
+
+    @abstractmethod
+    def set(self, key: str, value: dict) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entries if full."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every entry."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Return the number of stored entries."""
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache with a per-entry TTL."""
+    name = "memory"
+
+    def __init__(self, ttl: Optional[float] = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.time):
+        super().__init__(ttl, max_entries, clock)
+        self._entries: "OrderedDict[str, Tuple[Optional[float], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.record(misses=1)
+                return None
+            expires_at, payload = entry
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                self.stats.record(misses=1, expirations=1)
+                return None
+            self._entries.move_to_end(key)
+        self.stats.record(hits=1)
+        return json.loads(payload)
+
+    def set(self, key: str, value: dict) -> None:
+        payload = json.dumps(value)
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (self._expires_at(), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.stats.record(evictions=evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """On-disk cache in a SQLite database, evicting by least recent access."""
+    name = "sqlite"
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, ttl: Optional[float] = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, clock: Callable[[], float] = time.time):
+        super().__init__(ttl, max_entries, clock)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache(accessed_at)")
+
+    def get(self, key: str) -> Optional[dict]:
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.record(misses=1)
+                return None
+            payload, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.stats.record(misses=1, expirations=1)
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        self.stats.record(hits=1)
+        return json.loads(payload)
+
+    def set(self, key: str, value: dict) -> None:
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, payload, self._expires_at(), self.clock()),
+                )
+                evicted = self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    " SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        if evicted:
+            self.stats.record(evictions=evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def cache_from_env() -> Optional[CacheBackend]:
+    """
+    Build the cache configured by the environment.
+
+    ``LLM_CACHE_BACKEND`` selects ``memory``, ``sqlite`` or ``none`` (the default).
+    ``LLM_CACHE_TTL``, ``LLM_CACHE_MAX_ENTRIES`` and ``LLM_CACHE_PATH`` tune it.
+    """
+    backend = os.getenv("LLM_CACHE_BACKEND", "none").lower()
+    if backend in ("", "none", "off"):
+        return None
+    ttl = env_number("LLM_CACHE_TTL", DEFAULT_TTL_SECONDS) or None
+    max_entries = env_number("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES, int)
+    if backend == "memory":
+        return MemoryCache(ttl=ttl, max_entries=max_entries)
+    if backend == "sqlite":
+        return SQLiteCache(os.getenv("LLM_CACHE_PATH", DEFAULT_SQLITE_PATH), ttl=ttl, max_entries=max_entries)
+    logger.warning("Unknown LLM_CACHE_BACKEND %r, LLM response caching is disabled", backend)
+    return None
+
+
+_cache: Optional[CacheBackend] = None
+_cache_configured = False
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[CacheBackend]:
+    """Return the process-wide LLM cache, or None when caching is disabled."""
+    global _cache, _cache_configured
+    if not _cache_configured:
+        with _cache_lock:
+            if not _cache_configured:
+                _cache = cache_from_env()
+                _cache_configured = True
+    return _cache
+
+
+def configure_llm_cache(cache: Optional[CacheBackend]) -> None:
+    """Install ``cache`` as the process-wide LLM cache. Pass None to disable caching."""
+    global _cache, _cache_configured
+    with _cache_lock:
+        _cache = cache
+        _cache_configured = True
+
+
+def cache_bypassed() -> bool:
+    """Return True if the current context asked to bypass the LLM cache."""
+    return _bypass_cache.get()
+
+
+@contextmanager
+def bypass_llm_cache() -> Iterator[None]:
+    """Skip the LLM cache for every call made inside this block."""
+    token = _bypass_cache.set(True)
+    try:
+        yield
+    finally:
+        _bypass_cache.reset(token)
@@ -0,0 +1,231 @@
+"""
+Process-wide registry of pooled OpenAI and Anthropic clients.
+
+Constructing an ``OpenAI()`` per call builds a new httpx connection pool, which
+means a new TCP connection and TLS handshake for every completion. The registry
+keeps one long-lived sync client per (API key, base URL, model) and one async
+client per key and event loop, so keep-alive connections are reused across tool
+calls and graph runs. Anthropic clients, used by routes to Claude models, are
+pooled the same way.
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import httpx
+from anthropic import Anthropic, AsyncAnthropic
+from openai import AsyncOpenAI, OpenAI
+from pydantic import BaseModel
+
+from backend.config import env_number
+from backend.logger import logger
+
+ClientKey = Tuple[str, Optional[str], str]
+
+
+class ClientSettings(BaseModel):
+    """
+    Connection pool and timeout settings applied to every pooled client.
+
+    Attributes:
+        max_connections: Maximum number of concurrent connections per client
+        max_keepalive_connections: Maximum number of idle connections kept open per client
+        keepalive_expiry: Seconds an idle connection is kept alive before it is closed
+        timeout: Read/write/pool timeout in seconds for a single request
+        connect_timeout: Timeout in seconds for establishing a new connection
+        max_retries: Retries performed by the OpenAI SDK itself, on top of the retry policy
+    """
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    timeout: float = 60.0
+    connect_timeout: float = 5.0
+    max_retries: int = 0
+
+    @classmethod
+    def from_env(cls) -> "ClientSettings":
+        """Build settings from ``LLM_*`` environment variables, falling back to defaults."""
+        defaults = cls()
+        return cls(
+            max_connections=env_number("LLM_MAX_CONNECTIONS", defaults.max_connections, int),
+            max_keepalive_connections=env_number(
+                "LLM_MAX_KEEPALIVE_CONNECTIONS", defaults.max_keepalive_connections, int
+            ),
+            keepalive_expiry=env_number("LLM_KEEPALIVE_EXPIRY", defaults.keepalive_expiry),
+            timeout=env_number("LLM_TIMEOUT", defaults.timeout),
+            connect_timeout=env_number("LLM_CONNECT_TIMEOUT", defaults.connect_timeout),
+            max_retries=env_number("LLM_SDK_MAX_RETRIES", defaults.max_retries, int),
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def httpx_timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+
+class ClientRegistry:
+    """
+    Hands out shared OpenAI clients keyed by (API key, base URL, model), and
+    Anthropic clients keyed by (API key, base URL).
+
+    Sync clients are shared by every thread. Async clients are additionally
+    scoped to the event loop that created them, because an httpx connection
+    pool cannot be reused across loops.
+    """
+
+    def __init__(self, settings: Optional[ClientSettings] = None):
+        self.settings = settings or ClientSettings.from_env()
+        self._lock = threading.Lock()
+        self._sync_clients: Dict[ClientKey, OpenAI] = {}
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, AsyncOpenAI]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._sync_anthropic: Dict[ClientKey, Anthropic] = {}
+        self._async_anthropic: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, AsyncAnthropic]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def get_sync_client(self, api_key: str, base_url: Optional[str], model: str) -> OpenAI:
+        """Return the pooled sync client for this key, creating it on first use."""
+        key = (api_key, base_url, model)
+        client = self._sync_clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._sync_clients.get(key)
+            if client is None:
+                logger.debug("Creating pooled OpenAI client for base_url=%s model=%s", base_url, model)
+                client = OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    timeout=self.settings.httpx_timeout(),
+                    max_retries=self.settings.max_retries,
+                    http_client=httpx.Client(
+                        limits=self.settings.limits(),
+                        timeout=self.settings.httpx_timeout(),
+                    ),
+                )
+                self._sync_clients[key] = client
+        return client
+
+    def get_async_client(self, api_key: str, base_url: Optional[str], model: str) -> AsyncOpenAI:
+        """Return the pooled async client for this key on the running event loop."""
+        loop = asyncio.get_running_loop()
+        key = (api_key, base_url, model)
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                logger.debug("Creating pooled AsyncOpenAI client for base_url=%s model=%s", base_url, model)
+                client = AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    timeout=self.settings.httpx_timeout(),
+                    max_retries=self.settings.max_retries,
+                    http_client=httpx.AsyncClient(
+                        limits=self.settings.limits(),
+                        timeout=self.settings.httpx_timeout(),
+                    ),
+                )
+                clients[key] = client
+        return client
+
+    def get_sync_anthropic_client(self, api_key: str, base_url: Optional[str]) -> Anthropic:
+        """Return the pooled sync Anthropic client for this key, creating it on first use."""
+        key = (api_key, base_url, "")
+        with self._lock:
+            client = self._sync_anthropic.get(key)
+            if client is None:
+                logger.debug("Creating pooled Anthropic client for base_url=%s", base_url)
+                client = Anthropic(
+                    api_key=api_key,
+                    base_url=base_url,
+                    timeout=self.settings.httpx_timeout(),
+                    max_retries=self.settings.max_retries,
+                    http_client=httpx.Client(
+                        limits=self.settings.limits(),
+                        timeout=self.settings.httpx_timeout(),
+                    ),
+                )
+                self._sync_anthropic[key] = client
+        return client
+
+    def get_async_anthropic_client(self, api_key: str, base_url: Optional[str]) -> AsyncAnthropic:
+        """Return the pooled AsyncAnthropic client for this key on the running event loop."""
+        loop = asyncio.get_running_loop()
+        key = (api_key, base_url, "")
+        with self._lock:
+            clients = self._async_anthropic.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                logger.debug("Creating pooled AsyncAnthropic client for base_url=%s", base_url)
+                client = AsyncAnthropic(
+                    api_key=api_key,
+                    base_url=base_url,
+                    timeout=self.settings.httpx_timeout(),
+                    max_retries=self.settings.max_retries,
+                    http_client=httpx.AsyncClient(
+                        limits=self.settings.limits(),
+                        timeout=self.settings.httpx_timeout(),
+                    ),
+                )
+                clients[key] = client
+        return client
+
+    def stats(self) -> dict:
+        """Return the number of live pooled clients."""
+        with self._lock:
+            return {
+                "sync_clients": len(self._sync_clients) + len(self._sync_anthropic),
+                "async_clients": sum(len(clients) for clients in self._async_clients.values())
+                + sum(len(clients) for clients in self._async_anthropic.values()),
+            }
+
+    def close(self) -> None:
+        """Close every sync client. Async clients are closed with ``aclose``."""
+        with self._lock:
+            clients = [*self._sync_clients.values(), *self._sync_anthropic.values()]
+            self._sync_clients.clear()
+            self._sync_anthropic.clear()
+        for client in clients:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Close the async clients owned by the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = [*self._async_clients.pop(loop, {}).values(), *self._async_anthropic.pop(loop, {}).values()]
+        for client in clients:
+            await client.close()
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> ClientRegistry:
+    """Return the process-wide client registry, creating it from the environment on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ClientRegistry()
+    return _registry
+
+
+def configure_client_registry(settings: Optional[ClientSettings] = None) -> ClientRegistry:
+    """Replace the process-wide registry, closing the sync clients of the previous one."""
+    global _registry
+    with _registry_lock:
+        previous = _registry
+        _registry = ClientRegistry(settings)
+    if previous is not None:
+        previous.close()
+    return _registry
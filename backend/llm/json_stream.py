@@ -0,0 +1,100 @@
+"""
+Incremental parsing of streamed JSON completions.
+
+Completions requested with ``response_format=json_object`` arrive as arbitrary
+text fragments. ``JsonArrayStream`` scans the fragments as they are fed in
+and returns each element of one top-level array (for example ``subtasks``)
+as soon as that element is syntactically complete, long before the closing
+brace of the whole object arrives.
+
+The scanner only tracks nesting depth, strings and escapes, so each fragment
+is processed in time linear in its length. Elements are decoded with
+``json.loads``; the caller still parses the full text once the stream ends.
+"""
+
+import json
+from typing import Any, List, Optional
+
+
+class JsonArrayStream:
+    """
+    Emits the elements of the top-level array ``key`` from a streamed JSON object.
+
+    Args:
+        key: Name of the top-level field holding the array
+
+    Attributes:
+        items: Every element emitted so far, in order
+        complete: True once the array's closing bracket has been seen
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.items: List[Any] = []
+        self.complete = False
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start: Optional[int] = None
+        self._last_string: Optional[str] = None
+        self._value_key: Optional[str] = None
+        self._in_array = False
+        self._item_start: Optional[int] = None
+
+    def feed(self, fragment: str) -> List[Any]:
+        """Consume the next fragment of the completion. Returns the elements it completed."""
+        self._text += fragment
+        completed: List[Any] = []
+        text = self._text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._string_start is not None:
+                        self._last_string = json.loads(text[self._string_start:i + 1])
+                        self._string_start = None
+                continue
+
+            if c in " \t\r\n":
+                continue
+            if self._in_array and self._depth == 2 and self._item_start is None and c not in ",]":
+                self._item_start = i
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._string_start = i
+            elif c == ":" and self._depth == 1:
+                self._value_key = self._last_string
+            elif c in "{[":
+                if c == "[" and self._depth == 1 and self._value_key == self.key and not self.complete:
+                    self._in_array = True
+                self._depth += 1
+            elif c in "}]":
+                if self._in_array and self._depth == 2:
+                    self._finish_item(text, i, completed)
+                    self._in_array = False
+                    self.complete = True
+                self._depth -= 1
+            elif c == ",":
+                if self._in_array and self._depth == 2:
+                    self._finish_item(text, i, completed)
+                elif self._depth == 1:
+                    self._value_key = None
+        self._pos = len(text)
+        return completed
+
+    def _finish_item(self, text: str, end: int, completed: List[Any]) -> None:
+        if self._item_start is None:
+            return
+        item = json.loads(text[self._item_start:end])
+        self._item_start = None
+        self.items.append(item)
+        completed.append(item)
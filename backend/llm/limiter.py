@@ -0,0 +1,365 @@
+"""
+Process-wide limiter for outbound LLM calls.
+
+Every completion request that reaches the provider first takes a permit from
+the ``OutboundLimiter``:
+
+- two token buckets cap requests per minute and (estimated) tokens per
+  minute; the estimate is corrected with ``response.usage`` once the call
+  finishes
+- an AIMD concurrency window caps calls in flight. It grows by about one
+  slot per window of successful calls, and halves when the provider answers
+  429 or a call is slower than the latency target
+- waiting calls form a priority queue, so interactive requests are admitted
+  ahead of batch and speculative work
+
+Sync callers block their thread; async callers wait without blocking the
+event loop. Both share the same queue and window.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from backend.config import env_number
+from backend.metrics import LLM_CONCURRENCY_LIMIT, LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT, LLM_THROTTLED
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+PRIORITY_BACKGROUND = 20
+
+_PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch", PRIORITY_BACKGROUND: "background"}
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+def current_priority() -> int:
+    """Return the priority of LLM calls made in this context (lower runs first)."""
+    return _priority.get()
+
+
+@contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    """Queue every LLM call made inside this block at ``priority``."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _priority_name(priority: int) -> str:
+    return _PRIORITY_NAMES.get(priority, str(priority))
+
+
+class LimiterSettings(BaseModel):
+    """
+    Outbound limiter settings.
+
+    Attributes:
+        requests_per_minute: Request rate cap; 0 disables the request bucket
+        tokens_per_minute: Token rate cap; 0 disables the token bucket
+        initial_concurrency: Starting size of the concurrency window
+        min_concurrency: Smallest the window can shrink to
+        max_concurrency: Largest the window can grow to
+        latency_target: Calls slower than this many seconds shrink the window; 0 disables
+        decrease_factor: Multiplier applied to the window on 429 or a slow call
+        decrease_cooldown: Minimum seconds between two decreases
+        expected_completion_tokens: Completion tokens assumed when estimating a call's cost
+    """
+    requests_per_minute: float = 0
+    tokens_per_minute: float = 0
+    initial_concurrency: int = 16
+    min_concurrency: int = 1
+    max_concurrency: int = 64
+    latency_target: float = 30.0
+    decrease_factor: float = 0.5
+    decrease_cooldown: float = 1.0
+    expected_completion_tokens: int = 256
+
+    @classmethod
+    def from_env(cls) -> "LimiterSettings":
+        """Build settings from ``LLM_*`` environment variables, falling back to defaults."""
+        defaults = cls()
+        return cls(
+            requests_per_minute=env_number("LLM_MAX_RPM", defaults.requests_per_minute),
+            tokens_per_minute=env_number("LLM_MAX_TPM", defaults.tokens_per_minute),
+            initial_concurrency=env_number("LLM_CONCURRENCY", defaults.initial_concurrency, int),
+            min_concurrency=env_number("LLM_MIN_CONCURRENCY", defaults.min_concurrency, int),
+            max_concurrency=env_number("LLM_MAX_CONCURRENCY", defaults.max_concurrency, int),
+            latency_target=env_number("LLM_LATENCY_TARGET", defaults.latency_target),
+        )
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at ``per_minute / 60`` per second.
+
+    The level may go negative when a call turns out to cost more than its
+    estimate; later calls then wait until the debt is repaid.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float]):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self._clock = clock
+        self._level = per_minute
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (0 if it can be taken now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self._level >= amount else (amount - self._level) / self.rate
+
+    def take(self, amount: float) -> None:
+        """Take ``amount`` (a negative amount refunds an overestimate)."""
+        self._refill()
+        self._level = min(self.capacity, self._level - amount)
+
+    def level(self) -> float:
+        self._refill()
+        return self._level
+
+
+class Permit:
+    """Admission to make one LLM call; hand it back with ``OutboundLimiter.release``."""
+
+    def __init__(self, priority: int, estimated_tokens: int, start: float):
+        self.priority = priority
+        self.estimated_tokens = estimated_tokens
+        self.start = start
+        self.released = False
+
+
+class _Waiter:
+    def __init__(self, priority: int, cost: int, loop: Optional[asyncio.AbstractEventLoop]):
+        self.priority = priority
+        self.cost = cost
+        self.loop = loop
+        self.event = asyncio.Event() if loop is not None else threading.Event()
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.event.set)
+
+
+class OutboundLimiter:
+    """
+    Rate, concurrency and priority control in front of the LLM provider.
+
+    Args:
+        settings: Limits and AIMD parameters
+        clock: Time source, replaceable in tests
+    """
+
+    def __init__(self, settings: Optional[LimiterSettings] = None, clock: Callable[[], float] = time.monotonic):
+        self.settings = settings or LimiterSettings()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._limit = float(self.settings.initial_concurrency)
+        self._last_decrease = float("-inf")
+        self._requests = TokenBucket(self.settings.requests_per_minute, clock) \
+            if self.settings.requests_per_minute > 0 else None
+        self._tokens = TokenBucket(self.settings.tokens_per_minute, clock) \
+            if self.settings.tokens_per_minute > 0 else None
+        self.admitted = 0
+        self.throttled = 0
+        LLM_CONCURRENCY_LIMIT.set(self._limit)
+
+    @property
+    def limit(self) -> float:
+        """Current size of the AIMD concurrency window."""
+        return self._limit
+
+    def estimate_tokens(self, system_msg: str, user_prompt: str) -> int:
+        """Rough cost of a call: about four characters per prompt token plus the expected completion."""
+        return (len(system_msg) + len(user_prompt)) // 4 + self.settings.expected_completion_tokens
+
+    # --- admission ---
+    def _try_admit(self, waiter: _Waiter) -> Optional[float]:
+        """
+        Admit ``waiter`` if it is at the head of the queue and every limit allows it.
+        Returns 0 when admitted, otherwise how long to wait (None: until woken).
+        """
+        if not self._queue or self._queue[0][2] is not waiter:
+            return None
+        if self._in_flight >= max(1, int(self._limit)):
+            return None
+        delay = max(
+            self._requests.delay(1) if self._requests else 0.0,
+            self._tokens.delay(waiter.cost) if self._tokens else 0.0,
+        )
+        if delay > 0:
+            return delay
+        heapq.heappop(self._queue)
+        if self._requests:
+            self._requests.take(1)
+        if self._tokens:
+            self._tokens.take(waiter.cost)
+        self._in_flight += 1
+        self.admitted += 1
+        self._update_gauges()
+        return 0.0
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        heapq.heappush(self._queue, (waiter.priority, next(self._sequence), waiter))
+        self._update_gauges()
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+        heapq.heapify(self._queue)
+        self._update_gauges()
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            self._queue[0][2].wake()
+
+    def _update_gauges(self) -> None:
+        depths: Dict[int, int] = {priority: 0 for priority in _PRIORITY_NAMES}
+        for priority, _, _ in self._queue:
+            depths[priority] = depths.get(priority, 0) + 1
+        for priority, depth in depths.items():
+            LLM_QUEUE_DEPTH.set(depth, priority=_priority_name(priority))
+        LLM_IN_FLIGHT.set(self._in_flight)
+
+    def _permit(self, waiter: _Waiter, queued_at: float) -> Permit:
+        now = self._clock()
+        LLM_QUEUE_WAIT.observe(now - queued_at, priority=_priority_name(waiter.priority))
+        return Permit(waiter.priority, waiter.cost, now)
+
+    def acquire(self, estimated_tokens: int = 0, priority: Optional[int] = None) -> Permit:
+        """Block until a call may be made. Returns the permit to release afterwards."""
+        waiter = _Waiter(current_priority() if priority is None else priority, estimated_tokens, None)
+        queued_at = self._clock()
+        with self._lock:
+            self._enqueue(waiter)
+        try:
+            while True:
+                with self._lock:
+                    waiter.event.clear()
+                    delay = self._try_admit(waiter)
+                    if delay == 0:
+                        # The next caller may fit too
+                        self._wake_head()
+                        return self._permit(waiter, queued_at)
+                waiter.event.wait(delay)
+        except BaseException:
+            with self._lock:
+                self._abandon(waiter)
+                self._wake_head()
+            raise
+
+    async def aacquire(self, estimated_tokens: int = 0, priority: Optional[int] = None) -> Permit:
+        """Async version of acquire that waits without blocking the event loop."""
+        waiter = _Waiter(current_priority() if priority is None else priority, estimated_tokens,
+                         asyncio.get_running_loop())
+        queued_at = self._clock()
+        with self._lock:
+            self._enqueue(waiter)
+        try:
+            while True:
+                with self._lock:
+                    waiter.event.clear()
+                    delay = self._try_admit(waiter)
+                    if delay == 0:
+                        self._wake_head()
+                        return self._permit(waiter, queued_at)
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._lock:
+                self._abandon(waiter)
+                self._wake_head()
+            raise
+
+    # --- feedback ---
+    def release(self, permit: Permit, tokens_used: Optional[int] = None, throttled: bool = False) -> None:
+        """
+        Return a permit once its call has finished.
+
+        Args:
+            permit: The permit returned by acquire
+            tokens_used: Total tokens reported by the provider, used to correct the estimate
+            throttled: True if the provider answered 429 Too Many Requests
+        """
+        if permit.released:
+            return
+        permit.released = True
+        latency = self._clock() - permit.start
+        with self._lock:
+            self._in_flight -= 1
+            if self._tokens and tokens_used is not None:
+                self._tokens.take(tokens_used - permit.estimated_tokens)
+            slow = self.settings.latency_target > 0 and latency > self.settings.latency_target
+            if throttled or slow:
+                self._decrease()
+            else:
+                # Additive increase: about one slot per full window of successful calls
+                self._limit = min(float(self.settings.max_concurrency), self._limit + 1.0 / self._limit)
+            if throttled:
+                self.throttled += 1
+                LLM_THROTTLED.inc()
+            LLM_CONCURRENCY_LIMIT.set(self._limit)
+            self._update_gauges()
+            self._wake_head()
+
+    def _decrease(self) -> None:
+        now = self._clock()
+        # A burst of 429s from the same moment counts as one signal
+        if now - self._last_decrease < self.settings.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.settings.min_concurrency), self._limit * self.settings.decrease_factor)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "concurrency_limit": round(self._limit, 2),
+                "in_flight": self._in_flight,
+                "queued": len(self._queue),
+                "admitted": self.admitted,
+                "throttled": self.throttled,
+                "requests_available": round(self._requests.level(), 2) if self._requests else None,
+                "tokens_available": round(self._tokens.level(), 2) if self._tokens else None,
+            }
+
+
+_limiter: Optional[OutboundLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_llm_limiter() -> OutboundLimiter:
+    """Return the process-wide outbound limiter, configured from the environment on first use."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = OutboundLimiter(LimiterSettings.from_env())
+    return _limiter
+
+
+def configure_llm_limiter(limiter: Optional[OutboundLimiter]) -> None:
+    """Install ``limiter`` as the process-wide limiter. Pass None to rebuild it from the environment."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
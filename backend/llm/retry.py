@@ -0,0 +1,347 @@
+"""
+Retries, deadlines and hedging for outbound LLM calls.
+
+The task tools turn any failed completion into a degraded fallback: the raw
+input with confidence 0.0, or a "fail" judgment. One transient timeout
+therefore costs the user an extra clarification round trip. ``RetryPolicy``
+sits between the tools and the provider:
+
+- failures are classified. Timeouts, connection errors, 429 and 5xx
+  responses are retried; everything else (bad requests, unparseable output)
+  is not
+- retries back off exponentially with full jitter, honouring Retry-After
+- a graph run gets one deadline (``llm_deadline``). Once it has passed, no
+  new attempt starts and no retry is scheduled. Every attempt gets a timeout
+  no longer than the time left
+- optionally, an async call still running after the p95 latency of its
+  prompt is hedged with a duplicate request, and the first answer wins.
+  Hedges are skipped while calls are queued in the outbound limiter, so they
+  never add load to a saturated provider
+
+Every attempt, including a hedge, takes its own permit from the outbound
+limiter. The OpenAI SDK's own retries default to 0 so attempts are not
+multiplied.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Deque, Dict, Iterator, Optional, TypeVar
+
+import anthropic
+import httpx
+import openai
+from pydantic import BaseModel
+
+from backend.config import env_flag, env_number
+from backend.logger import logger
+from backend.llm.limiter import get_llm_limiter
+from backend.metrics import record_llm_give_up, record_llm_hedge, record_llm_retry
+
+T = TypeVar("T")
+
+# Error kinds worth another attempt
+RETRYABLE = ("timeout", "connection", "rate_limited", "server")
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """Raised instead of starting an LLM attempt once the run's deadline has passed."""
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classify a failed LLM attempt.
+
+    Returns one of "deadline", "timeout", "connection", "rate_limited",
+    "server", "client" or "other". Only the kinds in RETRYABLE are retried.
+    """
+    if isinstance(error, LLMDeadlineExceeded):
+        return "deadline"
+    if isinstance(error, (openai.APITimeoutError, anthropic.APITimeoutError, httpx.TimeoutException, TimeoutError)):
+        return "timeout"
+    if isinstance(error, (openai.APIConnectionError, anthropic.APIConnectionError, httpx.TransportError,
+                          ConnectionError)):
+        return "connection"
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        if status == 429:
+            return "rate_limited"
+        if status == 408:
+            return "timeout"
+        if status >= 500:
+            return "server"
+        if status >= 400:
+            return "client"
+    return "other"
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait, from Retry-After(-Ms) headers."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except (TypeError, ValueError):
+            # HTTP-date values are not worth parsing here; fall back to backoff
+            return None
+    return None
+
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_deadline", default=None)
+
+
+def current_deadline() -> Optional[float]:
+    """The current run's deadline on the ``time.monotonic`` clock, or None when no deadline is set."""
+    return _deadline.get()
+
+
+def deadline_remaining() -> Optional[float]:
+    """Seconds left before the current run's deadline, or None when no deadline is set."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def llm_deadline(seconds: Optional[float] = None) -> Iterator[None]:
+    """
+    Share one deadline ``seconds`` from now across every LLM call made inside this block.
+
+    Defaults to LLM_RUN_DEADLINE; 0 disables it. An enclosing deadline that
+    ends sooner is kept.
+    """
+    if seconds is None:
+        seconds = get_retry_policy().settings.run_deadline
+    deadline = time.monotonic() + seconds if seconds > 0 else None
+    current = _deadline.get()
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class RetrySettings(BaseModel):
+    """
+    Retry, deadline and hedging settings.
+
+    Attributes:
+        max_attempts: Attempts per LLM call, including the first
+        base_delay: Backoff cap in seconds before the first retry; doubles each retry
+        max_delay: Largest backoff cap in seconds
+        run_deadline: Default seconds an llm_deadline block allows; 0 disables it
+        hedge: Send a duplicate request when a call is slower than hedge_quantile
+        hedge_quantile: Latency quantile of the prompt after which a call is hedged
+        hedge_min_samples: Successful calls of a prompt needed before it is hedged
+        hedge_min_delay: Never hedge sooner than this many seconds
+        latency_window: Recent latencies kept per prompt
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.25
+    max_delay: float = 8.0
+    run_deadline: float = 120.0
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    hedge_min_delay: float = 0.05
+    latency_window: int = 200
+
+    @classmethod
+    def from_env(cls) -> "RetrySettings":
+        """Build settings from ``LLM_*`` environment variables, falling back to defaults."""
+        defaults = cls()
+        return cls(
+            max_attempts=max(1, env_number("LLM_RETRY_ATTEMPTS", defaults.max_attempts, int)),
+            base_delay=env_number("LLM_RETRY_BASE_DELAY", defaults.base_delay),
+            max_delay=env_number("LLM_RETRY_MAX_DELAY", defaults.max_delay),
+            run_deadline=env_number("LLM_RUN_DEADLINE", defaults.run_deadline),
+            hedge=env_flag("LLM_HEDGE", False),
+            hedge_quantile=env_number("LLM_HEDGE_QUANTILE", defaults.hedge_quantile),
+            hedge_min_samples=env_number("LLM_HEDGE_MIN_SAMPLES", defaults.hedge_min_samples, int),
+        )
+
+
+class LatencyTracker:
+    """Keeps the most recent successful call latencies per prompt."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, prompt: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(prompt, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, prompt: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """Nearest-rank quantile of the prompt's recent latencies, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(prompt, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, max(0, int(q * len(samples) + 0.5) - 1))]
+
+
+class RetryPolicy:
+    """
+    Runs LLM attempts with retries, the run deadline and optional hedging.
+
+    An attempt is a callable taking the timeout (seconds, or None for the
+    client default) that the request should be sent with.
+
+    Args:
+        settings: Retry settings; read from the environment when omitted
+        rng: Random source for jitter, replaceable in tests
+        sleep: Blocking sleep used between sync retries
+        asleep: Async sleep used between async retries
+    """
+
+    def __init__(self, settings: Optional[RetrySettings] = None, rng: Optional[random.Random] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 asleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self.settings = settings or RetrySettings.from_env()
+        self.latencies = LatencyTracker(self.settings.latency_window)
+        self._rng = rng or random.Random()
+        self._sleep = sleep
+        self._asleep = asleep
+
+    def backoff(self, retry: int, error: Optional[BaseException] = None) -> float:
+        """Delay before retry number ``retry`` (0-based): Retry-After if given, else full jitter."""
+        cap = min(self.settings.max_delay, self.settings.base_delay * 2 ** retry)
+        retry_after = _retry_after(error) if error is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.settings.max_delay)
+        return self._rng.uniform(0, cap)
+
+    def hedge_delay(self, prompt: str) -> Optional[float]:
+        """Seconds after which a call for ``prompt`` is hedged, or None when it should not be."""
+        if not self.settings.hedge:
+            return None
+        delay = self.latencies.quantile(prompt, self.settings.hedge_quantile, self.settings.hedge_min_samples)
+        if delay is None or get_llm_limiter().stats()["queued"]:
+            return None
+        return max(delay, self.settings.hedge_min_delay)
+
+    def _attempt_timeout(self) -> Optional[float]:
+        remaining = deadline_remaining()
+        if remaining is not None and remaining <= 0:
+            raise LLMDeadlineExceeded("LLM deadline for this run has passed")
+        return remaining
+
+    def _retry_delay(self, prompt: str, attempt: int, error: Exception,
+                     can_retry: Optional[Callable[[], bool]]) -> Optional[float]:
+        """Return the delay before the next attempt, or None to give up."""
+        kind = classify_error(error)
+        if kind not in RETRYABLE or (can_retry is not None and not can_retry()):
+            return None
+        if attempt + 1 >= self.settings.max_attempts:
+            record_llm_give_up(prompt, "attempts")
+            return None
+        delay = self.backoff(attempt, error)
+        remaining = deadline_remaining()
+        if remaining is not None and delay >= remaining:
+            record_llm_give_up(prompt, "deadline")
+            return None
+        record_llm_retry(prompt, kind)
+        logger.warning("LLM call for %s failed (%s: %s); retrying in %.2fs", prompt, kind, error, delay)
+        return delay
+
+    def call(self, prompt: str, attempt: Callable[[Optional[float]], T],
+             can_retry: Optional[Callable[[], bool]] = None) -> T:
+        """
+        Run ``attempt`` until it succeeds, fails with a non-retryable error, or attempts or the deadline run out.
+        Sync calls are not hedged.
+        """
+        for n in itertools.count():
+            try:
+                timeout = self._attempt_timeout()
+                start = time.perf_counter()
+                result = attempt(timeout)
+                self.latencies.observe(prompt, time.perf_counter() - start)
+                return result
+            except Exception as e:
+                delay = self._retry_delay(prompt, n, e, can_retry)
+                if delay is None:
+                    raise
+            self._sleep(delay)
+
+    async def acall(self, prompt: str, attempt: Callable[[Optional[float]], Awaitable[T]], hedge: bool = True,
+                    can_retry: Optional[Callable[[], bool]] = None) -> T:
+        """Async version of call that also hedges slow attempts when ``hedge`` is set and hedging is enabled."""
+        for n in itertools.count():
+            try:
+                return await self._ahedged(prompt, attempt, hedge)
+            except Exception as e:
+                delay = self._retry_delay(prompt, n, e, can_retry)
+                if delay is None:
+                    raise
+            await self._asleep(delay)
+
+    async def _atimed(self, prompt: str, attempt: Callable[[Optional[float]], Awaitable[T]],
+                      timeout: Optional[float]) -> T:
+        start = time.perf_counter()
+        result = await attempt(timeout)
+        self.latencies.observe(prompt, time.perf_counter() - start)
+        return result
+
+    async def _ahedged(self, prompt: str, attempt: Callable[[Optional[float]], Awaitable[T]], hedge: bool) -> T:
+        timeout = self._attempt_timeout()
+        delay = self.hedge_delay(prompt) if hedge else None
+        if delay is None or (timeout is not None and delay >= timeout):
+            return await self._atimed(prompt, attempt, timeout)
+
+        primary = asyncio.ensure_future(self._atimed(prompt, attempt, timeout))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            record_llm_hedge(prompt, "fired")
+            backup = asyncio.ensure_future(self._atimed(prompt, attempt, deadline_remaining()))
+            tasks.append(backup)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        record_llm_hedge(prompt, "won" if task is backup else "lost")
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            # The slower request is abandoned; its permit is released as it unwinds
+            for task in tasks:
+                task.cancel()
+
+
+_policy: Optional[RetryPolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Return the process-wide retry policy, configured from the environment on first use."""
+    global _policy
+    if _policy is None:
+        with _policy_lock:
+            if _policy is None:
+                _policy = RetryPolicy()
+    return _policy
+
+
+def configure_retry_policy(policy: Optional[RetryPolicy]) -> None:
+    """Install ``policy`` as the process-wide retry policy. Pass None to rebuild it from the environment."""
+    global _policy
+    with _policy_lock:
+        _policy = policy
@@ -0,0 +1,208 @@
+"""
+Per-tool model routing with fallback chains.
+
+Every task tool sends its completion through a route: a provider ("openai"
+or "anthropic") and a model. Each tool has an ordered chain of routes. The
+first route is tried (with retries) and, if it still fails, the next one
+takes over. A tool without its own chain uses the default chain.
+
+Chains are configured as comma-separated ``provider:model`` lists. A model
+name without a provider means OpenAI::
+
+    LLM_ROUTE_DEFAULT=openai:gpt-4.1
+    LLM_ROUTE_JUDGE_SUBTASKS=openai:gpt-4.1-mini,anthropic:claude-3-5-haiku-latest
+    LLM_ROUTE_CLARIFICATION=gpt-4.1-nano
+
+Each route's latency, outcome and estimated cost are recorded in the
+``task_agent_llm_route_*`` metrics. Cost is computed from the token counts
+in the response and a per-model price table, which LLM_PRICES can extend.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from backend.logger import logger
+
+OPENAI = "openai"
+ANTHROPIC = "anthropic"
+PROVIDERS = (OPENAI, ANTHROPIC)
+
+DEFAULT_ROUTE = "openai:gpt-4.1"
+
+# Tools that can be routed, and the prompt each one sends. retry_task shares
+# extract_task's prompt and therefore its route.
+TOOLS = (
+    "extract_task",
+    "judge_task",
+    "extract_and_judge_task",
+    "generate_subtasks",
+    "judge_subtasks",
+    "retry_subtasks",
+    "clarification",
+)
+PROMPT_TOOLS = {
+    "task_extraction": "extract_task",
+    "task_judgment": "judge_task",
+    "task_extraction_judgment": "extract_and_judge_task",
+    "subtask_generation": "generate_subtasks",
+    "subtask_judgment": "judge_subtasks",
+    "subtask_decision": "retry_subtasks",
+    "clarification": "clarification",
+}
+
+# USD per million (input, output) tokens, matched on the longest model name prefix
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "openai:gpt-4.1": (2.00, 8.00),
+    "openai:gpt-4.1-mini": (0.40, 1.60),
+    "openai:gpt-4.1-nano": (0.10, 0.40),
+    "openai:gpt-4o": (2.50, 10.00),
+    "openai:gpt-4o-mini": (0.15, 0.60),
+    "anthropic:claude-3-haiku": (0.25, 1.25),
+    "anthropic:claude-3-5-haiku": (0.80, 4.00),
+    "anthropic:claude-3-5-sonnet": (3.00, 15.00),
+    "anthropic:claude-3-7-sonnet": (3.00, 15.00),
+    "anthropic:claude-sonnet-4": (3.00, 15.00),
+    "anthropic:claude-opus-4": (15.00, 75.00),
+}
+
+
+class Route(BaseModel):
+    """
+    One provider and model a tool can be sent to.
+
+    Attributes:
+        provider: "openai" or "anthropic"
+        model: Model name as the provider knows it
+    """
+    provider: str
+    model: str
+
+    @classmethod
+    def parse(cls, value: str) -> "Route":
+        """
+        Parse ``provider:model``. Anything without a known provider prefix is an
+        OpenAI model name, including fine-tuned ones such as ``ft:gpt-4.1:org::id``.
+        """
+        provider, sep, model = value.strip().partition(":")
+        provider = provider.strip().lower()
+        if not sep or provider not in PROVIDERS:
+            provider, model = OPENAI, value.strip()
+        if not model.strip():
+            raise ValueError(f"LLM route {value!r} has no model")
+        return cls(provider=provider, model=model.strip())
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+def parse_chain(value: str) -> List[Route]:
+    """Parse a comma-separated fallback chain of routes."""
+    routes = [Route.parse(part) for part in value.split(",") if part.strip()]
+    if not routes:
+        raise ValueError("An LLM route chain needs at least one route")
+    return routes
+
+
+def _env_chain(name: str) -> Optional[List[Route]]:
+    value = os.getenv(name)
+    if not value:
+        return None
+    try:
+        return parse_chain(value)
+    except ValueError as e:
+        logger.warning("Ignoring invalid value for %s: %s", name, e)
+        return None
+
+
+def _env_prices() -> Dict[str, Tuple[float, float]]:
+    prices = dict(DEFAULT_PRICES)
+    value = os.getenv("LLM_PRICES")
+    if not value:
+        return prices
+    try:
+        for route, (input_price, output_price) in json.loads(value).items():
+            prices[Route.parse(route).label] = (float(input_price), float(output_price))
+    except (ValueError, TypeError) as e:
+        logger.warning("Ignoring invalid value for LLM_PRICES: %s", e)
+    return prices
+
+
+class ModelRouter:
+    """
+    Maps each tool to its fallback chain of routes and prices their usage.
+
+    Args:
+        default: Chain used by tools without one of their own
+        chains: Chains keyed by tool name
+        prices: USD per million (input, output) tokens keyed by ``provider:model`` prefix
+    """
+
+    def __init__(self, default: Optional[List[Route]] = None, chains: Optional[Dict[str, List[Route]]] = None,
+                 prices: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.default = default or parse_chain(DEFAULT_ROUTE)
+        self.chains = dict(chains or {})
+        self.prices = dict(DEFAULT_PRICES if prices is None else prices)
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        """Build a router from LLM_ROUTE_DEFAULT, LLM_ROUTE_<TOOL> and LLM_PRICES."""
+        chains = {}
+        for tool in TOOLS:
+            chain = _env_chain(f"LLM_ROUTE_{tool.upper()}")
+            if chain is not None:
+                chains[tool] = chain
+        return cls(_env_chain("LLM_ROUTE_DEFAULT"), chains, _env_prices())
+
+    def chain(self, tool: Optional[str]) -> List[Route]:
+        """Return the fallback chain for ``tool``."""
+        return self.chains.get(tool, self.default) if tool else self.default
+
+    def chain_for_prompt(self, prompt: str) -> List[Route]:
+        """Return the fallback chain for the tool that sends ``prompt``."""
+        return self.chain(PROMPT_TOOLS.get(prompt))
+
+    def providers(self, tool: Optional[str] = None) -> List[str]:
+        """Providers in ``tool``'s chain, or in every chain when ``tool`` is None."""
+        chains = [self.chain(tool)] if tool else [self.default, *self.chains.values()]
+        return list(dict.fromkeys(route.provider for chain in chains for route in chain))
+
+    def price(self, route: Route) -> Optional[Tuple[float, float]]:
+        matches = [label for label in self.prices if route.label.startswith(label)]
+        return self.prices[max(matches, key=len)] if matches else None
+
+    def cost(self, route: Route, prompt_tokens: int, completion_tokens: int) -> float:
+        """Estimated USD cost of one call on ``route``; 0 for models without a price."""
+        price = self.price(route)
+        if price is None:
+            return 0.0
+        return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+
+    def table(self) -> dict:
+        """The routing table: every tool's chain, as ``provider:model`` labels."""
+        return {tool: [route.label for route in self.chain(tool)] for tool in TOOLS}
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide model router, configured from the environment on first use."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter.from_env()
+    return _router
+
+
+def configure_model_router(router: Optional[ModelRouter]) -> None:
+    """Install ``router`` as the process-wide router. Pass None to rebuild it from the environment."""
+    global _router
+    with _router_lock:
+        _router = router
@@ -0,0 +1,254 @@
+"""
+Semantic cache for near-duplicate task inputs.
+
+The response cache only helps when a prompt repeats byte for byte, but users
+rarely type the same thing twice: "buy milk tomorrow" and "Buy milk
+tomorrow!" should share one extraction. This cache sits in front of
+``extract_task`` and ``generate_subtasks`` and matches on meaning instead:
+
+- the input is normalized (case, accents, punctuation and spacing) and
+  embedded with a hashing vectorizer over character n-grams and words. It is
+  local, CPU-only and needs no model download
+- each tool has its own ``VectorIndex``, a NumPy matrix of unit vectors
+  searched with one matrix-vector product
+- a lookup returns the cached response of the most similar entry whose
+  cosine similarity reaches the tool's threshold. Entries whose numbers or
+  guard (tenant and due date phrase, for extraction) differ never match, however
+  similar the rest of the text is
+
+When an index is full, the least recently used (``lru``) or oldest (``fifo``)
+entry is evicted. The cache is disabled unless ``SEMANTIC_CACHE`` is set.
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from backend.config import env_flag, env_number
+from backend.llm.cache import CacheStats
+from backend.logger import logger
+from backend.metrics import record_semantic_cache
+from backend.text import HashingVectorizer, normalize_text
+
+EVICTION_POLICIES = ("lru", "fifo")
+# Tools the cache sits in front of
+SEMANTIC_TOOLS = ("extract_task", "generate_subtasks")
+
+_NUMBER = re.compile(r"\d+")
+
+
+class VectorIndex:
+    """
+    Fixed-capacity nearest-neighbour index over unit vectors.
+
+    Vectors live in one preallocated float32 matrix, so a search is a single
+    matrix-vector product. Values are stored serialized, and every hit
+    returns a fresh copy the caller may mutate.
+
+    Args:
+        dim: Vector length
+        capacity: Entries kept before one is evicted
+        eviction: "lru" evicts the least recently used entry, "fifo" the oldest
+    """
+
+    def __init__(self, dim: int, capacity: int, eviction: str = "lru"):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {eviction!r}")
+        self.capacity = capacity
+        self.eviction = eviction
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._used = np.zeros(capacity, dtype=np.int64)
+        self._inserted = np.zeros(capacity, dtype=np.int64)
+        self._texts: List[Optional[str]] = [None] * capacity
+        self._keys: List[Tuple[str, ...]] = [()] * capacity
+        self._values: List[str] = [""] * capacity
+        self._slots: Dict[str, int] = {}
+        self._size = 0
+        self._tick = 0
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def search(self, vector: np.ndarray, threshold: float, key: Tuple[str, ...] = ()) -> Optional[Tuple[dict, float]]:
+        """Return the value and similarity of the closest entry with ``key`` at or above ``threshold``."""
+        with self._lock:
+            self._tick += 1
+            if self._size:
+                scores = self._vectors[:self._size] @ vector
+                candidates = np.flatnonzero(scores >= threshold)
+                for slot in candidates[np.argsort(-scores[candidates])]:
+                    if self._keys[slot] == key:
+                        self._used[slot] = self._tick
+                        self.stats.record(hits=1)
+                        return json.loads(self._values[slot]), float(scores[slot])
+            self.stats.record(misses=1)
+            return None
+
+    def add(self, text: str, vector: np.ndarray, value: dict, key: Tuple[str, ...] = ()) -> None:
+        """Store ``value`` for ``text``, replacing an entry with the same text or evicting one when full."""
+        payload = json.dumps(value)
+        with self._lock:
+            self._tick += 1
+            slot = self._slots.get(text)
+            if slot is None:
+                if self._size < self.capacity:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    ages = self._used if self.eviction == "lru" else self._inserted
+                    slot = int(np.argmin(ages))
+                    del self._slots[self._texts[slot]]
+                    self.stats.record(evictions=1)
+                self._slots[text] = slot
+                self._inserted[slot] = self._tick
+            self._vectors[slot] = vector
+            self._texts[slot] = text
+            self._keys[slot] = key
+            self._values[slot] = payload
+            self._used[slot] = self._tick
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slots.clear()
+            self._size = 0
+
+
+class SemanticCacheSettings(BaseModel):
+    """
+    Semantic cache settings.
+
+    Attributes:
+        enabled: Set to True to serve near-duplicate inputs from the cache
+        threshold: Cosine similarity a match must reach
+        thresholds: Per-tool overrides of ``threshold``
+        capacity: Entries kept per tool
+        eviction: "lru" or "fifo"
+        dim: Embedding length
+    """
+    enabled: bool = False
+    threshold: float = 0.9
+    thresholds: Dict[str, float] = {}
+    capacity: int = 1024
+    eviction: str = "lru"
+    dim: int = 1024
+
+    @classmethod
+    def from_env(cls) -> "SemanticCacheSettings":
+        """Build settings from ``SEMANTIC_CACHE*`` environment variables, falling back to defaults."""
+        defaults = cls()
+        thresholds = {}
+        for tool in SEMANTIC_TOOLS:
+            name = f"SEMANTIC_CACHE_THRESHOLD_{tool.upper()}"
+            if os.getenv(name):
+                thresholds[tool] = env_number(name, defaults.threshold)
+        eviction = os.getenv("SEMANTIC_CACHE_EVICTION", defaults.eviction).lower()
+        if eviction not in EVICTION_POLICIES:
+            logger.warning("Ignoring invalid value for SEMANTIC_CACHE_EVICTION: %r", eviction)
+            eviction = defaults.eviction
+        return cls(
+            enabled=env_flag("SEMANTIC_CACHE", False),
+            threshold=env_number("SEMANTIC_CACHE_THRESHOLD", defaults.threshold),
+            thresholds=thresholds,
+            capacity=env_number("SEMANTIC_CACHE_CAPACITY", defaults.capacity, int),
+            eviction=eviction,
+            dim=env_number("SEMANTIC_CACHE_DIM", defaults.dim, int),
+        )
+
+
+class SemanticCache:
+    """
+    Near-duplicate response cache with one vector index per tool.
+
+    Args:
+        settings: Cache settings; read from the environment when omitted
+    """
+
+    def __init__(self, settings: Optional[SemanticCacheSettings] = None):
+        self.settings = settings or SemanticCacheSettings.from_env()
+        self.vectorizer = HashingVectorizer(self.settings.dim)
+        self._indexes: Dict[str, VectorIndex] = {}
+        self._lock = threading.Lock()
+
+    def threshold(self, tool: str) -> float:
+        return self.settings.thresholds.get(tool, self.settings.threshold)
+
+    def _index(self, tool: str) -> VectorIndex:
+        index = self._indexes.get(tool)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(tool)
+                if index is None:
+                    index = self._indexes[tool] = VectorIndex(
+                        self.settings.dim, self.settings.capacity, self.settings.eviction)
+        return index
+
+    def _prepare(self, text: str, guard: str) -> Tuple[str, np.ndarray, Tuple[str, ...]]:
+        normalized = normalize_text(text)
+        # Numbers and the guard must match exactly: "room 12" is not "room 21"
+        key = (guard, *_NUMBER.findall(normalized))
+        return normalized, self.vectorizer.embed(normalized), key
+
+    def get(self, tool: str, text: str, guard: str = "") -> Optional[dict]:
+        """Return the response cached for the input most similar to ``text``, or None."""
+        normalized, vector, key = self._prepare(text, guard)
+        if not normalized:
+            return None
+        match = self._index(tool).search(vector, self.threshold(tool), key)
+        record_semantic_cache(tool, "miss" if match is None else "hit")
+        if match is None:
+            return None
+        value, similarity = match
+        logger.debug("Semantic cache hit for %s (similarity %.3f)", tool, similarity)
+        return value
+
+    def set(self, tool: str, text: str, value: dict, guard: str = "") -> None:
+        """Cache ``value`` as the response for ``text``."""
+        normalized, vector, key = self._prepare(text, guard)
+        if normalized:
+            self._index(tool).add(normalized, vector, value, key)
+
+    def clear(self) -> None:
+        with self._lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            index.clear()
+
+    def stats(self) -> dict:
+        """Hit, miss and eviction counts and the hit rate of every tool's index."""
+        with self._lock:
+            indexes = dict(self._indexes)
+        return {
+            "enabled": self.settings.enabled,
+            "tools": {
+                tool: {"entries": len(index), "threshold": self.threshold(tool), **index.stats.snapshot()}
+                for tool, index in indexes.items()
+            },
+        }
+
+
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Return the process-wide semantic cache, configured from the environment on first use."""
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache()
+    return _semantic_cache
+
+
+def configure_semantic_cache(cache: Optional[SemanticCache]) -> None:
+    """Install ``cache`` as the process-wide semantic cache. Pass None to rebuild it from the environment."""
+    global _semantic_cache
+    with _semantic_cache_lock:
+        _semantic_cache = cache
@@ -0,0 +1,127 @@
+"""
+Single-flight coalescing of concurrent identical LLM requests.
+
+When several callers ask for the same completion at the same time, only the
+first one (the leader) calls the provider; the others wait for the leader's
+result. Every caller, the leader included, receives its own copy of the
+parsed JSON, so no caller can mutate it while another is copying it.
+
+The leader's call runs in the leader's context, so anything a caller sets in
+a context variable (priority, deadline, token sink) must be part of the key.
+``SingleFlight`` covers threads (sync graph runs and thread pools) and
+``AsyncSingleFlight`` covers coroutines on an event loop.
+"""
+
+import asyncio
+import copy
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class SingleFlightStats:
+    """Thread-safe counters shared by the sync and async coalescers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def record(self, leader: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            if leader:
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "executions": self.executions, "coalesced": self.coalesced}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key across threads."""
+
+    def __init__(self, stats: Optional[SingleFlightStats] = None):
+        self.stats = stats or SingleFlightStats()
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` unless a call with ``key`` is already in flight, in which case wait for its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self.stats.record(leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            # Followers copy call.result, so the leader must not hand out the shared object
+            return copy.deepcopy(call.result)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent coroutine calls that share a key on the same event loop.
+
+    The leader's work runs in its own task, so cancelling any one waiter
+    (including the leader) does not cancel the call for the others.
+    """
+
+    def __init__(self, stats: Optional[SingleFlightStats] = None):
+        self.stats = stats or SingleFlightStats()
+        self._tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn()`` unless a call with ``key`` is already in flight, in which case share its result."""
+        tasks = self._tasks.setdefault(asyncio.get_running_loop(), {})
+        task = tasks.get(key)
+        leader = task is None
+        if leader:
+            task = tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: tasks.pop(key) if tasks.get(key) is done else None)
+        self.stats.record(leader)
+
+        # Every caller, the leader included, gets its own copy of the shared result
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def in_flight(self) -> int:
+        try:
+            return len(self._tasks.get(asyncio.get_running_loop(), {}))
+        except RuntimeError:
+            return 0
+
+
+coalescing_stats = SingleFlightStats()
+llm_singleflight = SingleFlight(coalescing_stats)
+llm_async_singleflight = AsyncSingleFlight(coalescing_stats)
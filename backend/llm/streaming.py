@@ -0,0 +1,83 @@
+"""
+Token streaming for LLM completions.
+
+Inside a ``stream_llm_tokens(sink)`` block, async completions for prompts
+whose output is shown to the user are requested with ``stream=True``. Each
+content delta is passed to ``sink`` as a ``"token"`` event as it arrives, and
+each subtask as a ``"subtask"`` event as soon as it is complete, so a
+streaming API can forward them before the completion finishes. The caller
+still receives the fully parsed JSON once the stream ends.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from openai.types import CompletionUsage
+
+# Called with the event name and its data
+TokenSink = Callable[[str, Dict[str, Any]], None]
+
+_token_sink: contextvars.ContextVar[Optional[TokenSink]] = contextvars.ContextVar("llm_token_sink", default=None)
+
+
+def token_sink() -> Optional[TokenSink]:
+    """Return the sink installed by the enclosing ``stream_llm_tokens`` block, if any."""
+    return _token_sink.get()
+
+
+@contextmanager
+def stream_llm_tokens(sink: TokenSink) -> Iterator[None]:
+    """
+    Stream completion tokens to ``sink`` for every call made inside this block.
+
+    Tasks created inside the block inherit the sink, so a graph run started
+    here streams from all of its nodes.
+    """
+    token = _token_sink.set(sink)
+    try:
+        yield
+    finally:
+        _token_sink.reset(token)
+
+
+async def acollect_stream(stream, on_delta: Callable[[str], None]) -> Tuple[str, Any]:
+    """
+    Read a streamed chat completion, calling ``on_delta`` for each content delta.
+
+    Returns the full content and the usage from the final chunk (None if the
+    provider did not send one).
+    """
+    parts = []
+    usage = None
+    async for chunk in stream:
+        if getattr(chunk, "usage", None) is not None:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            on_delta(delta)
+    return "".join(parts), usage
+
+
+async def acollect_anthropic_stream(stream, on_delta: Callable[[str], None]) -> Tuple[str, CompletionUsage]:
+    """
+    Read a streamed Anthropic message, calling ``on_delta`` for each text delta.
+
+    Returns the full text and the token counts from the message_start and
+    message_delta events, in the same shape as an OpenAI ``response.usage``.
+    """
+    parts = []
+    prompt_tokens = completion_tokens = 0
+    async for event in stream:
+        if event.type == "message_start":
+            prompt_tokens = event.message.usage.input_tokens or 0
+        elif event.type == "message_delta":
+            completion_tokens = event.usage.output_tokens or 0
+        elif event.type == "content_block_delta" and getattr(event.delta, "type", None) == "text_delta":
+            parts.append(event.delta.text)
+            on_delta(event.delta.text)
+    return "".join(parts), CompletionUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                           total_tokens=prompt_tokens + completion_tokens)
@@ -1,27 +1,85 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastmcp import FastMCP
+from fastmcp.server.openapi import RouteMap, RouteType
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, Field, ValidationError
 from typing import Optional, List
-from backend.graphs.task_agent import graph, TaskAgentState
-from backend.types import TaskMetadata, SubtaskMetadata
-from fastapi.responses import JSONResponse
-from langgraph.errors import GraphInterrupt
+from backend.graphs.task_agent import builder, fused_builder, TaskAgentState
+from backend.types import TaskMetadata, SubtaskMetadata, StoredTask, TaskStatus, DuplicateTask, TaskSearchPage
+from backend.storage import get_task_store, get_checkpointer
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from langgraph.types import Command
 from fastapi.exceptions import RequestValidationError
-from backend.logger import set_log_level, get_log_level
+from backend.config import env_number
+from backend.logger import logger, set_log_level, get_log_level
+from backend.llm.clients import get_client_registry
+from backend.llm.cache import get_llm_cache
+from backend.llm.semantic_cache import get_semantic_cache
+from backend.llm.singleflight import coalescing_stats
+from backend.llm.streaming import stream_llm_tokens
+from backend.llm.limiter import PRIORITY_BATCH, get_llm_limiter, llm_priority
+from backend.llm.retry import llm_deadline
+from backend.llm.breaker import get_circuit_breaker
+from backend.llm.router import get_model_router
+from backend.metrics import RequestTimings, collect_timings, render_metrics
+from backend.due_dates import parse_due_date
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+
+# Limits for POST /tasks/batch
+BATCH_MAX_ITEMS = env_number("BATCH_MAX_ITEMS", 500, int)
+BATCH_MAX_CONCURRENCY = env_number("BATCH_MAX_CONCURRENCY", 8, int)
+BATCH_ITEM_TIMEOUT = env_number("BATCH_ITEM_TIMEOUT", 120.0)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release the pooled LLM clients when the server shuts down."""
+    yield
+    registry = get_client_registry()
+    await registry.aclose()
+    registry.close()
 
 # A FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 class TaskRequest(BaseModel):
     task: str = Field(..., min_length=1, description="The task to be processed")
+    tenant_id: Optional[str] = Field(None, description="Tenant that owns the task and is charged for speculative LLM calls")
 
 class TaskResponse(BaseModel):
     task: str
+    task_id: Optional[int] = None
+    thread_id: Optional[str] = None
     subtasks: Optional[List[str]] = None
     status: str
     message: Optional[str] = None
     needs_input: Optional[bool] = None
     prompt: Optional[str] = None
+    degraded: Optional[bool] = None
+    duplicates: Optional[List[DuplicateTask]] = None
+    timings: Optional[RequestTimings] = None
+
+class BatchTaskRequest(BaseModel):
+    tasks: List[TaskRequest] = Field(..., min_length=1, description="The tasks to be processed")
+    stream: bool = Field(False, description="Stream results as NDJSON in completion order instead of one response")
+    max_concurrency: Optional[int] = Field(None, ge=1, description="Lower the server's concurrency limit for this batch")
+    item_timeout: Optional[float] = Field(None, gt=0, description="Seconds allowed per task before it is reported as an error")
+
+class BatchItemResponse(TaskResponse):
+    index: int
+
+class BatchTaskResponse(BaseModel):
+    results: List[BatchItemResponse]
+    succeeded: int
+    pending: int
+    failed: int
+
+class ResumeRequest(BaseModel):
+    response: str = Field(..., min_length=1, description="The user's answer to the pending prompt")
 
 class LogLevelRequest(BaseModel):
     level: str
@@ -42,50 +100,74 @@ async def validation_exception_handler(request: Request, exc: ValidationError):
         content={"detail": str(exc)}
     )
 
-@app.post("/tasks", response_model=TaskResponse)
-async def create_task(request: TaskRequest):
+_server_graph = None
+_server_graph_fused = False
+
+def get_server_graph():
     """
-    Create a new task using the LangGraph task agent.
-    This will:
-    1. Extract and validate the task
-    2. Optionally break it into subtasks
-    3. Return the final task and subtasks
-    
-    If the graph needs user input, it will return a response with needs_input=True
-    and a prompt message that should be shown to the user.
+    Return the task agent graph compiled with the process-wide checkpointer.
+    TASK_PIPELINE=fused selects the graph that extracts and judges a new task in one LLM call.
     """
-    try:
-        # Initialize the task agent state
-        state = TaskAgentState(input=request.task)
-        
-        # Run the task agent graph
-        result = await graph.ainvoke(state)
-        
-        # Extract task metadata from result
-        task_metadata = result.get("task_metadata")
-        if not task_metadata:
-            raise HTTPException(
-                status_code=400,
-                detail="Failed to extract task metadata"
-            )
-        
-        # Return the successful result
-        return TaskResponse(
-            task=task_metadata.task,
-            subtasks=result.get("subtask_metadata", {}).get("subtasks"),
-            status="success",
-            message="Task created successfully"
-        )
-        
-    except GraphInterrupt as e:
-        # This is not an error - the graph needs user input
+    global _server_graph, _server_graph_fused
+    checkpointer = get_checkpointer()
+    fused = os.getenv("TASK_PIPELINE", "split").lower() == "fused"
+    if _server_graph is None or _server_graph.checkpointer is not checkpointer or _server_graph_fused != fused:
+        _server_graph = (fused_builder if fused else builder).compile(checkpointer=checkpointer)
+        _server_graph_fused = fused
+    return _server_graph
+
+def _thread_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+def _task_response(result: dict, thread_id: str, fallback_task: str) -> TaskResponse:
+    """Turn the graph output into a response, reporting a pending interrupt as needs_input."""
+    task_metadata = result.get("task_metadata")
+    interrupts = result.get("__interrupt__")
+    if interrupts:
+        value = interrupts[0].value
         return TaskResponse(
-            task=request.task,
+            task=task_metadata.task if task_metadata else fallback_task,
+            thread_id=thread_id,
             status="pending",
             needs_input=True,
-            prompt=str(e),
-            message="Additional information required"
+            prompt=value.get("prompt") if isinstance(value, dict) else str(value),
+            message="Additional information required",
+            degraded=result.get("degraded") or None
+        )
+
+    if not task_metadata:
+        raise HTTPException(
+            status_code=400,
+            detail="Failed to extract task metadata"
         )
+
+    subtask_metadata = result.get("subtask_metadata")
+    return TaskResponse(
+        task=task_metadata.task,
+        task_id=result.get("task_id"),
+        thread_id=thread_id,
+        subtasks=subtask_metadata.subtasks if subtask_metadata else None,
+        status="success",
+        message="Task created successfully",
+        degraded=result.get("degraded") or None,
+        duplicates=result.get("duplicates") or None
+    )
+
+async def _run_task_graph(graph_input, thread_id: str, fallback_task: str,
+                          include_timings: bool = False) -> TaskResponse:
+    """Run (or resume) the task agent on ``thread_id`` and map errors to HTTP responses."""
+    try:
+        server_graph = get_server_graph()
+        with collect_timings() as timings, llm_deadline():
+            result = await server_graph.ainvoke(graph_input, _thread_config(thread_id))
+        response = _task_response(result, thread_id, fallback_task)
+        if include_timings:
+            response.timings = timings()
+        if response.status == "success":
+            # A finished run can never be resumed, so drop its checkpoints
+            await server_graph.checkpointer.adelete_thread(thread_id)
+        return response
+
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -95,14 +177,232 @@ async def create_task(request: TaskRequest):
             status_code=400,
             detail=str(e)
         )
-    except Exception as e:
+    except Exception:
         # Log the error and return a 500
-        print(f"Error processing task: {str(e)}")
+        logger.exception("Error processing task %s", thread_id)
         raise HTTPException(
             status_code=500,
             detail="Internal server error while processing task"
         )
 
+@app.post("/tasks", response_model=TaskResponse)
+async def create_task(request: TaskRequest, timings: bool = False):
+    """
+    Create a new task using the LangGraph task agent.
+    This will:
+    1. Extract and validate the task
+    2. Optionally break it into subtasks
+    3. Return the final task and subtasks
+    
+    If the graph needs user input, it will return a response with needs_input=True,
+    a prompt message that should be shown to the user, and the thread_id to pass
+    to POST /tasks/{thread_id}/resume with the user's answer.
+
+    With ?timings=true the response includes a per-node latency and token breakdown.
+    """
+    return await _run_task_graph(TaskAgentState(input=request.task, tenant_id=request.tenant_id), uuid.uuid4().hex, request.task, timings)
+
+async def _run_batch_item(index: int, item: TaskRequest, semaphore: asyncio.Semaphore,
+                          timeout: float) -> BatchItemResponse:
+    """
+    Run one batch item, reporting a timeout or failure as an error result instead of raising.
+    Its LLM calls queue behind interactive requests and stop retrying once the item's timeout is near.
+    """
+    async with semaphore:
+        try:
+            with llm_priority(PRIORITY_BATCH), llm_deadline(timeout):
+                response = await asyncio.wait_for(
+                    _run_task_graph(TaskAgentState(input=item.task, tenant_id=item.tenant_id), uuid.uuid4().hex, item.task),
+                    timeout
+                )
+        except asyncio.TimeoutError:
+            response = TaskResponse(task=item.task, status="error", message=f"Timed out after {timeout:g} seconds")
+        except HTTPException as e:
+            response = TaskResponse(task=item.task, status="error", message=str(e.detail))
+    return BatchItemResponse(index=index, **response.model_dump())
+
+async def _stream_batch(jobs: List[asyncio.Task]):
+    try:
+        for next_done in asyncio.as_completed(jobs):
+            item = await next_done
+            yield item.model_dump_json() + "\n"
+    finally:
+        # Stop the remaining runs if the client goes away
+        for job in jobs:
+            job.cancel()
+
+@app.post("/tasks/batch", response_model=BatchTaskResponse, operation_id="create_tasks_batch")
+async def create_tasks_batch(request: BatchTaskRequest):
+    """
+    Create many tasks at once using the LangGraph task agent.
+    Tasks run concurrently, up to BATCH_MAX_CONCURRENCY at a time, and each
+    one is given BATCH_ITEM_TIMEOUT seconds. Every input gets a result with
+    its index: "success", "pending" (with a thread_id to resume) or "error".
+
+    With stream=true, results are sent as NDJSON lines as each task finishes;
+    otherwise they are returned together, in input order.
+    """
+    if len(request.tasks) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {BATCH_MAX_ITEMS} tasks")
+
+    concurrency = min(request.max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    timeout = request.item_timeout or BATCH_ITEM_TIMEOUT
+    semaphore = asyncio.Semaphore(concurrency)
+    jobs = [
+        asyncio.ensure_future(_run_batch_item(index, item, semaphore, timeout))
+        for index, item in enumerate(request.tasks)
+    ]
+
+    if request.stream:
+        return StreamingResponse(_stream_batch(jobs), media_type="application/x-ndjson")
+
+    results = await asyncio.gather(*jobs)
+    return BatchTaskResponse(
+        results=results,
+        succeeded=sum(r.status == "success" for r in results),
+        pending=sum(r.status == "pending" for r in results),
+        failed=sum(r.status == "error" for r in results)
+    )
+
+@app.post("/tasks/{thread_id}/resume", response_model=TaskResponse)
+async def resume_task(thread_id: str, request: ResumeRequest, timings: bool = False):
+    """
+    Resume a task run that is waiting for user input.
+    The run continues from its last checkpoint, so steps that already
+    completed (and their LLM calls) are not repeated.
+    """
+    task_input = await _resumable_input(thread_id)
+    return await _run_task_graph(Command(resume=request.response), thread_id, task_input, timings)
+
+async def _resumable_input(thread_id: str) -> str:
+    """Return the original input of a run waiting for user input, or raise 404/409."""
+    snapshot = await get_server_graph().aget_state(_thread_config(thread_id))
+    if not snapshot.values:
+        raise HTTPException(status_code=404, detail=f"Task run {thread_id} not found")
+    if not snapshot.next:
+        raise HTTPException(status_code=409, detail=f"Task run {thread_id} is not waiting for input")
+    return snapshot.values.get("input", "")
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+async def _stream_task_graph(graph_input, thread_id: str, fallback_task: str):
+    """
+    Run (or resume) the task agent on ``thread_id`` as server-sent events:
+    ``start``, then ``node`` after each graph step, ``token`` for each streamed
+    LLM delta and ``subtask`` for each generated subtask as soon as it is
+    complete, then a final ``result`` (a TaskResponse) or ``error``.
+    """
+    server_graph = get_server_graph()
+    config = _thread_config(thread_id)
+    events: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def run() -> None:
+        try:
+            async for update in server_graph.astream(graph_input, config, stream_mode="updates"):
+                for node, value in update.items():
+                    if node != "__interrupt__":
+                        events.put_nowait(("node", {"node": node, "update": value}))
+        finally:
+            events.put_nowait(finished)
+
+    # The run task inherits the token sink and the LLM deadline from this context
+    with stream_llm_tokens(lambda event, data: events.put_nowait((event, data))), llm_deadline():
+        runner = asyncio.create_task(run())
+
+    yield _sse("start", {"thread_id": thread_id})
+    try:
+        while (event := await events.get()) is not finished:
+            yield _sse(*event)
+        await runner
+
+        snapshot = await server_graph.aget_state(config)
+        result = dict(snapshot.values)
+        if snapshot.interrupts:
+            result["__interrupt__"] = snapshot.interrupts
+        response = _task_response(result, thread_id, fallback_task)
+        if response.status == "success":
+            await server_graph.checkpointer.adelete_thread(thread_id)
+        yield _sse("result", response)
+    except HTTPException as e:
+        yield _sse("error", {"status_code": e.status_code, "detail": e.detail})
+    except ValueError as e:
+        yield _sse("error", {"status_code": 400, "detail": str(e)})
+    except Exception:
+        logger.exception("Error processing task %s", thread_id)
+        yield _sse("error", {"status_code": 500, "detail": "Internal server error while processing task"})
+    finally:
+        # Stop the run if the client goes away
+        runner.cancel()
+
+def _event_stream(events) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/tasks/stream")
+async def create_task_stream(request: TaskRequest):
+    """
+    Create a new task like POST /tasks, streaming progress as server-sent events.
+    Node events arrive as each graph step finishes, and token events carry the
+    clarification message and subtask list as the LLM writes them.
+    """
+    graph_input = TaskAgentState(input=request.task, tenant_id=request.tenant_id)
+    return _event_stream(_stream_task_graph(graph_input, uuid.uuid4().hex, request.task))
+
+@app.post("/tasks/{thread_id}/resume/stream")
+async def resume_task_stream(thread_id: str, request: ResumeRequest):
+    """Resume a task run like POST /tasks/{thread_id}/resume, streaming progress as server-sent events."""
+    task_input = await _resumable_input(thread_id)
+    return _event_stream(_stream_task_graph(Command(resume=request.response), thread_id, task_input))
+
+# Handlers that read the SQLite store are plain functions, so FastAPI runs them
+# in its threadpool instead of blocking the event loop
+@app.get("/tasks", response_model=List[StoredTask])
+def list_tasks(status: Optional[TaskStatus] = None, limit: int = 100, offset: int = 0):
+    """List stored tasks, optionally filtered by status."""
+    return get_task_store().list_tasks(status=status, limit=limit, offset=offset)
+
+@app.get("/tasks/search", response_model=TaskSearchPage)
+def search_tasks(q: str, status: Optional[TaskStatus] = None, due_date: Optional[str] = None,
+                 tenant_id: Optional[str] = None, limit: int = Query(20, ge=1, le=100),
+                 cursor: Optional[str] = None):
+    """
+    Search stored tasks and their subtasks, best match first. Every word in ``q``
+    must match; ``meet*`` matches words starting with "meet". Pass ``next_cursor``
+    back as ``cursor`` for the next page.
+    """
+    try:
+        return get_task_store().search_tasks(
+            q, status=status, due_date=due_date, tenant_id=tenant_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/tasks/due", response_model=List[StoredTask])
+def list_due_tasks(before: str, status: Optional[TaskStatus] = None, limit: int = Query(100, ge=1, le=1000)):
+    """
+    List tasks due at or before ``before``, soonest first. ``before`` is an ISO
+    timestamp (UTC unless it has an offset) or a due date phrase such as
+    "friday" or "eom", which covers the whole day it names.
+    """
+    try:
+        cutoff = datetime.fromisoformat(before)
+        if cutoff.tzinfo is None:
+            cutoff = cutoff.replace(tzinfo=timezone.utc)
+    except ValueError:
+        cutoff = parse_due_date(before)
+    if cutoff is None:
+        raise HTTPException(status_code=400, detail=f"Cannot read a date from before={before!r}")
+    return get_task_store().list_due(cutoff, status=status, limit=limit)
+
+@app.get("/tasks/{task_id:int}", response_model=StoredTask)
+def get_task(task_id: int):
+    """Get a stored task and its subtasks."""
+    task = get_task_store().get_task(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    return task
+
 @app.get("/api/log-level")
 async def get_log_level_endpoint():
     """Get the current log level."""
@@ -117,8 +417,60 @@ async def set_log_level_endpoint(request: LogLevelRequest):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-# Create an MCP server from your FastAPI app
-mcp = FastMCP.from_fastapi(app=app)
+@app.get("/api/llm-cache")
+async def get_llm_cache_stats():
+    """Get LLM response cache statistics."""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "backend": cache.name, "entries": len(cache), **cache.stats.snapshot()}
+
+@app.get("/api/llm-coalescing")
+async def get_llm_coalescing_stats():
+    """Get counts of LLM calls executed and coalesced into an identical in-flight call."""
+    return coalescing_stats.snapshot()
+
+@app.get("/api/semantic-cache")
+async def get_semantic_cache_stats():
+    """Get the semantic cache's entries, thresholds and hit rates per tool."""
+    return get_semantic_cache().stats()
+
+@app.get("/api/duplicate-index")
+async def get_duplicate_index_stats():
+    """Get the duplicate index's task count, capacity and tenants (``{"enabled": false}`` when it is off)."""
+    index = getattr(get_task_store(), "duplicate_index", None)
+    return {"enabled": False} if index is None else {"enabled": True, **index.stats()}
+
+@app.get("/api/llm-limiter")
+async def get_llm_limiter_stats():
+    """Get the outbound LLM limiter's concurrency window, queue and rate bucket levels."""
+    return get_llm_limiter().stats()
+
+@app.get("/api/llm-routes")
+async def get_llm_routes():
+    """Get each tool's chain of provider:model routes, tried in order."""
+    return get_model_router().table()
+
+@app.get("/health")
+async def health():
+    """
+    Report whether the server can reach its LLM providers. While any provider's circuit breaker is
+    open the status is "degraded": tools routed to it fall back to the next route in their chain, and
+    once a chain runs out, tasks are created with local extraction and no subtasks.
+    """
+    breakers = {provider: get_circuit_breaker(provider).stats() for provider in get_model_router().providers()}
+    degraded = any(stats["state"] == "open" for stats in breakers.values())
+    return {"status": "degraded" if degraded else "ok", "llm_breakers": breakers}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Per-node and per-LLM-call latency, token and retry metrics in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Create an MCP server from your FastAPI app; server-sent event routes are not useful as tools
+mcp = FastMCP.from_fastapi(app=app, route_maps=[
+    RouteMap(methods=["POST"], pattern=r".*/stream$", route_type=RouteType.IGNORE)
+])
 
 if __name__ == "__main__":
     mcp.run()  # Start the MCP server
\ No newline at end of file
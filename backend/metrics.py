@@ -0,0 +1,501 @@
+"""
+Latency, token and retry instrumentation for the task agent.
+
+Graph nodes are wrapped with ``instrument_node`` and every LLM call reports
+through ``record_llm_call``/``record_llm_cache_hit``. The measurements feed two
+sinks:
+
+- process-wide Prometheus metrics, rendered in the text exposition format by
+  ``render_metrics()`` and served on ``/metrics``
+- an optional per-request ``RequestTimings`` breakdown, collected while a
+  ``collect_timings()`` block is active
+
+The registry is a small in-house implementation of the Prometheus text format,
+so no client library is needed.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langgraph.errors import GraphInterrupt
+from pydantic import BaseModel
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_node: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("task_agent_node", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every series of this metric."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, one series per label combination."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, one series per label combination."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # Per series: one count per bucket, then the sum and the total count
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return int(series[-1]) if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+NODE_DURATION = registry.histogram(
+    "task_agent_node_duration_seconds", "Wall time spent in each graph node.", ("node", "outcome"))
+LLM_DURATION = registry.histogram(
+    "task_agent_llm_call_duration_seconds", "Time spent waiting on the LLM provider.", ("node", "prompt"))
+LLM_CALLS = registry.counter(
+    "task_agent_llm_calls_total", "LLM calls by how they were answered.", ("node", "prompt", "source"))
+LLM_TOKENS = registry.counter(
+    "task_agent_llm_tokens_total", "Tokens reported in the provider's response.usage.", ("node", "prompt", "kind"))
+RETRIES = registry.counter(
+    "task_agent_judgment_retries_total", "Failed judgments that sent the user back for clarification.", ("kind",))
+PREJUDGE = registry.counter(
+    "task_agent_prejudge_total", "Judgments decided by the local rules (pass/fail) or left to the LLM (llm).",
+    ("kind", "outcome"))
+LLM_QUEUE_DEPTH = registry.gauge(
+    "task_agent_llm_queue_depth", "LLM calls waiting for the outbound limiter.", ("priority",))
+LLM_IN_FLIGHT = registry.gauge(
+    "task_agent_llm_in_flight", "LLM calls admitted by the outbound limiter and not yet finished.")
+LLM_CONCURRENCY_LIMIT = registry.gauge(
+    "task_agent_llm_concurrency_limit", "Current AIMD concurrency window of the outbound limiter.")
+LLM_QUEUE_WAIT = registry.histogram(
+    "task_agent_llm_queue_wait_seconds", "Time LLM calls waited for the outbound limiter.", ("priority",))
+LLM_THROTTLED = registry.counter(
+    "task_agent_llm_throttled_total", "LLM calls rejected by the provider with 429 Too Many Requests.")
+LLM_RETRIES = registry.counter(
+    "task_agent_llm_retries_total", "LLM attempts retried, by the kind of error that failed them.",
+    ("prompt", "reason"))
+LLM_GIVE_UPS = registry.counter(
+    "task_agent_llm_retry_give_ups_total",
+    "Retryable LLM failures not retried because the attempts or the run deadline ran out.", ("prompt", "reason"))
+LLM_HEDGES = registry.counter(
+    "task_agent_llm_hedges_total", "Hedged LLM requests by outcome (fired, won, lost).", ("prompt", "outcome"))
+LLM_BREAKER_STATE = registry.gauge(
+    "task_agent_llm_breaker_state", "LLM circuit breaker state (0 closed, 1 half-open, 2 open).", ("provider",))
+LLM_BREAKER_REJECTED = registry.counter(
+    "task_agent_llm_breaker_rejected_total", "LLM calls failed fast because the circuit breaker was open.",
+    ("provider",))
+DEGRADED_NODES = registry.counter(
+    "task_agent_degraded_nodes_total", "Graph nodes that took the local path because the LLM was unavailable.",
+    ("node",))
+LLM_ROUTE_DURATION = registry.histogram(
+    "task_agent_llm_route_duration_seconds", "Time spent waiting on each tool's provider and model.",
+    ("tool", "route"))
+LLM_ROUTE_CALLS = registry.counter(
+    "task_agent_llm_route_calls_total", "Provider calls per tool and route by outcome (ok, error).",
+    ("tool", "route", "outcome"))
+LLM_ROUTE_COST = registry.counter(
+    "task_agent_llm_route_cost_usd_total", "Estimated provider cost per tool and route, from response token counts.",
+    ("tool", "route"))
+LLM_ROUTE_FALLBACKS = registry.counter(
+    "task_agent_llm_route_fallbacks_total", "Calls handed to the next route in the chain after this route failed.",
+    ("tool", "route"))
+SEMANTIC_CACHE_LOOKUPS = registry.counter(
+    "task_agent_semantic_cache_lookups_total", "Semantic cache lookups per tool by outcome (hit, miss).",
+    ("tool", "outcome"))
+DUE_DATE_PREPASS = registry.counter(
+    "task_agent_due_date_prepass_total",
+    "Local due date pre-pass results: filled (the LLM missed a date found locally), agreed (both found one), "
+    "llm (only the LLM found one) or none.", ("outcome",))
+SPECULATIONS = registry.counter(
+    "task_agent_speculations_total",
+    "Speculative subtask generations by outcome (started, used, discarded, expired, over_budget).", ("outcome",))
+
+
+class NodeTiming(BaseModel):
+    """Time and tokens spent in one graph node during a request."""
+    node: str
+    calls: int = 0
+    wall_ms: float = 0.0
+    llm_ms: float = 0.0
+    llm_calls: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class RequestTimings(BaseModel):
+    """
+    Per-request breakdown of where time and tokens went.
+
+    Attributes:
+        total_ms: Wall time of the whole request
+        llm_ms: Time spent waiting on the LLM provider
+        nodes: One entry per node that ran, in first-run order
+        retries: Failed judgments, keyed by "task" or "subtasks"
+    """
+    total_ms: float = 0.0
+    llm_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    nodes: List[NodeTiming] = []
+    retries: Dict[str, int] = {}
+
+
+class _TimingsCollector:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes: Dict[str, NodeTiming] = {}
+        self._retries: Dict[str, int] = {}
+        self._start = time.perf_counter()
+
+    def _node(self, name: Optional[str]) -> NodeTiming:
+        name = name or "unknown"
+        if name not in self._nodes:
+            self._nodes[name] = NodeTiming(node=name)
+        return self._nodes[name]
+
+    def add_node(self, name: str, seconds: float) -> None:
+        with self._lock:
+            timing = self._node(name)
+            timing.calls += 1
+            timing.wall_ms += seconds * 1000
+
+    def add_llm(self, name: Optional[str], seconds: float, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            timing = self._node(name)
+            timing.llm_calls += 1
+            timing.llm_ms += seconds * 1000
+            timing.prompt_tokens += prompt_tokens
+            timing.completion_tokens += completion_tokens
+
+    def add_cache_hit(self, name: Optional[str]) -> None:
+        with self._lock:
+            self._node(name).cache_hits += 1
+
+    def add_retry(self, kind: str) -> None:
+        with self._lock:
+            self._retries[kind] = self._retries.get(kind, 0) + 1
+
+    def snapshot(self) -> RequestTimings:
+        with self._lock:
+            nodes = [timing.model_copy() for timing in self._nodes.values()]
+            retries = dict(self._retries)
+        return RequestTimings(
+            total_ms=(time.perf_counter() - self._start) * 1000,
+            llm_ms=sum(n.llm_ms for n in nodes),
+            prompt_tokens=sum(n.prompt_tokens for n in nodes),
+            completion_tokens=sum(n.completion_tokens for n in nodes),
+            nodes=nodes,
+            retries=retries,
+        )
+
+
+_timings: contextvars.ContextVar[Optional[_TimingsCollector]] = contextvars.ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def collect_timings() -> Iterator[Callable[[], RequestTimings]]:
+    """
+    Collect a ``RequestTimings`` breakdown for everything run inside this block.
+
+    Yields a function returning the breakdown so far.
+    """
+    collector = _TimingsCollector()
+    token = _timings.set(collector)
+    try:
+        yield collector.snapshot
+    finally:
+        _timings.reset(token)
+
+
+def current_node() -> Optional[str]:
+    """Return the name of the graph node running in this context, if any."""
+    return _current_node.get()
+
+
+@contextmanager
+def _node_scope(name: str) -> Iterator[None]:
+    token = _current_node.set(name)
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except GraphInterrupt:
+        outcome = "interrupt"
+        raise
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_node.reset(token)
+        NODE_DURATION.observe(elapsed, node=name, outcome=outcome)
+        collector = _timings.get()
+        if collector is not None:
+            collector.add_node(name, elapsed)
+
+
+def instrument_node(name: str):
+    """Decorate a sync or async graph node so its wall time is recorded under ``name``."""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _node_scope(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _node_scope(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _token_count(usage, field: str) -> int:
+    value = getattr(usage, field, 0)
+    return value if isinstance(value, int) else 0
+
+
+def record_llm_call(prompt: str, seconds: float, usage=None, error: bool = False) -> None:
+    """Record one completion request sent to the provider, with the token counts from ``response.usage``."""
+    node = current_node() or "none"
+    prompt_tokens = _token_count(usage, "prompt_tokens")
+    completion_tokens = _token_count(usage, "completion_tokens")
+    LLM_DURATION.observe(seconds, node=node, prompt=prompt)
+    LLM_CALLS.inc(node=node, prompt=prompt, source="error" if error else "provider")
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, node=node, prompt=prompt, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, node=node, prompt=prompt, kind="completion")
+    collector = _timings.get()
+    if collector is not None:
+        collector.add_llm(current_node(), seconds, prompt_tokens, completion_tokens)
+
+
+def record_llm_cache_hit(prompt: str) -> None:
+    """Record an LLM call answered from the response cache."""
+    LLM_CALLS.inc(node=current_node() or "none", prompt=prompt, source="cache")
+    collector = _timings.get()
+    if collector is not None:
+        collector.add_cache_hit(current_node())
+
+
+def record_retry(kind: str) -> None:
+    """Record a failed judgment of ``kind`` ("task" or "subtasks") that triggers a retry."""
+    RETRIES.inc(kind=kind)
+    collector = _timings.get()
+    if collector is not None:
+        collector.add_retry(kind)
+
+
+def record_prejudge(kind: str, outcome: str) -> None:
+    """Record a pre-judge of ``kind`` ("task" or "subtasks") that decided ``outcome`` ("pass", "fail" or "llm")."""
+    PREJUDGE.inc(kind=kind, outcome=outcome)
+
+
+def record_llm_retry(prompt: str, reason: str) -> None:
+    """Record a failed LLM attempt for ``prompt`` that is retried because of ``reason`` (its error kind)."""
+    LLM_RETRIES.inc(prompt=prompt, reason=reason)
+
+
+def record_llm_give_up(prompt: str, reason: str) -> None:
+    """Record a retryable LLM failure left unretried because ``reason`` ("attempts" or "deadline") ran out."""
+    LLM_GIVE_UPS.inc(prompt=prompt, reason=reason)
+
+
+def record_llm_hedge(prompt: str, outcome: str) -> None:
+    """Record a hedged request for ``prompt``: "fired", then "won" or "lost" against the original."""
+    LLM_HEDGES.inc(prompt=prompt, outcome=outcome)
+
+
+_BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def record_breaker_state(provider: str, state: str) -> None:
+    """Record ``provider``'s circuit breaker entering ``state`` ("closed", "half_open" or "open")."""
+    LLM_BREAKER_STATE.set(_BREAKER_STATES[state], provider=provider)
+
+
+def record_breaker_rejected(provider: str) -> None:
+    """Record an LLM call failed fast by ``provider``'s open circuit breaker."""
+    LLM_BREAKER_REJECTED.inc(provider=provider)
+
+
+def record_degraded(node: str) -> None:
+    """Record a graph node that ran its local degraded path."""
+    DEGRADED_NODES.inc(node=node)
+
+
+def record_llm_route(tool: str, route: str, seconds: float, cost: float = 0.0, error: bool = False) -> None:
+    """Record one provider call made for ``tool`` on ``route`` (``provider:model``) and its estimated cost."""
+    LLM_ROUTE_DURATION.observe(seconds, tool=tool, route=route)
+    LLM_ROUTE_CALLS.inc(tool=tool, route=route, outcome="error" if error else "ok")
+    if cost:
+        LLM_ROUTE_COST.inc(cost, tool=tool, route=route)
+
+
+def record_llm_route_fallback(tool: str, route: str) -> None:
+    """Record ``route`` failing for ``tool`` and the call moving on to the next route."""
+    LLM_ROUTE_FALLBACKS.inc(tool=tool, route=route)
+
+
+def record_semantic_cache(tool: str, outcome: str) -> None:
+    """Record a semantic cache lookup for ``tool`` that ended in a ``hit`` or a ``miss``."""
+    SEMANTIC_CACHE_LOOKUPS.inc(tool=tool, outcome=outcome)
+
+
+def record_due_date_prepass(outcome: str) -> None:
+    """Record how the local due date pre-pass compared with the LLM's extraction."""
+    DUE_DATE_PREPASS.inc(outcome=outcome)
+
+
+def record_speculation(outcome: str) -> None:
+    """Record a speculative subtask generation reaching ``outcome``."""
+    SPECULATIONS.inc(outcome=outcome)
+
+
+def render_metrics() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    return registry.render()
@@ -0,0 +1,78 @@
+"""
+Task storage package.
+This package contains the storage interface for created tasks and its backends.
+"""
+
+import os
+import threading
+from typing import Optional
+
+from .base import TaskStore
+from .sqlite_store import SQLiteTaskStore
+from .duplicate_index import DuplicateIndex, DuplicateSettings, duplicate_index_from_env
+from .checkpointer import DEFAULT_CHECKPOINT_DB_PATH, CheckpointPruningPolicy, SQLiteCheckpointSaver
+
+DEFAULT_TASK_DB_PATH = "tasks.db"
+
+_store: Optional[TaskStore] = None
+_store_lock = threading.Lock()
+_checkpointer: Optional[SQLiteCheckpointSaver] = None
+
+
+def get_task_store() -> TaskStore:
+    """
+    Return the process-wide task store, opening the database at TASK_DB_PATH, its
+    duplicate index and its search index on first use.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = os.getenv("TASK_DB_PATH", DEFAULT_TASK_DB_PATH)
+                _store = SQLiteTaskStore(
+                    path,
+                    duplicate_index=duplicate_index_from_env(path),
+                    search_backend=os.getenv("TASK_SEARCH_BACKEND", "auto"),
+                )
+    return _store
+
+
+def configure_task_store(store: Optional[TaskStore]) -> None:
+    """Install ``store`` as the process-wide task store. Pass None to reopen from the environment."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def get_checkpointer() -> SQLiteCheckpointSaver:
+    """Return the process-wide graph checkpointer, opening the database at CHECKPOINT_DB_PATH on first use."""
+    global _checkpointer
+    if _checkpointer is None:
+        with _store_lock:
+            if _checkpointer is None:
+                _checkpointer = SQLiteCheckpointSaver(
+                    os.getenv("CHECKPOINT_DB_PATH", DEFAULT_CHECKPOINT_DB_PATH),
+                    policy=CheckpointPruningPolicy.from_env(),
+                )
+    return _checkpointer
+
+
+def configure_checkpointer(checkpointer: Optional[SQLiteCheckpointSaver]) -> None:
+    """Install ``checkpointer`` as the process-wide checkpointer. Pass None to reopen from the environment."""
+    global _checkpointer
+    with _store_lock:
+        _checkpointer = checkpointer
+
+
+__all__ = [
+    "TaskStore",
+    "SQLiteTaskStore",
+    "DuplicateIndex",
+    "DuplicateSettings",
+    "get_task_store",
+    "configure_task_store",
+    "CheckpointPruningPolicy",
+    "SQLiteCheckpointSaver",
+    "get_checkpointer",
+    "configure_checkpointer"
+]
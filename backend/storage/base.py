@@ -0,0 +1,61 @@
+"""
+Storage interface for created tasks.
+
+Every backend implements ``TaskStore`` so the graph and the API never depend
+on a particular database.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from backend.types import StoredTask, TaskSearchPage, TaskStatus
+
+
+class TaskStore(ABC):
+    """Interface for durable task storage backends."""
+
+    def save_task(self, task: StoredTask) -> StoredTask:
+        """Persist a single task with its subtasks and return it with its id assigned."""
+        return self.save_tasks([task])[0]
+
+    @abstractmethod
+    def save_tasks(self, tasks: List[StoredTask]) -> List[StoredTask]:
+        """Persist tasks in one transaction and return them with ids assigned, in order."""
+
+    @abstractmethod
+    def get_task(self, task_id: int) -> Optional[StoredTask]:
+        """Return the task with ``task_id`` or None if it does not exist."""
+
+    @abstractmethod
+    def list_tasks(self, status: Optional[TaskStatus] = None, limit: int = 100, offset: int = 0) -> List[StoredTask]:
+        """Return tasks ordered by id, optionally filtered by status."""
+
+    def list_due(self, before: datetime, status: Optional[TaskStatus] = None, limit: int = 100) -> List[StoredTask]:
+        """Return tasks due at or before ``before``, soonest first, optionally filtered by status."""
+        raise NotImplementedError(f"{type(self).__name__} does not support due date queries")
+
+    @abstractmethod
+    def update_status(self, task_id: int, status: TaskStatus) -> bool:
+        """Set the status of a task. Returns False if the task does not exist."""
+
+    def search_tasks(self, query: str, status: Optional[TaskStatus] = None, due_date: Optional[str] = None,
+                     tenant_id: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None) -> TaskSearchPage:
+        """
+        Full-text search over task text and subtasks, best match first, optionally filtered.
+
+        Pass the returned ``next_cursor`` back as ``cursor`` for the next page. Raises
+        ValueError for a query without words or a malformed cursor.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support search")
+
+    def find_duplicates(self, texts: Sequence[str], tenant_id: Optional[str] = None, k: int = 3,
+                        threshold: float = 0.85) -> List[List[Tuple[int, float]]]:
+        """
+        For each text, return up to ``k`` open tasks of ``tenant_id`` it almost duplicates, as
+        ``(task_id, similarity)`` pairs, most similar first. Backends without a duplicate index find none.
+        """
+        return [[] for _ in texts]
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
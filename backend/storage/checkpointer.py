@@ -0,0 +1,396 @@
+"""
+SQLite checkpointer for the task agent graph.
+
+Saves every graph checkpoint and pending write to a SQLite database, so a run
+paused on ``interrupt()`` can be resumed by thread id, even from another worker
+or after a restart. Each checkpoint is stored whole, with its channel values
+inline. Old checkpoints are pruned by the ``CheckpointPruningPolicy``, which
+keeps the database bounded.
+"""
+
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from pydantic import BaseModel
+
+from backend.config import env_number
+from backend.logger import logger
+
+DEFAULT_CHECKPOINT_DB_PATH = "checkpoints.db"
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS checkpoints (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        parent_checkpoint_id TEXT,
+        type TEXT,
+        checkpoint BLOB NOT NULL,
+        metadata_type TEXT,
+        metadata BLOB NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS writes (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        task_path TEXT NOT NULL DEFAULT '',
+        idx INTEGER NOT NULL,
+        channel TEXT NOT NULL,
+        type TEXT,
+        value BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_checkpoints_created_at ON checkpoints(created_at)",
+)
+
+SELECT_CHECKPOINT_COLUMNS = (
+    "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+    "metadata_type, metadata FROM checkpoints"
+)
+SELECT_WRITES = (
+    "SELECT task_id, channel, type, value FROM writes "
+    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx"
+)
+INSERT_CHECKPOINT = (
+    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+    "type, checkpoint, metadata_type, metadata, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_WRITE_COLUMNS = (
+    " INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, task_path, idx, channel, type, value) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+# Threads whose newest checkpoint is older than the cutoff
+SELECT_STALE_THREADS = "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?"
+# Checkpoints beyond the newest N in each (thread, namespace)
+SELECT_EXCESS_CHECKPOINTS = (
+    "SELECT thread_id, checkpoint_ns, checkpoint_id FROM ("
+    " SELECT thread_id, checkpoint_ns, checkpoint_id, ROW_NUMBER() OVER ("
+    "  PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS rank"
+    " FROM checkpoints) WHERE rank > ?"
+)
+DELETE_CHECKPOINT = "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+DELETE_CHECKPOINT_WRITES = "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+DELETE_THREAD_CHECKPOINTS = "DELETE FROM checkpoints WHERE thread_id = ?"
+DELETE_THREAD_WRITES = "DELETE FROM writes WHERE thread_id = ?"
+
+
+class CheckpointPruningPolicy(BaseModel):
+    """
+    Limits on how much checkpoint history is kept.
+
+    Attributes:
+        max_checkpoints_per_thread: Newest checkpoints kept per thread; older ones are dropped.
+            Resuming only needs the newest one. None keeps them all.
+        max_thread_age_seconds: Threads not checkpointed for this long are deleted. None never expires them.
+        prune_every: Prune automatically after this many saved checkpoints. 0 disables automatic pruning.
+    """
+    max_checkpoints_per_thread: Optional[int] = 20
+    max_thread_age_seconds: Optional[float] = 7 * 24 * 3600.0
+    prune_every: int = 100
+
+    @classmethod
+    def from_env(cls) -> "CheckpointPruningPolicy":
+        """Build a policy from CHECKPOINT_MAX_PER_THREAD, CHECKPOINT_MAX_AGE_HOURS and CHECKPOINT_PRUNE_EVERY."""
+        defaults = cls()
+        max_per_thread = env_number("CHECKPOINT_MAX_PER_THREAD", defaults.max_checkpoints_per_thread, int)
+        max_age_hours = env_number("CHECKPOINT_MAX_AGE_HOURS", defaults.max_thread_age_seconds / 3600)
+        return cls(
+            max_checkpoints_per_thread=max_per_thread or None,
+            max_thread_age_seconds=max_age_hours * 3600 or None,
+            prune_every=env_number("CHECKPOINT_PRUNE_EVERY", defaults.prune_every, int),
+        )
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpoint saver backed by a single SQLite database file.
+
+    Args:
+        path: Database file path, or ":memory:" for a throwaway database
+        policy: Pruning policy applied every ``policy.prune_every`` checkpoints and by ``prune()``
+        clock: Time source for checkpoint ages, overridable in tests
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_DB_PATH, policy: Optional[CheckpointPruningPolicy] = None,
+                 clock=time.time, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.policy = policy or CheckpointPruningPolicy()
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._puts_since_prune = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=128)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self.transaction() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the enclosed statements in a single write transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            if checkpoint_id:
+                row = self._conn.execute(
+                    SELECT_CHECKPOINT_COLUMNS + " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    SELECT_CHECKPOINT_COLUMNS
+                    + " WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = SELECT_CHECKPOINT_COLUMNS
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            results = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                checkpoint_tuple = self._to_tuple(row)
+                if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                results.append(checkpoint_tuple)
+        yield from results
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self.transaction() as conn:
+            conn.execute(
+                INSERT_CHECKPOINT,
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 checkpoint_type, checkpoint_blob, metadata_type, metadata_blob, self.clock()),
+            )
+            self._puts_since_prune += 1
+            due = self.policy.prune_every and self._puts_since_prune >= self.policy.prune_every
+        if due:
+            self.prune()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special writes (errors, interrupts, resumes) replace earlier ones; regular writes are kept once
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_blob = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, task_path,
+                         WRITES_IDX_MAP.get(channel, idx), channel, value_type, value_blob))
+        with self.transaction() as conn:
+            conn.executemany(verb + INSERT_WRITE_COLUMNS, rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.transaction() as conn:
+            conn.execute(DELETE_THREAD_CHECKPOINTS, (thread_id,))
+            conn.execute(DELETE_THREAD_WRITES, (thread_id,))
+
+    def prune(self) -> Dict[str, int]:
+        """
+        Apply the pruning policy now.
+
+        Returns:
+            The number of threads and checkpoints deleted
+        """
+        threads = checkpoints = 0
+        with self.transaction() as conn:
+            if self.policy.max_thread_age_seconds is not None:
+                cutoff = self.clock() - self.policy.max_thread_age_seconds
+                stale = [thread_id for (thread_id,) in conn.execute(SELECT_STALE_THREADS, (cutoff,))]
+                for thread_id in stale:
+                    checkpoints += conn.execute(DELETE_THREAD_CHECKPOINTS, (thread_id,)).rowcount
+                    conn.execute(DELETE_THREAD_WRITES, (thread_id,))
+                threads = len(stale)
+            if self.policy.max_checkpoints_per_thread is not None:
+                excess = conn.execute(
+                    SELECT_EXCESS_CHECKPOINTS, (max(self.policy.max_checkpoints_per_thread, 1),)
+                ).fetchall()
+                conn.executemany(DELETE_CHECKPOINT, excess)
+                conn.executemany(DELETE_CHECKPOINT_WRITES, excess)
+                checkpoints += len(excess)
+            self._puts_since_prune = 0
+        if threads or checkpoints:
+            logger.debug("Pruned %d checkpoint threads and %d checkpoints", threads, checkpoints)
+        return {"threads": threads, "checkpoints": checkpoints}
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of stored threads, checkpoints and pending writes."""
+        with self._lock:
+            threads, checkpoints = self._conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints"
+            ).fetchone()
+            writes = self._conn.execute("SELECT COUNT(*) FROM writes").fetchone()[0]
+        return {"threads": threads, "checkpoints": checkpoints, "writes": writes}
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def _to_tuple(self, row: tuple) -> CheckpointTuple:
+        (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+         checkpoint_type, checkpoint_blob, metadata_type, metadata_blob) = row
+        writes = self._conn.execute(SELECT_WRITES, (thread_id, checkpoint_ns, checkpoint_id)).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((checkpoint_type, checkpoint_blob)),
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    # SQLite calls are short, so the async API runs them on a worker thread
+    # instead of pulling in an async driver.
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        results = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in results:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,283 @@
+"""
+Vector index of open tasks for duplicate detection.
+
+Before a task is saved, ``create_task_node`` asks whether it almost
+duplicates an open task of the same tenant. Scanning rows in Python does not
+scale to tens of thousands of tasks, so every open task's text is embedded
+(with the hashing vectorizer the semantic cache uses) into a row of a float32
+matrix, next to arrays holding each row's task id and tenant. A batch of
+queries is one matrix product per chunk of a tenant's rows, followed by a
+top-k selection.
+
+The store keeps the index current: saved open tasks are added, and status
+changes add or remove them. Removing a task frees its row for reuse.
+
+On disk the index is a directory of ``.npy`` files opened as memory maps,
+plus ``meta.json`` holding the tenant names. Opening it only maps the files,
+so it loads in milliseconds whatever its size. On startup the store
+compares the index with the open tasks in the database (count, largest id
+and sum of ids). After a crash or an offline change it rebuilds the index
+from the database.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from backend.config import env_flag, env_number
+from backend.logger import logger
+from backend.text import HashingVectorizer, normalize_text
+
+INDEX_VERSION = 1
+INITIAL_CAPACITY = 1024
+# Rows scored per matrix product, bounding the memory a query needs
+QUERY_CHUNK_ROWS = 16384
+# Fingerprint of the open tasks: (count, largest id, sum of ids)
+Fingerprint = Tuple[int, int, int]
+
+
+class DuplicateSettings(BaseModel):
+    """
+    Duplicate detection settings.
+
+    Attributes:
+        enabled: Set to False to skip duplicate checks and the index
+        threshold: Cosine similarity at which an open task counts as a duplicate
+        top_k: Most duplicates reported per task
+        dim: Embedding length
+    """
+    enabled: bool = True
+    threshold: float = 0.85
+    top_k: int = 3
+    dim: int = 256
+
+    @classmethod
+    def from_env(cls) -> "DuplicateSettings":
+        """Build settings from ``DUPLICATE_*`` environment variables, falling back to defaults."""
+        defaults = cls()
+        return cls(
+            enabled=env_flag("DUPLICATE_CHECK", True),
+            threshold=env_number("DUPLICATE_THRESHOLD", defaults.threshold),
+            top_k=env_number("DUPLICATE_TOP_K", defaults.top_k, int),
+            dim=env_number("DUPLICATE_INDEX_DIM", defaults.dim, int),
+        )
+
+
+class DuplicateIndex:
+    """
+    Memory-mapped embedding matrix of open tasks with batched cosine top-k queries.
+
+    Args:
+        path: Directory holding the index files, or None for an in-memory index
+        dim: Embedding length; an existing index keeps the length it was built with
+    """
+
+    def __init__(self, path: Optional[str] = None, dim: int = 256):
+        self.path = path
+        self._lock = threading.RLock()
+        self._tenants: List[str] = []
+        self._tenant_codes: Dict[str, int] = {}
+        self._rows: Dict[int, int] = {}
+        if path is not None and os.path.exists(os.path.join(path, "meta.json")):
+            self._open(dim)
+        else:
+            self.vectorizer = HashingVectorizer(dim)
+            self._allocate(INITIAL_CAPACITY)
+        self._free = np.flatnonzero(self._ids < 0)[::-1].tolist()
+        used = np.flatnonzero(self._ids >= 0)
+        self._rows = dict(zip(self._ids[used].tolist(), used.tolist()))
+
+    # --- Files ---
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.npy")
+
+    def _new_array(self, name: str, shape: tuple, dtype, fill) -> np.ndarray:
+        if self.path is None:
+            return np.full(shape, fill, dtype=dtype)
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self._file(name) + ".tmp"
+        array = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=shape)
+        array[:] = fill
+        return array
+
+    def _allocate(self, capacity: int) -> None:
+        """Create arrays for ``capacity`` rows, copying over the rows of the current ones."""
+        old = (self._vectors, self._ids, self._tenant_ids) if hasattr(self, "_ids") else None
+        self._vectors = self._new_array("vectors", (capacity, self.vectorizer.dim), np.float32, 0.0)
+        self._ids = self._new_array("ids", (capacity,), np.int64, -1)
+        self._tenant_ids = self._new_array("tenants", (capacity,), np.int32, -1)
+        if old is not None:
+            used = len(old[1])
+            self._vectors[:used], self._ids[:used], self._tenant_ids[:used] = old
+        self._commit_files()
+
+    def _commit_files(self) -> None:
+        if self.path is None:
+            return
+        for name, array in (("vectors", self._vectors), ("ids", self._ids), ("tenants", self._tenant_ids)):
+            array.flush()
+            if os.path.exists(self._file(name) + ".tmp"):
+                os.replace(self._file(name) + ".tmp", self._file(name))
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        if self.path is None:
+            return
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": INDEX_VERSION, "dim": self.vectorizer.dim, "tenants": self._tenants}, f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def _open(self, dim: int) -> None:
+        with open(os.path.join(self.path, "meta.json")) as f:
+            meta = json.load(f)
+        self.vectorizer = HashingVectorizer(meta["dim"])
+        if meta["dim"] != dim:
+            logger.info("Duplicate index at %s keeps its embedding length %d", self.path, meta["dim"])
+        self._tenants = list(meta["tenants"])
+        self._tenant_codes = {tenant: code for code, tenant in enumerate(self._tenants)}
+        self._vectors = np.load(self._file("vectors"), mmap_mode="r+")
+        self._ids = np.load(self._file("ids"), mmap_mode="r+")
+        self._tenant_ids = np.load(self._file("tenants"), mmap_mode="r+")
+
+    def _grow(self) -> None:
+        capacity = len(self._ids)
+        self._allocate(capacity * 2)
+        self._free.extend(range(capacity * 2 - 1, capacity - 1, -1))
+
+    # --- Updates ---
+
+    def _tenant_code(self, tenant_id: Optional[str], create: bool = False) -> Optional[int]:
+        tenant = tenant_id or ""
+        code = self._tenant_codes.get(tenant)
+        if code is None and create:
+            code = self._tenant_codes[tenant] = len(self._tenants)
+            self._tenants.append(tenant)
+            self._write_meta()
+        return code
+
+    def _embed(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.vectorizer.dim), dtype=np.float32)
+        return np.stack([self.vectorizer.embed(normalize_text(text)) for text in texts])
+
+    def add(self, tasks: Iterable[Tuple[int, Optional[str], str]]) -> None:
+        """Index ``(task_id, tenant_id, text)`` tuples, replacing any task already indexed."""
+        tasks = list(tasks)
+        vectors = self._embed([text for _, _, text in tasks])
+        with self._lock:
+            for (task_id, tenant_id, _), vector in zip(tasks, vectors):
+                row = self._rows.get(task_id)
+                if row is None:
+                    if not self._free:
+                        self._grow()
+                    row = self._rows[task_id] = self._free.pop()
+                self._vectors[row] = vector
+                self._ids[row] = task_id
+                self._tenant_ids[row] = self._tenant_code(tenant_id, create=True)
+
+    def remove(self, task_ids: Iterable[int]) -> None:
+        """Drop tasks from the index, freeing their rows. Unknown ids are ignored."""
+        with self._lock:
+            for task_id in task_ids:
+                row = self._rows.pop(task_id, None)
+                if row is not None:
+                    self._ids[row] = -1
+                    self._tenant_ids[row] = -1
+                    self._free.append(row)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids[:] = -1
+            self._tenant_ids[:] = -1
+            self._rows.clear()
+            self._free = list(range(len(self._ids) - 1, -1, -1))
+
+    def rebuild(self, tasks: Iterable[Tuple[int, Optional[str], str]], batch_size: int = 1000) -> None:
+        """Replace the whole index with ``tasks``."""
+        with self._lock:
+            self.clear()
+            batch = []
+            for task in tasks:
+                batch.append(task)
+                if len(batch) >= batch_size:
+                    self.add(batch)
+                    batch = []
+            self.add(batch)
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the memory-mapped arrays back to disk."""
+        if self.path is not None:
+            with self._lock:
+                for array in (self._vectors, self._ids, self._tenant_ids):
+                    array.flush()
+
+    # --- Queries ---
+
+    def fingerprint(self) -> Fingerprint:
+        """Count, largest id and sum of ids of the indexed tasks, to compare with the database."""
+        with self._lock:
+            ids = self._ids[self._ids >= 0]
+            return (len(ids), int(ids.max()) if len(ids) else 0, int(ids.sum()))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def query(self, texts: Sequence[str], tenant_id: Optional[str] = None, k: int = 3,
+              threshold: float = 0.0) -> List[List[Tuple[int, float]]]:
+        """
+        Find each text's ``k`` most similar tasks of ``tenant_id``.
+
+        Returns one list of ``(task_id, similarity)`` per text, most similar
+        first, keeping only matches at or above ``threshold``.
+        """
+        queries = self._embed(texts)
+        with self._lock:
+            code = self._tenant_code(tenant_id)
+            rows = np.flatnonzero(self._tenant_ids == code) if code is not None else np.zeros(0, dtype=np.int64)
+            best_scores = np.zeros((len(texts), 0), dtype=np.float32)
+            best_ids = np.zeros((len(texts), 0), dtype=np.int64)
+            for start in range(0, len(rows), QUERY_CHUNK_ROWS):
+                chunk = rows[start:start + QUERY_CHUNK_ROWS]
+                scores = np.concatenate([best_scores, queries @ self._vectors[chunk].T], axis=1)
+                ids = np.concatenate([best_ids, np.broadcast_to(self._ids[chunk], (len(texts), len(chunk)))], axis=1)
+                if scores.shape[1] > k:
+                    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                    scores, ids = np.take_along_axis(scores, top, 1), np.take_along_axis(ids, top, 1)
+                best_scores, best_ids = scores, ids
+        order = np.argsort(-best_scores, axis=1)
+        return [
+            [(int(best_ids[i, j]), float(best_scores[i, j])) for j in order[i] if best_scores[i, j] >= threshold]
+            for i in range(len(texts))
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "path": self.path,
+                "tasks": len(self._rows),
+                "capacity": len(self._ids),
+                "tenants": len(self._tenants),
+                "dim": self.vectorizer.dim,
+            }
+
+
+def duplicate_index_from_env(db_path: str) -> Optional[DuplicateIndex]:
+    """
+    Build the duplicate index for the task database at ``db_path``, or None when DUPLICATE_CHECK is off.
+
+    The index lives in DUPLICATE_INDEX_PATH (default: ``<db_path>.vectors``);
+    an in-memory database gets an in-memory index.
+    """
+    settings = DuplicateSettings.from_env()
+    if not settings.enabled:
+        return None
+    if db_path == ":memory:" or db_path.startswith("file::memory:"):
+        return DuplicateIndex(None, settings.dim)
+    return DuplicateIndex(os.getenv("DUPLICATE_INDEX_PATH", f"{db_path}.vectors"), settings.dim)
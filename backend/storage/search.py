@@ -0,0 +1,181 @@
+"""
+Full-text search over stored tasks and their subtasks.
+
+The SQLite store indexes every task's text and subtasks when it saves them,
+inside the same write transaction. Where SQLite is built with FTS5 the index
+is an FTS5 table; otherwise the store falls back to ``InvertedIndex``, a
+pure-Python inverted index held in memory and rebuilt from the database on
+open. Both backends accept the same queries and rank with the same BM25
+formula, so results come back in the same order whichever one is in use:
+
+- a query is a list of words, all of which must match. ``meet*`` matches
+  any word starting with "meet"
+- words are compared after ``normalize_text`` (case, accents, punctuation),
+  the same way FTS5's ``unicode61`` tokenizer with ``remove_diacritics 2``
+  compares them
+- a match in the task text counts ``FIELD_WEIGHTS[0]`` times as much as one
+  in a subtask
+
+Results are ordered by score, best first, then by task id. Pages are
+fetched with an opaque cursor holding the last result's score and id.
+"""
+
+import base64
+import bisect
+import json
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from backend.text import normalize_text
+
+SEARCH_BACKENDS = ("auto", "fts5", "python")
+# Weights of the task text and subtasks columns
+FIELD_WEIGHTS = (2.0, 1.0)
+# BM25 parameters, the values FTS5's bm25() uses
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_QUERY_TOKEN = re.compile(r"([^\s*]+)(\*?)")
+
+# A query word and whether it matches as a prefix
+QueryTerm = Tuple[str, bool]
+
+
+def parse_query(query: str) -> List[QueryTerm]:
+    """
+    Split a search query into normalized words, keeping a trailing ``*`` as a prefix marker.
+
+    Raises ValueError if the query has no words.
+    """
+    terms = []
+    for match in _QUERY_TOKEN.finditer(query or ""):
+        words = normalize_text(match.group(1)).split()
+        terms.extend((word, False) for word in words)
+        if words and match.group(2):
+            terms[-1] = (words[-1], True)
+    if not terms:
+        raise ValueError("Search query has no words")
+    return terms
+
+
+def fts5_query(terms: List[QueryTerm]) -> str:
+    """Build an FTS5 MATCH expression requiring every term."""
+    return " ".join(f'"{word}"' + ("*" if prefix else "") for word, prefix in terms)
+
+
+def encode_cursor(score: float, task_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([score, task_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """Return the score and task id a cursor points after. Raises ValueError for a malformed cursor."""
+    try:
+        score, task_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(score), int(task_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid search cursor {cursor!r}") from e
+
+
+def subtask_text(subtasks: Iterable[str]) -> str:
+    """Text indexed for a task's subtasks."""
+    return "\n".join(subtasks)
+
+
+class SearchDocument(NamedTuple):
+    """What ``InvertedIndex`` keeps per task: column lengths and the fields searches filter on."""
+    lengths: Tuple[int, int]
+    status: str
+    due_date: Optional[str]
+    tenant_id: Optional[str]
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index with BM25 ranking, used when SQLite lacks FTS5.
+
+    Postings map each word to the tasks containing it and how often it
+    occurs in each column. The vocabulary is kept sorted, so a prefix term
+    is a bisect plus a scan of the words sharing the prefix.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, Tuple[int, int]]] = {}
+        self._vocabulary: List[str] = []
+        self._documents: Dict[int, SearchDocument] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, task_id: int, task: str, subtasks: str, status: str, due_date: Optional[str] = None,
+            tenant_id: Optional[str] = None) -> None:
+        """Index a task. Tasks are never re-indexed, so ``task_id`` must be new."""
+        columns = [Counter(normalize_text(text).split()) for text in (task, subtasks)]
+        lengths = (sum(columns[0].values()), sum(columns[1].values()))
+        with self._lock:
+            for word in columns[0].keys() | columns[1].keys():
+                postings = self._postings.get(word)
+                if postings is None:
+                    postings = self._postings[word] = {}
+                    bisect.insort(self._vocabulary, word)
+                postings[task_id] = (columns[0][word], columns[1][word])
+            self._documents[task_id] = SearchDocument(lengths, status, due_date, tenant_id)
+            self._total_length += sum(lengths)
+
+    def set_status(self, task_id: int, status: str) -> None:
+        with self._lock:
+            document = self._documents.get(task_id)
+            if document is not None:
+                self._documents[task_id] = document._replace(status=status)
+
+    def _matches(self, word: str, prefix: bool) -> Dict[int, Tuple[int, int]]:
+        """Occurrences per task of ``word``, or of every word starting with it for a prefix term."""
+        if not prefix:
+            return self._postings.get(word, {})
+        matches: Dict[int, Tuple[int, int]] = {}
+        start = bisect.bisect_left(self._vocabulary, word)
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(word):
+                break
+            for task_id, (in_task, in_subtasks) in self._postings[candidate].items():
+                seen = matches.get(task_id, (0, 0))
+                matches[task_id] = (seen[0] + in_task, seen[1] + in_subtasks)
+        return matches
+
+    def search(self, terms: List[QueryTerm], status: Optional[str] = None, due_date: Optional[str] = None,
+               tenant_id: Optional[str] = None) -> List[Tuple[float, int]]:
+        """
+        Return ``(score, task_id)`` for every task matching all ``terms`` and the filters, best first.
+
+        Scores follow FTS5's bm25(): lower is better, so they are negative.
+        """
+        with self._lock:
+            documents = len(self._documents)
+            if not documents:
+                return []
+            matches = [self._matches(word, prefix) for word, prefix in terms]
+            candidates = set.intersection(*(set(m) for m in matches))
+            average_length = self._total_length / documents
+            results = []
+            for task_id in candidates:
+                document = self._documents[task_id]
+                if ((status is not None and document.status != status)
+                        or (due_date is not None and document.due_date != due_date)
+                        or (tenant_id is not None and document.tenant_id != tenant_id)):
+                    continue
+                length = sum(document.lengths)
+                score = 0.0
+                for occurrences in matches:
+                    hits = len(occurrences)
+                    idf = math.log((documents - hits + 0.5) / (hits + 0.5))
+                    idf = idf if idf > 0 else 1e-6
+                    weighted = sum(w * n for w, n in zip(FIELD_WEIGHTS, occurrences[task_id]))
+                    score += idf * weighted * (BM25_K1 + 1) / (
+                        weighted + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+                results.append((-score, task_id))
+        results.sort()
+        return results
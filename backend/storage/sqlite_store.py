@@ -0,0 +1,419 @@
+"""
+SQLite implementation of the task store.
+
+The database runs in WAL mode and each reader thread gets its own connection,
+so reads never block on the writer. All SQL is kept in module constants so
+sqlite3's statement cache reuses the prepared statements. Concurrent writers
+are group-committed: whichever thread takes the write lock flushes every write
+queued so far in a single transaction.
+
+Columns added after a database was created are added on open by
+``COLUMN_MIGRATIONS``. ``due_at``, the due date resolved to a UTC timestamp,
+is indexed so "due before" queries are a B-tree range scan. An optional ``DuplicateIndex`` is kept in step with
+the open tasks after every committed write.
+
+Task text and subtasks are indexed for full-text search in the write
+transaction that saves them: in the ``task_search`` FTS5 table, or in an
+in-memory ``InvertedIndex`` when SQLite is built without FTS5 (see
+``backend.storage.search``).
+"""
+
+import bisect
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from backend.due_dates import parse_due_date
+from backend.logger import logger
+from backend.storage.base import TaskStore
+from backend.storage.duplicate_index import DuplicateIndex
+from backend.storage.search import (
+    FIELD_WEIGHTS,
+    SEARCH_BACKENDS,
+    InvertedIndex,
+    decode_cursor,
+    encode_cursor,
+    fts5_query,
+    parse_query,
+    subtask_text,
+)
+from backend.types import StoredTask, TaskSearchPage, TaskStatus
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'open',
+        due_date TEXT,
+        due_at TEXT,
+        is_open_ended INTEGER NOT NULL DEFAULT 0,
+        tenant_id TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS subtasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        UNIQUE (task_id, position)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)",
+)
+# (table, column, definition) of columns added since the first schema
+COLUMN_MIGRATIONS = (
+    ("tasks", "tenant_id", "TEXT"),
+    ("tasks", "due_at", "TEXT"),
+)
+# Indexes on migrated columns, created once the migrations have run
+MIGRATED_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_tasks_tenant_status ON tasks(tenant_id, status)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_due_at ON tasks(due_at)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_status_due_at ON tasks(status, due_at)",
+)
+
+INSERT_TASK = (
+    "INSERT INTO tasks (task, status, due_date, due_at, is_open_ended, tenant_id, created_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_SUBTASK = "INSERT INTO subtasks (task_id, position, text) VALUES (?, ?, ?)"
+SELECT_TASK = (
+    "SELECT id, task, status, due_date, due_at, is_open_ended, tenant_id, created_at, updated_at FROM tasks WHERE id = ?"
+)
+SELECT_TASKS = (
+    "SELECT id, task, status, due_date, due_at, is_open_ended, tenant_id, created_at, updated_at FROM tasks "
+    "ORDER BY id LIMIT ? OFFSET ?"
+)
+SELECT_TASKS_BY_STATUS = (
+    "SELECT id, task, status, due_date, due_at, is_open_ended, tenant_id, created_at, updated_at FROM tasks "
+    "WHERE status = ? ORDER BY id LIMIT ? OFFSET ?"
+)
+SELECT_DUE = (
+    "SELECT id, task, status, due_date, due_at, is_open_ended, tenant_id, created_at, updated_at FROM tasks "
+    "WHERE due_at <= ? ORDER BY due_at, id LIMIT ?"
+)
+SELECT_DUE_BY_STATUS = (
+    "SELECT id, task, status, due_date, due_at, is_open_ended, tenant_id, created_at, updated_at FROM tasks "
+    "WHERE status = ? AND due_at <= ? ORDER BY due_at, id LIMIT ?"
+)
+SELECT_UNRESOLVED_DUE_DATES = "SELECT id, due_date, created_at FROM tasks WHERE due_date IS NOT NULL AND due_at IS NULL"
+UPDATE_DUE_AT = "UPDATE tasks SET due_at = ? WHERE id = ?"
+SELECT_SUBTASKS = "SELECT text FROM subtasks WHERE task_id = ? ORDER BY position"
+UPDATE_STATUS = "UPDATE tasks SET status = ?, updated_at = ? WHERE id = ?"
+SELECT_OPEN_FINGERPRINT = "SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM(id), 0) FROM tasks WHERE status = 'open'"
+SELECT_OPEN_TASKS = "SELECT id, tenant_id, task FROM tasks WHERE status = 'open' ORDER BY id"
+
+CREATE_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5("
+    "task, subtasks, tokenize = 'unicode61 remove_diacritics 2')"
+)
+INSERT_SEARCH = "INSERT INTO task_search (rowid, task, subtasks) VALUES (?, ?, ?)"
+SELECT_SEARCH_FINGERPRINT = "SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM task_search"
+SELECT_TASKS_FINGERPRINT = "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM tasks"
+DELETE_SEARCH = "DELETE FROM task_search"
+# Text and filter columns of every task, with its subtasks joined the way subtask_text() joins them
+SELECT_SEARCH_DOCUMENTS = (
+    "SELECT id, task, COALESCE((SELECT group_concat(text, char(10)) FROM "
+    "(SELECT text FROM subtasks WHERE task_id = tasks.id ORDER BY position)), ''), "
+    "status, due_date, tenant_id FROM tasks ORDER BY id"
+)
+SEARCH_TASKS = (
+    "SELECT t.id, t.task, t.status, t.due_date, t.due_at, t.is_open_ended, t.tenant_id, t.created_at, t.updated_at, m.score "
+    "FROM (SELECT rowid AS id, bm25(task_search, {weights}) AS score FROM task_search "
+    "WHERE task_search MATCH :query) m JOIN tasks t ON t.id = m.id "
+    "WHERE (:status IS NULL OR t.status = :status) AND (:due_date IS NULL OR t.due_date = :due_date) "
+    "AND (:tenant_id IS NULL OR t.tenant_id = :tenant_id) "
+    "AND (:after_score IS NULL OR m.score > :after_score OR (m.score = :after_score AND t.id > :after_id)) "
+    "ORDER BY m.score, t.id LIMIT :limit"
+).format(weights=", ".join(str(w) for w in FIELD_WEIGHTS))
+SELECT_TASKS_BY_ID = (
+    "SELECT id, task, status, due_date, due_at, is_open_ended, tenant_id, created_at, updated_at FROM tasks "
+    "WHERE id IN ({ids})"
+)
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Format a due timestamp in UTC to the second, so stored values sort as text."""
+    return value.astimezone(timezone.utc).isoformat(timespec="seconds") if value is not None else None
+
+
+class _PendingWrite:
+    def __init__(self, tasks: List[StoredTask]):
+        self.tasks = tasks
+        self.result: List[StoredTask] = []
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    Task store backed by a single SQLite database file.
+
+    Args:
+        path: Database file path, or ":memory:" for a throwaway database
+        duplicate_index: Index of open tasks to keep current, rebuilt on open if it is out of step
+        search_backend: "fts5", "python" (in-memory inverted index) or "auto" to use FTS5 when available
+    """
+
+    def __init__(self, path: str = "tasks.db", duplicate_index: Optional[DuplicateIndex] = None,
+                 search_backend: str = "auto"):
+        self.path = path
+        self.duplicate_index = duplicate_index
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=128)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._lock = threading.RLock()
+        self._pending_lock = threading.Lock()
+        self._pending: List[_PendingWrite] = []
+        self._in_memory = path == ":memory:" or path.startswith("file::memory:")
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        with self.transaction() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._migrate(conn)
+            for statement in MIGRATED_INDEXES:
+                conn.execute(statement)
+        self._search_index: Optional[InvertedIndex] = None
+        self.search_backend = self._open_search(search_backend)
+        if duplicate_index is not None:
+            self._sync_duplicate_index()
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        added = set()
+        for table, column, definition in COLUMN_MIGRATIONS:
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                logger.info("Migrating task database: adding %s.%s", table, column)
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                added.add((table, column))
+        if ("tasks", "due_at") in added:
+            # Resolve the due dates of existing tasks relative to when they were created
+            conn.executemany(UPDATE_DUE_AT, [
+                (_timestamp(parse_due_date(due_date, datetime.fromisoformat(created_at))), task_id)
+                for task_id, due_date, created_at in conn.execute(SELECT_UNRESOLVED_DUE_DATES).fetchall()
+            ])
+
+    def _open_search(self, backend: str) -> str:
+        """Create or check the FTS5 search table, falling back to an in-memory index. Returns the backend used."""
+        if backend not in SEARCH_BACKENDS:
+            raise ValueError(f"Unknown search backend {backend!r}")
+        if backend != "python":
+            try:
+                with self.transaction() as conn:
+                    conn.execute(CREATE_SEARCH_TABLE)
+                    indexed = conn.execute(SELECT_SEARCH_FINGERPRINT).fetchone()
+                    if indexed != conn.execute(SELECT_TASKS_FINGERPRINT).fetchone():
+                        logger.info("Rebuilding the task search index")
+                        documents = conn.execute(SELECT_SEARCH_DOCUMENTS).fetchall()
+                        conn.execute(DELETE_SEARCH)
+                        conn.executemany(INSERT_SEARCH, [row[:3] for row in documents])
+                return "fts5"
+            except sqlite3.OperationalError as e:
+                if backend == "fts5" or "no such module" not in str(e):
+                    raise
+                logger.warning("SQLite was built without FTS5; searching tasks with an in-memory index")
+        index = InvertedIndex()
+        with self.reading() as conn:
+            for row in conn.execute(SELECT_SEARCH_DOCUMENTS):
+                index.add(*row)
+        self._search_index = index
+        return "python"
+
+    def _sync_duplicate_index(self) -> None:
+        with self.reading() as conn:
+            fingerprint = tuple(conn.execute(SELECT_OPEN_FINGERPRINT).fetchone())
+        if fingerprint == self.duplicate_index.fingerprint():
+            return
+        logger.info("Rebuilding the duplicate index from %d open tasks", fingerprint[0])
+        with self.reading() as conn:
+            self.duplicate_index.rebuild(conn.execute(SELECT_OPEN_TASKS))
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the enclosed statements in a single write transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    @contextmanager
+    def reading(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection for read-only queries, private to the calling thread."""
+        if self._in_memory:
+            # An in-memory database only exists on the writer connection
+            with self._lock:
+                yield self._conn
+            return
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, cached_statements=128)
+            self._local.conn = conn
+            with self._pending_lock:
+                self._readers.append(conn)
+        yield conn
+
+    def save_tasks(self, tasks: List[StoredTask]) -> List[StoredTask]:
+        pending = _PendingWrite(tasks)
+        with self._pending_lock:
+            self._pending.append(pending)
+
+        with self._lock:
+            if not pending.done.is_set():
+                with self._pending_lock:
+                    batch, self._pending = self._pending, []
+                self._flush(batch)
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _flush(self, batch: List[_PendingWrite]) -> None:
+        now = datetime.now(timezone.utc)
+        try:
+            with self.transaction() as conn:
+                for pending in batch:
+                    pending.result = [self._insert(conn, task, now) for task in pending.tasks]
+            saved = [task for pending in batch for task in pending.result]
+            if self._search_index is not None:
+                # Still under the write lock, so no other write lands between the commit and the index update
+                for task in saved:
+                    self._search_index.add(task.id, task.task, subtask_text(task.subtasks), task.status.value,
+                                           task.due_date, task.tenant_id)
+            self._index_saved(saved)
+        except BaseException as e:
+            for pending in batch:
+                pending.error = e
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+    def _index_saved(self, tasks: List[StoredTask]) -> None:
+        if self.duplicate_index is None:
+            return
+        try:
+            self.duplicate_index.add((task.id, task.tenant_id, task.task) for task in tasks
+                                     if task.status == TaskStatus.OPEN)
+        except Exception:
+            # The tasks are committed; the index is rebuilt the next time the store opens
+            logger.exception("Failed to add saved tasks to the duplicate index")
+
+    def _insert(self, conn: sqlite3.Connection, task: StoredTask, now: datetime) -> StoredTask:
+        created_at = task.created_at or now
+        due_at = task.due_at or parse_due_date(task.due_date, created_at)
+        cursor = conn.execute(
+            INSERT_TASK,
+            (task.task, task.status.value, task.due_date, _timestamp(due_at), int(task.is_open_ended),
+             task.tenant_id, created_at.isoformat(), now.isoformat()),
+        )
+        task_id = cursor.lastrowid
+        conn.executemany(INSERT_SUBTASK, [(task_id, i, text) for i, text in enumerate(task.subtasks)])
+        if self.search_backend == "fts5":
+            conn.execute(INSERT_SEARCH, (task_id, task.task, subtask_text(task.subtasks)))
+        return task.model_copy(update={"id": task_id, "due_at": due_at, "created_at": created_at, "updated_at": now})
+
+    def get_task(self, task_id: int) -> Optional[StoredTask]:
+        with self.reading() as conn:
+            row = conn.execute(SELECT_TASK, (task_id,)).fetchone()
+            return self._to_task(conn, row) if row else None
+
+    def list_tasks(self, status: Optional[TaskStatus] = None, limit: int = 100, offset: int = 0) -> List[StoredTask]:
+        with self.reading() as conn:
+            if status is None:
+                rows = conn.execute(SELECT_TASKS, (limit, offset)).fetchall()
+            else:
+                rows = conn.execute(SELECT_TASKS_BY_STATUS, (TaskStatus(status).value, limit, offset)).fetchall()
+            return [self._to_task(conn, row) for row in rows]
+
+    def list_due(self, before: datetime, status: Optional[TaskStatus] = None, limit: int = 100) -> List[StoredTask]:
+        before = _timestamp(before)
+        with self.reading() as conn:
+            if status is None:
+                rows = conn.execute(SELECT_DUE, (before, limit)).fetchall()
+            else:
+                rows = conn.execute(SELECT_DUE_BY_STATUS, (TaskStatus(status).value, before, limit)).fetchall()
+            return [self._to_task(conn, row) for row in rows]
+
+    def update_status(self, task_id: int, status: TaskStatus) -> bool:
+        with self.transaction() as conn:
+            cursor = conn.execute(UPDATE_STATUS, (TaskStatus(status).value, datetime.now(timezone.utc).isoformat(), task_id))
+            updated = cursor.rowcount > 0
+            if updated and self._search_index is not None:
+                self._search_index.set_status(task_id, TaskStatus(status).value)
+        if updated and self.duplicate_index is not None:
+            if TaskStatus(status) == TaskStatus.OPEN:
+                task = self.get_task(task_id)
+                self.duplicate_index.add([(task.id, task.tenant_id, task.task)])
+            else:
+                self.duplicate_index.remove([task_id])
+        return updated
+
+    def search_tasks(self, query: str, status: Optional[TaskStatus] = None, due_date: Optional[str] = None,
+                     tenant_id: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None) -> TaskSearchPage:
+        terms = parse_query(query)
+        after_score, after_id = decode_cursor(cursor) if cursor else (None, None)
+        status = TaskStatus(status).value if status is not None else None
+        with self.reading() as conn:
+            if self._search_index is None:
+                rows = conn.execute(SEARCH_TASKS, {
+                    "query": fts5_query(terms), "status": status, "due_date": due_date, "tenant_id": tenant_id,
+                    "after_score": after_score, "after_id": after_id, "limit": limit + 1,
+                }).fetchall()
+                hits = [(row[-1], row[0]) for row in rows]
+                rows_by_id = {row[0]: row[:-1] for row in rows}
+            else:
+                hits = self._search_index.search(terms, status, due_date, tenant_id)
+                if cursor:
+                    hits = hits[bisect.bisect_right(hits, (after_score, after_id)):]
+                hits = hits[:limit + 1]
+                ids = [task_id for _, task_id in hits[:limit]]
+                rows = conn.execute(SELECT_TASKS_BY_ID.format(ids=", ".join("?" * len(ids))), ids).fetchall()
+                rows_by_id = {row[0]: row for row in rows}
+            tasks = [self._to_task(conn, rows_by_id[task_id]) for _, task_id in hits[:limit]]
+        next_cursor = encode_cursor(*hits[limit - 1]) if len(hits) > limit else None
+        return TaskSearchPage(tasks=tasks, next_cursor=next_cursor)
+
+    def find_duplicates(self, texts: Sequence[str], tenant_id: Optional[str] = None, k: int = 3,
+                        threshold: float = 0.85) -> List[List[Tuple[int, float]]]:
+        if self.duplicate_index is None:
+            return super().find_duplicates(texts, tenant_id, k, threshold)
+        return self.duplicate_index.query(texts, tenant_id, k, threshold)
+
+    def _to_task(self, conn: sqlite3.Connection, row: tuple) -> StoredTask:
+        task_id, task, status, due_date, due_at, is_open_ended, tenant_id, created_at, updated_at = row
+        subtasks = [text for (text,) in conn.execute(SELECT_SUBTASKS, (task_id,))]
+        return StoredTask(
+            id=task_id,
+            task=task,
+            subtasks=subtasks,
+            status=TaskStatus(status),
+            due_date=due_date,
+            due_at=datetime.fromisoformat(due_at) if due_at else None,
+            is_open_ended=bool(is_open_ended),
+            tenant_id=tenant_id,
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at),
+        )
+
+    def close(self) -> None:
+        with self._pending_lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        if self.duplicate_index is not None:
+            self.duplicate_index.flush()
+        with self._lock:
+            self._conn.close()
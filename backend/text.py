@@ -0,0 +1,62 @@
+"""
+Text normalization and embedding shared by the semantic cache, duplicate
+detection and full-text search.
+
+``normalize_text`` folds case, accents, punctuation and spacing, so inputs
+that differ only in those compare equal. ``HashingVectorizer`` embeds
+normalized text as a unit vector of hashed character n-grams and words. It
+is local, CPU-only and needs no model download.
+"""
+
+import re
+import unicodedata
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase ``text``, strip accents and punctuation, and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_NON_WORD.sub(" ", text.lower()).replace("_", " ").split())
+
+
+class HashingVectorizer:
+    """
+    Embeds text as a signed, L2-normalized bag of hashed features.
+
+    Features are the character n-grams of every space-padded word plus the
+    words themselves. Each feature is hashed with CRC32 into one of ``dim``
+    buckets with a sign taken from the hash, so colliding features tend to
+    cancel instead of piling up.
+
+    Args:
+        dim: Number of hash buckets (vector length)
+        ngram_range: Smallest and largest character n-gram length
+    """
+
+    def __init__(self, dim: int = 1024, ngram_range: Tuple[int, int] = (3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def features(self, normalized: str) -> List[str]:
+        low, high = self.ngram_range
+        features = []
+        for word in normalized.split():
+            features.append(word)
+            padded = f" {word} "
+            for n in range(low, high + 1):
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def embed(self, normalized: str) -> np.ndarray:
+        """Return the unit vector for already normalized text (all zeros for empty text)."""
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in self.features(normalized)), dtype=np.uint32)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        vector = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -1,19 +1,37 @@
 from .task_tools import (
     extract_task,
     judge_task,
+    extract_and_judge_task,
     generate_subtasks,
     judge_subtasks,
     create_task,
+    find_duplicate_tasks,
     retry_task_with_feedback,
-    retry_subtasks_with_feedback
+    retry_subtasks_with_feedback,
+    aextract_task,
+    ajudge_task,
+    aextract_and_judge_task,
+    agenerate_subtasks,
+    ajudge_subtasks,
+    aretry_task_with_feedback,
+    aretry_subtasks_with_feedback
 )
 
 __all__ = [
     "extract_task",
     "judge_task",
+    "extract_and_judge_task",
     "generate_subtasks",
     "judge_subtasks",
     "create_task",
+    "find_duplicate_tasks",
     "retry_task_with_feedback",
-    "retry_subtasks_with_feedback"
-] 
\ No newline at end of file
+    "retry_subtasks_with_feedback",
+    "aextract_task",
+    "ajudge_task",
+    "aextract_and_judge_task",
+    "agenerate_subtasks",
+    "ajudge_subtasks",
+    "aretry_task_with_feedback",
+    "aretry_subtasks_with_feedback"
+]
@@ -0,0 +1,119 @@
+"""
+Local degraded path used while the LLM provider is unavailable.
+
+When the circuit breaker of every provider in a node's route chain is open,
+the node skips the LLM entirely and uses these functions, so a run finishes
+in milliseconds instead of waiting out timeouts:
+
+- ``extract_task_locally`` cleans up the input and pulls out a due date
+  phrase ("by Friday", "tomorrow", "2025-06-01") with regular expressions
+- ``refine_task_locally`` reads a due date or an "open-ended" answer from the
+  user's clarification
+- ``judge_task_locally`` applies the rule-based judge, accepting the task
+  when the rules leave it undecided
+
+Subtasks are never generated in degraded mode.
+"""
+
+import re
+from typing import Optional
+
+from backend.due_dates import find_due_date, find_open_ended
+from backend.llm.breaker import get_circuit_breaker
+from backend.llm.router import get_model_router
+from backend.metrics import record_degraded
+from backend.tools.prejudge import judge_task_by_rules
+from backend.types import TaskMetadata, TaskJudgment, SubtaskMetadata, SubtaskJudgment, JudgmentType
+
+DEGRADED_TASK_REASON = "Accepted without LLM review while the language model is unavailable"
+DEGRADED_SUBTASKS_REASON = "Subtasks are skipped while the language model is unavailable"
+# Confidence of a local extraction; high enough for the rule-based judge to accept it
+DEGRADED_CONFIDENCE = 0.7
+
+_LEAD_IN = re.compile(
+    r"^(?:please\s+|(?:can|could|would) you\s+|(?:remind me|i need|i have|i want|i'd like|i would like)\s+to\s+"
+    r"|(?:add|create) (?:a )?task(?: to)?:?\s+|todo:?\s+)+",
+    re.IGNORECASE)
+
+
+# Routed tool whose chain decides each node's fallback; other nodes are tools themselves
+NODE_TOOLS = {
+    "retry_task": "extract_task",
+    "ask_to_subtask": "generate_subtasks",
+    "ask_about_task": "clarification",
+    "ask_about_subtasks": "clarification",
+}
+
+
+def llm_unavailable(tool: Optional[str] = None) -> bool:
+    """Return whether every provider in ``tool``'s route chain would reject an LLM call right now."""
+    return not any(get_circuit_breaker(provider).available() for provider in get_model_router().providers(tool))
+
+
+def degrade(state, node: str) -> bool:
+    """
+    Return whether ``node`` should take its local path, flagging the run as degraded when it does.
+    """
+    if not llm_unavailable(NODE_TOOLS.get(node, node)):
+        return False
+    state.degraded = True
+    record_degraded(node)
+    return True
+
+
+def _clean_task(text: str) -> str:
+    task = _LEAD_IN.sub("", text.strip()).strip(" \t\n.,;:!")
+    return task[:1].upper() + task[1:] if task else text.strip()
+
+
+def extract_task_locally(text: str) -> TaskMetadata:
+    """Extract a task from ``text`` without the LLM."""
+    due_date, remainder = find_due_date(text)
+    is_open_ended = False
+    if due_date is None:
+        is_open_ended, remainder = find_open_ended(remainder)
+    return TaskMetadata(
+        task=_clean_task(remainder),
+        confidence=DEGRADED_CONFIDENCE,
+        concerns=[],
+        questions=[],
+        is_subtaskable=False,
+        due_date=due_date,
+        is_open_ended=is_open_ended
+    )
+
+
+def refine_task_locally(metadata: TaskMetadata, feedback: Optional[str]) -> TaskMetadata:
+    """Apply the user's clarification to ``metadata`` without the LLM, reading a due date or an open-ended answer."""
+    refined = metadata.model_copy(deep=True)
+    refined.questions = []
+    refined.concerns = []
+    refined.is_subtaskable = False
+    due_date, _ = find_due_date(feedback or "")
+    if due_date is not None:
+        refined.due_date = due_date
+        refined.is_open_ended = False
+    elif find_open_ended(feedback or "")[0]:
+        refined.is_open_ended = True
+    return refined
+
+
+def judge_task_locally(metadata: TaskMetadata) -> TaskJudgment:
+    """Judge a task with the rules alone, accepting it when they leave the outcome undecided."""
+    return judge_task_by_rules(metadata) or TaskJudgment(judgment=JudgmentType.PASS, reason=DEGRADED_TASK_REASON)
+
+
+def skipped_subtasks(subtasks: Optional[SubtaskMetadata] = None) -> SubtaskMetadata:
+    """Keep any subtasks already agreed on, and generate none."""
+    return SubtaskMetadata(
+        subtasks=subtasks.subtasks if subtasks else [],
+        confidence=subtasks.confidence if subtasks else 0.0,
+        concerns=[DEGRADED_SUBTASKS_REASON],
+        questions=[],
+        user_accepted_subtasks=True
+    )
+
+
+def judge_subtasks_locally() -> SubtaskJudgment:
+    """Accept the subtasks as they are; they cannot be reviewed without the LLM."""
+    return SubtaskJudgment(judgment=JudgmentType.PASS, reason=DEGRADED_SUBTASKS_REASON)
@@ -1,13 +1,88 @@
-from typing import Union
-from backend.tools.task_tools import _make_llm_call, get_client, DEFAULT_MODEL
+import os
+from string import Template
+from typing import List, Optional, Union
+from backend.tools.task_tools import _make_llm_call, _amake_llm_call, get_client, DEFAULT_MODEL
 from backend.types import TaskMetadata, SubtaskMetadata, TaskJudgment
 import traceback
 from backend.logger import logger
 from backend.prompts.task_prompts import TASK_CLARIFICATION_SYSTEM_PROMPT
-def generate_task_clarification_prompt(metadata: Union[TaskMetadata, SubtaskMetadata], judgment: TaskJudgment, task_type: str) -> str:
+
+# --- Clarification rendering ---
+# "template" renders the message locally; "rich" asks the LLM to write it.
+CLARIFICATION_MODE_TEMPLATE = "template"
+CLARIFICATION_MODE_RICH = "rich"
+
+# Above this confidence, concerns and questions are left out (same rule as the rich prompt)
+CONFIDENCE_THRESHOLD = 0.7
+
+_CLARIFICATION_TEMPLATES = {
+    "task": {
+        "missing": Template(
+            "I couldn't work out a clear task from your request.\n\n"
+            "${details}"
+            "Could you please describe the task again a little more clearly?"
+        ),
+        "review": Template(
+            "Here is the task I understood:\n\n"
+            "${items}\n\n"
+            "${details}"
+            "Would you like to modify this task, or confirm it as it is?"
+        ),
+    },
+    "subtasks": {
+        "missing": Template(
+            "I couldn't come up with subtasks for this task.\n\n"
+            "${details}"
+            "Could you please describe the steps you have in mind?"
+        ),
+        "review": Template(
+            "Here are the subtasks I came up with:\n\n"
+            "${items}\n\n"
+            "${details}"
+            "Would you like to modify these subtasks, or confirm them as they are?"
+        ),
+    },
+}
+
+def clarification_mode() -> str:
+    """Return the configured clarification mode from CLARIFICATION_MODE (default "template")."""
+    return os.getenv("CLARIFICATION_MODE", CLARIFICATION_MODE_TEMPLATE).lower()
+
+def _bullet_section(title: str, lines: Optional[List[str]]) -> str:
+    lines = [line for line in (lines or []) if line and line.strip()]
+    if not lines:
+        return ""
+    return f"{title}\n" + "\n".join(f"- {line}" for line in lines) + "\n\n"
+
+def render_clarification_message(metadata: Union[TaskMetadata, SubtaskMetadata], judgment: TaskJudgment, task_type: str) -> str:
     """
-    Use LLM to create a human-facing message asking for clarification or confirmation based on concerns and questions.
+    Build the clarification message locally from the metadata and judgment, without an LLM call.
+    Follows the same rules as TASK_CLARIFICATION_SYSTEM_PROMPT.
     """
+    templates = _CLARIFICATION_TEMPLATES.get(task_type, _CLARIFICATION_TEMPLATES["task"])
+    if isinstance(metadata, TaskMetadata):
+        items = [metadata.task] if metadata.task and metadata.task.strip() else []
+    else:
+        items = [subtask for subtask in metadata.subtasks if subtask and subtask.strip()]
+
+    details = ""
+    reason = getattr(judgment, "reason", None)
+    if reason:
+        details += f"{reason}\n\n"
+    confident = metadata.confidence is not None and metadata.confidence > CONFIDENCE_THRESHOLD
+    if not items or not confident:
+        details += _bullet_section("Concerns:", metadata.concerns)
+        details += _bullet_section("Questions:", metadata.questions)
+
+    if not items:
+        return templates["missing"].substitute(details=details)
+    if isinstance(metadata, TaskMetadata):
+        rendered_items = f"- {items[0]}"
+    else:
+        rendered_items = "\n".join(f"{i}. {item}" for i, item in enumerate(items, start=1))
+    return templates["review"].substitute(items=rendered_items, details=details)
+
+def _clarification_request(metadata: Union[TaskMetadata, SubtaskMetadata], judgment: TaskJudgment, task_type: str) -> tuple:
     # Handle task-specific content
     task_content = ""
     if isinstance(metadata, TaskMetadata):
@@ -35,19 +110,48 @@ def generate_task_clarification_prompt(metadata: Union[TaskMetadata, SubtaskMeta
         </questions>
     </user_prompt>
     """
+    system_msg = TASK_CLARIFICATION_SYSTEM_PROMPT.format(task_type=task_type, confidence_score=confidence_score)
+    return system_msg, user_prompt
 
+def _clarification_message(content, task_type: str) -> str:
+    # Extract the message from the dictionary response
+    if isinstance(content, dict) and "message" in content:
+        return content["message"]
+    else:
+        logger.error(f"Unexpected response format: {content}")
+        return f"I need some clarification about your {task_type}. Could you please provide more details?"
+
+def _clarification_fallback(e: Exception, task_type: str) -> str:
+    logger.error(f"Failed to generate {task_type} clarification prompt: {str(e)}")
+    logger.error(f"Stack trace:\n{traceback.format_exc()}")
+    return f"I need some clarification about your {task_type}. Could you please provide more details?"
+
+def generate_task_clarification_prompt(metadata: Union[TaskMetadata, SubtaskMetadata], judgment: TaskJudgment, task_type: str,
+                                       mode: Optional[str] = None) -> str:
+    """
+    Create a human-facing message asking for clarification or confirmation based on concerns and questions.
+    The message is rendered from a local template unless ``mode`` (or CLARIFICATION_MODE) is "rich",
+    in which case the LLM writes it.
+    """
+    if (mode or clarification_mode()) != CLARIFICATION_MODE_RICH:
+        return render_clarification_message(metadata, judgment, task_type)
+    system_msg, user_prompt = _clarification_request(metadata, judgment, task_type)
     try:
-        content = _make_llm_call(TASK_CLARIFICATION_SYSTEM_PROMPT.format(task_type=task_type, confidence_score=confidence_score), user_prompt)
-        
-        # Extract the message from the dictionary response
-        if isinstance(content, dict) and "message" in content:
-            return content["message"]
-        else:
-            logger.error(f"Unexpected response format: {content}")
-            return f"I need some clarification about your {task_type}. Could you please provide more details?"
-            
+        content = _make_llm_call(system_msg, user_prompt)
+        return _clarification_message(content, task_type)
     except Exception as e:
-        logger.error(f"Failed to generate {task_type} clarification prompt: {str(e)}")
-        logger.error(f"Stack trace:\n{traceback.format_exc()}")
-        return f"I need some clarification about your {task_type}. Could you please provide more details?"
+        return _clarification_fallback(e, task_type)
 
+async def agenerate_task_clarification_prompt(metadata: Union[TaskMetadata, SubtaskMetadata], judgment: TaskJudgment, task_type: str,
+                                              mode: Optional[str] = None) -> str:
+    """
+    Async version of generate_task_clarification_prompt.
+    """
+    if (mode or clarification_mode()) != CLARIFICATION_MODE_RICH:
+        return render_clarification_message(metadata, judgment, task_type)
+    system_msg, user_prompt = _clarification_request(metadata, judgment, task_type)
+    try:
+        content = await _amake_llm_call(system_msg, user_prompt)
+        return _clarification_message(content, task_type)
+    except Exception as e:
+        return _clarification_fallback(e, task_type)
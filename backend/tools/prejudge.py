@@ -0,0 +1,104 @@
+"""
+Rule-based fast path for task and subtask judgment.
+
+TASK_JUDGMENT_SYSTEM_PROMPT and SUBTASK_JUDGMENT_SYSTEM_PROMPT spell out rules
+that decide most judgments without any reasoning:
+
+- a task without a due date that is not open-ended fails
+- a confident task (confidence >= 0.7) with no concerns or questions passes
+- subtasks pass if and only if the user accepted them
+
+``prejudge_task`` and ``prejudge_subtasks`` apply those rules locally and
+return None when the outcome is ambiguous and the LLM has to decide.
+Set ``JUDGE_FAST_PATH=false`` to always ask the LLM.
+"""
+
+import re
+from typing import Optional
+
+from backend.config import env_flag
+from backend.logger import logger
+from backend.metrics import record_prejudge
+from backend.types import TaskMetadata, TaskJudgment, SubtaskMetadata, SubtaskJudgment, JudgmentType
+
+# Same threshold as the judgment prompts
+CONFIDENCE_THRESHOLD = 0.7
+
+TASK_PASS_REASON = "The task is clear and specific enough to take action on"
+TASK_NO_DUE_DATE_REASON = "The task has no due date and is not open-ended"
+DUE_DATE_QUESTION = "When does this task need to be done by?"
+SUBTASKS_ACCEPTED_REASON = "User approved the subtasks"
+SUBTASKS_NOT_ACCEPTED_REASON = "The subtasks need your approval before the task can be created"
+
+# Whole words and phrases that ask for a due date; "when" alone ("When you say...") does not
+_DUE_DATE_QUESTION = re.compile(
+    r"\b(?:due|deadlines?|by when|(?:what|which|target) date"
+    r"|when (?:is|does|do|should|must|will|would|can) (?:this|it|that|the task|you need (?:this|it))\b"
+    r".*\b(?:due|done|finished|completed?|ready)\b)",
+    re.IGNORECASE)
+
+
+def fast_path_enabled() -> bool:
+    """Return whether JUDGE_FAST_PATH allows local judgments (default true)."""
+    return env_flag("JUDGE_FAST_PATH", True)
+
+
+def is_due_date_question(question: str) -> bool:
+    """Return whether ``question`` asks for the task's due date."""
+    return _DUE_DATE_QUESTION.search(question) is not None
+
+
+def _asks_for_due_date(metadata: TaskMetadata) -> bool:
+    return any(is_due_date_question(question) for question in metadata.questions)
+
+
+def judge_task_by_rules(metadata: TaskMetadata) -> Optional[TaskJudgment]:
+    """
+    Apply the task judgment rules, returning None when they don't decide the outcome.
+
+    Like an LLM judgment, a failure for a missing due date appends its question
+    to ``metadata.questions``.
+    """
+    if not metadata.due_date and not metadata.is_open_ended:
+        additional_questions = [] if _asks_for_due_date(metadata) else [DUE_DATE_QUESTION]
+        metadata.questions.extend(additional_questions)
+        return TaskJudgment(judgment=JudgmentType.FAIL, reason=TASK_NO_DUE_DATE_REASON,
+                            additional_questions=additional_questions)
+    if metadata.confidence >= CONFIDENCE_THRESHOLD and not metadata.concerns and not metadata.questions:
+        return TaskJudgment(judgment=JudgmentType.PASS, reason=TASK_PASS_REASON)
+    return None
+
+
+def prejudge_task(metadata: TaskMetadata) -> Optional[TaskJudgment]:
+    """Judge a task locally when the rules decide it, or return None to defer to the LLM."""
+    if not fast_path_enabled():
+        return None
+
+    judgment = judge_task_by_rules(metadata)
+    if judgment is None:
+        record_prejudge("task", "llm")
+        return None
+
+    logger.debug("prejudge_task: %s (%s)", judgment.judgment.value, judgment.reason)
+    record_prejudge("task", judgment.judgment.value)
+    return judgment
+
+
+def prejudge_subtasks(subtasks: SubtaskMetadata) -> Optional[SubtaskJudgment]:
+    """
+    Judge subtasks locally from the user's acceptance.
+
+    The subtask prompt makes acceptance decisive, so this only returns None
+    when the fast path is disabled.
+    """
+    if not fast_path_enabled():
+        return None
+
+    if subtasks.user_accepted_subtasks:
+        judgment = SubtaskJudgment(judgment=JudgmentType.PASS, reason=SUBTASKS_ACCEPTED_REASON)
+    else:
+        judgment = SubtaskJudgment(judgment=JudgmentType.FAIL, reason=SUBTASKS_NOT_ACCEPTED_REASON)
+
+    logger.debug("prejudge_subtasks: %s (%s)", judgment.judgment.value, judgment.reason)
+    record_prejudge("subtasks", judgment.judgment.value)
+    return judgment
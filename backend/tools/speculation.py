@@ -0,0 +1,220 @@
+"""
+Speculative subtask generation.
+
+When a subtaskable task passes judgment, ``ask_to_subtask_node`` pauses for a
+yes/no answer before ``generate_subtasks`` starts. With SPECULATIVE_SUBTASKS
+enabled, generation starts on a background thread as soon as the question is
+asked. ``generate_subtasks_node`` picks up the result (waiting for it if it is
+still in flight) on "yes", and the result is dropped on "no".
+
+Results are kept in this process, keyed by thread and task text, because a
+running call cannot be checkpointed. A resume handled by another process
+simply misses and generates the subtasks as usual.
+
+Every speculative call is charged to the tenant that started it. Once a tenant
+has spent its budget for the current window, its tasks fall back to
+generating subtasks on demand.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from backend.config import env_flag, env_number
+from backend.logger import logger
+from backend.llm.limiter import PRIORITY_BACKGROUND, llm_priority
+from backend.metrics import instrument_node, record_speculation
+from backend.tools.task_tools import generate_subtasks
+from backend.types import TaskMetadata, SubtaskMetadata
+
+DEFAULT_TENANT = "default"
+
+SpeculationKey = Tuple[str, str]
+
+
+def speculation_enabled() -> bool:
+    """Return whether SPECULATIVE_SUBTASKS is turned on (default false)."""
+    return env_flag("SPECULATIVE_SUBTASKS", False)
+
+
+class SpeculationBudget:
+    """
+    Caps speculative calls per tenant over a sliding time window.
+
+    Args:
+        max_calls: Speculative calls each tenant may start per window
+        window_seconds: Length of the sliding window
+        clock: Time source, replaceable in tests
+    """
+
+    def __init__(self, max_calls: int = 50, window_seconds: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_calls = max_calls
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._calls: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SpeculationBudget":
+        """Build a budget from SPECULATION_MAX_PER_TENANT and SPECULATION_WINDOW_SECONDS."""
+        return cls(
+            max_calls=env_number("SPECULATION_MAX_PER_TENANT", 50, int),
+            window_seconds=env_number("SPECULATION_WINDOW_SECONDS", 3600.0),
+        )
+
+    def try_acquire(self, tenant: str) -> bool:
+        """Charge one call to ``tenant`` if it has budget left. Returns False when it does not."""
+        now = self._clock()
+        with self._lock:
+            calls = self._calls.setdefault(tenant, deque())
+            while calls and calls[0] <= now - self.window_seconds:
+                calls.popleft()
+            if len(calls) >= self.max_calls:
+                return False
+            calls.append(now)
+            return True
+
+    def used(self, tenant: str) -> int:
+        """Return the calls ``tenant`` has spent in the current window."""
+        now = self._clock()
+        with self._lock:
+            return sum(1 for t in self._calls.get(tenant, ()) if t > now - self.window_seconds)
+
+
+@instrument_node("speculate_subtasks")
+def _speculate(metadata: TaskMetadata, tenant: str) -> SubtaskMetadata:
+    # Speculative calls queue behind interactive and batch work
+    with llm_priority(PRIORITY_BACKGROUND):
+        return generate_subtasks(metadata, tenant)
+
+
+class SubtaskSpeculator:
+    """
+    Runs speculative ``generate_subtasks`` calls on a thread pool and holds their results.
+
+    Args:
+        budget: Per-tenant cap on speculative calls
+        max_workers: Speculative calls that may run at the same time
+        ttl_seconds: How long an unclaimed result is kept
+        clock: Time source, replaceable in tests
+    """
+
+    def __init__(self, budget: Optional[SpeculationBudget] = None, max_workers: int = 4,
+                 ttl_seconds: float = 900.0, clock: Callable[[], float] = time.monotonic):
+        self.budget = budget or SpeculationBudget()
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculate")
+        self._pending: Dict[SpeculationKey, Tuple[float, Future]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SubtaskSpeculator":
+        """Build a speculator from SPECULATION_MAX_WORKERS and the budget settings."""
+        return cls(SpeculationBudget.from_env(), max_workers=env_number("SPECULATION_MAX_WORKERS", 4, int))
+
+    def _evict_expired(self) -> None:
+        cutoff = self._clock() - self.ttl_seconds
+        with self._lock:
+            expired = [key for key, (started, _) in self._pending.items() if started < cutoff]
+            for key in expired:
+                self._pending.pop(key)[1].cancel()
+        for _ in expired:
+            record_speculation("expired")
+
+    def start(self, key: SpeculationKey, tenant: str, metadata: TaskMetadata) -> bool:
+        """Start generating subtasks for ``key`` unless already started or over budget. Returns True if started."""
+        self._evict_expired()
+        with self._lock:
+            if key in self._pending:
+                return False
+            if not self.budget.try_acquire(tenant):
+                record_speculation("over_budget")
+                logger.debug("speculation: tenant %s is over budget", tenant)
+                return False
+            self._pending[key] = (self._clock(), self._executor.submit(_speculate, metadata.model_copy(deep=True), tenant))
+        record_speculation("started")
+        logger.debug("speculation: started subtask generation for %s", key)
+        return True
+
+    def _pop(self, key: SpeculationKey) -> Optional[Future]:
+        with self._lock:
+            entry = self._pending.pop(key, None)
+        return entry[1] if entry else None
+
+    @staticmethod
+    def _usable(result: SubtaskMetadata) -> Optional[SubtaskMetadata]:
+        # An empty result is generate_subtasks' error fallback; generate again instead
+        if not result.subtasks:
+            return None
+        record_speculation("used")
+        return result
+
+    def take(self, key: SpeculationKey) -> Optional[SubtaskMetadata]:
+        """Claim the result for ``key``, waiting if it is still running. Returns None on a miss."""
+        future = self._pop(key)
+        if future is None or future.cancelled():
+            return None
+        return self._usable(future.result())
+
+    async def atake(self, key: SpeculationKey) -> Optional[SubtaskMetadata]:
+        """Async version of take that waits without blocking the event loop."""
+        future = self._pop(key)
+        if future is None or future.cancelled():
+            return None
+        return self._usable(await asyncio.wrap_future(future))
+
+    def discard(self, key: SpeculationKey) -> None:
+        """Drop the result for ``key``, cancelling the call if it has not started yet."""
+        future = self._pop(key)
+        if future is not None:
+            future.cancel()
+            record_speculation("discarded")
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_speculator: Optional[SubtaskSpeculator] = None
+_speculator_lock = threading.Lock()
+
+
+def get_speculator() -> SubtaskSpeculator:
+    """Return the process-wide speculator, configured from the environment on first use."""
+    global _speculator
+    if _speculator is None:
+        with _speculator_lock:
+            if _speculator is None:
+                _speculator = SubtaskSpeculator.from_env()
+    return _speculator
+
+
+def configure_speculator(speculator: Optional[SubtaskSpeculator]) -> None:
+    """Install ``speculator`` as the process-wide speculator. Pass None to rebuild it from the environment."""
+    global _speculator
+    with _speculator_lock:
+        previous, _speculator = _speculator, speculator
+    if previous is not None and previous is not speculator:
+        previous.shutdown()
+
+
+def _thread_id() -> str:
+    from langgraph.config import get_config
+    try:
+        return str(get_config().get("configurable", {}).get("thread_id", ""))
+    except RuntimeError:
+        # Called outside a graph run
+        return ""
+
+
+def speculation_key(metadata: TaskMetadata) -> SpeculationKey:
+    """Key a speculation by the current graph thread and the task it was generated for."""
+    return _thread_id(), metadata.task
@@ -1,14 +1,36 @@
-from typing import List, Optional
-from openai import OpenAI
+from typing import Callable, List, Optional, Tuple
+from anthropic import Anthropic, AsyncAnthropic
+from openai import AsyncOpenAI, OpenAI
+from openai.types import CompletionUsage
 import os
 from dotenv import load_dotenv
 import json
-from backend.types import TaskMetadata, TaskJudgment, SubtaskMetadata, SubtaskJudgment
+import time
+from backend.types import (
+    TaskMetadata, TaskJudgment, TaskExtractionJudgment, SubtaskMetadata, SubtaskJudgment, StoredTask, DuplicateTask
+)
+from backend.storage import get_task_store, DuplicateSettings
+from backend.due_dates import find_due_date
 from fastapi import HTTPException
 from backend.logger import initialize_logger, logger
+from backend.config import env_number
+from backend.llm.clients import get_client_registry
+from backend.llm.cache import get_llm_cache, make_cache_key, cache_bypassed
+from backend.llm.singleflight import llm_singleflight, llm_async_singleflight
+from backend.llm.streaming import token_sink, acollect_stream, acollect_anthropic_stream
+from backend.llm.json_stream import JsonArrayStream
+from backend.llm.limiter import get_llm_limiter, current_priority
+from backend.llm.retry import get_retry_policy, current_deadline, LLMDeadlineExceeded
+from backend.llm.breaker import get_circuit_breaker
+from backend.llm.semantic_cache import get_semantic_cache
+from backend.llm.router import ANTHROPIC, OPENAI, PROMPT_TOOLS, Route, get_model_router
+from backend.metrics import (
+    record_llm_call, record_llm_cache_hit, record_llm_route, record_llm_route_fallback, current_node
+)
 from backend.prompts.task_prompts import (
     TASK_EXTRACTION_SYSTEM_PROMPT,
     TASK_JUDGMENT_SYSTEM_PROMPT,
+    TASK_EXTRACTION_AND_JUDGMENT_SYSTEM_PROMPT,
     SUBTASK_GENERATION_SYSTEM_PROMPT,
     SUBTASK_JUDGMENT_SYSTEM_PROMPT,
     TASK_CLARIFICATION_SYSTEM_PROMPT,
@@ -24,74 +46,423 @@ logger.info("Logger initialized successfully")
 
 # --- Constants ---
 DEFAULT_MODEL = "gpt-4.1"
+ANTHROPIC_MAX_TOKENS = 2048
+ANTHROPIC_PREFILL = "{"
+ANTHROPIC_JSON_INSTRUCTION = "Respond with a single JSON object and nothing else."
 
 # --- Shared LLM client accessor ---
-def get_client():
+def get_client(model: str = DEFAULT_MODEL) -> OpenAI:
+    """
+    Return the pooled, process-wide OpenAI client for the configured API key and base URL.
+    Clients are reused across calls so keep-alive connections survive between completions.
+    """
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise ValueError(
+            "OpenAI API key not found. Please set the OPENAI_API_KEY environment variable. "
+            "You can get an API key from https://platform.openai.com/api-keys"
+        )
+    return get_client_registry().get_sync_client(openai_api_key, os.getenv("OPENAI_BASE_URL"), model)
+
+def get_async_client(model: str = DEFAULT_MODEL) -> AsyncOpenAI:
+    """
+    Return the pooled AsyncOpenAI client for the running event loop.
+    """
     openai_api_key = os.getenv("OPENAI_API_KEY")
     if not openai_api_key:
         raise ValueError(
             "OpenAI API key not found. Please set the OPENAI_API_KEY environment variable. "
             "You can get an API key from https://platform.openai.com/api-keys"
         )
-    return OpenAI(api_key=openai_api_key)
+    return get_client_registry().get_async_client(openai_api_key, os.getenv("OPENAI_BASE_URL"), model)
+
+def _anthropic_api_key() -> str:
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "Anthropic API key not found. Please set the ANTHROPIC_API_KEY environment variable "
+            "to route calls to Claude models."
+        )
+    return api_key
+
+def get_anthropic_client() -> Anthropic:
+    """
+    Return the pooled Anthropic client, used by routes to Claude models.
+    """
+    return get_client_registry().get_sync_anthropic_client(_anthropic_api_key(), os.getenv("ANTHROPIC_BASE_URL"))
+
+def get_async_anthropic_client() -> AsyncAnthropic:
+    """
+    Return the pooled AsyncAnthropic client for the running event loop.
+    """
+    return get_client_registry().get_async_anthropic_client(_anthropic_api_key(), os.getenv("ANTHROPIC_BASE_URL"))
+
+# Metric label for each system prompt; the clarification prompt is formatted per call
+_PROMPT_NAMES = {
+    TASK_EXTRACTION_SYSTEM_PROMPT: "task_extraction",
+    TASK_JUDGMENT_SYSTEM_PROMPT: "task_judgment",
+    TASK_EXTRACTION_AND_JUDGMENT_SYSTEM_PROMPT: "task_extraction_judgment",
+    SUBTASK_GENERATION_SYSTEM_PROMPT: "subtask_generation",
+    SUBTASK_JUDGMENT_SYSTEM_PROMPT: "subtask_judgment",
+    SUBTASK_DECISION_PROMPT: "subtask_decision",
+}
+
+# Prompts whose output reaches the user; their tokens are forwarded when streaming
+STREAMED_PROMPTS = {"subtask_generation", "subtask_decision", "clarification"}
+# Prompts answering with a "subtasks" array, whose entries are forwarded as they complete
+SUBTASK_PROMPTS = {"subtask_generation", "subtask_decision"}
+
+def _prompt_name(system_msg: str) -> str:
+    return _PROMPT_NAMES.get(system_msg, "clarification")
+
+def _completion_request(system_msg: str, user_prompt: str, model: str = DEFAULT_MODEL) -> dict:
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_msg},
+            {"role": "user", "content": user_prompt}
+        ],
+        "response_format": {"type": "json_object"}
+    }
 
-def _make_llm_call(system_msg: str, user_prompt: str) -> dict:
+def _anthropic_request(system_msg: str, user_prompt: str, model: str) -> dict:
+    # Claude has no JSON mode: ask for a bare object and prefill its opening brace
+    return {
+        "model": model,
+        "max_tokens": env_number("ANTHROPIC_MAX_TOKENS", ANTHROPIC_MAX_TOKENS, int),
+        "system": f"{system_msg}\n\n{ANTHROPIC_JSON_INSTRUCTION}",
+        "messages": [
+            {"role": "user", "content": user_prompt},
+            {"role": "assistant", "content": ANTHROPIC_PREFILL}
+        ]
+    }
+
+def _anthropic_usage(usage) -> Optional[CompletionUsage]:
+    if usage is None:
+        return None
+    prompt_tokens, completion_tokens = usage.input_tokens or 0, usage.output_tokens or 0
+    return CompletionUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                           total_tokens=prompt_tokens + completion_tokens)
+
+def _request_key(route: Route, system_msg: str, user_prompt: str) -> str:
+    # OpenAI routes keep keying on the bare model, so existing cache entries stay valid
+    model = route.model if route.provider == OPENAI else route.label
+    return make_cache_key(model, system_msg, user_prompt, {"type": "json_object"})
+
+def _flight_key(key: str, streamed: bool) -> Optional[str]:
+    # The leader's call runs with the leader's priority, deadline and token sink,
+    # so only callers that agree on all three share it. Streamed calls never do.
+    if streamed:
+        return None
+    return f"{key}:{current_priority()}:{current_deadline() or ''}"
+
+def _is_rate_limited(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+def _total_tokens(usage) -> Optional[int]:
+    total = getattr(usage, "total_tokens", None)
+    return total if isinstance(total, int) else None
+
+def _token_count(usage, field: str) -> int:
+    count = getattr(usage, field, None)
+    return count if isinstance(count, int) else 0
+
+def _timeout_option(timeout: Optional[float]) -> dict:
+    # Only override the client's timeout when the run deadline is closer
+    return {} if timeout is None else {"timeout": max(timeout, 0.001)}
+
+def _active_cache(use_cache: bool):
+    return get_llm_cache() if use_cache and not cache_bypassed() else None
+
+def _active_semantic_cache():
+    cache = get_semantic_cache()
+    return cache if cache.settings.enabled and not cache_bypassed() else None
+
+def _complete(route: Route, system_msg: str, user_prompt: str, timeout: Optional[float]):
+    """Send one completion to ``route`` and return its text and usage."""
+    if route.provider == ANTHROPIC:
+        response = get_anthropic_client().messages.create(
+            **_anthropic_request(system_msg, user_prompt, route.model), **_timeout_option(timeout))
+        text = "".join(block.text for block in response.content if block.type == "text")
+        return ANTHROPIC_PREFILL + text, _anthropic_usage(response.usage)
+    response = get_client(route.model).chat.completions.create(
+        **_completion_request(system_msg, user_prompt, route.model), **_timeout_option(timeout))
+    return response.choices[0].message.content, getattr(response, "usage", None)
+
+async def _acomplete(route: Route, system_msg: str, user_prompt: str, timeout: Optional[float],
+                     on_delta: Optional[Callable[[str], None]] = None):
+    """Async counterpart of _complete. With ``on_delta``, the completion is streamed through it."""
+    if route.provider == ANTHROPIC:
+        client = get_async_anthropic_client()
+        request = _anthropic_request(system_msg, user_prompt, route.model)
+        if on_delta is None:
+            response = await client.messages.create(**request, **_timeout_option(timeout))
+            text = "".join(block.text for block in response.content if block.type == "text")
+            return ANTHROPIC_PREFILL + text, _anthropic_usage(response.usage)
+        prefill = [ANTHROPIC_PREFILL]
+
+        def forward(delta: str) -> None:
+            # The prefilled brace never comes back from the provider; hand it on with the first delta
+            on_delta((prefill.pop() if prefill else "") + delta)
+
+        stream = await client.messages.create(**request, stream=True, **_timeout_option(timeout))
+        text, usage = await acollect_anthropic_stream(stream, forward)
+        return ANTHROPIC_PREFILL + text, usage
+    client = get_async_client(route.model)
+    request = _completion_request(system_msg, user_prompt, route.model)
+    if on_delta is None:
+        response = await client.chat.completions.create(**request, **_timeout_option(timeout))
+        return response.choices[0].message.content, getattr(response, "usage", None)
+    stream = await client.chat.completions.create(
+        **request, stream=True, stream_options={"include_usage": True}, **_timeout_option(timeout))
+    return await acollect_stream(stream, on_delta)
+
+def _record_route_call(tool: str, prompt: str, route: Route, seconds: float, usage=None, error: bool = False) -> None:
+    record_llm_call(prompt, seconds, usage, error=error)
+    cost = get_model_router().cost(route, _token_count(usage, "prompt_tokens"), _token_count(usage, "completion_tokens"))
+    record_llm_route(tool, route.label, seconds, cost, error=error)
+
+def _falls_back(tool: str, routes: List[Route], index: int, error: Exception) -> bool:
+    """Return whether a call that failed on ``routes[index]`` moves on to the next route."""
+    if index == len(routes) - 1 or isinstance(error, LLMDeadlineExceeded):
+        return False
+    logger.warning("LLM route %s failed for %s (%s: %s); falling back to %s",
+                   routes[index].label, tool, type(error).__name__, error, routes[index + 1].label)
+    record_llm_route_fallback(tool, routes[index].label)
+    return True
+
+def _make_llm_call(system_msg: str, user_prompt: str, use_cache: bool = True) -> dict:
     """
-    Helper function to make OpenAI API calls.
+    Helper function to make LLM API calls.
+
+    The call goes to the first route in the tool's chain from the model
+    router, and on to the next route if that one still fails after retries.
+    Responses are served from the LLM cache when enabled, and concurrent calls
+    with identical inputs are coalesced into a single completion. Calls that do
+    reach a provider wait for a permit from the outbound limiter, and
+    transient failures are retried by the retry policy within the run's deadline.
+    While a provider's circuit breaker is open, its routes fail fast with CircuitOpenError.
     
     Args:
         system_msg: The system message for the API call
         user_prompt: The user prompt for the API call
+        use_cache: Set to False to bypass the LLM response cache for this call
     
     Returns:
         The parsed JSON response from the API
     """
-    client = get_client()
-    
-    response = client.chat.completions.create(
-        model=DEFAULT_MODEL,
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_prompt}
-        ],
-        response_format={"type": "json_object"}
-    )
-    content = response.choices[0].message.content.strip()
-    return json.loads(content)
-
-def extract_task(state) -> TaskMetadata:
+    prompt = _prompt_name(system_msg)
+    tool = PROMPT_TOOLS[prompt]
+    routes = get_model_router().chain(tool)
+    key = _request_key(routes[0], system_msg, user_prompt)
+    cache = _active_cache(use_cache)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            record_llm_cache_hit(prompt)
+            return cached
+
+    def attempt_on(route: Route):
+        def attempt(timeout: Optional[float]) -> dict:
+            breaker = get_circuit_breaker(route.provider)
+            limiter = get_llm_limiter()
+            probe = breaker.before_call()
+            permit = limiter.acquire(limiter.estimate_tokens(system_msg, user_prompt))
+            start = time.perf_counter()
+            try:
+                text, usage = _complete(route, system_msg, user_prompt, timeout)
+            except Exception as e:
+                limiter.release(permit, throttled=_is_rate_limited(e))
+                breaker.after_call(probe, e)
+                _record_route_call(tool, prompt, route, time.perf_counter() - start, error=True)
+                raise
+            limiter.release(permit, _total_tokens(usage))
+            breaker.after_call(probe)
+            _record_route_call(tool, prompt, route, time.perf_counter() - start, usage)
+            return json.loads(text.strip())
+        return attempt
+
+    def call() -> dict:
+        for index, route in enumerate(routes):
+            try:
+                content = get_retry_policy().call(prompt, attempt_on(route))
+                break
+            except Exception as e:
+                if not _falls_back(tool, routes, index, e):
+                    raise
+        if cache is not None:
+            cache.set(key, content)
+        return content
+
+    return llm_singleflight.do(_flight_key(key, False), call)
+
+def _stream_forwarder(sink, prompt: str):
+    """Build a delta callback that sends token events, plus subtask events for SUBTASK_PROMPTS."""
+    node = current_node()
+    subtasks = JsonArrayStream("subtasks") if prompt in SUBTASK_PROMPTS else None
+
+    def forward(delta: str) -> None:
+        sink("token", {"node": node, "prompt": prompt, "text": delta})
+        if subtasks is not None:
+            completed = subtasks.feed(delta)
+            first_index = len(subtasks.items) - len(completed)
+            for offset, subtask in enumerate(completed):
+                sink("subtask", {"node": node, "prompt": prompt, "index": first_index + offset, "subtask": subtask})
+    return forward
+
+async def _amake_llm_call(system_msg: str, user_prompt: str, use_cache: bool = True) -> dict:
     """
-    Use LLM to extract the main task, assess confidence, raise concerns, and generate clarifying questions.
+    Async counterpart of _make_llm_call that awaits the completion instead of blocking the event loop.
+
+    Inside a ``stream_llm_tokens`` block, calls for STREAMED_PROMPTS are streamed:
+    every content delta is passed to the sink as it arrives, and each entry of
+    a subtasks array as soon as it is complete. Streamed calls are never
+    hedged, and are only retried or handed to a fallback route if nothing has
+    been forwarded yet.
     """
-    user_prompt = f"""
+    prompt = _prompt_name(system_msg)
+    tool = PROMPT_TOOLS[prompt]
+    routes = get_model_router().chain(tool)
+    key = _request_key(routes[0], system_msg, user_prompt)
+    cache = _active_cache(use_cache)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            record_llm_cache_hit(prompt)
+            return cached
+
+    sink = token_sink() if prompt in STREAMED_PROMPTS else None
+    forwarded = False
+
+    def attempt_on(route: Route):
+        async def attempt(timeout: Optional[float]) -> dict:
+            breaker = get_circuit_breaker(route.provider)
+            limiter = get_llm_limiter()
+            probe = breaker.before_call()
+            try:
+                permit = await limiter.aacquire(limiter.estimate_tokens(system_msg, user_prompt))
+            except BaseException:
+                breaker.abandon(probe)
+                raise
+            on_delta = None
+            if sink is not None:
+                forward = _stream_forwarder(sink, prompt)
+
+                def on_delta(delta: str) -> None:
+                    nonlocal forwarded
+                    forwarded = True
+                    forward(delta)
+
+            start = time.perf_counter()
+            try:
+                text, usage = await _acomplete(route, system_msg, user_prompt, timeout, on_delta)
+            except BaseException as e:
+                # Also give the permit back when the run is cancelled mid-call
+                limiter.release(permit, throttled=_is_rate_limited(e))
+                if isinstance(e, Exception):
+                    breaker.after_call(probe, e)
+                    _record_route_call(tool, prompt, route, time.perf_counter() - start, error=True)
+                else:
+                    breaker.abandon(probe)
+                raise
+            limiter.release(permit, _total_tokens(usage))
+            breaker.after_call(probe)
+            _record_route_call(tool, prompt, route, time.perf_counter() - start, usage)
+            return json.loads(text.strip())
+        return attempt
+
+    async def call() -> dict:
+        for index, route in enumerate(routes):
+            try:
+                content = await get_retry_policy().acall(prompt, attempt_on(route), hedge=sink is None,
+                                                         can_retry=lambda: not forwarded)
+                break
+            except Exception as e:
+                if forwarded or not _falls_back(tool, routes, index, e):
+                    raise
+        if cache is not None:
+            cache.set(key, content)
+        return content
+
+    flight = _flight_key(key, sink is not None)
+    return await (call() if flight is None else llm_async_singleflight.do(flight, call))
+
+# --- Task extraction ---
+def _extract_task_prompt(state) -> str:
+    return f"""
     <user_prompt>
         {state.input}
     </user_prompt>
     """
 
+def _task_metadata_from_response(state, content: dict) -> TaskMetadata:
+    result = TaskMetadata(**content)
+    # Set due_date_confirmed if we have a due date or it's marked as open-ended
+    if result.due_date is not None or result.is_open_ended:
+        state.due_date_confirmed = True
+    return result
+
+def _extract_task_fallback(state) -> TaskMetadata:
+    return TaskMetadata(
+        task=state.input.strip(),
+        confidence=0.0,
+        concerns=["Unable to parse task extraction response"],
+        questions=[],
+        is_subtaskable=False,
+        due_date=None,
+        is_open_ended=False
+    )
+
+def _extraction_guard(state) -> str:
+    # Inputs that differ in tenant or due date never share an extraction
+    due_date = find_due_date(state.input or "")[0]
+    return f"{state.tenant_id or ''}:{(due_date or '').lower()}"
+
+def _cached_extraction(state) -> Optional[TaskMetadata]:
+    cache = _active_semantic_cache()
+    if cache is None:
+        return None
+    content = cache.get("extract_task", state.input, _extraction_guard(state))
+    return None if content is None else _task_metadata_from_response(state, content)
+
+def _cache_extraction(state, content: dict) -> None:
+    cache = _active_semantic_cache()
+    if cache is not None:
+        cache.set("extract_task", state.input, content, _extraction_guard(state))
+
+def extract_task(state) -> TaskMetadata:
+    """
+    Use LLM to extract the main task, assess confidence, raise concerns, and generate clarifying questions.
+    Near-duplicates of an earlier input are answered from the semantic cache when it is enabled.
+    """
+    cached = _cached_extraction(state)
+    if cached is not None:
+        return cached
     try:
-        content = _make_llm_call(TASK_EXTRACTION_SYSTEM_PROMPT, user_prompt)
-        result = TaskMetadata(**content)
-        # Set due_date_confirmed if we have a due date or it's marked as open-ended
-        if result.due_date is not None or result.is_open_ended:
-            state.due_date_confirmed = True
-        return result
+        content = _make_llm_call(TASK_EXTRACTION_SYSTEM_PROMPT, _extract_task_prompt(state))
+        result = _task_metadata_from_response(state, content)
     except Exception as e:
-        return TaskMetadata(
-            task=state.input.strip(),
-            confidence=0.0,
-            concerns=["Unable to parse task extraction response"],
-            questions=[],
-            is_subtaskable=False,
-            due_date=None,
-            is_open_ended=False
-        )
+        return _extract_task_fallback(state)
+    _cache_extraction(state, content)
+    return result
 
-def judge_task(metadata: TaskMetadata) -> TaskJudgment:
+async def aextract_task(state) -> TaskMetadata:
     """
-    Determine if the extracted task is clearly defined and actionable.
-    Uses task confidence, concerns, and clarification questions as context.
+    Async version of extract_task.
     """
+    cached = _cached_extraction(state)
+    if cached is not None:
+        return cached
+    try:
+        content = await _amake_llm_call(TASK_EXTRACTION_SYSTEM_PROMPT, _extract_task_prompt(state))
+        result = _task_metadata_from_response(state, content)
+    except Exception as e:
+        return _extract_task_fallback(state)
+    _cache_extraction(state, content)
+    return result
+
+# --- Task judgment ---
+def _judge_task_prompt(metadata: TaskMetadata) -> str:
     logger.debug("judge_task: Starting task judgment")
     logger.debug("Task to judge: %s", metadata.task)
     logger.debug("Confidence: %f", metadata.confidence)
@@ -100,7 +471,7 @@ def judge_task(metadata: TaskMetadata) -> TaskJudgment:
     logger.debug("Due date: %s", metadata.due_date)
     logger.debug("Is open ended: %s", metadata.is_open_ended)
 
-    user_prompt = f"""
+    return f"""
     <user_prompt>
         <task>{metadata.task}</task>
         <confidence>{metadata.confidence}</confidence>
@@ -117,33 +488,80 @@ def judge_task(metadata: TaskMetadata) -> TaskJudgment:
     </user_prompt>
     """
 
-    try:
-        content = _make_llm_call(TASK_JUDGMENT_SYSTEM_PROMPT, user_prompt)
-        logger.debug("LLM judgment response: %s", content)
-        result = TaskJudgment(**content)
-        logger.debug("Judgment result: %s", result.judgment)
-        logger.debug("Judgment reason: %s", result.reason)
-        logger.debug("Additional questions: %s", result.additional_questions)
+def _task_judgment_from_response(metadata: TaskMetadata, content: dict) -> TaskJudgment:
+    logger.debug("LLM judgment response: %s", content)
+    result = TaskJudgment(**content)
+    logger.debug("Judgment result: %s", result.judgment)
+    logger.debug("Judgment reason: %s", result.reason)
+    logger.debug("Additional questions: %s", result.additional_questions)
+    
+    # Append any additional questions to the metadata
+    if result.additional_questions:
+        metadata.questions.extend(result.additional_questions)
+        logger.debug("Updated questions list: %s", metadata.questions)
         
-        # Append any additional questions to the metadata
-        if result.additional_questions:
-            metadata.questions.extend(result.additional_questions)
-            logger.debug("Updated questions list: %s", metadata.questions)
-            
-        return result
+    return result
+
+def _judge_task_fallback(e: Exception) -> TaskJudgment:
+    logger.error("Error in judge_task: %s", str(e))
+    return TaskJudgment(
+        judgment="fail",
+        reason="Task judgment failed: unable to parse task judgment response.",
+        additional_questions=[]
+    )
+
+def judge_task(metadata: TaskMetadata) -> TaskJudgment:
+    """
+    Determine if the extracted task is clearly defined and actionable.
+    Uses task confidence, concerns, and clarification questions as context.
+    """
+    try:
+        content = _make_llm_call(TASK_JUDGMENT_SYSTEM_PROMPT, _judge_task_prompt(metadata))
+        return _task_judgment_from_response(metadata, content)
     except Exception as e:
-        logger.error("Error in judge_task: %s", str(e))
-        return TaskJudgment(
-            judgment="fail",
-            reason="Task judgment failed: unable to parse task judgment response.",
-            additional_questions=[]
-        )
+        return _judge_task_fallback(e)
 
-def judge_subtasks(metadata: TaskMetadata, subtasks: SubtaskMetadata) -> SubtaskJudgment:
+async def ajudge_task(metadata: TaskMetadata) -> TaskJudgment:
     """
-    Evaluate whether the generated subtasks represent a complete and logical decomposition of the main task.
+    Async version of judge_task.
+    """
+    try:
+        content = await _amake_llm_call(TASK_JUDGMENT_SYSTEM_PROMPT, _judge_task_prompt(metadata))
+        return _task_judgment_from_response(metadata, content)
+    except Exception as e:
+        return _judge_task_fallback(e)
+
+# --- Fused task extraction and judgment ---
+def _extraction_judgment_from_response(state, content: dict) -> Tuple[TaskMetadata, TaskJudgment]:
+    combined = TaskExtractionJudgment(**content)
+    metadata = _task_metadata_from_response(state, combined.task_metadata().model_dump())
+    judgment = _task_judgment_from_response(metadata, combined.task_judgment().model_dump())
+    return metadata, judgment
+
+def extract_and_judge_task(state) -> Tuple[TaskMetadata, TaskJudgment]:
+    """
+    Extract the main task and judge it in a single LLM call.
+    Returns the same results as extract_task followed by judge_task.
     """
-    user_prompt = f"""
+    try:
+        content = _make_llm_call(TASK_EXTRACTION_AND_JUDGMENT_SYSTEM_PROMPT, _extract_task_prompt(state))
+        return _extraction_judgment_from_response(state, content)
+    except Exception as e:
+        return _extract_task_fallback(state), _judge_task_fallback(e)
+
+async def aextract_and_judge_task(state) -> Tuple[TaskMetadata, TaskJudgment]:
+    """
+    Async version of extract_and_judge_task.
+    """
+    try:
+        content = await _amake_llm_call(TASK_EXTRACTION_AND_JUDGMENT_SYSTEM_PROMPT, _extract_task_prompt(state))
+        return _extraction_judgment_from_response(state, content)
+    except Exception as e:
+        return _extract_task_fallback(state), _judge_task_fallback(e)
+
+# --- Subtask judgment ---
+def _judge_subtasks_prompt(metadata: TaskMetadata, subtasks: SubtaskMetadata) -> str:
+    return f"""
     <user_prompt>
         <task>{metadata.task}</task>
 
@@ -165,107 +583,195 @@ def judge_subtasks(metadata: TaskMetadata, subtasks: SubtaskMetadata) -> Subtask
     </user_prompt>
     """
 
+def _judge_subtasks_fallback() -> SubtaskJudgment:
+    return SubtaskJudgment(
+        judgment="fail",
+        reason="Subtask judgment failed: unable to parse subtask judgment response."
+    )
+
+def judge_subtasks(metadata: TaskMetadata, subtasks: SubtaskMetadata) -> SubtaskJudgment:
+    """
+    Evaluate whether the generated subtasks represent a complete and logical decomposition of the main task.
+    """
     try:
-        content = _make_llm_call(SUBTASK_JUDGMENT_SYSTEM_PROMPT, user_prompt)
+        content = _make_llm_call(SUBTASK_JUDGMENT_SYSTEM_PROMPT, _judge_subtasks_prompt(metadata, subtasks))
         return SubtaskJudgment(**content)
     except Exception:
-        return SubtaskJudgment(
-            judgment="fail",
-            reason="Subtask judgment failed: unable to parse subtask judgment response."
-        )
-
-def save_task_to_db(task: str, subtasks: Optional[List[str]] = None):
-    subtasks = subtasks or []
-    print(f"[SAVE] Task: {task}\n[SUBTASKS]\n" + chr(10).join(f"- {s}" for s in subtasks))
-    return {
-        "status": "saved"
-    }
+        return _judge_subtasks_fallback()
 
-def generate_subtasks(metadata: TaskMetadata) -> SubtaskMetadata:
+async def ajudge_subtasks(metadata: TaskMetadata, subtasks: SubtaskMetadata) -> SubtaskJudgment:
     """
-    Use LLM to propose subtasks for a given task and identify missing information.
+    Async version of judge_subtasks.
     """
-    user_prompt = f"""
+    try:
+        content = await _amake_llm_call(SUBTASK_JUDGMENT_SYSTEM_PROMPT, _judge_subtasks_prompt(metadata, subtasks))
+        return SubtaskJudgment(**content)
+    except Exception:
+        return _judge_subtasks_fallback()
+
+# --- Subtask generation ---
+def _generate_subtasks_prompt(metadata: TaskMetadata) -> str:
+    return f"""
     <user_prompt>
         {metadata.task}
     </user_prompt>
     """
 
+def _generate_subtasks_fallback() -> SubtaskMetadata:
+    return SubtaskMetadata(
+        subtasks=[],
+        confidence=0.0,
+        concerns=["Unable to parse subtask generation response"],
+        questions=[]
+    )
+
+def _cached_subtasks(metadata: TaskMetadata, tenant_id: Optional[str]) -> Optional[SubtaskMetadata]:
+    cache = _active_semantic_cache()
+    if cache is None:
+        return None
+    # Tasks of different tenants never share subtasks
+    content = cache.get("generate_subtasks", metadata.task, tenant_id or "")
+    return None if content is None else SubtaskMetadata(**content)
+
+def _cache_subtasks(metadata: TaskMetadata, tenant_id: Optional[str], content: dict) -> None:
+    cache = _active_semantic_cache()
+    if cache is not None:
+        cache.set("generate_subtasks", metadata.task, content, tenant_id or "")
+
+def generate_subtasks(metadata: TaskMetadata, tenant_id: Optional[str] = None) -> SubtaskMetadata:
+    """
+    Use LLM to propose subtasks for a given task and identify missing information.
+    Near-duplicates of an earlier task of the same tenant are answered from the semantic cache when it is enabled.
+    """
+    cached = _cached_subtasks(metadata, tenant_id)
+    if cached is not None:
+        return cached
     try:
-        content = _make_llm_call(SUBTASK_GENERATION_SYSTEM_PROMPT, user_prompt)
-        return SubtaskMetadata(**content)
+        content = _make_llm_call(SUBTASK_GENERATION_SYSTEM_PROMPT, _generate_subtasks_prompt(metadata))
+        result = SubtaskMetadata(**content)
     except Exception:
-        return SubtaskMetadata(
-            subtasks=[],
-            confidence=0.0,
-            concerns=["Unable to parse subtask generation response"],
-            questions=[]
-        )
+        return _generate_subtasks_fallback()
+    _cache_subtasks(metadata, tenant_id, content)
+    return result
+
+async def agenerate_subtasks(metadata: TaskMetadata, tenant_id: Optional[str] = None) -> SubtaskMetadata:
+    """
+    Async version of generate_subtasks.
+    """
+    cached = _cached_subtasks(metadata, tenant_id)
+    if cached is not None:
+        return cached
+    try:
+        content = await _amake_llm_call(SUBTASK_GENERATION_SYSTEM_PROMPT, _generate_subtasks_prompt(metadata))
+        result = SubtaskMetadata(**content)
+    except Exception:
+        return _generate_subtasks_fallback()
+    _cache_subtasks(metadata, tenant_id, content)
+    return result
 
-def create_task(task: str, subtasks: Optional[List[str]] = None) -> dict:
+def find_duplicate_tasks(task: str, tenant_id: Optional[str] = None) -> List[DuplicateTask]:
+    """
+    Return the open tasks of ``tenant_id`` that ``task`` almost duplicates, most similar first.
     """
-    Create a new task with optional subtasks.
-    Currently just logs the task and subtasks.
-    TODO: Implement actual task storage
+    settings = DuplicateSettings.from_env()
+    if not settings.enabled:
+        return []
+    store = get_task_store()
+    matches = store.find_duplicates([task], tenant_id, settings.top_k, settings.threshold)[0]
+    duplicates = []
+    for task_id, similarity in matches:
+        stored = store.get_task(task_id)
+        if stored is not None:
+            duplicates.append(DuplicateTask(task_id=task_id, task=stored.task, similarity=round(similarity, 3)))
+    return duplicates
+
+def create_task(task: str, subtasks: Optional[List[str]] = None, due_date: Optional[str] = None,
+                is_open_ended: bool = False, tenant_id: Optional[str] = None) -> dict:
+    """
+    Create a new task with optional subtasks and persist it through the task store.
     """
     subtasks = subtasks or []
-    print(f"[SAVE] Task: {task}\n[SUBTASKS]\n" + chr(10).join(f"- {s}" for s in subtasks))
+    stored = get_task_store().save_task(StoredTask(
+        task=task,
+        subtasks=subtasks,
+        due_date=due_date,
+        is_open_ended=is_open_ended,
+        tenant_id=tenant_id
+    ))
+    logger.info("Saved task %s: %s (%d subtasks)", stored.id, task, len(subtasks))
     return {
         "status": "saved",
+        "id": stored.id,
         "task": task,
         "subtasks": subtasks
     }
 
-def retry_task_with_feedback(state) -> TaskMetadata:
-    """
-    Use LLM to refine the task based on user feedback.
-    """
+# --- Task refinement ---
+def _retry_task_prompt(state) -> str:
     logger.debug("retry_task_with_feedback: Starting task refinement")
     logger.debug("Original task: %s", state.task_metadata.task)
     logger.debug("User feedback: %s", state.user_feedback)
 
-    user_prompt = f"""
+    return f"""
     <user_prompt>
         <original_task>{state.task_metadata.task}</original_task>
         <user_feedback>{state.user_feedback}</user_feedback>
     </user_prompt>
     """
 
-    try:
-        content = _make_llm_call(TASK_EXTRACTION_SYSTEM_PROMPT, user_prompt)
-        logger.debug("LLM response: %s", content)
-        result = TaskMetadata(**content)
-        logger.debug("Refined task: %s", result.task)
-        logger.debug("Due date: %s", result.due_date)
-        logger.debug("Is open ended: %s", result.is_open_ended)
+def _refined_task_from_response(state, content: dict) -> TaskMetadata:
+    logger.debug("LLM response: %s", content)
+    result = TaskMetadata(**content)
+    logger.debug("Refined task: %s", result.task)
+    logger.debug("Due date: %s", result.due_date)
+    logger.debug("Is open ended: %s", result.is_open_ended)
+    
+    # Update due_date_confirmed if we have a due date or it's marked as open-ended
+    if result.due_date is not None or result.is_open_ended:
+        state.due_date_confirmed = True
         
-        # Update due_date_confirmed if we have a due date or it's marked as open-ended
-        if result.due_date is not None or result.is_open_ended:
-            state.due_date_confirmed = True
-            
-        return result
+    return result
+
+def _retry_task_fallback(state, e: Exception) -> TaskMetadata:
+    logger.error("Error in retry_task_with_feedback: %s", str(e))
+    return TaskMetadata(
+        task=state.task_metadata.task,
+        confidence=0.0,
+        concerns=["Unable to parse task refinement response"],
+        questions=[],
+        is_subtaskable=False,
+        due_date=None,
+        is_open_ended=False
+    )
+
+def retry_task_with_feedback(state) -> TaskMetadata:
+    """
+    Use LLM to refine the task based on user feedback.
+    """
+    try:
+        content = _make_llm_call(TASK_EXTRACTION_SYSTEM_PROMPT, _retry_task_prompt(state))
+        return _refined_task_from_response(state, content)
     except Exception as e:
-        logger.error("Error in retry_task_with_feedback: %s", str(e))
-        return TaskMetadata(
-            task=state.task_metadata.task,
-            confidence=0.0,
-            concerns=["Unable to parse task refinement response"],
-            questions=[],
-            is_subtaskable=False,
-            due_date=None,
-            is_open_ended=False
-        )
+        return _retry_task_fallback(state, e)
 
-def retry_subtasks_with_feedback(state) -> SubtaskMetadata:
+async def aretry_task_with_feedback(state) -> TaskMetadata:
     """
-    Use LLM to refine subtasks based on user feedback.
+    Async version of retry_task_with_feedback.
     """
+    try:
+        content = await _amake_llm_call(TASK_EXTRACTION_SYSTEM_PROMPT, _retry_task_prompt(state))
+        return _refined_task_from_response(state, content)
+    except Exception as e:
+        return _retry_task_fallback(state, e)
+
+# --- Subtask refinement ---
+def _retry_subtasks_prompt(state) -> str:
     original_prompt = f"<original_prompt>{state.last_user_message}</original_prompt>" if state.last_user_message else ""
 
     # Handle case when subtask_metadata is None
     original_subtasks = state.subtask_metadata.subtasks if state.subtask_metadata else []
 
-    user_msg = f"""
+    return f"""
     <user_prompt>
     <task>{state.task_metadata.task}</task>
 
@@ -279,8 +785,22 @@ def retry_subtasks_with_feedback(state) -> SubtaskMetadata:
     </user_prompt>
     """
 
+def retry_subtasks_with_feedback(state) -> SubtaskMetadata:
+    """
+    Use LLM to refine subtasks based on user feedback.
+    """
+    try:
+        content = _make_llm_call(SUBTASK_DECISION_PROMPT, _retry_subtasks_prompt(state))
+        return SubtaskMetadata(**content)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"retry_subtasks_with_feedback failed: {str(e)}")
+
+async def aretry_subtasks_with_feedback(state) -> SubtaskMetadata:
+    """
+    Async version of retry_subtasks_with_feedback.
+    """
     try:
-        content = _make_llm_call(SUBTASK_DECISION_PROMPT, user_msg)
+        content = await _amake_llm_call(SUBTASK_DECISION_PROMPT, _retry_subtasks_prompt(state))
         return SubtaskMetadata(**content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"retry_subtasks_with_feedback failed: {str(e)}")
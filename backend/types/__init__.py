@@ -1,19 +1,29 @@
 from .types import (
     TaskMetadata,
     TaskJudgment,
+    TaskExtractionJudgment,
     SubtaskMetadata,
     SubtaskJudgment,
     JudgmentType,
     TaskAgentState,
-    UserFeedbackRetry
+    UserFeedbackRetry,
+    TaskStatus,
+    StoredTask,
+    DuplicateTask,
+    TaskSearchPage
 )
 
 __all__ = [
     "TaskMetadata",
     "TaskJudgment",
+    "TaskExtractionJudgment",
     "SubtaskMetadata",
     "SubtaskJudgment",
     "JudgmentType",
     "TaskAgentState",
-    "UserFeedbackRetry"
+    "UserFeedbackRetry",
+    "TaskStatus",
+    "StoredTask",
+    "DuplicateTask",
+    "TaskSearchPage"
 ] 
\ No newline at end of file
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import Optional, List, Literal
 from enum import Enum
+from datetime import datetime
 
 class JudgmentType(str, Enum):
     PASS = "pass"
@@ -29,6 +30,18 @@ class TaskJudgment(BaseModel):
     reason: str
     additional_questions: List[str] = []
 
+class TaskExtractionJudgment(TaskMetadata, TaskJudgment):
+    """
+    Combined response of the fused extract-and-judge prompt: every TaskMetadata
+    field plus every TaskJudgment field, returned by a single completion.
+    """
+
+    def task_metadata(self) -> TaskMetadata:
+        return TaskMetadata(**self.model_dump(include=set(TaskMetadata.model_fields)))
+
+    def task_judgment(self) -> TaskJudgment:
+        return TaskJudgment(**self.model_dump(include=set(TaskJudgment.model_fields)))
+
 class SubtaskMetadata(BaseModel):
     """
     Metadata about a set of subtasks, including the LLM's assessment of user acceptance.
@@ -52,6 +65,61 @@ class SubtaskJudgment(BaseModel):
     judgment: JudgmentType
     reason: str
 
+class TaskStatus(str, Enum):
+    OPEN = "open"
+    DONE = "done"
+
+class StoredTask(BaseModel):
+    """
+    A task as persisted by the task store.
+
+    Attributes:
+        id: Store-assigned identifier, None until the task is saved
+        task: The task description
+        subtasks: Ordered list of subtask descriptions
+        status: Whether the task is still open or done
+        due_date: The due date as extracted from the user's input
+        due_at: End of the due day in UTC, resolved from ``due_date`` when the task is saved
+        is_open_ended: Whether the task intentionally has no due date
+        tenant_id: The tenant the task belongs to
+        created_at: When the task was first saved (UTC)
+        updated_at: When the task was last modified (UTC)
+    """
+    id: Optional[int] = None
+    task: str
+    subtasks: List[str] = []
+    status: TaskStatus = TaskStatus.OPEN
+    due_date: Optional[str] = None
+    due_at: Optional[datetime] = None
+    is_open_ended: bool = False
+    tenant_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class DuplicateTask(BaseModel):
+    """
+    An open task that a new task almost duplicates.
+
+    Attributes:
+        task_id: Identifier of the open task in the task store
+        task: The open task's description
+        similarity: Cosine similarity of the two task descriptions
+    """
+    task_id: int
+    task: str
+    similarity: float
+
+class TaskSearchPage(BaseModel):
+    """
+    One page of task search results.
+
+    Attributes:
+        tasks: Matching tasks, best match first
+        next_cursor: Cursor for the next page, None on the last page
+    """
+    tasks: List[StoredTask]
+    next_cursor: Optional[str] = None
+
 class TaskAgentState(BaseModel):
     """
     The state of the task agent, tracking progress through the task processing workflow.
@@ -72,7 +140,11 @@ class TaskAgentState(BaseModel):
         last_user_message: The last message shown to the user
         user_feedback: The user's most recent feedback
         task_creation_confirmed: Whether the task has been created
+        task_id: Identifier of the created task in the task store
         due_date_confirmed: Whether the due date has been confirmed or marked as open-ended
+        tenant_id: The tenant the run belongs to, charged for its speculative LLM calls
+        degraded: Whether any node took its local path because the LLM was unavailable
+        duplicates: Open tasks of the same tenant that the created task almost duplicates
     """
     input: Optional[str] = None
     task_metadata: Optional[TaskMetadata] = None
@@ -86,4 +158,8 @@ class TaskAgentState(BaseModel):
     last_user_message: Optional[str] = None
     user_feedback: Optional[str] = None
     task_creation_confirmed: bool = False
+    task_id: Optional[int] = None
     due_date_confirmed: bool = False
+    tenant_id: Optional[str] = None
+    degraded: bool = False
+    duplicates: List[DuplicateTask] = []
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the task agent.
+These scripts run against local stubs and never call a real LLM provider.
+"""
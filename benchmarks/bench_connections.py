@@ -0,0 +1,79 @@
+"""
+Count the HTTP connections opened per task agent graph run.
+
+Runs the task agent graph against a local stub OpenAI server twice: once with
+the pooled client registry, and once with a fresh ``OpenAI()`` per LLM call
+(the behaviour before the registry existed). Reports connections opened per run.
+
+Usage:
+    python -m benchmarks.bench_connections --runs 20 [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import time
+from unittest.mock import patch
+
+from benchmarks.stub_openai import StubOpenAIServer
+
+
+def _run_graph(runs: int) -> float:
+    from backend.graphs.task_agent import graph
+    from backend.types import TaskAgentState
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        graph.invoke(TaskAgentState(input="Do the dishes by 2026-11-01"))
+    return time.perf_counter() - start
+
+
+def _fresh_client(model: str = None):
+    from openai import OpenAI
+    return OpenAI(api_key=os.environ["OPENAI_API_KEY"], base_url=os.environ["OPENAI_BASE_URL"])
+
+
+def measure(server: StubOpenAIServer, runs: int, pooled: bool) -> dict:
+    from backend.llm.clients import configure_client_registry
+
+    configure_client_registry()
+    server.reset_counters()
+    if pooled:
+        elapsed = _run_graph(runs)
+    else:
+        with patch("backend.tools.task_tools.get_client", _fresh_client):
+            elapsed = _run_graph(runs)
+    return {
+        "mode": "pooled" if pooled else "per_call",
+        "runs": runs,
+        "llm_calls": server.requests_served,
+        "connections_opened": server.connections_opened,
+        "connections_per_run": server.connections_opened / runs,
+        "seconds": elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Graph runs per mode")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+
+    with StubOpenAIServer() as server:
+        os.environ["OPENAI_API_KEY"] = "stub-key"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("TASK_DB_PATH", ":memory:")
+        results = [measure(server, args.runs, pooled) for pooled in (False, True)]
+
+    print(f"{'mode':<10}{'runs':>6}{'llm calls':>11}{'connections':>13}{'conn/run':>10}{'seconds':>10}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['runs']:>6}{r['llm_calls']:>11}{r['connections_opened']:>13}"
+              f"{r['connections_per_run']:>10.2f}{r['seconds']:>10.3f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
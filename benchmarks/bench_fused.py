@@ -0,0 +1,86 @@
+"""
+Compare the fused extract+judge pipeline with the split one.
+
+Runs new tasks through ``graph`` (extract_task, then judge_task) and through
+``fused_graph`` (one extract_and_judge_task call), against a local stub OpenAI
+server with a fixed per-call latency. Reports latency percentiles, LLM calls
+and prompt/completion tokens per task. The stub estimates tokens as characters
+/ 4, which is enough to compare the prompt sizes of the two pipelines.
+
+Usage:
+    python -m benchmarks.bench_fused --runs 50 --latency 0.3 [--json results.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from typing import List
+
+from benchmarks.stub_openai import StubOpenAIServer
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    # Nearest-rank percentile
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)] if sorted_values else 0.0
+
+
+def measure(server: StubOpenAIServer, pipeline: str, runs: int) -> dict:
+    from backend.graphs.task_agent import graph, fused_graph
+    from backend.metrics import collect_timings
+    from backend.types import TaskAgentState
+
+    selected = fused_graph if pipeline == "fused" else graph
+    # One unmeasured run opens the pooled connection
+    selected.invoke(TaskAgentState(input="Do the dishes by 2026-11-01 (warmup)"))
+    server.reset_counters()
+    latencies = []
+    prompt_tokens = completion_tokens = 0
+    for n in range(runs):
+        start = time.perf_counter()
+        with collect_timings() as timings:
+            selected.invoke(TaskAgentState(input=f"Do the dishes by 2026-11-01 (run {n})"))
+        latencies.append(time.perf_counter() - start)
+        breakdown = timings()
+        prompt_tokens += breakdown.prompt_tokens
+        completion_tokens += breakdown.completion_tokens
+
+    latencies.sort()
+    return {
+        "pipeline": pipeline,
+        "runs": runs,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "llm_calls_per_task": server.requests_served / runs,
+        "prompt_tokens_per_task": prompt_tokens / runs,
+        "completion_tokens_per_task": completion_tokens / runs,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50, help="New tasks per pipeline")
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub provider latency per call in seconds")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+
+    with StubOpenAIServer(latency=args.latency) as server:
+        os.environ["OPENAI_API_KEY"] = "stub-key"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("TASK_DB_PATH", ":memory:")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        results = [measure(server, pipeline, args.runs) for pipeline in ("split", "fused")]
+
+    print(f"{'pipeline':<10}{'p50 ms':>9}{'p95 ms':>9}{'llm/task':>10}{'prompt tok':>12}{'completion tok':>16}")
+    for r in results:
+        print(f"{r['pipeline']:<10}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['llm_calls_per_task']:>10.1f}"
+              f"{r['prompt_tokens_per_task']:>12.0f}{r['completion_tokens_per_task']:>16.0f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Measure the framework overhead of the task agent graph with a stub LLM.
+
+``_make_llm_call`` and ``_amake_llm_call`` are replaced by a scripted stub that
+sleeps for a configurable latency and returns canned JSON, so the numbers
+reflect LangGraph, state handling and checkpointing rather than a provider.
+Each scenario drives the graph along one representative path, answering every
+interrupt by resuming the thread:
+
+- pass_first_time: the task passes judgment and is created straight away
+- task_retry: the task fails judgment until ``UserFeedbackRetry.max_retries``
+- subtask_refinement: the user asks for subtasks, which fail judgment until
+  ``UserFeedbackRetry.max_retries``
+
+Reports p50/p95/p99 latency, runs/sec, LLM calls per run and peak RSS.
+
+Usage:
+    python -m benchmarks.bench_graph --runs 200 --latency 0 [--mode async] [--json results.json]
+    python -m benchmarks.bench_graph --compare results.json [--fail-threshold 10]
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import ExitStack
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+from benchmarks.stub_openai import DEFAULT_RESPONSES, prompt_name
+
+SCENARIOS: Dict[str, Dict[str, List[dict]]] = {
+    "pass_first_time": {},
+    "task_retry": {
+        # Low confidence with a concern, so the rule-based pre-judge defers to the LLM
+        "task_extraction": [{**DEFAULT_RESPONSES["task_extraction"], "confidence": 0.5, "concerns": ["Which dishes?"]}],
+        "task_judgment": [{"judgment": "fail", "reason": "The task is too vague", "additional_questions": []}],
+    },
+    "subtask_refinement": {
+        "task_extraction": [{**DEFAULT_RESPONSES["task_extraction"], "is_subtaskable": True}],
+        "subtask_judgment": [{"judgment": "fail", "reason": "The subtasks miss a step"}],
+        "subtask_decision": [{**DEFAULT_RESPONSES["subtask_decision"], "user_accepted_subtasks": False}],
+    },
+}
+
+
+class StubLLM:
+    """
+    Scripted stand-in for the LLM call helpers.
+
+    Each prompt name maps to a list of responses returned in order, repeating
+    the last one; prompts without a script get ``DEFAULT_RESPONSES``.
+    """
+
+    def __init__(self, script: Dict[str, List[dict]], latency: float = 0.0):
+        self.script = script
+        self.latency = latency
+        self.calls = 0
+        self._positions: Dict[str, int] = {}
+
+    def reset(self) -> None:
+        self._positions.clear()
+
+    def _respond(self, system_msg: str) -> dict:
+        self.calls += 1
+        name = prompt_name(system_msg)
+        responses = self.script.get(name) or [DEFAULT_RESPONSES[name]]
+        position = self._positions.get(name, 0)
+        self._positions[name] = position + 1
+        return copy.deepcopy(responses[min(position, len(responses) - 1)])
+
+    def call(self, system_msg: str, user_prompt: str, use_cache: bool = True) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(system_msg)
+
+    async def acall(self, system_msg: str, user_prompt: str, use_cache: bool = True) -> dict:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(system_msg)
+
+    def patches(self) -> ExitStack:
+        """Install the stub everywhere the tools look up the LLM call helpers."""
+        stack = ExitStack()
+        for module in ("backend.tools.task_tools", "backend.tools.interaction_messages"):
+            stack.enter_context(patch(f"{module}._make_llm_call", self.call))
+            stack.enter_context(patch(f"{module}._amake_llm_call", self.acall))
+        return stack
+
+
+def answer(prompt: str) -> str:
+    """Reply to an interrupt the way a cooperative user would."""
+    return "yes" if "(yes/no)" in prompt else "Please make it more specific"
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _make_checkpointer(kind: str, tmpdir: str):
+    if kind == "sqlite":
+        from backend.storage import SQLiteCheckpointSaver
+        return SQLiteCheckpointSaver(os.path.join(tmpdir, "checkpoints.db"))
+    from langgraph.checkpoint.memory import InMemorySaver
+    return InMemorySaver()
+
+
+def _run_once(graph, mode: str) -> int:
+    """Drive one run to completion, resuming after every interrupt. Returns the number of resumes."""
+    from langgraph.types import Command
+    from backend.types import TaskAgentState
+
+    config = {"configurable": {"thread_id": uuid.uuid4().hex}}
+    graph_input = TaskAgentState(input="Do the dishes by 2026-11-01")
+    resumes = 0
+    while True:
+        if mode == "async":
+            result = asyncio.run(graph.ainvoke(graph_input, config))
+        else:
+            result = graph.invoke(graph_input, config)
+        interrupts = result.get("__interrupt__")
+        if not interrupts:
+            return resumes
+        graph_input = Command(resume=answer(interrupts[0].value["prompt"]))
+        resumes += 1
+
+
+def run_scenario(name: str, runs: int, warmup: int, latency: float, mode: str, checkpointer: str) -> dict:
+    from backend.graphs.task_agent import builder
+
+    stub = StubLLM(SCENARIOS[name], latency)
+    with tempfile.TemporaryDirectory() as tmpdir, stub.patches():
+        graph = builder.compile(checkpointer=_make_checkpointer(checkpointer, tmpdir))
+        for _ in range(warmup):
+            stub.reset()
+            _run_once(graph, mode)
+
+        stub.calls = 0
+        latencies = []
+        resumes = 0
+        start = time.perf_counter()
+        for _ in range(runs):
+            stub.reset()
+            run_start = time.perf_counter()
+            resumes += _run_once(graph, mode)
+            latencies.append(time.perf_counter() - run_start)
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "runs": runs,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "runs_per_sec": runs / elapsed if elapsed else 0.0,
+        "llm_calls_per_run": stub.calls / runs,
+        "resumes_per_run": resumes / runs,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, fail_threshold: Optional[float]) -> bool:
+    """Print per-scenario changes against a baseline. Returns False if p50 regressed past the threshold."""
+    previous = {r["scenario"]: r for r in baseline["results"]}
+    ok = True
+    print(f"\ncompared with {baseline['meta'].get('revision') or 'baseline'}")
+    print(f"{'scenario':<22}{'p50 change':>12}{'p99 change':>12}{'runs/s change':>15}")
+    for result in current["results"]:
+        before = previous.get(result["scenario"])
+        if before is None:
+            continue
+
+        def change(key: str) -> float:
+            return (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+
+        p50 = change("p50_ms")
+        print(f"{result['scenario']:<22}{p50:>+11.1f}%{change('p99_ms'):>+11.1f}%{change('runs_per_sec'):>+14.1f}%")
+        if fail_threshold is not None and p50 > fail_threshold:
+            ok = False
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200, help="Measured runs per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured runs per scenario")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the stub LLM sleeps per call")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync", help="Drive the graph with invoke or ainvoke")
+    parser.add_argument("--checkpointer", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Run only these scenarios")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    parser.add_argument("--compare", dest="baseline_path", help="Compare against results written by --json")
+    parser.add_argument("--fail-threshold", type=float, help="Exit non-zero if any p50 regresses by more than this percent")
+    args = parser.parse_args()
+
+    os.environ.setdefault("TASK_DB_PATH", ":memory:")
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    results = [
+        run_scenario(name, args.runs, args.warmup, args.latency, args.mode, args.checkpointer)
+        for name in args.scenario or SCENARIOS
+    ]
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "mode": args.mode,
+            "checkpointer": args.checkpointer,
+            "latency": args.latency,
+            "runs": args.runs,
+        },
+        "results": results,
+    }
+
+    print(f"{'scenario':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'runs/s':>10}{'llm/run':>9}{'peak MiB':>10}")
+    for r in results:
+        print(f"{r['scenario']:<22}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['runs_per_sec']:>10.1f}{r['llm_calls_per_run']:>9.1f}{r['peak_rss_mb']:>10.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline_path:
+        with open(args.baseline_path) as f:
+            baseline = json.load(f)
+        if not compare(baseline, report, args.fail_threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measure time-to-first-byte of POST /tasks/stream against POST /tasks.
+
+Starts the API in process next to a stub OpenAI server that streams its
+answers in ~4-character chunks. ``--latency`` is the time to the first chunk
+and ``--token-interval`` is the gap between chunks. The stub is scripted so
+every task needs clarification (extraction with low confidence, judgment
+"fail"), with CLARIFICATION_MODE=rich so the clarification message is
+written, and streamed, by the LLM. Non-streamed answers arrive whole after
+``--latency``, so the streamed total is longer by the chunk delays.
+
+For each endpoint it reports the p50/p95 of:
+- first_node: first node progress event (streaming only)
+- first_token: first LLM token forwarded to the client (streaming only)
+- total: the complete response
+
+Usage:
+    python -m benchmarks.bench_stream --runs 20 --latency 0.3 --token-interval 0.02 [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.stub_openai import DEFAULT_RESPONSES, StubOpenAIServer
+
+CLARIFY_RESPONSES = {
+    "task_extraction": {**DEFAULT_RESPONSES["task_extraction"], "confidence": 0.5, "concerns": ["Which dishes?"]},
+    "task_judgment": {"judgment": "fail", "reason": "The task is vague", "additional_questions": []},
+    "clarification": {"message": "Here is the task I understood: do the dishes. Which dishes do you mean, "
+                                 "and is there a particular time you would like them done by?"},
+}
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    # Nearest-rank percentile
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)] if sorted_values else 0.0
+
+
+async def _plain(client: httpx.AsyncClient, n: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    response = await client.post("/tasks", json={"task": f"Do the dishes ({n})"})
+    response.raise_for_status()
+    return {"total": time.perf_counter() - start}
+
+
+async def _streamed(client: httpx.AsyncClient, n: int) -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+    async with client.stream("POST", "/tasks/stream", json={"task": f"Do the dishes ({n})"}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("event: "):
+                continue
+            elapsed = time.perf_counter() - start
+            if line == "event: node":
+                timings.setdefault("first_node", elapsed)
+            elif line == "event: token":
+                timings.setdefault("first_token", elapsed)
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+async def measure(url: str, runs: int) -> List[dict]:
+    results = []
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        for name, send in (("POST /tasks", _plain), ("POST /tasks/stream", _streamed)):
+            samples: Dict[str, List[float]] = {}
+            for n in range(runs):
+                for key, value in (await send(client, n)).items():
+                    samples.setdefault(key, []).append(value)
+            result = {"endpoint": name, "runs": runs}
+            for key, values in samples.items():
+                values.sort()
+                result[f"{key}_p50_ms"] = _percentile(values, 50) * 1000
+                result[f"{key}_p95_ms"] = _percentile(values, 95) * 1000
+            results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Requests per endpoint")
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub time to first chunk in seconds")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="Stub delay between chunks in seconds")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+
+    stub = StubOpenAIServer(responses=CLARIFY_RESPONSES, latency=args.latency, token_interval=args.token_interval)
+    with tempfile.TemporaryDirectory() as tmpdir, stub:
+        os.environ["OPENAI_API_KEY"] = "stub-key"
+        os.environ["OPENAI_BASE_URL"] = stub.base_url
+        os.environ["CLARIFICATION_MODE"] = "rich"
+        os.environ.setdefault("TASK_DB_PATH", os.path.join(tmpdir, "tasks.db"))
+        os.environ.setdefault("CHECKPOINT_DB_PATH", os.path.join(tmpdir, "checkpoints.db"))
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        from benchmarks.loadtest import InProcessServer
+
+        server = InProcessServer().start()
+        try:
+            results = asyncio.run(measure(server.url, args.runs))
+        finally:
+            server.stop()
+
+    print(f"{'endpoint':<20}{'first node p50':>17}{'first token p50':>17}{'total p50':>11}{'total p95':>11}")
+    for r in results:
+        first_node = f"{r['first_node_p50_ms']:.0f} ms" if "first_node_p50_ms" in r else "-"
+        first_token = f"{r['first_token_p50_ms']:.0f} ms" if "first_token_p50_ms" in r else "-"
+        print(f"{r['endpoint']:<20}{first_node:>17}{first_token:>17}"
+              f"{r['total_p50_ms']:>8.0f} ms{r['total_p95_ms']:>8.0f} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Load test the FastAPI/MCP server against a local fake OpenAI endpoint.
+
+Starts ``backend.mcp_server:app`` under uvicorn on a background thread, next
+to a ``StubOpenAIServer`` with programmable latency and error rate. Then it
+drives ``POST /tasks`` either open-loop at a target request rate (``--rps``)
+or closed-loop with N concurrent clients (``--concurrency``). A probe
+coroutine on the server's event loop measures how late its timers fire, which
+shows when blocking work stalls the loop.
+
+Reports throughput, a latency histogram with percentiles, response outcomes
+and error rate, and event-loop lag. The load generator shares the process
+(and the GIL) with an in-process server. To size real workers, start the
+server separately and pass ``--url``; loop lag is then not measured.
+
+Usage:
+    python -m benchmarks.loadtest --rps 20 --duration 30 --llm-latency 0.2
+    python -m benchmarks.loadtest --concurrency 50 --duration 30 --llm-error-rate 0.05 [--json results.json]
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.stub_openai import StubOpenAIServer
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+OK_OUTCOMES = ("success", "pending")
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+class LoopLagProbe:
+    """Samples how late ``asyncio.sleep`` wakes up on the loop it runs on."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stopped = False
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._stopped:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def stop(self) -> None:
+        self._stopped = True
+
+    def reset(self) -> None:
+        self.samples = []
+
+    def summary(self) -> Dict[str, float]:
+        samples = sorted(self.samples)
+        return {
+            "samples": len(samples),
+            "p50_ms": _percentile(samples, 50) * 1000,
+            "p99_ms": _percentile(samples, 99) * 1000,
+            "max_ms": (samples[-1] if samples else 0.0) * 1000,
+        }
+
+
+class InProcessServer:
+    """Runs the FastAPI app under uvicorn on its own thread and event loop, with a lag probe on that loop."""
+
+    def __init__(self, host: str = "127.0.0.1", lag_interval: float = 0.01):
+        import uvicorn
+        from backend.mcp_server import app
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, 0))
+        self.server = uvicorn.Server(uvicorn.Config(app, log_level="warning", access_log=False))
+        self.probe = LoopLagProbe(lag_interval)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._socket.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def _serve(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        probe = loop.create_task(self.probe.run())
+        try:
+            loop.run_until_complete(self.server.serve(sockets=[self._socket]))
+        finally:
+            self.probe.stop()
+            loop.run_until_complete(probe)
+            loop.close()
+
+    def start(self) -> "InProcessServer":
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        while not self.server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("uvicorn failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        if self._thread is not None:
+            self._thread.join()
+        self._socket.close()
+
+
+class Recorder:
+    """Collects per-request latency and outcome."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.outcomes: Counter = Counter()
+
+    def record(self, latency: float, outcome: str) -> None:
+        self.latencies.append(latency)
+        self.outcomes[outcome] += 1
+
+    def histogram(self) -> Dict[str, int]:
+        counts = Counter()
+        for latency in self.latencies:
+            ms = latency * 1000
+            bucket = next((f"<={b}ms" for b in BUCKETS_MS if ms <= b), f">{BUCKETS_MS[-1]}ms")
+            counts[bucket] += 1
+        labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {label: counts[label] for label in labels}
+
+
+async def _send(client: httpx.AsyncClient, recorder: Recorder, n: int) -> None:
+    start = time.perf_counter()
+    try:
+        # Distinct inputs, so concurrent requests are not coalesced into one LLM call
+        response = await client.post("/tasks", json={"task": f"Load test task {n}: water the plants by Friday"})
+        if response.status_code == 200:
+            outcome = response.json().get("status", "success")
+        else:
+            outcome = f"http_{response.status_code}"
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+    recorder.record(time.perf_counter() - start, outcome)
+
+
+async def run_rps(url: str, rps: float, duration: float, timeout: float) -> Recorder:
+    """Open loop: start requests on a fixed schedule, whether or not earlier ones have finished."""
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        pending = []
+        for n in range(int(rps * duration)):
+            delay = start + n / rps - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            pending.append(asyncio.ensure_future(_send(client, recorder, n)))
+        await asyncio.gather(*pending)
+    return recorder
+
+
+async def run_concurrency(url: str, concurrency: int, duration: float, timeout: float) -> Recorder:
+    """Closed loop: ``concurrency`` clients each send their next request as soon as the last one finishes."""
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+        counter = iter(range(1 << 62))
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                await _send(client, recorder, next(counter))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return recorder
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    latencies = sorted(recorder.latencies)
+    total = len(latencies)
+    errors = sum(count for outcome, count in recorder.outcomes.items() if outcome not in OK_OUTCOMES)
+    return {
+        "requests": total,
+        "seconds": elapsed,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "error_rate": errors / total if total else 0.0,
+        "outcomes": dict(recorder.outcomes),
+        "latency_ms": {
+            "p50": _percentile(latencies, 50) * 1000,
+            "p95": _percentile(latencies, 95) * 1000,
+            "p99": _percentile(latencies, 99) * 1000,
+            "max": (latencies[-1] if latencies else 0.0) * 1000,
+        },
+        "histogram": recorder.histogram(),
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"requests      {report['requests']} in {report['seconds']:.1f}s "
+          f"({report['throughput_rps']:.1f} req/s)")
+    print(f"error rate    {report['error_rate']:.2%}")
+    print("outcomes      " + ", ".join(f"{k}={v}" for k, v in sorted(report["outcomes"].items())))
+    latency = report["latency_ms"]
+    print(f"latency ms    p50={latency['p50']:.1f} p95={latency['p95']:.1f} "
+          f"p99={latency['p99']:.1f} max={latency['max']:.1f}")
+    peak = max(report["histogram"].values()) or 1
+    for label, count in report["histogram"].items():
+        print(f"  {label:>10} {count:>7} {'#' * round(40 * count / peak)}")
+    if "loop_lag_ms" in report:
+        lag = report["loop_lag_ms"]
+        print(f"loop lag ms   p50={lag['p50_ms']:.2f} p99={lag['p99_ms']:.2f} max={lag['max_ms']:.2f}")
+    if "llm" in report:
+        llm = report["llm"]
+        print(f"llm stub      {llm['requests']} calls ({llm['calls_per_request']:.1f}/request), "
+              f"{llm['errors']} injected errors, {llm['connections']} connections")
+    if "limiter" in report:
+        limiter = report["limiter"]
+        print(f"llm limiter   window={limiter['concurrency_limit']} admitted={limiter['admitted']} "
+              f"throttled={limiter['throttled']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    load = parser.add_mutually_exclusive_group(required=True)
+    load.add_argument("--rps", type=float, help="Target request rate (open loop)")
+    load.add_argument("--concurrency", type=int, help="Number of concurrent clients (closed loop)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load for")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client timeout per request in seconds")
+    parser.add_argument("--url", help="Load test an already running server instead of starting one")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="Fake provider latency per call in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Extra random provider latency in seconds")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of provider calls that fail")
+    parser.add_argument("--llm-error-status", type=int, default=500, help="HTTP status for failed provider calls")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+
+    stub = StubOpenAIServer(latency=args.llm_latency, latency_jitter=args.llm_jitter,
+                            error_rate=args.llm_error_rate, error_status=args.llm_error_status)
+    server: Optional[InProcessServer] = None
+    with tempfile.TemporaryDirectory() as tmpdir, stub:
+        url = args.url
+        if url is None:
+            os.environ["OPENAI_API_KEY"] = "stub-key"
+            os.environ["OPENAI_BASE_URL"] = stub.base_url
+            os.environ.setdefault("TASK_DB_PATH", os.path.join(tmpdir, "tasks.db"))
+            os.environ.setdefault("CHECKPOINT_DB_PATH", os.path.join(tmpdir, "checkpoints.db"))
+            os.environ.setdefault("LOG_LEVEL", "WARNING")
+            server = InProcessServer().start()
+            url = server.url
+        try:
+            if server is not None:
+                server.probe.reset()
+            start = time.perf_counter()
+            if args.rps:
+                recorder = asyncio.run(run_rps(url, args.rps, args.duration, args.timeout))
+            else:
+                recorder = asyncio.run(run_concurrency(url, args.concurrency, args.duration, args.timeout))
+            report = summarize(recorder, time.perf_counter() - start)
+            report["mode"] = {"rps": args.rps} if args.rps else {"concurrency": args.concurrency}
+            if server is not None:
+                report["loop_lag_ms"] = server.probe.summary()
+                report["llm"] = {
+                    "requests": stub.requests_served,
+                    "errors": stub.errors_served,
+                    "connections": stub.connections_opened,
+                    "calls_per_request": stub.requests_served / report["requests"] if report["requests"] else 0.0,
+                }
+                from backend.llm.limiter import get_llm_limiter
+                report["limiter"] = get_llm_limiter().stats()
+        finally:
+            if server is not None:
+                server.stop()
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
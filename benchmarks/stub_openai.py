@@ -0,0 +1,262 @@
+"""
+A local, OpenAI-compatible stub HTTP server for benchmarks.
+
+The server answers ``POST /v1/chat/completions`` with scripted JSON chosen by
+the system prompt of the request, and counts the TCP connections and requests
+it receives. It speaks HTTP/1.1 with keep-alive so connection reuse by the
+client is visible in ``connections_opened``. Latency and an error rate can be
+injected to emulate a slow or flaky provider.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+from backend.prompts.task_prompts import (
+    TASK_EXTRACTION_SYSTEM_PROMPT,
+    TASK_JUDGMENT_SYSTEM_PROMPT,
+    TASK_EXTRACTION_AND_JUDGMENT_SYSTEM_PROMPT,
+    SUBTASK_GENERATION_SYSTEM_PROMPT,
+    SUBTASK_JUDGMENT_SYSTEM_PROMPT,
+    SUBTASK_DECISION_PROMPT
+)
+
+# Canned responses that drive the task agent straight from extraction to creation.
+DEFAULT_RESPONSES: Dict[str, dict] = {
+    "task_extraction": {
+        "task": "Do the dishes",
+        "confidence": 0.95,
+        "concerns": [],
+        "questions": [],
+        "is_subtaskable": False,
+        "due_date": "2026-11-01",
+        "is_open_ended": False
+    },
+    "task_judgment": {
+        "judgment": "pass",
+        "reason": "The task is clear and specific enough to take action on",
+        "additional_questions": []
+    },
+    "task_extraction_judgment": {
+        "task": "Do the dishes",
+        "confidence": 0.95,
+        "concerns": [],
+        "questions": [],
+        "is_subtaskable": False,
+        "due_date": "2026-11-01",
+        "is_open_ended": False,
+        "judgment": "pass",
+        "reason": "The task is clear and specific enough to take action on",
+        "additional_questions": []
+    },
+    "subtask_generation": {
+        "subtasks": ["Fill sink with hot water", "Scrub dishes", "Rinse and dry"],
+        "confidence": 0.9,
+        "concerns": [],
+        "questions": []
+    },
+    "subtask_judgment": {
+        "judgment": "pass",
+        "reason": "User approved the subtasks"
+    },
+    "subtask_decision": {
+        "subtasks": ["Fill sink with hot water", "Scrub dishes", "Rinse and dry"],
+        "confidence": 0.9,
+        "concerns": [],
+        "questions": [],
+        "user_accepted_subtasks": True
+    },
+    "clarification": {
+        "message": "Could you tell me a bit more about this task?",
+        "concerns": [],
+        "questions": []
+    }
+}
+
+_PROMPT_NAMES = {
+    TASK_EXTRACTION_SYSTEM_PROMPT: "task_extraction",
+    TASK_JUDGMENT_SYSTEM_PROMPT: "task_judgment",
+    TASK_EXTRACTION_AND_JUDGMENT_SYSTEM_PROMPT: "task_extraction_judgment",
+    SUBTASK_GENERATION_SYSTEM_PROMPT: "subtask_generation",
+    SUBTASK_JUDGMENT_SYSTEM_PROMPT: "subtask_judgment",
+    SUBTASK_DECISION_PROMPT: "subtask_decision",
+}
+
+
+def prompt_name(system_msg: str) -> str:
+    """Map a system prompt to the name of the tool that sent it."""
+    return _PROMPT_NAMES.get(system_msg, "clarification")
+
+
+def default_responder(responses: Dict[str, dict]) -> Callable[[dict], str]:
+    """Build a responder that returns the scripted JSON for each prompt."""
+    def respond(request: dict) -> str:
+        system_msg = request["messages"][0]["content"]
+        return json.dumps(responses[prompt_name(system_msg)])
+    return respond
+
+
+class StubOpenAIServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server emulating the chat completions endpoint.
+
+    Args:
+        latency: Seconds to wait before answering each completion request
+        latency_jitter: Extra random delay of up to this many seconds
+        error_rate: Fraction of completion requests answered with ``error_status``
+        error_status: HTTP status used for injected errors, e.g. 500 or 429
+        token_interval: Delay between chunks of a streamed (``stream=True``) response;
+            ``latency`` is then the time to the first chunk
+
+    Attributes:
+        connections_opened: Number of TCP connections accepted
+        requests_served: Number of completion requests answered
+        errors_served: Number of injected error responses
+    """
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 responses: Optional[Dict[str, dict]] = None,
+                 responder: Optional[Callable[[dict], str]] = None,
+                 latency: float = 0.0, latency_jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 500, token_interval: float = 0.0):
+        super().__init__((host, port), _CompletionHandler)
+        self.responder = responder or default_responder({**DEFAULT_RESPONSES, **(responses or {})})
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.token_interval = token_interval
+        self.connections_opened = 0
+        self.requests_served = 0
+        self.errors_served = 0
+        self._counter_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def process_request(self, request, client_address):
+        with self._counter_lock:
+            self.connections_opened += 1
+        super().process_request(request, client_address)
+
+    def count_request(self) -> None:
+        with self._counter_lock:
+            self.requests_served += 1
+
+    def simulate_provider(self) -> Optional[int]:
+        """Sleep for the configured latency and return an error status if this request should fail."""
+        delay = self.latency + (random.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            with self._counter_lock:
+                self.errors_served += 1
+            return self.error_status
+        return None
+
+    def reset_counters(self) -> None:
+        with self._counter_lock:
+            self.connections_opened = 0
+            self.requests_served = 0
+            self.errors_served = 0
+
+    def start(self) -> "StubOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StubOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class _CompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        self.server.count_request()
+        error_status = self.server.simulate_provider()
+        if error_status is not None:
+            self._send_json(error_status, {"error": {"message": "Injected error", "type": "server_error"}})
+            return
+        content = self.server.responder(request)
+        prompt_tokens = sum(len(m.get("content", "")) for m in request.get("messages", [])) // 4
+        completion_tokens = len(content) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        if request.get("stream"):
+            self._send_stream(request, content, usage)
+            return
+        self._send_json(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        })
+
+    def _send_stream(self, request: dict, content: str, usage: dict) -> None:
+        """Send ``content`` as server-sent chat.completion.chunk events, about one token (4 chars) each."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(choices: list, chunk_usage: Optional[dict] = None) -> None:
+            body = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": request.get("model", "stub"), "choices": choices, "usage": chunk_usage}
+            self._write_chunk(f"data: {json.dumps(body)}\n\n".encode())
+
+        for start in range(0, len(content), 4):
+            if start and self.server.token_interval:
+                time.sleep(self.server.token_interval)
+            chunk([{"index": 0, "delta": {"content": content[start:start + 4]}, "finish_reason": None}])
+        chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if request.get("stream_options", {}).get("include_usage"):
+            chunk([], usage)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 @pytest.fixture
 def mock_openai():
@@ -7,4 +7,41 @@ def mock_openai():
         mock_client = Mock()
         mock_get_client.return_value = mock_client
         mock_client.chat.completions.create = Mock()
-        yield mock_client 
\ No newline at end of file
+        yield mock_client
+
+@pytest.fixture
+def mock_async_openai():
+    with patch('backend.tools.task_tools.get_async_client') as mock_get_client:
+        mock_client = Mock()
+        mock_get_client.return_value = mock_client
+        mock_client.chat.completions.create = AsyncMock()
+        yield mock_client
+
+@pytest.fixture(autouse=True)
+def task_store():
+    """Give every test a throwaway in-memory task store."""
+    from backend.storage import SQLiteTaskStore, configure_task_store
+    store = SQLiteTaskStore(":memory:")
+    configure_task_store(store)
+    yield store
+    configure_task_store(None)
+    store.close()
+
+@pytest.fixture(autouse=True)
+def checkpointer():
+    """Give every test a throwaway in-memory graph checkpointer."""
+    from backend.storage import SQLiteCheckpointSaver, configure_checkpointer
+    saver = SQLiteCheckpointSaver(":memory:")
+    configure_checkpointer(saver)
+    yield saver
+    configure_checkpointer(None)
+    saver.close()
+
+@pytest.fixture(autouse=True)
+def circuit_breaker():
+    """Give every test a closed circuit breaker, so failures injected by one test cannot open it for the next."""
+    from backend.llm.breaker import CircuitBreaker, BreakerSettings, configure_circuit_breaker
+    breaker = CircuitBreaker(BreakerSettings())
+    configure_circuit_breaker(breaker)
+    yield breaker
+    configure_circuit_breaker(None)
@@ -1,3 +1,5 @@
+import asyncio
+import threading
 from backend.graphs.task_agent import (
     TaskAgentState, 
     extract_task_node, 
@@ -8,7 +10,15 @@ from backend.graphs.task_agent import (
     retry_task_node,
     ask_about_subtasks_node,
     retry_subtasks_node,
-    judge_task_node
+    judge_task_node,
+    aask_about_task_node,
+    ajudge_subtasks_node,
+    aretry_subtasks_node,
+    acreate_task_node,
+    aask_to_subtask_node,
+    extract_and_judge_task_node,
+    graph,
+    fused_graph
 )
 from backend.types import TaskMetadata, SubtaskMetadata, JudgmentType, TaskJudgment, SubtaskJudgment, UserFeedbackRetry
 from unittest.mock import Mock, patch
@@ -62,7 +72,8 @@ def test_generate_subtasks_node(mock_openai):
     assert result.subtask_metadata.concerns == []
     assert result.subtask_metadata.questions == []
 
-def test_judge_subtasks_node_pass(mock_openai):
+def test_judge_subtasks_node_pass(mock_openai, monkeypatch):
+    monkeypatch.setenv("JUDGE_FAST_PATH", "false")
     mock_openai.chat.completions.create.return_value.choices = [
         Mock(message=Mock(content='{"judgment": "pass", "reason": "Subtasks are well-structured"}'))
     ]
@@ -85,7 +96,8 @@ def test_judge_subtasks_node_pass(mock_openai):
     assert result.subtask_judgment.judgment == JudgmentType.PASS
     assert "well-structured" in result.subtask_judgment.reason.lower()
 
-def test_judge_subtasks_node_fail(mock_openai):
+def test_judge_subtasks_node_fail(mock_openai, monkeypatch):
+    monkeypatch.setenv("JUDGE_FAST_PATH", "false")
     mock_openai.chat.completions.create.return_value.choices = [
         Mock(message=Mock(content='{"judgment": "fail", "reason": "Subtasks are incomplete"}'))
     ]
@@ -163,6 +175,14 @@ def test_ask_to_subtask_node_valid_yes():
             result = ask_to_subtask_node(state)
             assert result.user_wants_subtasks is True
 
+def test_aask_to_subtask_node_valid_yes():
+    state = TaskAgentState(
+        task_metadata=TaskMetadata(task="do the dishes", confidence=0.9, concerns=[], questions=[], is_subtaskable=True)
+    )
+    with patch('backend.graphs.task_agent.interrupt', return_value="yes"):
+        result = asyncio.run(aask_to_subtask_node(state))
+    assert result.user_wants_subtasks is True
+
 def test_ask_to_subtask_node_valid_no():
     """Test processing various valid 'no' responses."""
     valid_no_responses = ['no', 'NO', 'No', 'n', 'N', 'false', 'False', 'FALSE', 'f', 'F', '0', 'off']
@@ -511,4 +531,183 @@ def test_ask_to_subtask_conditional_edges_retry():
     state_yes = state.model_copy(update={"user_wants_subtasks": True})
     state_no = state.model_copy(update={"user_wants_subtasks": False})
     assert edge_lambda(state_yes) == "yes"
-    assert edge_lambda(state_no) == "no" 
\ No newline at end of file
+    assert edge_lambda(state_no) == "no" 
+def test_graph_ainvoke_uses_async_nodes(mock_openai, mock_async_openai, monkeypatch):
+    monkeypatch.setenv("JUDGE_FAST_PATH", "false")
+    mock_async_openai.chat.completions.create.side_effect = [
+        Mock(choices=[Mock(message=Mock(content='{"task": "do the dishes", "confidence": 0.9, "concerns": [], "questions": [], "due_date": "2024-03-20"}'))]),
+        Mock(choices=[Mock(message=Mock(content='{"judgment": "pass", "reason": "Task is clear"}'))]),
+    ]
+    result = asyncio.run(graph.ainvoke(TaskAgentState(input="Do the dishes by March 20th")))
+    assert result["task_metadata"].task == "do the dishes"
+    assert result["task_creation_confirmed"] is True
+    assert mock_async_openai.chat.completions.create.await_count == 2
+    mock_openai.chat.completions.create.assert_not_called()
+
+def test_acreate_task_node_saves_off_the_event_loop():
+    threads = []
+
+    def create_task(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return {"id": 7}
+
+    state = TaskAgentState(task_metadata=TaskMetadata(task="do the dishes", confidence=0.9, concerns=[], questions=[],
+                                                      due_date="tomorrow"))
+    with patch("backend.graphs.task_agent.create_task", side_effect=create_task):
+        result = asyncio.run(acreate_task_node(state))
+    assert result.task_id == 7
+    assert result.task_creation_confirmed is True
+    assert threads and threads[0] is not threading.main_thread()
+
+def test_aask_about_task_node_first_run(mock_async_openai, monkeypatch):
+    monkeypatch.setenv("CLARIFICATION_MODE", "rich")
+    mock_async_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"message": "Which dishes do you mean?"}'))
+    ]
+    state = TaskAgentState(
+        task_metadata=TaskMetadata(task="do the dishes", confidence=0.5, concerns=["Task is vague"], questions=["Which dishes?"]),
+        task_judgment=TaskJudgment(judgment=JudgmentType.FAIL, reason="Task is too vague")
+    )
+    with patch('backend.graphs.task_agent.interrupt') as mock_interrupt:
+        mock_interrupt.side_effect = GraphInterrupt({"prompt": "Which dishes do you mean?"})
+        with pytest.raises(GraphInterrupt):
+            asyncio.run(aask_about_task_node(state))
+        mock_interrupt.assert_called_once_with({"prompt": "Which dishes do you mean?"})
+    assert state.last_user_message == "Which dishes do you mean?"
+
+def test_ajudge_subtasks_node_retry_behavior(mock_async_openai):
+    mock_async_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"judgment": "fail", "reason": "Subtasks are incomplete"}'))
+    ]
+    state = TaskAgentState(
+        task_metadata=TaskMetadata(task="do the dishes", confidence=0.9, concerns=[], questions=[]),
+        subtask_metadata=SubtaskMetadata(subtasks=["Fill sink"], confidence=0.5, concerns=["Missing steps"], questions=[])
+    )
+    for _ in range(2):
+        result = asyncio.run(ajudge_subtasks_node(state))
+        assert result.subtask_judgment.judgment == JudgmentType.FAIL
+    result = asyncio.run(ajudge_subtasks_node(state))
+    assert result.subtask_judgment.judgment == JudgmentType.PASS
+    assert "Max retries reached" in result.subtask_judgment.reason
+
+def test_aretry_subtasks_node_preserves_user_acceptance(mock_async_openai):
+    mock_async_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"subtasks": ["Scrub", "Dry"], "confidence": 0.9, "concerns": [], "questions": [], "user_accepted_subtasks": true}'))
+    ]
+    state = TaskAgentState(
+        task_metadata=TaskMetadata(task="do the dishes", confidence=0.9, concerns=[], questions=[]),
+        subtask_metadata=SubtaskMetadata(subtasks=["Scrub"]),
+        user_feedback="looks good, add drying"
+    )
+    result = asyncio.run(aretry_subtasks_node(state))
+    assert result.subtask_metadata.subtasks == ["Scrub", "Dry"]
+    assert result.user_accepted_subtasks is True
+    assert result.user_feedback is None
+
+def test_aask_about_task_node_renders_template_without_llm(mock_async_openai):
+    state = TaskAgentState(
+        task_metadata=TaskMetadata(task="do the dishes", confidence=0.5, concerns=["Task is vague"], questions=["Which dishes?"]),
+        task_judgment=TaskJudgment(judgment=JudgmentType.FAIL, reason="Task is too vague")
+    )
+    with patch('backend.graphs.task_agent.interrupt') as mock_interrupt:
+        mock_interrupt.side_effect = GraphInterrupt()
+        with pytest.raises(GraphInterrupt):
+            asyncio.run(aask_about_task_node(state))
+    assert "- do the dishes" in state.last_user_message
+    assert "Which dishes?" in state.last_user_message
+    mock_async_openai.chat.completions.create.assert_not_called()
+
+def test_extract_and_judge_task_node_applies_judgment(mock_openai):
+    mock_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"task": "do the dishes", "confidence": 0.5, "concerns": ["Vague"], "questions": [], '
+                                  '"judgment": "fail", "reason": "Task is too vague"}'))
+    ]
+    state = TaskAgentState(input="Do the dishes", user_feedback="stale feedback")
+    result = extract_and_judge_task_node(state)
+    assert result.task_metadata.task == "do the dishes"
+    assert result.task_judgment.judgment == JudgmentType.FAIL
+    assert result.task_judgment_retry.retries == 1
+    assert result.user_feedback is None
+
+def test_fused_graph_uses_one_call_before_routing(mock_async_openai):
+    mock_async_openai.chat.completions.create.side_effect = [
+        Mock(choices=[Mock(message=Mock(content='{"task": "do the dishes", "confidence": 0.9, "concerns": [], "questions": [], '
+                                                '"due_date": "2026-11-01", "judgment": "pass", "reason": "Task is clear"}'))]),
+    ]
+    result = asyncio.run(fused_graph.ainvoke(TaskAgentState(input="Do the dishes by November 1st")))
+    assert result["task_metadata"].task == "do the dishes"
+    assert result["task_creation_confirmed"] is True
+    assert mock_async_openai.chat.completions.create.await_count == 1
+
+def test_graph_fast_path_skips_llm_judgment(mock_openai, mock_async_openai):
+    mock_async_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"task": "do the dishes", "confidence": 0.9, "concerns": [], "questions": [], "due_date": "2024-03-20"}'))
+    ]
+    result = asyncio.run(graph.ainvoke(TaskAgentState(input="Do the dishes by March 20th")))
+    assert result["task_judgment"].judgment == JudgmentType.PASS
+    assert result["task_creation_confirmed"] is True
+    assert mock_async_openai.chat.completions.create.await_count == 1
+
+def test_due_date_prepass_fills_in_what_the_llm_missed(mock_async_openai):
+    from backend.metrics import DUE_DATE_PREPASS
+    filled = DUE_DATE_PREPASS.value(outcome="filled")
+    mock_async_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"task": "Renew passport", "confidence": 0.9, "concerns": [], '
+                                  '"questions": ["When is this due?"]}'))
+    ]
+    result = asyncio.run(graph.ainvoke(TaskAgentState(input="renew passport by 2026-11-03")))
+    assert result["task_metadata"].due_date == "2026-11-03"
+    assert result["task_metadata"].questions == []
+    assert result["due_date_confirmed"] is True
+    # The rules pass the task, so there is no judgment call and no clarification loop
+    assert result["task_judgment"].judgment == JudgmentType.PASS
+    assert mock_async_openai.chat.completions.create.await_count == 1
+    assert DUE_DATE_PREPASS.value(outcome="filled") == filled + 1
+
+def test_due_date_prepass_keeps_the_llm_date_and_reads_open_ended(mock_openai):
+    mock_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"task": "Renew passport", "confidence": 0.9, "concerns": [], "questions": [], '
+                                  '"due_date": "Nov 3rd"}'))
+    ]
+    result = extract_task_node(TaskAgentState(input="renew passport by 2026-11-03"))
+    assert result.task_metadata.due_date == "Nov 3rd"
+    mock_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"task": "Learn piano", "confidence": 0.9, "concerns": [], "questions": []}'))
+    ]
+    result = extract_task_node(TaskAgentState(input="learn piano, no rush"))
+    assert result.task_metadata.is_open_ended is True
+    assert result.due_date_confirmed is True
+
+def test_fused_prepass_replaces_a_missing_due_date_failure(mock_openai):
+    mock_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"task": "Call the bank", "confidence": 0.9, "concerns": [], "questions": [], '
+                                  '"judgment": "fail", "reason": "No due date", '
+                                  '"additional_questions": ["What is the deadline?"]}'))
+    ]
+    result = extract_and_judge_task_node(TaskAgentState(input="call the bank tomorrow"))
+    assert result.task_metadata.due_date == "tomorrow"
+    assert result.task_metadata.questions == []
+    assert result.task_judgment.judgment == JudgmentType.PASS
+    assert result.task_judgment_retry.retries == 0
+
+def test_due_date_prepass_can_be_disabled(mock_openai, monkeypatch):
+    monkeypatch.setenv("DUE_DATE_PREPASS", "false")
+    mock_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"task": "Call the bank", "confidence": 0.9, "concerns": [], "questions": []}'))
+    ]
+    result = extract_task_node(TaskAgentState(input="call the bank tomorrow"))
+    assert result.task_metadata.due_date is None
+    assert result.due_date_confirmed is False
+
+def test_retry_task_node_reads_the_due_date_from_the_answer(mock_openai):
+    mock_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"task": "do the dishes", "confidence": 0.9, "concerns": [], "questions": []}'))
+    ]
+    state = TaskAgentState(
+        input="do the dishes",
+        task_metadata=TaskMetadata(task="do the dishes", confidence=0.9, concerns=[], questions=["When?"]),
+        user_feedback="end of the week please"
+    )
+    result = retry_task_node(state)
+    assert result.task_metadata.due_date == "end of the week"
+    assert result.due_date_confirmed is True
@@ -0,0 +1,27 @@
+"""
+Test doubles shared by several test modules.
+
+Import them with ``from helpers import ...``: pytest puts this directory,
+which holds the root conftest.py, on ``sys.path``.
+"""
+
+from unittest.mock import Mock
+
+
+class FakeClock:
+    """A time source for code that takes a ``clock`` callable; advance it by setting ``now``."""
+
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class StatusError(Exception):
+    """An error shaped like an OpenAI or Anthropic HTTP error, with a status code and response headers."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = Mock(headers=headers or {})
@@ -0,0 +1,91 @@
+import pytest
+
+from backend.llm.breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    BreakerSettings,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from backend.llm.cache import bypass_llm_cache
+from helpers import FakeClock, StatusError
+
+
+def _call(breaker, error=None):
+    probe = breaker.before_call()
+    breaker.after_call(probe, error)
+
+
+def test_opens_once_failure_rate_is_reached():
+    breaker = CircuitBreaker(BreakerSettings(min_calls=4, failure_rate=0.5), clock=FakeClock())
+    _call(breaker)
+    _call(breaker)
+    _call(breaker, TimeoutError())
+    assert breaker.state == CLOSED
+    _call(breaker, StatusError(503))
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_old_outcomes_leave_the_window():
+    clock = FakeClock()
+    breaker = CircuitBreaker(BreakerSettings(min_calls=2, window_seconds=10), clock=clock)
+    _call(breaker, TimeoutError())
+    clock.now += 11
+    _call(breaker)
+    # The expired failure would have made it 1 of 2
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 1
+
+
+def test_client_errors_and_rate_limits_do_not_count():
+    breaker = CircuitBreaker(BreakerSettings(min_calls=1), clock=FakeClock())
+    _call(breaker, StatusError(400))
+    _call(breaker, StatusError(429))
+    _call(breaker, ValueError("Invalid JSON"))
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_half_open_probe_closes_or_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(BreakerSettings(min_calls=1, open_seconds=5), clock=clock)
+    _call(breaker, TimeoutError())
+    assert not breaker.available()
+
+    clock.now += 5
+    assert breaker.state == HALF_OPEN
+    probe = breaker.before_call()
+    assert probe
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.after_call(probe, TimeoutError())
+    assert breaker.state == OPEN
+
+    clock.now += 5
+    probe = breaker.before_call()
+    breaker.after_call(probe)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_abandoned_probe_frees_its_slot():
+    clock = FakeClock()
+    breaker = CircuitBreaker(BreakerSettings(min_calls=1, open_seconds=5), clock=clock)
+    _call(breaker, TimeoutError())
+    clock.now += 5
+    breaker.abandon(breaker.before_call())
+    assert breaker.available()
+
+
+def test_open_breaker_fails_llm_calls_fast(mock_openai, circuit_breaker):
+    from backend.tools.task_tools import _make_llm_call
+    for _ in range(circuit_breaker.settings.min_calls):
+        _call(circuit_breaker, TimeoutError())
+    with bypass_llm_cache(), pytest.raises(CircuitOpenError):
+        _make_llm_call("system", "user")
+    mock_openai.chat.completions.create.assert_not_called()
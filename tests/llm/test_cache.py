@@ -0,0 +1,136 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+from backend.llm.cache import (
+    MemoryCache,
+    SQLiteCache,
+    DEFAULT_MAX_ENTRIES,
+    DEFAULT_TTL_SECONDS,
+    cache_from_env,
+    make_cache_key,
+    configure_llm_cache,
+    bypass_llm_cache
+)
+from backend.tools import task_tools
+from backend.types import TaskAgentState
+from helpers import FakeClock
+
+@pytest.fixture
+def memory_cache():
+    cache = MemoryCache(ttl=60, max_entries=10)
+    configure_llm_cache(cache)
+    yield cache
+    configure_llm_cache(None)
+
+def test_cache_key_depends_on_every_input():
+    key = make_cache_key("gpt-4.1", "system", "user", {"type": "json_object"})
+    assert key == make_cache_key("gpt-4.1", "system", "user", {"type": "json_object"})
+    assert key != make_cache_key("gpt-4.1-mini", "system", "user", {"type": "json_object"})
+    assert key != make_cache_key("gpt-4.1", "other", "user", {"type": "json_object"})
+    assert key != make_cache_key("gpt-4.1", "system", "other", {"type": "json_object"})
+    assert key != make_cache_key("gpt-4.1", "system", "user", None)
+
+def test_memory_cache_lru_eviction():
+    cache = MemoryCache(ttl=None, max_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}  # "a" is now most recently used
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("c") == {"v": 3}
+    stats = cache.stats.snapshot()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+def test_memory_cache_ttl_expiry():
+    clock = FakeClock()
+    cache = MemoryCache(ttl=10, max_entries=10, clock=clock)
+    cache.set("a", {"v": 1})
+    clock.now += 5
+    assert cache.get("a") == {"v": 1}
+    clock.now += 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats.snapshot()["expirations"] == 1
+
+def test_memory_cache_returns_copies():
+    cache = MemoryCache()
+    cache.set("a", {"questions": []})
+    cache.get("a")["questions"].append("mutated")
+    assert cache.get("a") == {"questions": []}
+
+def test_sqlite_cache_persists_and_evicts(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path, ttl=100, max_entries=2, clock=clock)
+    cache.set("a", {"v": 1})
+    clock.now += 1
+    cache.set("b", {"v": 2})
+    clock.now += 1
+    assert cache.get("a") == {"v": 1}
+    clock.now += 1
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.stats.snapshot()["evictions"] == 1
+    cache.close()
+
+    reopened = SQLiteCache(path, ttl=100, max_entries=2, clock=clock)
+    assert reopened.get("a") == {"v": 1}
+    assert reopened.get("c") == {"v": 3}
+    clock.now += 200
+    assert reopened.get("a") is None
+    reopened.close()
+
+def test_make_llm_call_uses_cache(mock_openai, memory_cache):
+    mock_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"task": "do the dishes", "confidence": 0.9, "concerns": [], "questions": []}'))
+    ]
+    first = task_tools.extract_task(TaskAgentState(input="Do the dishes"))
+    second = task_tools.extract_task(TaskAgentState(input="Do the dishes"))
+    assert first == second
+    assert mock_openai.chat.completions.create.call_count == 1
+    assert memory_cache.stats.snapshot()["hits"] == 1
+
+def test_failed_responses_are_not_cached(mock_openai, memory_cache):
+    mock_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content="invalid json"))
+    ]
+    task_tools.extract_task(TaskAgentState(input="Do the dishes"))
+    task_tools.extract_task(TaskAgentState(input="Do the dishes"))
+    assert mock_openai.chat.completions.create.call_count == 2
+    assert len(memory_cache) == 0
+
+def test_cache_bypass(mock_openai, memory_cache):
+    mock_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"judgment": "pass", "reason": "ok"}'))
+    ]
+    task_tools._make_llm_call("system", "user")
+    task_tools._make_llm_call("system", "user", use_cache=False)
+    with bypass_llm_cache():
+        task_tools._make_llm_call("system", "user")
+    assert mock_openai.chat.completions.create.call_count == 3
+    task_tools._make_llm_call("system", "user")
+    assert mock_openai.chat.completions.create.call_count == 3
+
+def test_async_llm_call_uses_cache(mock_async_openai, memory_cache):
+    mock_async_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"judgment": "pass", "reason": "ok"}'))
+    ]
+
+    async def call_twice():
+        await task_tools._amake_llm_call("system", "user")
+        return await task_tools._amake_llm_call("system", "user")
+
+    assert asyncio.run(call_twice()) == {"judgment": "pass", "reason": "ok"}
+    assert mock_async_openai.chat.completions.create.await_count == 1
+
+def test_cache_from_env_ignores_invalid_numbers(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "memory")
+    monkeypatch.setenv("LLM_CACHE_TTL", "an hour")
+    monkeypatch.setenv("LLM_CACHE_MAX_ENTRIES", "lots")
+    cache = cache_from_env()
+    assert isinstance(cache, MemoryCache)
+    assert cache.ttl == DEFAULT_TTL_SECONDS
+    assert cache.max_entries == DEFAULT_MAX_ENTRIES
@@ -0,0 +1,78 @@
+import os
+import asyncio
+import pytest
+from unittest.mock import patch
+from backend.llm.clients import ClientRegistry, ClientSettings, get_client_registry
+from backend.tools import task_tools
+
+def test_sync_client_is_reused_for_same_key():
+    registry = ClientRegistry(ClientSettings())
+    first = registry.get_sync_client("key", None, "gpt-4.1")
+    second = registry.get_sync_client("key", None, "gpt-4.1")
+    assert first is second
+    assert registry.stats()["sync_clients"] == 1
+    registry.close()
+
+def test_sync_client_differs_per_key_base_url_and_model():
+    registry = ClientRegistry(ClientSettings())
+    base = registry.get_sync_client("key", None, "gpt-4.1")
+    assert registry.get_sync_client("other-key", None, "gpt-4.1") is not base
+    assert registry.get_sync_client("key", "http://localhost:1234/v1", "gpt-4.1") is not base
+    assert registry.get_sync_client("key", None, "gpt-4.1-mini") is not base
+    assert registry.stats()["sync_clients"] == 4
+    registry.close()
+    assert registry.stats()["sync_clients"] == 0
+
+def test_client_uses_configured_timeouts_and_retries():
+    registry = ClientRegistry(ClientSettings(timeout=12.0, connect_timeout=2.0, max_retries=0))
+    client = registry.get_sync_client("key", None, "gpt-4.1")
+    assert client.max_retries == 0
+    assert client.timeout.read == 12.0
+    assert client.timeout.connect == 2.0
+    registry.close()
+
+def test_async_client_is_scoped_to_event_loop():
+    registry = ClientRegistry(ClientSettings())
+
+    async def get_twice():
+        first = registry.get_async_client("key", None, "gpt-4.1")
+        second = registry.get_async_client("key", None, "gpt-4.1")
+        assert first is second
+        count = registry.stats()["async_clients"]
+        await registry.aclose()
+        return first, count
+
+    first, count = asyncio.run(get_twice())
+    second, _ = asyncio.run(get_twice())
+    assert count == 1
+    assert first is not second
+
+def test_settings_from_env():
+    env = {
+        "LLM_MAX_CONNECTIONS": "10",
+        "LLM_MAX_KEEPALIVE_CONNECTIONS": "5",
+        "LLM_KEEPALIVE_EXPIRY": "30",
+        "LLM_TIMEOUT": "20",
+        "LLM_CONNECT_TIMEOUT": "1.5",
+        "LLM_SDK_MAX_RETRIES": "not-a-number",
+    }
+    with patch.dict("os.environ", env):
+        settings = ClientSettings.from_env()
+    assert settings.max_connections == 10
+    assert settings.max_keepalive_connections == 5
+    assert settings.keepalive_expiry == 30.0
+    assert settings.timeout == 20.0
+    assert settings.connect_timeout == 1.5
+    assert settings.max_retries == ClientSettings().max_retries
+
+def test_get_client_returns_pooled_client():
+    with patch.dict("os.environ", {"OPENAI_API_KEY": "test-key"}):
+        assert task_tools.get_client() is task_tools.get_client()
+        assert task_tools.get_client() is get_client_registry().get_sync_client(
+            "test-key", os.getenv("OPENAI_BASE_URL"), task_tools.DEFAULT_MODEL
+        )
+
+def test_get_client_requires_api_key():
+    with patch.dict("os.environ", {}, clear=True):
+        with pytest.raises(ValueError):
+            task_tools.get_client()
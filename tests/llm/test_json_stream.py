@@ -0,0 +1,55 @@
+import json
+
+from backend.llm.json_stream import JsonArrayStream
+
+COMPLETION = json.dumps({
+    "confidence": 0.9,
+    "subtasks": ["Fill the sink", "Scrub \"pans\", plates", "Rinse [and] dry"],
+    "concerns": ["None, really"],
+    "questions": []
+})
+
+
+def _feed_in_chunks(stream, text, size):
+    emitted = []
+    for start in range(0, len(text), size):
+        emitted.append(stream.feed(text[start:start + size]))
+    return emitted
+
+
+def test_emits_each_element_once_complete():
+    stream = JsonArrayStream("subtasks")
+    emitted = _feed_in_chunks(stream, COMPLETION, 1)
+    assert stream.items == ["Fill the sink", 'Scrub "pans", plates', "Rinse [and] dry"]
+    assert stream.complete
+    # Each element is emitted at the delimiter right after it, not at the end of the object
+    positions = [i for i, items in enumerate(emitted) if items]
+    assert [COMPLETION[i] for i in positions] == [",", ",", "]"]
+    assert positions[-1] < COMPLETION.index('"concerns"')
+
+
+def test_chunk_boundaries_do_not_matter():
+    for size in (2, 3, 7, 50, len(COMPLETION)):
+        stream = JsonArrayStream("subtasks")
+        _feed_in_chunks(stream, COMPLETION, size)
+        assert stream.items == json.loads(COMPLETION)["subtasks"]
+
+
+def test_ignores_other_arrays_and_nested_keys():
+    text = json.dumps({
+        "meta": {"subtasks": ["not this one"]},
+        "concerns": ["a", "b"],
+        "subtasks": [{"step": "x", "tags": ["y"]}, 3, None],
+    })
+    stream = JsonArrayStream("subtasks")
+    _feed_in_chunks(stream, text, 4)
+    assert stream.items == [{"step": "x", "tags": ["y"]}, 3, None]
+
+
+def test_empty_and_missing_arrays():
+    stream = JsonArrayStream("subtasks")
+    assert stream.feed('{"subtasks": [], "confidence": 0.0}') == []
+    assert stream.complete
+    stream = JsonArrayStream("subtasks")
+    stream.feed('{"message": "subtasks"}')
+    assert stream.items == [] and not stream.complete
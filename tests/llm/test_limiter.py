@@ -0,0 +1,140 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.llm.limiter import (
+    LimiterSettings,
+    OutboundLimiter,
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    TokenBucket,
+    configure_llm_limiter,
+    llm_priority,
+)
+from backend.metrics import LLM_QUEUE_DEPTH
+from helpers import FakeClock
+
+
+def test_token_bucket_refills_continuously():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    bucket.take(60)
+    assert bucket.delay(1) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert bucket.delay(1) == pytest.approx(0.5)
+    clock.now += 100
+    assert bucket.level() == 60
+    # Requests larger than the bucket only wait for a full bucket
+    assert bucket.delay(500) == 0.0
+
+
+def test_aimd_window_grows_and_halves_on_429():
+    clock = FakeClock()
+    limiter = OutboundLimiter(LimiterSettings(initial_concurrency=4, max_concurrency=5), clock=clock)
+    for _ in range(4):
+        limiter.release(limiter.acquire())
+    assert limiter.limit == pytest.approx(5.0, abs=0.1)
+    limiter.release(limiter.acquire(), throttled=True)
+    assert limiter.limit == pytest.approx(2.5, abs=0.1)
+    # A second 429 within the cooldown is the same congestion signal
+    limiter.release(limiter.acquire(), throttled=True)
+    assert limiter.limit == pytest.approx(2.5, abs=0.1)
+    clock.now += 2
+    limiter.release(limiter.acquire(), throttled=True)
+    assert limiter.limit == pytest.approx(1.25, abs=0.1)
+    assert limiter.stats()["throttled"] == 3
+
+
+def test_slow_calls_shrink_the_window():
+    clock = FakeClock()
+    limiter = OutboundLimiter(LimiterSettings(initial_concurrency=8, latency_target=5), clock=clock)
+    permit = limiter.acquire()
+    clock.now += 6
+    limiter.release(permit)
+    assert limiter.limit == 4
+
+
+def test_concurrency_window_blocks_until_release():
+    limiter = OutboundLimiter(LimiterSettings(initial_concurrency=1, max_concurrency=1))
+    permit = limiter.acquire()
+    admitted = threading.Event()
+
+    def second():
+        limiter.release(limiter.acquire())
+        admitted.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    assert not admitted.wait(0.1)
+    assert limiter.stats()["queued"] == 1
+    limiter.release(permit)
+    assert admitted.wait(2)
+    thread.join()
+
+
+def test_interactive_calls_go_ahead_of_batch():
+    limiter = OutboundLimiter(LimiterSettings(initial_concurrency=1, max_concurrency=1))
+    order = []
+
+    async def call(name, priority):
+        with llm_priority(priority):
+            permit = await limiter.aacquire()
+        order.append(name)
+        limiter.release(permit)
+
+    async def scenario():
+        held = await limiter.aacquire()
+        batch = [asyncio.create_task(call(f"batch{i}", PRIORITY_BATCH)) for i in range(2)]
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0.01)
+        assert LLM_QUEUE_DEPTH.value(priority="batch") == 2
+        assert LLM_QUEUE_DEPTH.value(priority="interactive") == 1
+        limiter.release(held)
+        await asyncio.gather(*batch, interactive)
+
+    asyncio.run(scenario())
+    assert order == ["interactive", "batch0", "batch1"]
+
+
+def test_token_budget_waits_and_usage_refunds_overestimates():
+    limiter = OutboundLimiter(LimiterSettings(tokens_per_minute=600))
+
+    async def scenario():
+        permit = await limiter.aacquire(600)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.aacquire(600), 0.05)
+        # The abandoned waiter left the queue
+        assert limiter.stats()["queued"] == 0
+        waiter = asyncio.create_task(limiter.aacquire(600))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        # The call only used 10 tokens, so most of the estimate comes back
+        limiter.release(permit, tokens_used=10)
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(scenario())
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+
+def test_llm_calls_report_throttling_to_the_limiter(mock_openai):
+    from backend.tools.task_tools import _make_llm_call
+    from backend.llm.retry import RetryPolicy, RetrySettings, configure_retry_policy
+    limiter = OutboundLimiter(LimiterSettings(initial_concurrency=8))
+    configure_llm_limiter(limiter)
+    configure_retry_policy(RetryPolicy(RetrySettings(max_attempts=1)))
+    try:
+        mock_openai.chat.completions.create.side_effect = _RateLimited()
+        with pytest.raises(_RateLimited):
+            _make_llm_call("system", "user", use_cache=False)
+        stats = limiter.stats()
+        assert stats["throttled"] == 1
+        assert stats["in_flight"] == 0
+        assert limiter.limit == 4
+    finally:
+        configure_llm_limiter(None)
+        configure_retry_policy(None)
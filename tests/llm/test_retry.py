@@ -0,0 +1,156 @@
+import asyncio
+import time
+from unittest.mock import Mock
+
+import httpx
+import openai
+import pytest
+
+from backend.llm.cache import bypass_llm_cache
+from backend.llm.retry import (
+    LLMDeadlineExceeded,
+    RetryPolicy,
+    RetrySettings,
+    classify_error,
+    configure_retry_policy,
+    llm_deadline,
+)
+from backend.metrics import LLM_GIVE_UPS, LLM_HEDGES, LLM_RETRIES
+from helpers import StatusError
+
+
+def _completion(content='{"task": "buy milk", "confidence": 0.9, "concerns": [], "questions": []}'):
+    return Mock(choices=[Mock(message=Mock(content=content))], usage=None)
+
+
+@pytest.fixture
+def sleeps():
+    """Install a retry policy that records its backoff delays instead of sleeping."""
+    delays = []
+
+    async def asleep(seconds):
+        delays.append(seconds)
+
+    configure_retry_policy(RetryPolicy(RetrySettings(max_attempts=3), sleep=delays.append, asleep=asleep))
+    yield delays
+    configure_retry_policy(None)
+
+
+def test_classify_error():
+    request = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+    assert classify_error(openai.APITimeoutError(request=request)) == "timeout"
+    assert classify_error(openai.APIConnectionError(request=request)) == "connection"
+    assert classify_error(StatusError(429)) == "rate_limited"
+    assert classify_error(StatusError(503)) == "server"
+    assert classify_error(StatusError(400)) == "client"
+    assert classify_error(ValueError("Invalid JSON")) == "other"
+    assert classify_error(LLMDeadlineExceeded()) == "deadline"
+
+
+def test_transient_errors_are_retried_with_jittered_backoff(mock_openai, sleeps):
+    from backend.tools.task_tools import _make_llm_call
+    before = LLM_RETRIES.value(prompt="clarification", reason="server")
+    mock_openai.chat.completions.create.side_effect = [StatusError(503), StatusError(503), _completion()]
+    with bypass_llm_cache():
+        assert _make_llm_call("system", "user")["task"] == "buy milk"
+    assert mock_openai.chat.completions.create.call_count == 3
+    # Full jitter: each delay is somewhere below the doubling cap
+    assert 0 <= sleeps[0] <= 0.25 and 0 <= sleeps[1] <= 0.5
+    assert LLM_RETRIES.value(prompt="clarification", reason="server") == before + 2
+
+
+def test_permanent_errors_are_not_retried(mock_openai, sleeps):
+    from backend.tools.task_tools import _make_llm_call
+    mock_openai.chat.completions.create.side_effect = StatusError(400)
+    with bypass_llm_cache(), pytest.raises(StatusError):
+        _make_llm_call("system", "user")
+    assert mock_openai.chat.completions.create.call_count == 1
+    assert sleeps == []
+
+
+def test_gives_up_after_max_attempts(mock_openai, sleeps):
+    from backend.tools.task_tools import extract_task
+    before = LLM_GIVE_UPS.value(prompt="task_extraction", reason="attempts")
+    mock_openai.chat.completions.create.side_effect = StatusError(500)
+    with bypass_llm_cache():
+        result = extract_task(Mock(input="buy milk"))
+    # The tool still degrades gracefully once the retries are spent
+    assert result.confidence == 0.0
+    assert mock_openai.chat.completions.create.call_count == 3
+    assert LLM_GIVE_UPS.value(prompt="task_extraction", reason="attempts") == before + 1
+
+
+def test_retry_after_header_overrides_backoff(mock_openai, sleeps):
+    from backend.tools.task_tools import _make_llm_call
+    mock_openai.chat.completions.create.side_effect = [StatusError(429, {"retry-after": "1.5"}), _completion()]
+    with bypass_llm_cache():
+        _make_llm_call("system", "user")
+    assert sleeps == [1.5]
+
+
+def test_deadline_caps_attempt_timeout_and_stops_retries(mock_openai, sleeps):
+    from backend.tools.task_tools import _make_llm_call
+    mock_openai.chat.completions.create.side_effect = StatusError(429, {"retry-after": "5"})
+    with bypass_llm_cache(), llm_deadline(2.0):
+        with pytest.raises(StatusError):
+            _make_llm_call("system", "user")
+    # Waiting 5s for the retry would overrun the 2s deadline
+    assert mock_openai.chat.completions.create.call_count == 1
+    assert 0 < mock_openai.chat.completions.create.call_args.kwargs["timeout"] <= 2.0
+    assert sleeps == []
+
+
+def test_no_attempt_starts_after_the_deadline(mock_openai, sleeps):
+    from backend.tools.task_tools import _make_llm_call
+    with bypass_llm_cache(), llm_deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(LLMDeadlineExceeded):
+            _make_llm_call("system", "user")
+    mock_openai.chat.completions.create.assert_not_called()
+
+
+def test_inner_deadline_never_extends_the_outer_one():
+    from backend.llm.retry import deadline_remaining
+    assert deadline_remaining() is None
+    with llm_deadline(1.0):
+        with llm_deadline(60.0):
+            assert deadline_remaining() <= 1.0
+    assert deadline_remaining() is None
+
+
+def test_slow_async_call_is_hedged_and_first_answer_wins():
+    policy = RetryPolicy(RetrySettings(hedge=True, hedge_min_samples=1, hedge_min_delay=0.01))
+    policy.latencies.observe("subtask_judgment", 0.02)
+    calls = []
+
+    async def attempt(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+            return "primary"
+        return "hedge"
+
+    before = LLM_HEDGES.value(prompt="subtask_judgment", outcome="won")
+    start = time.perf_counter()
+    assert asyncio.run(policy.acall("subtask_judgment", attempt)) == "hedge"
+    assert time.perf_counter() - start < 1
+    assert len(calls) == 2
+    assert LLM_HEDGES.value(prompt="subtask_judgment", outcome="won") == before + 1
+
+
+def test_streamed_call_is_not_retried_once_output_was_forwarded():
+    delays = []
+
+    async def asleep(seconds):
+        delays.append(seconds)
+
+    policy = RetryPolicy(RetrySettings(max_attempts=3), asleep=asleep)
+    attempts = []
+
+    async def attempt(timeout):
+        attempts.append(timeout)
+        raise StatusError(502)
+
+    with pytest.raises(StatusError):
+        asyncio.run(policy.acall("subtask_generation", attempt, hedge=False, can_retry=lambda: False))
+    assert len(attempts) == 1 and delays == []
@@ -0,0 +1,139 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from backend.llm.breaker import BreakerSettings, CircuitBreaker, configure_circuit_breaker
+from backend.llm.cache import bypass_llm_cache
+from backend.llm.retry import RetryPolicy, RetrySettings, configure_retry_policy
+from backend.llm.router import ModelRouter, Route, configure_model_router, parse_chain
+from backend.llm.streaming import stream_llm_tokens
+from backend.metrics import LLM_ROUTE_CALLS, LLM_ROUTE_COST, LLM_ROUTE_FALLBACKS
+from backend.tools.degraded import llm_unavailable
+from helpers import StatusError
+
+FALLBACK_CHAIN = "openai:gpt-4.1,anthropic:claude-3-5-haiku-latest"
+
+
+@pytest.fixture
+def router():
+    """Route clarification calls to OpenAI with an Anthropic fallback, and make a single attempt per route."""
+    router = ModelRouter(chains={"clarification": parse_chain(FALLBACK_CHAIN)})
+    configure_model_router(router)
+    configure_retry_policy(RetryPolicy(RetrySettings(max_attempts=1)))
+    yield router
+    configure_model_router(None)
+    configure_retry_policy(None)
+
+
+@pytest.fixture
+def mock_anthropic():
+    with patch("backend.tools.task_tools.get_anthropic_client") as mock_get_client:
+        mock_client = Mock()
+        mock_get_client.return_value = mock_client
+        yield mock_client
+
+
+def test_parse_routes():
+    assert Route.parse("gpt-4.1-mini") == Route(provider="openai", model="gpt-4.1-mini")
+    assert Route.parse(" Anthropic:claude-3-5-haiku-latest ").label == "anthropic:claude-3-5-haiku-latest"
+    assert [route.provider for route in parse_chain(FALLBACK_CHAIN)] == ["openai", "anthropic"]
+    assert Route.parse("ft:gpt-4.1:acme::abc123") == Route(provider="openai", model="ft:gpt-4.1:acme::abc123")
+    with pytest.raises(ValueError):
+        Route.parse("anthropic:")
+    with pytest.raises(ValueError):
+        parse_chain(" , ")
+
+
+def test_chains_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_ROUTE_DEFAULT", "gpt-4.1-mini")
+    monkeypatch.setenv("LLM_ROUTE_JUDGE_SUBTASKS", FALLBACK_CHAIN)
+    monkeypatch.setenv("LLM_ROUTE_CLARIFICATION", "anthropic:")
+    router = ModelRouter.from_env()
+    table = router.table()
+    assert table["judge_subtasks"] == FALLBACK_CHAIN.split(",")
+    # Invalid chains are ignored, leaving the tool on the default
+    assert table["clarification"] == table["extract_task"] == ["openai:gpt-4.1-mini"]
+    assert router.chain_for_prompt("subtask_judgment") == parse_chain(FALLBACK_CHAIN)
+    assert router.providers("extract_task") == ["openai"]
+    assert router.providers() == ["openai", "anthropic"]
+
+
+def test_cost_uses_the_longest_price_prefix(monkeypatch):
+    router = ModelRouter()
+    assert router.cost(Route.parse("gpt-4.1-mini-2025-04-14"), 1_000_000, 0) == pytest.approx(0.40)
+    assert router.cost(Route.parse("gpt-4.1"), 1000, 1000) == pytest.approx(0.01)
+    assert router.cost(Route.parse("ft:my-model"), 1000, 1000) == 0.0
+
+    monkeypatch.setenv("LLM_PRICES", '{"ft:my-model": [1, 2]}')
+    assert ModelRouter.from_env().cost(Route.parse("ft:my-model:v2"), 1_000_000, 1_000_000) == pytest.approx(3.0)
+
+
+def test_falls_back_to_the_next_route(mock_openai, mock_anthropic, router):
+    from backend.tools.task_tools import _make_llm_call
+    mock_openai.chat.completions.create.side_effect = StatusError(503)
+    mock_anthropic.messages.create.return_value = Mock(
+        content=[Mock(type="text", text='"task": "buy milk", "confidence": 0.9}')],
+        usage=Mock(input_tokens=1000, output_tokens=200))
+    label = "anthropic:claude-3-5-haiku-latest"
+    fallbacks = LLM_ROUTE_FALLBACKS.value(tool="clarification", route="openai:gpt-4.1")
+    errors = LLM_ROUTE_CALLS.value(tool="clarification", route="openai:gpt-4.1", outcome="error")
+    cost = LLM_ROUTE_COST.value(tool="clarification", route=label)
+
+    with bypass_llm_cache():
+        assert _make_llm_call("system", "user") == {"task": "buy milk", "confidence": 0.9}
+
+    request = mock_anthropic.messages.create.call_args.kwargs
+    assert request["model"] == "claude-3-5-haiku-latest"
+    # The prefilled brace makes the reply start inside a JSON object
+    assert request["messages"][-1] == {"role": "assistant", "content": "{"}
+    assert LLM_ROUTE_FALLBACKS.value(tool="clarification", route="openai:gpt-4.1") == fallbacks + 1
+    assert LLM_ROUTE_CALLS.value(tool="clarification", route="openai:gpt-4.1", outcome="error") == errors + 1
+    assert LLM_ROUTE_COST.value(tool="clarification", route=label) == pytest.approx(cost + 0.0016)
+
+
+def test_last_route_failure_is_raised(mock_openai, mock_anthropic, router):
+    from backend.tools.task_tools import _make_llm_call
+    mock_openai.chat.completions.create.side_effect = StatusError(503)
+    mock_anthropic.messages.create.side_effect = StatusError(529)
+    with bypass_llm_cache(), pytest.raises(StatusError, match="529"):
+        _make_llm_call("system", "user")
+
+
+def test_streams_anthropic_fallback_with_the_prefilled_brace(mock_async_openai, router):
+    from backend.tools.task_tools import _amake_llm_call
+    mock_async_openai.chat.completions.create.side_effect = StatusError(503)
+    deltas = ['"question": ', '"When?"}']
+    events = [SimpleNamespace(type="message_start", message=SimpleNamespace(usage=SimpleNamespace(input_tokens=50)))]
+    events += [SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=text))
+               for text in deltas]
+    events.append(SimpleNamespace(type="message_delta", usage=SimpleNamespace(output_tokens=5)))
+
+    async def stream():
+        for event in events:
+            yield event
+
+    client = Mock()
+    client.messages.create = AsyncMock(return_value=stream())
+    tokens = []
+
+    async def run():
+        with stream_llm_tokens(lambda kind, data: tokens.append(data["text"])), bypass_llm_cache():
+            return await _amake_llm_call("Ask the user something", "user")
+
+    with patch("backend.tools.task_tools.get_async_anthropic_client", return_value=client):
+        assert asyncio.run(run()) == {"question": "When?"}
+    assert "".join(tokens) == '{"question": "When?"}'
+
+
+def test_unavailable_only_when_every_provider_in_the_chain_is_open(router):
+    openai_breaker = CircuitBreaker(BreakerSettings(min_calls=1), provider="openai")
+    anthropic_breaker = CircuitBreaker(BreakerSettings(min_calls=1), provider="anthropic")
+    configure_circuit_breaker(openai_breaker, "openai")
+    configure_circuit_breaker(anthropic_breaker, "anthropic")
+    openai_breaker.after_call(openai_breaker.before_call(), TimeoutError())
+    assert llm_unavailable("extract_task")
+    assert not llm_unavailable("clarification")
+    anthropic_breaker.after_call(anthropic_breaker.before_call(), TimeoutError())
+    assert llm_unavailable("clarification")
@@ -0,0 +1,113 @@
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from backend.llm.semantic_cache import (
+    SemanticCache,
+    SemanticCacheSettings,
+    VectorIndex,
+    configure_semantic_cache,
+)
+from backend.metrics import SEMANTIC_CACHE_LOOKUPS
+from backend.text import HashingVectorizer
+from backend.tools.task_tools import aextract_task, extract_task, generate_subtasks
+from backend.types import TaskAgentState, TaskMetadata
+
+
+@pytest.fixture
+def semantic_cache():
+    cache = SemanticCache(SemanticCacheSettings(enabled=True))
+    configure_semantic_cache(cache)
+    yield cache
+    configure_semantic_cache(None)
+
+
+def _completion(content):
+    return Mock(choices=[Mock(message=Mock(content=content))], usage=None)
+
+
+def test_index_finds_nearest_neighbour_with_matching_key():
+    vectorizer = HashingVectorizer()
+    index = VectorIndex(vectorizer.dim, capacity=4)
+    index.add("buy milk tomorrow", vectorizer.embed("buy milk tomorrow"), {"task": "milk"}, ("tomorrow",))
+    index.add("buy eggs tomorrow", vectorizer.embed("buy eggs tomorrow"), {"task": "eggs"}, ("tomorrow",))
+
+    value, similarity = index.search(vectorizer.embed("buy some milk tomorrow"), 0.8, ("tomorrow",))
+    assert value == {"task": "milk"} and 0.8 <= similarity < 1.0
+    assert index.search(vectorizer.embed("buy some milk tomorrow"), 0.8, ("friday",)) is None
+    assert index.search(vectorizer.embed("call the bank"), 0.8, ("tomorrow",)) is None
+    assert index.stats.snapshot()["hit_rate"] == pytest.approx(1 / 3)
+
+
+@pytest.mark.parametrize("eviction, evicted", [("lru", "b"), ("fifo", "a")])
+def test_eviction_policies(eviction, evicted):
+    vectorizer = HashingVectorizer()
+    index = VectorIndex(vectorizer.dim, capacity=2, eviction=eviction)
+    for text in ("a", "b"):
+        index.add(text, vectorizer.embed(text), {"text": text})
+    assert index.search(vectorizer.embed("a"), 0.99) is not None
+    index.add("c", vectorizer.embed("c"), {"text": "c"})
+    assert len(index) == 2
+    assert index.search(vectorizer.embed(evicted), 0.99) is None
+    assert index.stats.snapshot()["evictions"] == 1
+
+
+def test_numbers_must_match(semantic_cache):
+    semantic_cache.set("extract_task", "book room 12 for the standup", {"task": "room 12"})
+    assert semantic_cache.get("extract_task", "Book room 12 for the standup!") == {"task": "room 12"}
+    assert semantic_cache.get("extract_task", "book room 21 for the standup") is None
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("SEMANTIC_CACHE", "true")
+    monkeypatch.setenv("SEMANTIC_CACHE_THRESHOLD", "0.8")
+    monkeypatch.setenv("SEMANTIC_CACHE_THRESHOLD_GENERATE_SUBTASKS", "0.95")
+    monkeypatch.setenv("SEMANTIC_CACHE_EVICTION", "random")
+    cache = SemanticCache()
+    assert cache.settings.enabled
+    assert cache.threshold("extract_task") == 0.8
+    assert cache.threshold("generate_subtasks") == 0.95
+    assert cache.settings.eviction == "lru"
+
+
+def test_extract_task_serves_near_duplicates(mock_openai, semantic_cache):
+    mock_openai.chat.completions.create.return_value = _completion(
+        '{"task": "Buy milk", "confidence": 0.9, "concerns": [], "questions": [], "due_date": "tomorrow"}')
+    hits = SEMANTIC_CACHE_LOOKUPS.value(tool="extract_task", outcome="hit")
+
+    first = extract_task(TaskAgentState(input="buy milk tomorrow"))
+    state = TaskAgentState(input="Buy milk tomorrow!")
+    second = asyncio.run(aextract_task(state))
+
+    assert second == first
+    assert state.due_date_confirmed
+    assert mock_openai.chat.completions.create.call_count == 1
+    assert SEMANTIC_CACHE_LOOKUPS.value(tool="extract_task", outcome="hit") == hits + 1
+    # A different due date is a different request
+    extract_task(TaskAgentState(input="buy milk friday"))
+    assert mock_openai.chat.completions.create.call_count == 2
+    assert semantic_cache.stats()["tools"]["extract_task"]["hits"] == 1
+
+
+def test_generate_subtasks_skips_failed_responses(mock_openai, semantic_cache):
+    metadata = TaskMetadata(task="Plan the team offsite", confidence=0.9, concerns=[], questions=[])
+    mock_openai.chat.completions.create.return_value = _completion("not json")
+    assert generate_subtasks(metadata).subtasks == []
+    mock_openai.chat.completions.create.return_value = _completion(
+        '{"subtasks": ["Pick a venue", "Send invites"], "confidence": 0.8, "concerns": [], "questions": []}')
+    assert generate_subtasks(metadata).subtasks == ["Pick a venue", "Send invites"]
+    metadata.task = "Plan the team offsite!"
+    assert generate_subtasks(metadata).subtasks == ["Pick a venue", "Send invites"]
+    assert mock_openai.chat.completions.create.call_count == 2
+
+
+def test_generate_subtasks_misses_across_tenants(mock_openai, semantic_cache):
+    metadata = TaskMetadata(task="Plan the team offsite", confidence=0.9, concerns=[], questions=[])
+    mock_openai.chat.completions.create.return_value = _completion(
+        '{"subtasks": ["Pick a venue", "Send invites"], "confidence": 0.8, "concerns": [], "questions": []}')
+    generate_subtasks(metadata, "acme")
+    assert generate_subtasks(metadata, "acme").subtasks == ["Pick a venue", "Send invites"]
+    assert mock_openai.chat.completions.create.call_count == 1
+    generate_subtasks(metadata, "globex")
+    assert mock_openai.chat.completions.create.call_count == 2
@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+from backend.llm.limiter import PRIORITY_BATCH, llm_priority
+from backend.llm.retry import llm_deadline
+from backend.llm.singleflight import SingleFlight, AsyncSingleFlight
+from backend.llm.streaming import stream_llm_tokens
+from backend.tools import task_tools
+
+def test_sync_callers_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow_call():
+        calls.append(1)
+        release.wait(timeout=5)
+        return {"subtasks": ["a"]}
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(flight.do, "key", slow_call) for _ in range(5)]
+        while flight.stats.snapshot()["calls"] < 5:
+            time.sleep(0.01)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert len(calls) == 1
+    assert all(r == {"subtasks": ["a"]} for r in results)
+    assert flight.stats.snapshot() == {"calls": 5, "executions": 1, "coalesced": 4}
+    assert flight.in_flight() == 0
+
+def test_sync_followers_get_independent_copies():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def slow_call():
+        release.wait(timeout=5)
+        return {"questions": []}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", slow_call)
+        while flight.in_flight() == 0:
+            time.sleep(0.01)
+        follower = pool.submit(flight.do, "key", slow_call)
+        while flight.stats.snapshot()["calls"] < 2:
+            time.sleep(0.01)
+        release.set()
+        follower.result()["questions"].append("mutated")
+        assert leader.result() == {"questions": []}
+
+def test_leaders_get_a_copy_too():
+    shared = {"questions": []}
+    assert SingleFlight().do("key", lambda: shared) is not shared
+
+    async def call():
+        await asyncio.sleep(0.01)
+        return shared
+
+    async def run():
+        flight = AsyncSingleFlight()
+        return await asyncio.gather(flight.do("key", call), flight.do("key", call))
+
+    leader, follower = asyncio.run(run())
+    assert leader == follower == shared
+    assert leader is not shared and follower is not shared and leader is not follower
+
+def test_sync_errors_propagate_to_followers():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing_call():
+        release.wait(timeout=5)
+        raise TimeoutError("provider timeout")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flight.do, "key", failing_call) for _ in range(3)]
+        while flight.stats.snapshot()["calls"] < 3:
+            time.sleep(0.01)
+        release.set()
+        for future in futures:
+            with pytest.raises(TimeoutError):
+                future.result()
+    assert flight.in_flight() == 0
+
+def test_sync_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats.snapshot()["coalesced"] == 0
+
+def test_async_callers_share_one_execution():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow_call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"judgment": "pass"}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", slow_call) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == {"judgment": "pass"} for r in results)
+    assert flight.stats.snapshot() == {"calls": 10, "executions": 1, "coalesced": 9}
+
+def test_async_leader_cancellation_does_not_cancel_followers():
+    flight = AsyncSingleFlight()
+
+    async def slow_call():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("key", slow_call))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", slow_call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+
+def test_concurrent_identical_async_llm_calls_are_coalesced(mock_async_openai):
+    async def slow_completion(**kwargs):
+        await asyncio.sleep(0.05)
+        return Mock(choices=[Mock(message=Mock(content='{"task": "buy milk", "confidence": 0.9, "concerns": [], "questions": []}'))])
+
+    mock_async_openai.chat.completions.create.side_effect = slow_completion
+    before = task_tools.llm_async_singleflight.stats.snapshot()["coalesced"]
+
+    async def run():
+        return await asyncio.gather(*(task_tools._amake_llm_call("system", "buy milk") for _ in range(4)))
+
+    results = asyncio.run(run())
+    assert all(r["task"] == "buy milk" for r in results)
+    assert mock_async_openai.chat.completions.create.await_count == 1
+    assert task_tools.llm_async_singleflight.stats.snapshot()["coalesced"] - before == 3
+
+def test_llm_calls_in_different_contexts_are_not_coalesced(mock_async_openai):
+    async def slow_completion(**kwargs):
+        await asyncio.sleep(0.05)
+        return Mock(choices=[Mock(message=Mock(content='{"task": "buy milk", "confidence": 0.9, "concerns": [], "questions": []}'))])
+
+    mock_async_openai.chat.completions.create.side_effect = slow_completion
+
+    async def batch_call():
+        with llm_priority(PRIORITY_BATCH):
+            return await task_tools._amake_llm_call("system", "buy milk")
+
+    async def deadline_call():
+        with llm_deadline(30):
+            return await task_tools._amake_llm_call("system", "buy milk")
+
+    async def run():
+        return await asyncio.gather(task_tools._amake_llm_call("system", "buy milk"), batch_call(), deadline_call())
+
+    results = asyncio.run(run())
+    assert all(r["task"] == "buy milk" for r in results)
+    assert mock_async_openai.chat.completions.create.await_count == 3
+
+def test_streamed_llm_call_is_not_coalesced_onto_a_plain_one(mock_async_openai):
+    content = '{"message": "Which dishes?"}'
+
+    async def chunks():
+        yield Mock(choices=[Mock(delta=Mock(content=content))], usage=None)
+        yield Mock(choices=[], usage=None)
+
+    async def completion(**kwargs):
+        if kwargs.get("stream"):
+            return chunks()
+        await asyncio.sleep(0.05)
+        return Mock(choices=[Mock(message=Mock(content=content))])
+
+    mock_async_openai.chat.completions.create.side_effect = completion
+    tokens = []
+
+    async def streamed_call():
+        await asyncio.sleep(0.01)
+        with stream_llm_tokens(lambda kind, data: tokens.append(data["text"])):
+            return await task_tools._amake_llm_call("Ask the user something", "dishes")
+
+    async def run():
+        return await asyncio.gather(task_tools._amake_llm_call("Ask the user something", "dishes"), streamed_call())
+
+    assert asyncio.run(run()) == [{"message": "Which dishes?"}] * 2
+    assert "".join(tokens) == content
@@ -0,0 +1,143 @@
+import asyncio
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from backend.storage import CheckpointPruningPolicy, SQLiteCheckpointSaver
+
+def _config(thread_id, checkpoint_id=None):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    if checkpoint_id:
+        config["configurable"]["checkpoint_id"] = checkpoint_id
+    return config
+
+def _put_chain(saver, thread_id, count):
+    """Save ``count`` checkpoints on a thread, each the child of the last, and return their ids."""
+    config = _config(thread_id)
+    checkpoint = empty_checkpoint()
+    ids = []
+    for step in range(count):
+        checkpoint = create_checkpoint(checkpoint, None, step)
+        checkpoint["channel_values"] = {"input": f"step {step}"}
+        config = saver.put(config, checkpoint, {"source": "loop", "step": step}, {})
+        ids.append(config["configurable"]["checkpoint_id"])
+    return ids
+
+def test_put_and_get_latest_checkpoint(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"))
+    ids = _put_chain(saver, "t1", 3)
+
+    latest = saver.get_tuple(_config("t1"))
+    assert latest.config["configurable"]["checkpoint_id"] == ids[-1]
+    assert latest.checkpoint["channel_values"] == {"input": "step 2"}
+    assert latest.metadata["step"] == 2
+    assert latest.parent_config["configurable"]["checkpoint_id"] == ids[1]
+
+    first = saver.get_tuple(_config("t1", ids[0]))
+    assert first.checkpoint["channel_values"] == {"input": "step 0"}
+    assert first.parent_config is None
+    assert saver.get_tuple(_config("missing")) is None
+    saver.close()
+
+def test_checkpoints_survive_reopen(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    saver = SQLiteCheckpointSaver(path)
+    ids = _put_chain(saver, "t1", 2)
+    saver.put_writes(_config("t1", ids[-1]), [("input", "pending"), ("__interrupt__", "ask")], "task-1")
+    saver.close()
+
+    reopened = SQLiteCheckpointSaver(path)
+    latest = reopened.get_tuple(_config("t1"))
+    assert latest.config["configurable"]["checkpoint_id"] == ids[-1]
+    assert latest.pending_writes == [("task-1", "__interrupt__", "ask"), ("task-1", "input", "pending")]
+    reopened.close()
+
+def test_list_filters_and_limits():
+    saver = SQLiteCheckpointSaver(":memory:")
+    ids = _put_chain(saver, "t1", 4)
+    _put_chain(saver, "t2", 1)
+
+    listed = [c.config["configurable"]["checkpoint_id"] for c in saver.list(_config("t1"))]
+    assert listed == ids[::-1]
+    assert len(list(saver.list(None))) == 5
+    assert len(list(saver.list(_config("t1"), limit=2))) == 2
+    assert [c.metadata["step"] for c in saver.list(_config("t1"), filter={"step": 1})] == [1]
+    before = [c.metadata["step"] for c in saver.list(_config("t1"), before=_config("t1", ids[2]))]
+    assert before == [1, 0]
+
+def test_special_writes_replace_regular_writes_do_not():
+    saver = SQLiteCheckpointSaver(":memory:")
+    config = _config("t1", _put_chain(saver, "t1", 1)[0])
+    saver.put_writes(config, [("input", "first")], "task-1")
+    saver.put_writes(config, [("input", "second")], "task-1")
+    saver.put_writes(config, [("__error__", "boom")], "task-1")
+    saver.put_writes(config, [("__error__", "boom again")], "task-1")
+    assert saver.get_tuple(config).pending_writes == [("task-1", "__error__", "boom again"), ("task-1", "input", "first")]
+
+def test_delete_thread():
+    saver = SQLiteCheckpointSaver(":memory:")
+    ids = _put_chain(saver, "t1", 2)
+    _put_chain(saver, "t2", 1)
+    saver.put_writes(_config("t1", ids[-1]), [("input", "x")], "task-1")
+    saver.delete_thread("t1")
+    assert saver.get_tuple(_config("t1")) is None
+    assert saver.stats() == {"threads": 1, "checkpoints": 1, "writes": 0}
+
+def test_prune_keeps_newest_checkpoints_per_thread():
+    saver = SQLiteCheckpointSaver(":memory:", policy=CheckpointPruningPolicy(max_checkpoints_per_thread=2, prune_every=0))
+    ids = _put_chain(saver, "t1", 5)
+    saver.put_writes(_config("t1", ids[0]), [("input", "old")], "task-1")
+    _put_chain(saver, "t2", 1)
+
+    assert saver.prune() == {"threads": 0, "checkpoints": 3}
+    assert [c.config["configurable"]["checkpoint_id"] for c in saver.list(_config("t1"))] == ids[:2:-1]
+    assert saver.stats() == {"threads": 2, "checkpoints": 3, "writes": 0}
+
+def test_prune_drops_stale_threads():
+    now = [1000.0]
+    policy = CheckpointPruningPolicy(max_checkpoints_per_thread=None, max_thread_age_seconds=60, prune_every=0)
+    saver = SQLiteCheckpointSaver(":memory:", policy=policy, clock=lambda: now[0])
+    _put_chain(saver, "old", 2)
+    now[0] += 50
+    _put_chain(saver, "recent", 1)
+    now[0] += 20
+
+    assert saver.prune() == {"threads": 1, "checkpoints": 2}
+    assert saver.get_tuple(_config("old")) is None
+    assert saver.get_tuple(_config("recent")) is not None
+
+def test_prunes_automatically_every_n_puts():
+    policy = CheckpointPruningPolicy(max_checkpoints_per_thread=1, prune_every=3)
+    saver = SQLiteCheckpointSaver(":memory:", policy=policy)
+    _put_chain(saver, "t1", 2)
+    assert saver.stats()["checkpoints"] == 2
+    _put_chain(saver, "t2", 1)
+    assert saver.stats()["checkpoints"] == 2
+
+def test_policy_from_env(monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_MAX_PER_THREAD", "5")
+    monkeypatch.setenv("CHECKPOINT_MAX_AGE_HOURS", "0")
+    monkeypatch.setenv("CHECKPOINT_PRUNE_EVERY", "10")
+    policy = CheckpointPruningPolicy.from_env()
+    assert policy.max_checkpoints_per_thread == 5
+    assert policy.max_thread_age_seconds is None
+    assert policy.prune_every == 10
+
+def test_policy_from_env_ignores_invalid_numbers(monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_MAX_PER_THREAD", "twenty")
+    monkeypatch.setenv("CHECKPOINT_MAX_AGE_HOURS", "1 week")
+    monkeypatch.setenv("CHECKPOINT_PRUNE_EVERY", "often")
+    assert CheckpointPruningPolicy.from_env() == CheckpointPruningPolicy()
+
+def test_async_api_matches_sync():
+    saver = SQLiteCheckpointSaver(":memory:")
+    ids = _put_chain(saver, "t1", 2)
+
+    async def run():
+        latest = await saver.aget_tuple(_config("t1"))
+        listed = [c async for c in saver.alist(_config("t1"))]
+        await saver.aput_writes(latest.config, [("input", "x")], "task-1")
+        await saver.adelete_thread("t2")
+        return latest, listed
+
+    latest, listed = asyncio.run(run())
+    assert latest.config["configurable"]["checkpoint_id"] == ids[-1]
+    assert len(listed) == 2
+    assert saver.get_tuple(_config("t1")).pending_writes == [("task-1", "input", "x")]
@@ -0,0 +1,98 @@
+import sqlite3
+import time
+
+from backend.storage import DuplicateIndex, SQLiteTaskStore
+from backend.types import StoredTask, TaskStatus
+
+
+def test_query_returns_top_k_of_the_tenant():
+    index = DuplicateIndex()
+    index.add([
+        (1, "acme", "Water the plants"),
+        (2, "acme", "Water the garden plants"),
+        (3, "acme", "File the quarterly taxes"),
+        (4, "other", "Water the plants"),
+    ])
+    matches = index.query(["water the plants!", "file taxes", "book a flight"], "acme", k=2, threshold=0.5)
+    assert [task_id for task_id, _ in matches[0]] == [1, 2]
+    assert matches[0][0][1] > matches[0][1][1]
+    assert [task_id for task_id, _ in matches[1]] == [3]
+    assert matches[2] == []
+    assert index.query(["water the plants"], "nobody") == [[]]
+
+
+def test_remove_frees_rows_and_index_grows(monkeypatch):
+    monkeypatch.setattr("backend.storage.duplicate_index.INITIAL_CAPACITY", 4)
+    index = DuplicateIndex()
+    index.add((i, None, f"Task number {i}") for i in range(4))
+    index.remove([2, 99])
+    index.add([(10, None, "Task number ten")])
+    assert index.stats()["capacity"] == 4
+    index.add((i, None, f"Task number {i}") for i in range(20, 24))
+    assert index.stats()["capacity"] == 8
+    assert len(index) == 8
+    assert index.query(["task number 2"], k=1, threshold=0.99) == [[]]
+    assert index.query(["task number 23"], k=1, threshold=0.99)[0][0][0] == 23
+
+
+def test_index_persists_and_reloads(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.storage.duplicate_index.INITIAL_CAPACITY", 8)
+    path = str(tmp_path / "index")
+    index = DuplicateIndex(path)
+    index.add((i, "acme" if i % 2 else None, f"Task number {i}") for i in range(20))
+    index.remove([5])
+    index.flush()
+
+    start = time.perf_counter()
+    reloaded = DuplicateIndex(path)
+    assert time.perf_counter() - start < 0.5
+    assert reloaded.fingerprint() == index.fingerprint()
+    assert reloaded.query(["task number 7"], "acme", k=1) == index.query(["task number 7"], "acme", k=1)
+    assert reloaded.query(["task number 5"], "acme", k=1, threshold=0.99) == [[]]
+
+
+def test_store_keeps_the_index_current(tmp_path):
+    db_path = str(tmp_path / "tasks.db")
+    store = SQLiteTaskStore(db_path, duplicate_index=DuplicateIndex(str(tmp_path / "index")))
+    first, second = store.save_tasks([StoredTask(task="Buy milk"), StoredTask(task="Call the bank")])
+    store.save_task(StoredTask(task="Buy bread", status=TaskStatus.DONE))
+    assert [m[0][0] for m in store.find_duplicates(["buy milk", "call the bank"], threshold=0.9)] == [first.id, second.id]
+    assert store.find_duplicates(["buy bread"], threshold=0.9) == [[]]
+
+    store.update_status(first.id, TaskStatus.DONE)
+    assert store.find_duplicates(["buy milk"], threshold=0.9) == [[]]
+    store.update_status(first.id, TaskStatus.OPEN)
+    assert store.find_duplicates(["buy milk"], threshold=0.9)[0][0][0] == first.id
+    store.close()
+
+    # A task added while the index was not watching triggers a rebuild on open
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO tasks (task, status, created_at, updated_at) VALUES ('Walk the dog', 'open', '', '')")
+    conn.commit()
+    conn.close()
+    reopened = SQLiteTaskStore(db_path, duplicate_index=DuplicateIndex(str(tmp_path / "index")))
+    assert reopened.duplicate_index.fingerprint()[0] == 3
+    assert reopened.find_duplicates(["walk the dog"], threshold=0.9)[0]
+    reopened.close()
+
+
+def test_migrates_databases_without_tenant_id(tmp_path):
+    db_path = str(tmp_path / "tasks.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, task TEXT NOT NULL, "
+        "status TEXT NOT NULL DEFAULT 'open', due_date TEXT, is_open_ended INTEGER NOT NULL DEFAULT 0, "
+        "created_at TEXT NOT NULL, updated_at TEXT NOT NULL)")
+    conn.execute("INSERT INTO tasks (task, created_at, updated_at) VALUES "
+                 "('Old task', '2025-01-01T00:00:00+00:00', '2025-01-01T00:00:00+00:00')")
+    conn.commit()
+    conn.close()
+
+    store = SQLiteTaskStore(db_path)
+    assert store.get_task(1).tenant_id is None
+    saved = store.save_task(StoredTask(task="New task", tenant_id="acme"))
+    assert store.get_task(saved.id).tenant_id == "acme"
+    with store.reading() as conn:
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(tasks)")}
+    assert "idx_tasks_tenant_status" in indexes
+    store.close()
@@ -0,0 +1,116 @@
+import random
+import sqlite3
+
+import pytest
+
+from backend.storage import SQLiteTaskStore
+from backend.storage.search import InvertedIndex, parse_query
+from backend.types import StoredTask, TaskStatus
+
+BACKENDS = ["fts5", "python"]
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request):
+    store = SQLiteTaskStore(":memory:", search_backend=request.param)
+    yield store
+    store.close()
+
+
+def _ids(page):
+    return [task.id for task in page.tasks]
+
+
+def test_parse_query():
+    assert parse_query("Café  meet* 3.5") == [("cafe", False), ("meet", True), ("3", False), ("5", False)]
+    with pytest.raises(ValueError):
+        parse_query(" * !! ")
+
+
+def test_ranks_task_text_above_subtasks(store):
+    in_subtask, in_task, unrelated = store.save_tasks([
+        StoredTask(task="Plan the offsite", subtasks=["Draft the budget"]),
+        StoredTask(task="Review the budget"),
+        StoredTask(task="Buy milk"),
+    ])
+    assert _ids(store.search_tasks("budget")) == [in_task.id, in_subtask.id]
+    assert _ids(store.search_tasks("BUDGET plan")) == [in_subtask.id]
+    assert _ids(store.search_tasks("bud*")) == [in_task.id, in_subtask.id]
+    assert _ids(store.search_tasks("bu*")) == [unrelated.id, in_task.id, in_subtask.id]
+    assert store.search_tasks("budgets").tasks == []
+    assert store.search_tasks("budget").tasks[1].subtasks == ["Draft the budget"]
+
+
+def test_filters(store):
+    done, friday, acme = store.save_tasks([
+        StoredTask(task="Call the bank"),
+        StoredTask(task="Call the plumber", due_date="friday"),
+        StoredTask(task="Call the client", tenant_id="acme"),
+    ])
+    store.update_status(done.id, TaskStatus.DONE)
+    assert _ids(store.search_tasks("call", status=TaskStatus.DONE)) == [done.id]
+    assert set(_ids(store.search_tasks("call", status=TaskStatus.OPEN))) == {friday.id, acme.id}
+    assert _ids(store.search_tasks("call", due_date="friday")) == [friday.id]
+    assert _ids(store.search_tasks("call", tenant_id="acme")) == [acme.id]
+
+
+def test_cursor_pagination(store):
+    store.save_tasks([StoredTask(task=f"Write report {i}" + " report" * (i % 3)) for i in range(25)])
+    expected = _ids(store.search_tasks("report", limit=100))
+    pages, cursor = [], None
+    while True:
+        page = store.search_tasks("report", limit=10, cursor=cursor)
+        pages.append(_ids(page))
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert [len(ids) for ids in pages] == [10, 10, 5]
+    assert sum(pages, []) == expected
+    with pytest.raises(ValueError):
+        store.search_tasks("report", cursor="not-a-cursor")
+
+
+def test_failed_batch_is_not_indexed(store):
+    bad = StoredTask.model_construct(task=None, subtasks=[], status=TaskStatus.OPEN, due_date=None,
+                                     is_open_ended=False, tenant_id=None, created_at=None)
+    with pytest.raises(Exception):
+        store.save_tasks([StoredTask(task="Good task"), bad])
+    assert store.search_tasks("good").tasks == []
+
+
+def test_backends_rank_identically():
+    random.seed(7)
+    words = "plan meet meeting milk buy call bank report draft review budget team".split()
+    tasks = [StoredTask(task=" ".join(random.choices(words, k=random.randint(1, 6))),
+                        subtasks=[" ".join(random.choices(words, k=3)) for _ in range(random.randint(0, 3))])
+             for _ in range(200)]
+    stores = [SQLiteTaskStore(":memory:", search_backend=backend) for backend in BACKENDS]
+    for store in stores:
+        store.save_tasks(tasks)
+    for query in ("meet*", "plan budget", "b*", "review team"):
+        fts5, python = (_ids(store.search_tasks(query, limit=100)) for store in stores)
+        assert fts5 == python and fts5
+
+
+def test_index_is_backfilled_on_open(tmp_path):
+    db_path = str(tmp_path / "tasks.db")
+    old = SQLiteTaskStore(db_path, search_backend="python")
+    old.save_task(StoredTask(task="Old task", subtasks=["Old step"]))
+    old.close()
+    store = SQLiteTaskStore(db_path, search_backend="fts5")
+    assert [t.task for t in store.search_tasks("step").tasks] == ["Old task"]
+    store.save_task(StoredTask(task="New task"))
+    store.close()
+    reopened = SQLiteTaskStore(db_path, search_backend="python")
+    assert len(reopened.search_tasks("task").tasks) == 2
+    reopened.close()
+
+
+def test_falls_back_without_fts5(monkeypatch):
+    # SQLite reports a missing FTS5 build as an unknown module
+    monkeypatch.setattr("backend.storage.sqlite_store.CREATE_SEARCH_TABLE", "CREATE VIRTUAL TABLE t USING nope()")
+    store = SQLiteTaskStore(":memory:")
+    assert store.search_backend == "python"
+    with pytest.raises(sqlite3.OperationalError):
+        SQLiteTaskStore(":memory:", search_backend="fts5")
+    assert isinstance(store._search_index, InvertedIndex)
@@ -0,0 +1,114 @@
+import sqlite3
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from backend.storage import SQLiteTaskStore
+from backend.storage.sqlite_store import SELECT_DUE_BY_STATUS
+from backend.types import StoredTask, TaskStatus
+
+def test_save_and_get_task(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / "tasks.db"))
+    saved = store.save_task(StoredTask(task="Do the dishes", subtasks=["Scrub", "Rinse"], due_date="2026-11-01"))
+    assert saved.id is not None
+    assert saved.created_at is not None
+
+    loaded = store.get_task(saved.id)
+    assert loaded.task == "Do the dishes"
+    assert loaded.subtasks == ["Scrub", "Rinse"]
+    assert loaded.due_date == "2026-11-01"
+    assert loaded.status == TaskStatus.OPEN
+    assert loaded.is_open_ended is False
+    store.close()
+
+def test_tasks_survive_reopen(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    store = SQLiteTaskStore(path)
+    task_id = store.save_task(StoredTask(task="Maintain garden", is_open_ended=True)).id
+    store.close()
+
+    reopened = SQLiteTaskStore(path)
+    task = reopened.get_task(task_id)
+    assert task.task == "Maintain garden"
+    assert task.is_open_ended is True
+    reopened.close()
+
+def test_wal_mode_and_indexes(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / "tasks.db"))
+    with store.reading() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(tasks)")}
+    assert {"idx_tasks_due_date", "idx_tasks_status"} <= indexes
+    store.close()
+
+def test_save_tasks_is_one_transaction(task_store):
+    saved = task_store.save_tasks([StoredTask(task=f"Task {i}", subtasks=[f"Step {i}"]) for i in range(5)])
+    assert [t.task for t in saved] == [f"Task {i}" for i in range(5)]
+    assert len({t.id for t in saved}) == 5
+    assert len(task_store.list_tasks()) == 5
+
+def test_failed_batch_is_rolled_back(task_store):
+    bad = StoredTask.model_construct(task=None, subtasks=[], status=TaskStatus.OPEN, due_date=None,
+                                     is_open_ended=False, created_at=None)
+    with pytest.raises(Exception):
+        task_store.save_tasks([StoredTask(task="Good task"), bad])
+    assert task_store.list_tasks() == []
+
+def test_list_tasks_filters_by_status(task_store):
+    first = task_store.save_task(StoredTask(task="First"))
+    task_store.save_task(StoredTask(task="Second"))
+    assert task_store.update_status(first.id, TaskStatus.DONE) is True
+    assert task_store.update_status(9999, TaskStatus.DONE) is False
+    assert [t.task for t in task_store.list_tasks(status=TaskStatus.OPEN)] == ["Second"]
+    assert [t.task for t in task_store.list_tasks(status=TaskStatus.DONE)] == ["First"]
+    assert [t.task for t in task_store.list_tasks(limit=1, offset=1)] == ["Second"]
+
+def test_concurrent_writers_are_all_persisted(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / "tasks.db"))
+    start = threading.Barrier(8)
+
+    def write(i):
+        start.wait()
+        return store.save_task(StoredTask(task=f"Task {i}", subtasks=["a", "b"])).id
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(write, range(8)))
+    assert len(set(ids)) == 8
+    assert all(store.get_task(task_id).subtasks == ["a", "b"] for task_id in ids)
+    store.close()
+
+def test_due_dates_are_resolved_and_range_queried(task_store):
+    created = datetime(2026, 10, 17, 12, tzinfo=timezone.utc)
+    friday, tomorrow, unreadable, none = task_store.save_tasks([
+        StoredTask(task="Send report", due_date="friday", created_at=created),
+        StoredTask(task="Call mom", due_date="tomorrow", created_at=created),
+        StoredTask(task="Fix the fence", due_date="soon", created_at=created),
+        StoredTask(task="Read a book", created_at=created),
+    ])
+    assert friday.due_at == datetime(2026, 10, 23, 23, 59, 59, tzinfo=timezone.utc)
+    assert task_store.get_task(tomorrow.id).due_at == datetime(2026, 10, 18, 23, 59, 59, tzinfo=timezone.utc)
+    assert unreadable.due_at is None and none.due_at is None
+
+    assert [t.id for t in task_store.list_due(datetime(2026, 12, 1, tzinfo=timezone.utc))] == [tomorrow.id, friday.id]
+    assert [t.id for t in task_store.list_due(tomorrow.due_at)] == [tomorrow.id]
+    task_store.update_status(tomorrow.id, TaskStatus.DONE)
+    assert [t.id for t in task_store.list_due(friday.due_at, status=TaskStatus.OPEN)] == [friday.id]
+    with task_store.reading() as conn:
+        plan = " ".join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN " + SELECT_DUE_BY_STATUS, ("open", "2026-12-01", 10)))
+    assert "idx_tasks_status_due_at" in plan
+
+def test_migration_resolves_existing_due_dates(tmp_path):
+    db_path = str(tmp_path / "tasks.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, task TEXT NOT NULL, "
+        "status TEXT NOT NULL DEFAULT 'open', due_date TEXT, is_open_ended INTEGER NOT NULL DEFAULT 0, "
+        "created_at TEXT NOT NULL, updated_at TEXT NOT NULL)")
+    conn.execute("INSERT INTO tasks (task, due_date, created_at, updated_at) VALUES "
+                 "('Old task', 'tomorrow', '2025-01-01T09:00:00+00:00', '2025-01-01T09:00:00+00:00')")
+    conn.commit()
+    conn.close()
+    store = SQLiteTaskStore(db_path)
+    assert store.get_task(1).due_at == datetime(2025, 1, 2, 23, 59, 59, tzinfo=timezone.utc)
+    store.close()
@@ -0,0 +1,24 @@
+from backend.config import env_flag, env_number
+
+
+def test_env_number_falls_back_on_missing_or_invalid_values(monkeypatch):
+    monkeypatch.delenv("TEST_NUMBER", raising=False)
+    assert env_number("TEST_NUMBER", 3) == 3
+    monkeypatch.setenv("TEST_NUMBER", "2.5")
+    assert env_number("TEST_NUMBER", 3) == 2.5
+    monkeypatch.setenv("TEST_NUMBER", "lots")
+    assert env_number("TEST_NUMBER", 3, int) == 3
+
+
+def test_env_flag_accepts_the_same_words_everywhere(monkeypatch):
+    monkeypatch.delenv("TEST_FLAG", raising=False)
+    assert env_flag("TEST_FLAG", True) is True
+    for value in ("1", "true", "Yes", " on "):
+        monkeypatch.setenv("TEST_FLAG", value)
+        assert env_flag("TEST_FLAG", False) is True
+    for value in ("0", "false", "No", "OFF"):
+        monkeypatch.setenv("TEST_FLAG", value)
+        assert env_flag("TEST_FLAG", True) is False
+    monkeypatch.setenv("TEST_FLAG", "sometimes")
+    assert env_flag("TEST_FLAG", True) is True
+    assert env_flag("TEST_FLAG", False) is False
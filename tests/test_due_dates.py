@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.due_dates import (
+    LocalDueDate,
+    detect_due_date,
+    due_date_cache_info,
+    find_due_date,
+    find_open_ended,
+    parse_due_date,
+)
+
+# A Saturday afternoon
+NOW = datetime(2026, 10, 17, 15, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("phrase, due", [
+    ("today", "2026-10-17"),
+    ("EOD", "2026-10-17"),
+    ("tomorrow", "2026-10-18"),
+    ("by Friday", "2026-10-23"),
+    ("this saturday", "2026-10-17"),
+    ("next Monday", "2026-10-19"),
+    ("next friday", "2026-10-23"),
+    ("end of the week", "2026-10-23"),
+    ("next week", "2026-10-23"),
+    ("this weekend", "2026-10-18"),
+    ("next weekend", "2026-10-25"),
+    ("EOM", "2026-10-31"),
+    ("next month", "2026-11-30"),
+    ("end of the year", "2026-12-31"),
+    ("next year", "2027-12-31"),
+    ("in 3 days", "2026-10-20"),
+    ("in 2 weeks", "2026-10-31"),
+    ("in 1 month", "2026-11-17"),
+    ("2026-11-01", "2026-11-01"),
+    ("11/1", "2026-11-01"),
+    ("11/1/27", "2027-11-01"),
+    ("Nov. 3", "2026-11-03"),
+    ("November 3rd, 2027", "2027-11-03"),
+    ("3rd of November", "2026-11-03"),
+    ("Oct 16", "2027-10-16"),
+])
+def test_parse_due_date(phrase, due):
+    assert parse_due_date(phrase, NOW) == datetime.fromisoformat(f"{due}T23:59:59+00:00")
+
+
+@pytest.mark.parametrize("phrase", [None, "", "soon", "Feb 30", "2026-13-01"])
+def test_unreadable_phrases(phrase):
+    assert parse_due_date(phrase, NOW) is None
+
+
+def test_relative_to_request_time_in_utc():
+    late_evening_in_new_york = datetime(2026, 10, 17, 22, 0, tzinfo=timezone(timedelta(hours=-4)))
+    assert parse_due_date("today", late_evening_in_new_york).date().isoformat() == "2026-10-18"
+
+
+def test_repeated_phrases_are_cached():
+    parse_due_date("in 9 days", NOW)
+    hits = due_date_cache_info().hits
+    assert parse_due_date("  In 9 Days ", NOW + timedelta(hours=1)) == parse_due_date("in 9 days", NOW)
+    assert due_date_cache_info().hits == hits + 2
+
+
+def test_find_due_date():
+    assert find_due_date("send the invoice EOM") == ("EOM", "send the invoice")
+    assert find_due_date("book flights by Nov 3") == ("Nov 3", "book flights")
+
+
+def test_detect_due_date():
+    assert detect_due_date("renew passport by Nov 3rd", NOW) == LocalDueDate("Nov 3rd", False)
+    assert detect_due_date("learn piano, no deadline", NOW) == LocalDueDate(None, True)
+    assert detect_due_date("file taxes by Feb 30", NOW) is None
+    assert detect_due_date("call mom", NOW) is None
+    assert find_open_ended("learn piano whenever I can") == (True, "learn piano")
+
+
+def test_find_due_date_needs_a_lead_in_for_bare_dates():
+    assert find_due_date("Finish chapter 10/12 by Friday") == ("Friday", "Finish chapter 10/12")
+    assert find_due_date("pay rent due on 1/2") == ("1/2", "pay rent")
+
+
+@pytest.mark.parametrize("text", [
+    "Buy 1/2 gallon of milk",
+    "Finish chapter 10/12",
+    "review section 3/5 of report",
+    "I may 2 things",
+    "Order 2 may flowers",
+    "Play ongoing game",
+    "Find out whenever store opens",
+])
+def test_detect_due_date_ignores_numbers_and_other_words(text):
+    assert detect_due_date(text, NOW) is None
@@ -1,11 +1,23 @@
 from fastapi.testclient import TestClient
+from unittest.mock import Mock
 from backend.mcp_server import app
+import asyncio
+import json
 import pytest
+from backend.types import StoredTask
+from backend.prompts.task_prompts import TASK_JUDGMENT_SYSTEM_PROMPT
 
 client = TestClient(app)
 
-def test_create_task():
+def _completion(content):
+    return Mock(choices=[Mock(message=Mock(content=content))])
+
+def test_create_task(mock_async_openai):
     """Test creating a task through the API."""
+    mock_async_openai.chat.completions.create.side_effect = [
+        _completion('{"task": "Test Task", "confidence": 0.9, "concerns": [], "questions": [], "is_open_ended": true}'),
+        _completion('{"judgment": "pass", "reason": "Task is clear"}'),
+    ]
     response = client.post(
         "/tasks",
         json={"task": "Test Task"}  # Use json parameter instead of params
@@ -31,4 +43,403 @@ def test_create_task_empty_task():
         "/tasks",
         json={"task": ""}  # Empty task string
     )
-    assert response.status_code == 400  # Bad request 
\ No newline at end of file
+    assert response.status_code == 400  # Bad request 
+def test_get_stored_task(task_store):
+    task_id = task_store.save_task(StoredTask(task="Do the dishes", subtasks=["Scrub"])).id
+    response = client.get(f"/tasks/{task_id}")
+    assert response.status_code == 200
+    assert response.json()["subtasks"] == ["Scrub"]
+
+    response = client.get("/tasks", params={"status": "open"})
+    assert response.status_code == 200
+    assert [t["id"] for t in response.json()] == [task_id]
+
+def _record_event_loop(monkeypatch, store, method):
+    """Record, for each call of ``store.method``, whether it ran on an event loop thread."""
+    on_loop = []
+    original = getattr(store, method)
+
+    def wrapped(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(store, method, wrapped)
+    return on_loop
+
+def test_task_reads_run_off_the_event_loop(task_store, monkeypatch):
+    task_id = task_store.save_task(StoredTask(task="Do the dishes")).id
+    listed = _record_event_loop(monkeypatch, task_store, "list_tasks")
+    fetched = _record_event_loop(monkeypatch, task_store, "get_task")
+    assert client.get("/tasks").status_code == 200
+    assert client.get(f"/tasks/{task_id}").status_code == 200
+    assert listed == fetched == [False]
+
+def test_get_missing_task():
+    response = client.get("/tasks/12345")
+    assert response.status_code == 404
+
+def test_create_task_pending_then_resume(mock_async_openai, checkpointer, monkeypatch):
+    monkeypatch.setenv("JUDGE_FAST_PATH", "false")
+    create = mock_async_openai.chat.completions.create
+    create.side_effect = [
+        _completion('{"task": "Do the dishes", "confidence": 0.4, "concerns": ["Vague"], "questions": ["Which dishes?"]}'),
+        _completion('{"judgment": "fail", "reason": "Task is vague"}'),
+    ]
+    response = client.post("/tasks", json={"task": "Do the dishes"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "pending"
+    assert data["needs_input"] is True
+    assert "Which dishes?" in data["prompt"]
+    thread_id = data["thread_id"]
+
+    create.side_effect = [
+        _completion('{"task": "Do the dishes in the sink", "confidence": 0.9, "concerns": [], "questions": [], "is_open_ended": true}'),
+        _completion('{"judgment": "pass", "reason": "Task is clear"}'),
+    ]
+    response = client.post(f"/tasks/{thread_id}/resume", json={"response": "The ones in the sink"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "success"
+    assert data["task"] == "Do the dishes in the sink"
+    assert data["task_id"] is not None
+    # Extraction and the first judgment were not re-run on resume
+    assert create.await_count == 4
+    assert checkpointer.stats()["threads"] == 0
+
+    response = client.post(f"/tasks/{thread_id}/resume", json={"response": "again"})
+    assert response.status_code == 404
+
+def _open_breaker(breaker):
+    for _ in range(breaker.settings.min_calls):
+        breaker.after_call(breaker.before_call(), TimeoutError())
+
+def test_open_breaker_creates_tasks_locally(mock_async_openai, circuit_breaker, task_store):
+    assert client.get("/health").json()["status"] == "ok"
+    _open_breaker(circuit_breaker)
+    health = client.get("/health").json()
+    assert health["status"] == "degraded"
+    assert health["llm_breakers"]["openai"]["state"] == "open"
+
+    response = client.post("/tasks", json={"task": "Remind me to water the plants by Friday"})
+    data = response.json()
+    assert data["status"] == "success"
+    assert data["degraded"] is True
+    assert data["task"] == "Water the plants"
+    assert not data["subtasks"]
+    assert task_store.get_task(data["task_id"]).due_date == "Friday"
+    mock_async_openai.chat.completions.create.assert_not_called()
+
+def test_open_breaker_asks_for_a_missing_due_date(mock_async_openai, circuit_breaker):
+    _open_breaker(circuit_breaker)
+    data = client.post("/tasks", json={"task": "Call mom"}).json()
+    assert data["status"] == "pending"
+    assert data["degraded"] is True
+
+    data = client.post(f"/tasks/{data['thread_id']}/resume", json={"response": "tomorrow"}).json()
+    assert data["status"] == "success"
+    assert data["task"] == "Call mom"
+    mock_async_openai.chat.completions.create.assert_not_called()
+
+def test_speculative_subtasks_used_on_yes(mock_openai, mock_async_openai, monkeypatch):
+    from backend.tools.speculation import SubtaskSpeculator, SpeculationBudget, configure_speculator
+    monkeypatch.setenv("SPECULATIVE_SUBTASKS", "true")
+    speculator = SubtaskSpeculator(SpeculationBudget(max_calls=5))
+    configure_speculator(speculator)
+    mock_async_openai.chat.completions.create.side_effect = [
+        _completion('{"task": "Plan a party", "confidence": 0.9, "concerns": [], "questions": [], '
+                    '"is_subtaskable": true, "due_date": "2026-11-01"}'),
+    ]
+    mock_openai.chat.completions.create.return_value = _completion(
+        '{"subtasks": ["Pick a venue", "Send invites"], "confidence": 0.9, "concerns": [], "questions": []}')
+    try:
+        response = client.post("/tasks", json={"task": "Plan a party by 2026-11-01", "tenant_id": "acme"})
+        data = response.json()
+        assert data["status"] == "pending"
+        assert "(yes/no)" in data["prompt"]
+        assert speculator.budget.used("acme") == 1
+
+        response = client.post(f"/tasks/{data['thread_id']}/resume", json={"response": "yes"})
+        data = response.json()
+        assert data["status"] == "pending"
+        assert "Pick a venue" in data["prompt"]
+        # Subtasks came from the speculative call; no async generation after "yes"
+        assert mock_openai.chat.completions.create.call_count == 1
+        assert mock_async_openai.chat.completions.create.await_count == 1
+        assert speculator.pending() == 0
+    finally:
+        configure_speculator(None)
+
+def test_speculative_subtasks_discarded_on_no(mock_openai, mock_async_openai, monkeypatch):
+    from backend.tools.speculation import SubtaskSpeculator, configure_speculator
+    monkeypatch.setenv("SPECULATIVE_SUBTASKS", "true")
+    speculator = SubtaskSpeculator()
+    configure_speculator(speculator)
+    mock_async_openai.chat.completions.create.return_value = _completion(
+        '{"task": "Plan a party", "confidence": 0.9, "concerns": [], "questions": [], '
+        '"is_subtaskable": true, "due_date": "2026-11-01"}')
+    mock_openai.chat.completions.create.return_value = _completion(
+        '{"subtasks": ["Pick a venue"], "confidence": 0.9, "concerns": [], "questions": []}')
+    try:
+        data = client.post("/tasks", json={"task": "Plan a party by 2026-11-01"}).json()
+        assert speculator.budget.used("default") == 1
+        data = client.post(f"/tasks/{data['thread_id']}/resume", json={"response": "no"}).json()
+        assert data["status"] == "success"
+        assert data["subtasks"] is None
+        assert speculator.pending() == 0
+    finally:
+        configure_speculator(None)
+
+def test_resume_unknown_thread():
+    response = client.post("/tasks/does-not-exist/resume", json={"response": "yes"})
+    assert response.status_code == 404
+
+def test_resume_requires_response():
+    response = client.post("/tasks/abc/resume", json={"response": ""})
+    assert response.status_code == 400
+
+def _echo_llm(**kwargs):
+    """Pass every task, naming it after the input so results can be matched to items."""
+    system_msg, user_prompt = (m["content"] for m in kwargs["messages"])
+    if system_msg == TASK_JUDGMENT_SYSTEM_PROMPT:
+        return _completion('{"judgment": "pass", "reason": "Task is clear"}')
+    task = next(name for name in ("Wash car", "Pay rent", "Call mom") if name in user_prompt)
+    return _completion(f'{{"task": "{task}", "confidence": 0.9, "concerns": [], "questions": [], "is_open_ended": true}}')
+
+def test_create_tasks_batch(mock_async_openai):
+    mock_async_openai.chat.completions.create.side_effect = _echo_llm
+    response = client.post("/tasks/batch", json={"tasks": [{"task": "Wash car"}, {"task": "Pay rent"}, {"task": "Call mom"}]})
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["index"] for r in data["results"]] == [0, 1, 2]
+    assert [r["task"] for r in data["results"]] == ["Wash car", "Pay rent", "Call mom"]
+    assert data["succeeded"] == 3
+    assert data["pending"] == 0
+    assert data["failed"] == 0
+
+def test_create_tasks_batch_streams_ndjson(mock_async_openai):
+    import json
+    mock_async_openai.chat.completions.create.side_effect = _echo_llm
+    response = client.post("/tasks/batch", json={"tasks": [{"task": "Wash car"}, {"task": "Pay rent"}], "stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted((r["index"], r["task"], r["status"]) for r in lines) == [
+        (0, "Wash car", "success"), (1, "Pay rent", "success")
+    ]
+
+def test_create_tasks_batch_limits_concurrency_and_times_out(monkeypatch):
+    import asyncio
+    import backend.mcp_server as server
+    running, peak = 0, 0
+
+    async def fake_run(graph_input, thread_id, fallback_task):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            await asyncio.sleep(5 if fallback_task == "slow" else 0.01)
+        finally:
+            running -= 1
+        return server.TaskResponse(task=fallback_task, thread_id=thread_id, status="success")
+
+    monkeypatch.setattr(server, "_run_task_graph", fake_run)
+    tasks = [{"task": f"task {i}"} for i in range(6)] + [{"task": "slow"}]
+    response = client.post("/tasks/batch", json={"tasks": tasks, "max_concurrency": 2, "item_timeout": 0.2})
+    data = response.json()
+    assert peak == 2
+    assert data["succeeded"] == 6
+    assert data["failed"] == 1
+    assert data["results"][6]["status"] == "error"
+    assert "Timed out" in data["results"][6]["message"]
+
+def test_create_tasks_batch_rejects_empty_and_oversized(monkeypatch):
+    import backend.mcp_server as server
+    assert client.post("/tasks/batch", json={"tasks": []}).status_code == 400
+    monkeypatch.setattr(server, "BATCH_MAX_ITEMS", 1)
+    assert client.post("/tasks/batch", json={"tasks": [{"task": "a"}, {"task": "b"}]}).status_code == 400
+
+def test_create_task_with_timings_and_metrics(mock_async_openai, monkeypatch):
+    monkeypatch.setenv("JUDGE_FAST_PATH", "false")
+    mock_async_openai.chat.completions.create.side_effect = [
+        Mock(choices=[Mock(message=Mock(content='{"task": "Timed task", "confidence": 0.9, "concerns": [], "questions": [], "is_open_ended": true}'))],
+             usage=Mock(prompt_tokens=120, completion_tokens=30)),
+        Mock(choices=[Mock(message=Mock(content='{"judgment": "pass", "reason": "Task is clear"}'))],
+             usage=Mock(prompt_tokens=80, completion_tokens=10)),
+    ]
+    response = client.post("/tasks", params={"timings": "true"}, json={"task": "Timed task"})
+    assert response.status_code == 200
+    timings = response.json()["timings"]
+    assert timings["prompt_tokens"] == 200
+    assert timings["completion_tokens"] == 40
+    nodes = {n["node"]: n for n in timings["nodes"]}
+    assert nodes["extract_task"]["llm_calls"] == 1
+    assert nodes["judge_task"]["prompt_tokens"] == 80
+    assert "create_task" in nodes
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert 'task_agent_node_duration_seconds_count{node="extract_task",outcome="ok"}' in metrics.text
+    assert 'task_agent_llm_tokens_total{node="judge_task",prompt="task_judgment",kind="prompt"}' in metrics.text
+
+def test_timings_omitted_by_default(mock_async_openai):
+    mock_async_openai.chat.completions.create.side_effect = [
+        _completion('{"task": "Untimed", "confidence": 0.9, "concerns": [], "questions": [], "is_open_ended": true}'),
+        _completion('{"judgment": "pass", "reason": "Task is clear"}'),
+    ]
+    response = client.post("/tasks", json={"task": "Untimed"})
+    assert response.json()["timings"] is None
+
+def _stream_chunks(*deltas, usage=None):
+    async def chunks():
+        for delta in deltas:
+            yield Mock(choices=[Mock(delta=Mock(content=delta))], usage=None)
+        yield Mock(choices=[], usage=usage)
+    return chunks()
+
+def _sse_events(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_create_task_stream_reports_nodes_then_result(mock_async_openai):
+    mock_async_openai.chat.completions.create.return_value = _completion(
+        '{"task": "Do the dishes", "confidence": 0.9, "concerns": [], "questions": []}')
+    response = client.post("/tasks/stream", json={"task": "Do the dishes"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(response)
+    assert events[0][0] == "start"
+    assert [data["node"] for name, data in events if name == "node"] == ["extract_task", "judge_task"]
+    name, result = events[-1]
+    assert name == "result"
+    assert result["status"] == "pending"
+    assert result["thread_id"] == events[0][1]["thread_id"]
+    assert "due" in result["prompt"].lower()
+
+def test_create_task_stream_forwards_clarification_tokens(mock_async_openai, monkeypatch):
+    monkeypatch.setenv("CLARIFICATION_MODE", "rich")
+    create = mock_async_openai.chat.completions.create
+    create.side_effect = [
+        _completion('{"task": "Do the dishes", "confidence": 0.4, "concerns": ["Vague"], "questions": ["Which dishes?"]}'),
+        _stream_chunks('{"message": "Which', ' dishes', ' do you mean?"}', usage=Mock(prompt_tokens=50, completion_tokens=9)),
+    ]
+    response = client.post("/tasks/stream", json={"task": "Do the dishes"})
+    events = _sse_events(response)
+    tokens = [data for name, data in events if name == "token"]
+    assert "".join(token["text"] for token in tokens) == '{"message": "Which dishes do you mean?"}'
+    assert {token["prompt"] for token in tokens} == {"clarification"}
+    assert {token["node"] for token in tokens} == {"ask_about_task"}
+    assert create.await_args_list[1].kwargs["stream"] is True
+    # Tokens arrive before the node that produced them finishes
+    names = [name for name, _ in events]
+    assert names.index("token") < names.index("result")
+    assert events[-1][1]["prompt"] == "Which dishes do you mean?"
+
+def test_create_task_stream_logs_unexpected_errors(monkeypatch):
+    class BrokenGraph:
+        async def astream(self, *args, **kwargs):
+            raise RuntimeError("boom")
+            yield
+
+    logger = Mock()
+    monkeypatch.setattr("backend.mcp_server.get_server_graph", lambda: BrokenGraph())
+    monkeypatch.setattr("backend.mcp_server.logger", logger)
+    events = _sse_events(client.post("/tasks/stream", json={"task": "Do the dishes"}))
+    assert events[-1] == ("error", {"status_code": 500, "detail": "Internal server error while processing task"})
+    logger.exception.assert_called_once()
+
+def test_create_task_logs_unexpected_errors(monkeypatch):
+    class BrokenGraph:
+        async def ainvoke(self, *args, **kwargs):
+            raise RuntimeError("boom")
+
+    logger = Mock()
+    monkeypatch.setattr("backend.mcp_server.get_server_graph", lambda: BrokenGraph())
+    monkeypatch.setattr("backend.mcp_server.logger", logger)
+    response = client.post("/tasks", json={"task": "Do the dishes"})
+    assert response.status_code == 500
+    logger.exception.assert_called_once()
+
+def test_resume_task_stream(mock_async_openai):
+    mock_async_openai.chat.completions.create.return_value = _completion(
+        '{"task": "Do the dishes", "confidence": 0.9, "concerns": [], "questions": []}')
+    thread_id = client.post("/tasks", json={"task": "Do the dishes"}).json()["thread_id"]
+    mock_async_openai.chat.completions.create.return_value = _completion(
+        '{"task": "Do the dishes", "confidence": 0.9, "concerns": [], "questions": [], "is_open_ended": true}')
+    response = client.post(f"/tasks/{thread_id}/resume/stream", json={"response": "No deadline"})
+    events = _sse_events(response)
+    assert events[-1][0] == "result"
+    assert events[-1][1]["status"] == "success"
+    assert events[-1][1]["task_id"] is not None
+
+    response = client.post(f"/tasks/{thread_id}/resume/stream", json={"response": "again"})
+    assert response.status_code == 404
+
+def test_resume_stream_emits_subtasks_as_they_complete(mock_async_openai):
+    create = mock_async_openai.chat.completions.create
+    create.return_value = _completion('{"task": "Plan a party", "confidence": 0.9, "concerns": [], "questions": [], '
+                                      '"is_subtaskable": true, "due_date": "2026-11-01"}')
+    thread_id = client.post("/tasks", json={"task": "Plan a party by 2026-11-01"}).json()["thread_id"]
+
+    create.return_value = _stream_chunks('{"subtasks": ["Pick a ven', 'ue", "Send invi', 'tes"], "confid',
+                                         'ence": 0.9, "concerns": [], "questions": []}')
+    events = _sse_events(client.post(f"/tasks/{thread_id}/resume/stream", json={"response": "yes"}))
+    names = [name for name, _ in events]
+    subtasks = [data for name, data in events if name == "subtask"]
+    assert [(s["index"], s["subtask"]) for s in subtasks] == [(0, "Pick a venue"), (1, "Send invites")]
+    assert {s["node"] for s in subtasks} == {"generate_subtasks"}
+    # The first subtask is sent before the rest of the completion has been streamed
+    assert names.index("subtask") < len(names) - names[::-1].index("token") - 1
+    assert "Pick a venue" in events[-1][1]["prompt"]
+
+def test_create_task_warns_about_open_duplicates(mock_async_openai):
+    from backend.storage import DuplicateIndex, SQLiteTaskStore, configure_task_store
+    store = SQLiteTaskStore(":memory:", duplicate_index=DuplicateIndex())
+    configure_task_store(store)
+    existing = store.save_task(StoredTask(task="Water the plants", tenant_id="acme"))
+    store.save_task(StoredTask(task="Water the plants", tenant_id="other"))
+    mock_async_openai.chat.completions.create.side_effect = [
+        _completion('{"task": "Water the plants!", "confidence": 0.9, "concerns": [], "questions": [], "is_open_ended": true}'),
+        _completion('{"judgment": "pass", "reason": "Task is clear"}'),
+    ]
+    data = client.post("/tasks", json={"task": "water the plants", "tenant_id": "acme"}).json()
+    assert data["status"] == "success"
+    assert [d["task_id"] for d in data["duplicates"]] == [existing.id]
+    assert data["duplicates"][0]["similarity"] == pytest.approx(1.0)
+    assert store.get_task(data["task_id"]).tenant_id == "acme"
+
+def test_duplicate_index_stats():
+    assert client.get("/api/duplicate-index").json() == {"enabled": False}
+
+def test_search_tasks(task_store, monkeypatch):
+    on_loop = _record_event_loop(monkeypatch, task_store, "search_tasks")
+    first, second = task_store.save_tasks([StoredTask(task="Renew passport"), StoredTask(task="Passport photos")])
+    page = client.get("/tasks/search", params={"q": "passport", "limit": 1}).json()
+    assert len(page["tasks"]) == 1 and page["next_cursor"]
+    rest = client.get("/tasks/search", params={"q": "passport", "cursor": page["next_cursor"]}).json()
+    assert {page["tasks"][0]["id"], rest["tasks"][0]["id"]} == {first.id, second.id}
+    assert rest["next_cursor"] is None
+    assert client.get("/tasks/search", params={"q": "renew*"}).json()["tasks"][0]["id"] == first.id
+    assert client.get("/tasks/search", params={"q": "!!"}).status_code == 400
+    assert not any(on_loop)
+
+def test_list_due_tasks(task_store, monkeypatch):
+    on_loop = _record_event_loop(monkeypatch, task_store, "list_due")
+    overdue, later = task_store.save_tasks([
+        StoredTask(task="Pay rent", due_date="2026-10-01"),
+        StoredTask(task="Renew lease", due_date="2026-12-01"),
+    ])
+    assert [t["id"] for t in client.get("/tasks/due", params={"before": "2026-11-01"}).json()] == [overdue.id]
+    response = client.get("/tasks/due", params={"before": "2026-12-01T23:59:59Z", "status": "open"})
+    assert [t["id"] for t in response.json()] == [overdue.id, later.id]
+    assert response.json()[0]["due_at"].startswith("2026-10-01T23:59:59")
+    assert on_loop == [False, False]
+    assert client.get("/tasks/due", params={"before": "someday"}).status_code == 400
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+from langgraph.errors import GraphInterrupt
+from backend.metrics import (
+    MetricsRegistry, collect_timings, current_node, instrument_node,
+    record_llm_call, record_llm_cache_hit, record_retry, NODE_DURATION, LLM_TOKENS
+)
+
+def test_counter_and_histogram_render_prometheus_text():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls made.", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    calls.inc(route="/tasks")
+    calls.inc(2, route='/say "hi"')
+    latency.observe(0.05, route="/tasks")
+    latency.observe(0.5, route="/tasks")
+
+    text = registry.render()
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{route="/tasks"} 1' in text
+    assert 'calls_total{route="/say \\"hi\\""} 2' in text
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{route="/tasks",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/tasks",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/tasks",le="+Inf"} 2' in text
+    assert 'latency_seconds_sum{route="/tasks"} 0.55' in text
+    assert 'latency_seconds_count{route="/tasks"} 2' in text
+
+def test_instrument_node_records_sync_and_async_nodes():
+    @instrument_node("metrics_test_sync")
+    def sync_node(state):
+        assert current_node() == "metrics_test_sync"
+        return state
+
+    @instrument_node("metrics_test_async")
+    async def async_node(state):
+        assert current_node() == "metrics_test_async"
+        return state
+
+    assert sync_node(1) == 1
+    assert asyncio.run(async_node(2)) == 2
+    assert current_node() is None
+    assert NODE_DURATION.count(node="metrics_test_sync", outcome="ok") == 1
+    assert NODE_DURATION.count(node="metrics_test_async", outcome="ok") == 1
+
+def test_instrument_node_labels_interrupts():
+    @instrument_node("metrics_test_interrupt")
+    def node(state):
+        raise GraphInterrupt()
+
+    with pytest.raises(GraphInterrupt):
+        node(None)
+    assert NODE_DURATION.count(node="metrics_test_interrupt", outcome="interrupt") == 1
+
+def test_collect_timings_breaks_down_by_node():
+    @instrument_node("metrics_test_llm")
+    def node():
+        record_llm_call("task_extraction", 0.02, Mock(prompt_tokens=100, completion_tokens=20))
+        record_llm_call("task_judgment", 0.01, Mock(prompt_tokens=50, completion_tokens=5))
+        record_llm_cache_hit("task_judgment")
+        record_retry("task")
+
+    with collect_timings() as timings:
+        node()
+    result = timings()
+
+    assert result.prompt_tokens == 150
+    assert result.completion_tokens == 25
+    assert result.llm_ms == pytest.approx(30)
+    assert result.retries == {"task": 1}
+    [timing] = result.nodes
+    assert timing.node == "metrics_test_llm"
+    assert timing.calls == 1
+    assert timing.llm_calls == 2
+    assert timing.cache_hits == 1
+    assert LLM_TOKENS.value(node="metrics_test_llm", prompt="task_extraction", kind="prompt") == 100
+
+def test_record_llm_call_ignores_missing_usage():
+    with collect_timings() as timings:
+        record_llm_call("clarification", 0.01, usage=None)
+        record_llm_call("clarification", 0.01, usage=Mock())
+    assert timings().prompt_tokens == 0
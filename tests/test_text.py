@@ -0,0 +1,13 @@
+import pytest
+
+from backend.text import HashingVectorizer, normalize_text
+
+
+def test_normalize_and_embed():
+    assert normalize_text("  Buy  Milk, tomorrow!! ") == "buy milk tomorrow"
+    assert normalize_text("Café_run") == "cafe run"
+    vectorizer = HashingVectorizer(dim=256)
+    vector = vectorizer.embed("buy milk tomorrow")
+    assert vector.shape == (256,)
+    assert float(vector @ vector) == pytest.approx(1.0)
+    assert not vectorizer.embed("").any()
@@ -0,0 +1,53 @@
+from backend.tools.degraded import (
+    DEGRADED_TASK_REASON,
+    extract_task_locally,
+    find_due_date,
+    judge_task_locally,
+    refine_task_locally,
+)
+from backend.tools.prejudge import DUE_DATE_QUESTION
+from backend.types import JudgmentType
+
+
+def test_find_due_date():
+    assert find_due_date("water the plants by Friday") == ("Friday", "water the plants")
+    assert find_due_date("file taxes before April 15th") == ("April 15th", "file taxes")
+    assert find_due_date("submit report 2025-06-01")[0] == "2025-06-01"
+    assert find_due_date("finish it by end of the week")[0] == "end of the week"
+    assert find_due_date("call mom") == (None, "call mom")
+
+
+def test_extract_task_locally():
+    metadata = extract_task_locally("Remind me to water the plants by Friday.")
+    assert metadata.task == "Water the plants"
+    assert metadata.due_date == "Friday"
+    assert not metadata.is_subtaskable
+    assert not metadata.is_open_ended
+
+    open_ended = extract_task_locally("Read more books, no rush")
+    assert open_ended.task == "Read more books"
+    assert open_ended.is_open_ended
+    assert open_ended.due_date is None
+
+
+def test_judge_task_locally_accepts_what_the_rules_leave_open():
+    metadata = extract_task_locally("Buy milk tomorrow")
+    metadata.concerns = ["Which shop?"]
+    judgment = judge_task_locally(metadata)
+    assert judgment.judgment == JudgmentType.PASS
+    assert judgment.reason == DEGRADED_TASK_REASON
+
+
+def test_missing_due_date_is_asked_for_then_read_from_feedback(monkeypatch):
+    # The rules apply even when the LLM judge is configured
+    monkeypatch.setenv("JUDGE_FAST_PATH", "false")
+    metadata = extract_task_locally("Call mom")
+    judgment = judge_task_locally(metadata)
+    assert judgment.judgment == JudgmentType.FAIL
+    assert metadata.questions == [DUE_DATE_QUESTION]
+
+    refined = refine_task_locally(metadata, "by next Monday please")
+    assert refined.due_date == "next Monday"
+    assert refined.questions == []
+    assert judge_task_locally(refined).judgment == JudgmentType.PASS
+    assert refine_task_locally(metadata, "there is no deadline").is_open_ended
@@ -0,0 +1,49 @@
+import asyncio
+from unittest.mock import Mock
+from backend.tools.interaction_messages import (
+    generate_task_clarification_prompt, agenerate_task_clarification_prompt, render_clarification_message
+)
+from backend.types import TaskMetadata, TaskJudgment, SubtaskMetadata, SubtaskJudgment, JudgmentType
+
+def _task(confidence=0.5, task="do the dishes"):
+    return TaskMetadata(task=task, confidence=confidence, concerns=["Task is vague"], questions=["Which dishes?"])
+
+def test_render_task_lists_task_reason_concerns_and_questions():
+    message = render_clarification_message(_task(), TaskJudgment(judgment=JudgmentType.FAIL, reason="Task is too vague"), "task")
+    assert message.startswith("Here is the task I understood:\n\n- do the dishes\n\n")
+    assert "Task is too vague" in message
+    assert "Concerns:\n- Task is vague\n\n" in message
+    assert "Questions:\n- Which dishes?\n\n" in message
+    assert message.endswith("confirm it as it is?")
+
+def test_render_skips_concerns_when_confident():
+    message = render_clarification_message(_task(confidence=0.9), TaskJudgment(judgment=JudgmentType.FAIL, reason="Needs a date"), "task")
+    assert "Needs a date" in message
+    assert "Concerns" not in message
+    assert "Questions" not in message
+
+def test_render_missing_task_asks_for_a_clearer_version():
+    message = render_clarification_message(_task(confidence=0.9, task=" "), TaskJudgment(judgment=JudgmentType.FAIL, reason="No task"), "task")
+    assert message.startswith("I couldn't work out a clear task")
+    assert "Which dishes?" in message
+
+def test_render_subtasks_numbers_each_subtask():
+    metadata = SubtaskMetadata(subtasks=["Fill sink", "Scrub"], confidence=0.5, concerns=[], questions=["Where do they go?"])
+    message = render_clarification_message(metadata, SubtaskJudgment(judgment=JudgmentType.FAIL, reason="Incomplete"), "subtasks")
+    assert "1. Fill sink\n2. Scrub" in message
+    assert "Questions:\n- Where do they go?" in message
+    assert "Concerns" not in message
+
+def test_template_mode_makes_no_llm_call(mock_openai, mock_async_openai):
+    judgment = TaskJudgment(judgment=JudgmentType.FAIL, reason="Task is too vague")
+    assert generate_task_clarification_prompt(_task(), judgment, "task") == render_clarification_message(_task(), judgment, "task")
+    assert asyncio.run(agenerate_task_clarification_prompt(_task(), judgment, "task")).startswith("Here is the task")
+    mock_openai.chat.completions.create.assert_not_called()
+    mock_async_openai.chat.completions.create.assert_not_called()
+
+def test_rich_mode_uses_the_llm(mock_openai, monkeypatch):
+    monkeypatch.setenv("CLARIFICATION_MODE", "rich")
+    mock_openai.chat.completions.create.return_value.choices = [Mock(message=Mock(content='{"message": "Which dishes?"}'))]
+    judgment = TaskJudgment(judgment=JudgmentType.FAIL, reason="Task is too vague")
+    assert generate_task_clarification_prompt(_task(), judgment, "task") == "Which dishes?"
+    assert generate_task_clarification_prompt(_task(), judgment, "task", mode="template").startswith("Here is the task")
@@ -0,0 +1,78 @@
+from backend.metrics import PREJUDGE
+from backend.tools.prejudge import prejudge_task, prejudge_subtasks, is_due_date_question, DUE_DATE_QUESTION
+from backend.types import TaskMetadata, SubtaskMetadata, JudgmentType
+
+
+def _task(**overrides):
+    fields = dict(task="do the dishes", confidence=0.9, concerns=[], questions=[], due_date="2026-11-01")
+    fields.update(overrides)
+    return TaskMetadata(**fields)
+
+
+def test_prejudge_task_passes_confident_task_with_due_date():
+    before = PREJUDGE.value(kind="task", outcome="pass")
+    result = prejudge_task(_task())
+    assert result.judgment == JudgmentType.PASS
+    assert PREJUDGE.value(kind="task", outcome="pass") == before + 1
+
+
+def test_prejudge_task_passes_open_ended_task():
+    result = prejudge_task(_task(due_date=None, is_open_ended=True))
+    assert result.judgment == JudgmentType.PASS
+
+
+def test_prejudge_task_fails_without_due_date_and_asks_for_one():
+    metadata = _task(due_date=None)
+    result = prejudge_task(metadata)
+    assert result.judgment == JudgmentType.FAIL
+    assert result.additional_questions == [DUE_DATE_QUESTION]
+    assert metadata.questions == [DUE_DATE_QUESTION]
+
+
+def test_prejudge_task_does_not_repeat_existing_due_date_question():
+    metadata = _task(due_date=None, questions=["When is this due?"])
+    result = prejudge_task(metadata)
+    assert result.judgment == JudgmentType.FAIL
+    assert result.additional_questions == []
+    assert metadata.questions == ["When is this due?"]
+
+
+def test_prejudge_task_asks_for_due_date_despite_unrelated_questions():
+    metadata = _task(due_date=None, questions=["Which dashboards should I update?"])
+    result = prejudge_task(metadata)
+    assert result.judgment == JudgmentType.FAIL
+    assert result.additional_questions == [DUE_DATE_QUESTION]
+
+
+def test_is_due_date_question_matches_whole_words():
+    assert is_due_date_question(DUE_DATE_QUESTION)
+    assert is_due_date_question("When is this due?")
+    assert is_due_date_question("Is there a deadline?")
+    assert is_due_date_question("By when should it be finished?")
+    assert not is_due_date_question("Which candidate should I call?")
+    assert not is_due_date_question("How should I validate the input?")
+    assert not is_due_date_question("What should I do with the residue?")
+    assert not is_due_date_question("When you say dashboards, which ones do you mean?")
+
+
+def test_prejudge_task_defers_ambiguous_task_to_llm():
+    before = PREJUDGE.value(kind="task", outcome="llm")
+    assert prejudge_task(_task(confidence=0.5)) is None
+    assert prejudge_task(_task(concerns=["Which dishes?"])) is None
+    assert PREJUDGE.value(kind="task", outcome="llm") == before + 2
+
+
+def test_prejudge_subtasks_follows_user_acceptance():
+    subtasks = SubtaskMetadata(subtasks=["Fill sink"], confidence=0.9, concerns=[], questions=[])
+    assert prejudge_subtasks(subtasks).judgment == JudgmentType.FAIL
+    subtasks.user_accepted_subtasks = True
+    result = prejudge_subtasks(subtasks)
+    assert result.judgment == JudgmentType.PASS
+    assert "User approved" in result.reason
+
+
+def test_prejudge_disabled(monkeypatch):
+    monkeypatch.setenv("JUDGE_FAST_PATH", "false")
+    assert prejudge_task(_task()) is None
+    assert prejudge_task(_task(due_date=None)) is None
+    assert prejudge_subtasks(SubtaskMetadata(subtasks=[], confidence=0.9, concerns=[], questions=[])) is None
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from backend.metrics import SPECULATIONS
+from backend.tools.speculation import SpeculationBudget, SubtaskSpeculator
+from backend.types import TaskMetadata, SubtaskMetadata
+from helpers import FakeClock
+
+TASK = TaskMetadata(task="Plan a party", confidence=0.9, concerns=[], questions=[], is_subtaskable=True)
+SUBTASKS = SubtaskMetadata(subtasks=["Pick a date", "Invite guests"], confidence=0.9, concerns=[], questions=[])
+
+
+@pytest.fixture
+def speculator():
+    speculator = SubtaskSpeculator(SpeculationBudget(max_calls=2, window_seconds=60), max_workers=1)
+    yield speculator
+    speculator.shutdown()
+
+
+def test_budget_caps_calls_per_tenant_within_window():
+    clock = FakeClock()
+    budget = SpeculationBudget(max_calls=2, window_seconds=60, clock=clock)
+    assert budget.try_acquire("a") and budget.try_acquire("a")
+    assert not budget.try_acquire("a")
+    assert budget.try_acquire("b")
+    clock.now += 61
+    assert budget.used("a") == 0
+    assert budget.try_acquire("a")
+
+
+def test_from_env_ignores_invalid_numbers(monkeypatch):
+    monkeypatch.setenv("SPECULATION_MAX_PER_TENANT", "fifty")
+    monkeypatch.setenv("SPECULATION_WINDOW_SECONDS", "1h")
+    monkeypatch.setenv("SPECULATION_MAX_WORKERS", "")
+    budget = SpeculationBudget.from_env()
+    assert (budget.max_calls, budget.window_seconds) == (50, 3600.0)
+    SubtaskSpeculator.from_env().shutdown()
+
+
+def test_take_returns_speculative_result(speculator):
+    with patch("backend.tools.speculation.generate_subtasks", return_value=SUBTASKS) as generate:
+        assert speculator.start(("t1", TASK.task), "default", TASK)
+        # Starting the same key again (the node re-runs on resume) is a no-op
+        assert not speculator.start(("t1", TASK.task), "default", TASK)
+        assert speculator.take(("t1", TASK.task)) == SUBTASKS
+    generate.assert_called_once()
+    assert speculator.take(("t1", TASK.task)) is None
+
+
+def test_atake_waits_for_running_call(speculator):
+    release = threading.Event()
+
+    def slow_generate(metadata, tenant_id=None):
+        release.wait(5)
+        return SUBTASKS
+
+    async def claim():
+        waiter = asyncio.ensure_future(speculator.atake(("t1", TASK.task)))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        release.set()
+        return await waiter
+
+    with patch("backend.tools.speculation.generate_subtasks", side_effect=slow_generate):
+        speculator.start(("t1", TASK.task), "default", TASK)
+        assert asyncio.run(claim()) == SUBTASKS
+
+
+def test_discard_and_over_budget(speculator):
+    discarded = SPECULATIONS.value(outcome="discarded")
+    over_budget = SPECULATIONS.value(outcome="over_budget")
+    with patch("backend.tools.speculation.generate_subtasks", return_value=SUBTASKS):
+        assert speculator.start(("t1", TASK.task), "tenant", TASK)
+        assert speculator.start(("t2", TASK.task), "tenant", TASK)
+        assert not speculator.start(("t3", TASK.task), "tenant", TASK)
+        speculator.discard(("t1", TASK.task))
+        assert speculator.pending() == 1
+        assert speculator.take(("t1", TASK.task)) is None
+        assert speculator.take(("t2", TASK.task)) == SUBTASKS
+    assert SPECULATIONS.value(outcome="discarded") == discarded + 1
+    assert SPECULATIONS.value(outcome="over_budget") == over_budget + 1
+
+
+def test_failed_speculation_is_a_miss(speculator):
+    empty = SubtaskMetadata(subtasks=[], confidence=0.0, concerns=[], questions=[])
+    with patch("backend.tools.speculation.generate_subtasks", return_value=empty):
+        speculator.start(("t1", TASK.task), "default", TASK)
+        assert speculator.take(("t1", TASK.task)) is None
+
+
+def test_unclaimed_results_expire():
+    clock = FakeClock()
+    speculator = SubtaskSpeculator(SpeculationBudget(clock=clock), ttl_seconds=10, clock=clock)
+    with patch("backend.tools.speculation.generate_subtasks", return_value=SUBTASKS):
+        speculator.start(("t1", TASK.task), "default", TASK)
+        clock.now += 11
+        speculator.start(("t2", TASK.task), "default", TASK)
+        assert speculator.take(("t1", TASK.task)) is None
+        assert speculator.take(("t2", TASK.task)) == SUBTASKS
+    speculator.shutdown()
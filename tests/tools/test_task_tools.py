@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from unittest.mock import Mock, patch
 from backend.tools import task_tools
@@ -459,4 +460,93 @@ def test_extract_task_error_handling_due_date_confirmed(mock_openai):
     result = task_tools.extract_task(state)
     assert state.due_date_confirmed is False
     assert result.due_date is None
-    assert result.is_open_ended is False 
\ No newline at end of file
+    assert result.is_open_ended is False 
+def test_aextract_task_basic(mock_async_openai):
+    mock_async_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"task": "do the dishes", "confidence": 0.9, "concerns": [], "questions": [], "due_date": "2024-03-20"}'))
+    ]
+    state = TaskAgentState(input="Do the dishes by March 20th")
+    result = asyncio.run(task_tools.aextract_task(state))
+    assert isinstance(result, TaskMetadata)
+    assert result.task == "do the dishes"
+    assert state.due_date_confirmed is True
+    mock_async_openai.chat.completions.create.assert_awaited_once()
+
+def test_aextract_task_error_handling(mock_async_openai):
+    mock_async_openai.chat.completions.create.side_effect = Exception("timeout")
+    state = TaskAgentState(input="Do the dishes")
+    result = asyncio.run(task_tools.aextract_task(state))
+    assert result.task == "Do the dishes"
+    assert result.confidence == 0.0
+    assert "Unable to parse task extraction response" in result.concerns
+
+def test_ajudge_task_adds_additional_questions(mock_async_openai):
+    mock_async_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"judgment": "fail", "reason": "Task needs a due date", "additional_questions": ["When is it due?"]}'))
+    ]
+    metadata = TaskMetadata(task="Do the dishes", confidence=0.9, concerns=[], questions=[])
+    result = asyncio.run(task_tools.ajudge_task(metadata))
+    assert result.judgment == JudgmentType.FAIL
+    assert metadata.questions == ["When is it due?"]
+
+def test_agenerate_subtasks_and_ajudge_subtasks(mock_async_openai):
+    mock_async_openai.chat.completions.create.side_effect = [
+        Mock(choices=[Mock(message=Mock(content='{"subtasks": ["Scrub", "Rinse"], "confidence": 0.9, "concerns": [], "questions": []}'))]),
+        Mock(choices=[Mock(message=Mock(content='{"judgment": "pass", "reason": "User approved the subtasks"}'))]),
+    ]
+    metadata = TaskMetadata(task="Do the dishes", confidence=0.9, concerns=[], questions=[])
+    subtasks = asyncio.run(task_tools.agenerate_subtasks(metadata))
+    assert subtasks.subtasks == ["Scrub", "Rinse"]
+    judgment = asyncio.run(task_tools.ajudge_subtasks(metadata, subtasks))
+    assert judgment.judgment == JudgmentType.PASS
+
+def test_aretry_task_with_feedback_error_handling(mock_async_openai):
+    mock_async_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content="invalid json"))
+    ]
+    state = TaskAgentState(
+        task_metadata=TaskMetadata(task="do the dishes", confidence=0.5, concerns=[], questions=[]),
+        user_feedback="all of them"
+    )
+    result = asyncio.run(task_tools.aretry_task_with_feedback(state))
+    assert result.task == "do the dishes"
+    assert "Unable to parse task refinement response" in result.concerns
+
+def test_aretry_subtasks_with_feedback_error_handling(mock_async_openai):
+    mock_async_openai.chat.completions.create.side_effect = Exception("Invalid JSON response")
+    state = TaskAgentState(
+        task_metadata=TaskMetadata(task="do the dishes", confidence=0.9, concerns=[], questions=[]),
+        user_feedback="Include drying"
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(task_tools.aretry_subtasks_with_feedback(state))
+    assert "retry_subtasks_with_feedback failed" in str(exc_info.value)
+
+def test_create_task_persists_to_store(task_store):
+    result = task_tools.create_task("Do the dishes", ["Scrub"], due_date="2026-11-01")
+    stored = task_store.get_task(result["id"])
+    assert stored.task == "Do the dishes"
+    assert stored.subtasks == ["Scrub"]
+    assert stored.due_date == "2026-11-01"
+
+def test_extract_and_judge_task_single_call(mock_openai):
+    mock_openai.chat.completions.create.return_value.choices = [
+        Mock(message=Mock(content='{"task": "do the dishes", "confidence": 0.6, "concerns": [], "questions": [], '
+                                  '"due_date": "2026-11-01", "judgment": "fail", "reason": "Which dishes?", '
+                                  '"additional_questions": ["Which dishes?"]}'))
+    ]
+    state = TaskAgentState(input="Do the dishes by November 1st")
+    metadata, judgment = task_tools.extract_and_judge_task(state)
+    assert metadata.task == "do the dishes"
+    assert metadata.questions == ["Which dishes?"]
+    assert judgment.judgment == JudgmentType.FAIL
+    assert state.due_date_confirmed is True
+    assert mock_openai.chat.completions.create.call_count == 1
+
+def test_extract_and_judge_task_error_handling(mock_async_openai):
+    mock_async_openai.chat.completions.create.return_value.choices = [Mock(message=Mock(content="invalid json"))]
+    state = TaskAgentState(input="Do the dishes")
+    metadata, judgment = asyncio.run(task_tools.aextract_and_judge_task(state))
+    assert metadata.task == "Do the dishes"
+    assert metadata.confidence == 0.0
+    assert judgment.judgment == JudgmentType.FAIL